@@ -12,10 +12,60 @@
 #include <cstdint> 
 
 // ディスクキャッシュの先頭に書き込むヘッダ情報
+// 本体（f0, time, spec, ap の double 列）が 8 バイト境界から始まるよう 16 バイトにしている
 struct VoseCacheHeader {
     uint32_t magic;     // 'VOSE' (0x45534F56) かどうかを確認するマジックナンバー
     int length;         // フレーム数
     int spec_bins;      // 周波数ビン数
+    uint32_t version;   // キャッシュ形式（2）。旧形式のファイルは読み捨てて再解析する
+};
+
+// ディスクキャッシュの統計（get_engine_cache_stats）
+struct VoseCacheStats {
+    int64_t hits;           // ディスク（事前解析含む）から読めた回数
+    int64_t misses;         // ディスクに無く WORLD 解析した回数
+    int64_t memory_hits;    // メモリ上の解析結果を使った回数
+    int64_t evictions;      // 容量超過で消したファイル数
+    int64_t bytes_read;     // 読んだ（mmap した）バイト数
+    int64_t bytes_written;
+    int64_t entries;        // cache/ 内の .vsc 件数
+    int64_t total_bytes;    // cache/ 内の合計バイト数
+    int64_t budget_bytes;   // 上限（0 = 無制限）
+    double  load_seconds;   // ディスク読み込みにかかった累計秒数
+};
+
+// --- 任意音声の WORLD 一括解析（src/core/world_batch.cpp） ---
+enum { VOSE_F0_HARVEST = 0, VOSE_F0_DIO = 1 };
+
+struct VoseWorldOptions {
+    double frame_period;    // ms
+    double f0_floor;        // Hz（CheapTrick の FFT 長もこれで決まる）
+    double f0_ceil;         // Hz
+    int    f0_method;       // VOSE_F0_HARVEST（高品質）/ VOSE_F0_DIO（高速、StoneMask で補正）
+    int    num_threads;     // 0 = ハードウェアスレッド数
+};
+
+// 出力配列は呼び出し側が確保する（world_analysis_frames / world_analysis_fft_size で大きさを問い合わせる）
+struct VoseWorldJob {
+    const double* x;             // モノラル波形
+    int64_t       length;
+    int           fs;
+    int           frames;        // time / f0 の長さ
+    double*       time;
+    double*       f0;
+    double*       spectrogram;   // frames × (fft_size / 2 + 1)、NULL なら計算しない
+    double*       aperiodicity;  // 同上
+    int           fft_size;
+    int           status;        // 出力：0 = 成功、負 = 失敗
+};
+
+// 録音クリップの再合成カーブ（各配列はブロック全体に等間隔で引き伸ばされる。NULL なら無変更）
+struct VoseVoiceCurves {
+    const double* pitch_shift;   // 半音（0 = そのまま）
+    const double* gender;        // 0〜1（0.5 = そのまま、NoteEvent と同じ）
+    const double* tension;       // 同上
+    const double* breath;        // 同上
+    int           length;
 };
 
 // --- GUI（Python）とやり取りするための構造体 ---
@@ -52,13 +102,45 @@ struct OtoEntry; // 前方宣言
 extern "C" {
     // 1. 音源をメモリにパッキングする（内蔵音源化の必須関数）
     DLLEXPORT void load_embedded_resource(const char* phoneme, const int16_t* raw_data, int sample_count);
+    //    登録済みの音源と解析キャッシュを解放する（未登録なら何もしない）
+    DLLEXPORT void unload_embedded_resource(const char* phoneme);
+
+    // 1b. 事前解析（pack_voice）。キャッシュ名は PCM 内容のハッシュ
+    //     prebake_analysis: raw_data を解析して cache_dir/<キー>.vsc に書く。戻り値はフレーム数（失敗時 0）
+    //     set_analysis_cache_dir: レンダー時に cache/ より先に探すディレクトリ
+    DLLEXPORT int prebake_analysis(const int16_t* raw_data, int sample_count, const char* cache_dir, char* key_out);
+    DLLEXPORT void set_analysis_cache_dir(const char* dir);
+
+    // 1c. oto.ini（エイリアス → タイミング）。呼ぶたびに全件を置き換える
+    DLLEXPORT void set_oto_data(const OtoEntry* entries, int count);
+
+    // 1d. 任意音声の WORLD 一括解析（ジョブをスレッドで並列に処理する）。戻り値は成功したジョブ数
+    DLLEXPORT int world_analysis_frames(const VoseWorldOptions* options, int fs, int64_t length);
+    DLLEXPORT int world_analysis_fft_size(const VoseWorldOptions* options, int fs);
+    DLLEXPORT int world_analyze_batch(const VoseWorldOptions* options, VoseWorldJob* jobs, int count);
+
+    // 1e. 録音ブロックを解析 → カーブで加工 → WORLD 合成（y は length サンプル）。0 = 成功
+    DLLEXPORT int resynthesize_block(const double* x, int64_t length, int fs,
+                                     const VoseVoiceCurves* curves, double* y);
 
     // 2. レンダリング実行関数
     DLLEXPORT void execute_render(NoteEvent* notes, int note_count, const char* output_path, int mode_flag);
+
+    // 2b. メモリ出力（出力サンプル数を問い合わせ → 呼び出し側のバッファに書き込む）
+    //     戻り値は総サンプル数。out には min(総サンプル数, capacity) だけ書く
+    DLLEXPORT int64_t query_render_length(const NoteEvent* notes, int note_count);
+    DLLEXPORT int64_t execute_render_to_buffer(NoteEvent* notes, int note_count, double* out, int64_t capacity);
     
     // 3. エンジン管理
     DLLEXPORT float get_engine_version(void);
     DLLEXPORT void clear_engine_cache(void);
+
+    // 3b. ディスクキャッシュ（既定は作業ディレクトリの cache/、容量無制限、ifstream 読み込み）
+    DLLEXPORT void set_engine_cache_dir(const char* dir);
+    DLLEXPORT void set_engine_cache_limit(int64_t max_bytes);   // 超えたら最終アクセスの古い順に消す
+    DLLEXPORT void set_engine_cache_mmap(int enable);           // 1 でキャッシュファイルを mmap する
+    DLLEXPORT void get_engine_cache_stats(VoseCacheStats* out);
+    DLLEXPORT void reset_engine_cache_stats(void);
 }
 
 #endif // VOSE_CORE_H
@@ -0,0 +1,264 @@
+"""
+asset_import.py — VO-SE Cut Studio
+素材の一括取り込み（フォルダごと）
+  ■ scan_media   : フォルダを再帰的にたどり、動画・音声ファイルを集める
+  ■ AssetImporter: プローブはプロセスプールでまとめて並列に（結果は ProbeCache に保存）、
+                   ポスターサムネイルと波形ピークは EnginePool のハンドルでバックグラウンドに作る。
+                   一覧で見えている素材を優先し、取り込み速度（ファイル/秒）を通知する
+コールバックは取り込みのスレッドから呼ばれるので、Qt 側では Signal 経由で受け取ること。
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import video_engine as _ve_mod
+from edl_compiler import VIDEO_EXTS
+from engine_pool import EnginePool
+from media_probe import MediaInfo, ProbeCache
+
+AUDIO_EXTS = (".wav", ".mp3", ".aac", ".flac")
+MEDIA_EXTS = VIDEO_EXTS + AUDIO_EXTS
+
+THUMB_SIZE     = (96, 54)   # ポスターサムネイルの最大サイズ
+WAVEFORM_BINS  = 512        # extract_waveform と同じ chunks
+PROBE_BATCH    = 16         # 1 回にプロセスプールへ渡すファイル数（一覧を少しずつ埋めるため小さめ）
+MEDIA_WORKERS  = 2          # サムネイル・波形のスレッド数（プレビューのハンドルとは別）
+
+
+def scan_media(paths: Iterable[str], exts: Sequence[str] = MEDIA_EXTS) -> List[str]:
+    """paths（ファイルまたはフォルダ）から拡張子が exts のファイルを集める。フォルダ内は名前順"""
+    found: List[str] = []
+    seen:  Set[str]  = set()
+
+    def add(path: str) -> None:
+        path = os.path.abspath(path)
+        if path.lower().endswith(tuple(exts)) and path not in seen:
+            seen.add(path)
+            found.append(path)
+
+    for root in paths:
+        if not os.path.isdir(root):
+            add(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if not name.startswith("."):
+                    add(os.path.join(dirpath, name))
+    return found
+
+
+@dataclass
+class AssetMedia:
+    """1 素材の解析結果"""
+    path:      str
+    info:      Optional[MediaInfo]
+    # (h, w, 4) uint8 RGB32（FrameBuffer.array と同じ並び）
+    thumbnail: Optional[np.ndarray] = None
+    # extract_waveform(WAVEFORM_BINS) と同じ形
+    peaks:     List[float] = field(default_factory=list)
+
+
+@dataclass
+class ImportProgress:
+    probed:   int
+    analyzed: int
+    total:    int
+    elapsed:  float
+
+    @property
+    def files_per_sec(self) -> float:
+        """プローブ済みファイル数 / 経過秒"""
+        return self.probed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self) -> float:
+        return (self.probed + self.analyzed) / (2 * self.total) if self.total > 0 else 1.0
+
+
+class AssetImporter:
+    """
+    paths（ファイル・フォルダ混在可）を取り込む。段階ごとのコールバック:
+        on_found(paths)                      … 見つかったファイル（一覧に先に並べる）
+        on_probed([(path, MediaInfo or None)]) … プローブ結果（PROBE_BATCH 件ずつ）
+        on_media(AssetMedia)                 … サムネイル・波形
+        on_progress(ImportProgress) / on_finished(message)
+    prioritize(paths) で一覧に見えている素材を先に処理させる。
+    """
+
+    def __init__(
+        self,
+        pool: EnginePool,
+        probe: ProbeCache,
+        paths: Sequence[str],
+        skip: Iterable[str] = (),
+        probe_workers: Optional[int] = None,
+        media_workers: int = MEDIA_WORKERS,
+        thumb_size: Tuple[int, int] = THUMB_SIZE,
+        on_found:    Optional[Callable[[List[str]], None]] = None,
+        on_probed:   Optional[Callable[[List[Tuple[str, Optional[MediaInfo]]]], None]] = None,
+        on_media:    Optional[Callable[[AssetMedia], None]] = None,
+        on_progress: Optional[Callable[[ImportProgress], None]] = None,
+        on_finished: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.pool          = pool
+        self.probe         = probe
+        self.roots         = list(paths)
+        self.skip          = {os.path.abspath(p) for p in skip}
+        self.probe_workers = probe_workers or max(1, min(8, os.cpu_count() or 2))
+        self.media_workers = max(1, media_workers)
+        self.thumb_size    = thumb_size
+        self.on_found      = on_found
+        self.on_probed     = on_probed
+        self.on_media      = on_media
+        self.on_progress   = on_progress
+        self.on_finished   = on_finished
+
+        self._cond     = threading.Condition()
+        self._cancel   = threading.Event()
+        self._urgent:  Set[str] = set()
+        self._to_probe: List[str] = []
+        self._to_media: List[Tuple[str, MediaInfo]] = []
+        self._probing  = True
+        self._total    = 0
+        self._probed   = 0
+        self._analyzed = 0
+        self._t0       = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="vose-import", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def prioritize(self, paths: Iterable[str]) -> None:
+        """paths（一覧で見えている素材）を次に処理する"""
+        with self._cond:
+            self._urgent = {os.path.abspath(p) for p in paths}
+
+    # ── 内部 ────────────────────────────────────────────────────
+
+    def _take(self, queue: list, n: int, key: Callable = lambda x: x) -> list:
+        """queue から n 件取り出す。優先（見えている）ものが先、残りは追加順。ロックを持って呼ぶ"""
+        picked = [x for x in queue if key(x) in self._urgent][:n]
+        if len(picked) < n:
+            chosen = set(map(key, picked))
+            picked += [x for x in queue if key(x) not in chosen][:n - len(picked)]
+        taken = set(map(key, picked))
+        queue[:] = [x for x in queue if key(x) not in taken]
+        return picked
+
+    def _report(self) -> None:
+        if self.on_progress is not None:
+            with self._cond:
+                progress = ImportProgress(self._probed, self._analyzed, self._total,
+                                          time.perf_counter() - self._t0)
+            self.on_progress(progress)
+
+    def _run(self) -> None:
+        self._t0 = time.perf_counter()
+        workers: List[threading.Thread] = []
+        try:
+            paths = [p for p in scan_media(self.roots) if p not in self.skip]
+            self._total    = len(paths)
+            self._to_probe = list(paths)
+            if self.on_found is not None and paths:
+                self.on_found(paths)
+            workers = [threading.Thread(target=self._media_loop, name=f"vose-import-media{i}",
+                                        daemon=True) for i in range(self.media_workers)]
+            for w in workers:
+                w.start()
+            self._probe_all()
+        except Exception as e:
+            print(f"❌ 取り込みエラー: {e}")
+            self._cancel.set()
+        finally:
+            with self._cond:
+                self._probing = False
+                self._cond.notify_all()
+            for w in workers:
+                w.join()
+
+        elapsed = time.perf_counter() - self._t0
+        if self._cancel.is_set():
+            message = f"取り込みを中止しました（{self._probed}/{self._total} ファイル）"
+        else:
+            rate = self._total / elapsed if elapsed > 0 else 0.0
+            message = (f"{self._total} ファイルを取り込みました  "
+                       f"{elapsed:.1f}s  {rate:.1f} ファイル/秒")
+        if self.on_finished is not None:
+            self.on_finished(message)
+
+    def _probe_all(self) -> None:
+        """
+        プロセスプールで PROBE_BATCH 件ずつプローブし、解析待ちに回す
+        （キャッシュ済みのファイルは開かない）
+        """
+        if not self._to_probe:
+            return
+        with ProcessPoolExecutor(min(self.probe_workers, len(self._to_probe)),
+                                 mp_context=mp.get_context("spawn")) as ex:
+            while not self._cancel.is_set():
+                with self._cond:
+                    batch = self._take(self._to_probe, PROBE_BATCH)
+                if not batch:
+                    break
+                infos = self.probe.get_many(batch, executor=ex)
+                with self._cond:
+                    self._probed += len(batch)
+                    self._analyzed += sum(1 for info in infos if info is None)
+                    self._to_media.extend((p, i) for p, i in zip(batch, infos) if i is not None)
+                    self._cond.notify_all()
+                if self.on_probed is not None:
+                    self.on_probed(list(zip(batch, infos)))
+                self._report()
+
+    def _media_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._to_media and self._probing and not self._cancel.is_set():
+                    self._cond.wait()
+                if self._cancel.is_set() or not self._to_media:
+                    return
+                path, info = self._take(self._to_media, 1, key=lambda x: x[0])[0]
+            media = self._analyze(path, info)
+            with self._cond:
+                self._analyzed += 1
+            if self.on_media is not None:
+                self.on_media(media)
+            self._report()
+
+    def _analyze(self, path: str, info: MediaInfo) -> AssetMedia:
+        media = AssetMedia(path, info)
+        if not (info.has_video or info.has_audio):
+            return media
+        try:
+            with self.pool.engine(path) as engine:
+                if engine is None:
+                    return media
+                if info.has_video and not path.lower().endswith(AUDIO_EXTS):
+                    w, h = _ve_mod.fit_size(info.width, info.height, *self.thumb_size)
+                    # 冒頭は黒フレームが多いので、尺の 10%（最大 1 秒）の位置をポスターにする
+                    frame = engine.grab_frame(min(1.0, info.duration * 0.1), w, h)
+                    if frame is not None:
+                        media.thumbnail = frame.array
+                elif info.has_audio:
+                    media.peaks = engine.extract_waveform(WAVEFORM_BINS)
+        except Exception as e:
+            print(f"⚠️  素材の解析に失敗: {path} ({e})")
+        return media
@@ -0,0 +1,152 @@
+"""
+edl_compiler.py — VO-SE Cut Studio
+タイムライン全トラック → 書き出し用のコンパクトな EDL
+  ■ 各クリップのソースを決める（動画ファイルならそのファイル、それ以外は読み込み中の動画）
+  ■ 上のトラックの別ソースのクリップに隠れる区間・長さ 0 の区間・ソースの尺を超える区間を捨てる
+  ■ 同じソースの隣接・重複区間を 1 つにまとめる
+  ■ ソースごとに前方向にしか読まない順へ並べる（コンテナのシーク回数を減らす）
+タイムライン上の秒 = ソース上の秒 という現在のクリップモデルをそのまま使う。
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+VIDEO_EXTS = (".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm")
+
+MERGE_GAP_SEC = 0.001   # これ以下の隙間は隣接とみなしてつなぐ
+
+Span = Tuple[float, float]
+
+
+@dataclass
+class CompiledEDL:
+    sources: List[str]
+    entries: List[Dict[str, Any]]            # {"in", "out", "enabled", "source"(sources の添字)}
+    stats:   Dict[str, float] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps(self.entries, ensure_ascii=False)
+
+    @property
+    def duration(self) -> float:
+        return sum(e["out"] - e["in"] for e in self.entries)
+
+
+def clip_source(clip: Dict[str, Any], default_source: str) -> str:
+    """クリップのソース動画。動画ファイルを指していないクリップ（TTS・字幕）は default_source"""
+    path = clip.get("wav_path") or ""
+    if path and path.lower().endswith(VIDEO_EXTS):
+        return path
+    return default_source
+
+
+def _merge(spans: Iterable[Span], gap: float = MERGE_GAP_SEC) -> List[Span]:
+    merged: List[Span] = []
+    for a, b in sorted(spans):
+        if merged and a <= merged[-1][1] + gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def _subtract(spans: Sequence[Span], cover: Sequence[Span]) -> List[Span]:
+    """spans（整列済み・重なりなし）から cover（同）を取り除く"""
+    out: List[Span] = []
+    j = 0
+    for a, b in spans:
+        while j < len(cover) and cover[j][1] <= a:
+            j += 1
+        k, cur = j, a
+        while k < len(cover) and cover[k][0] < b:
+            if cover[k][0] > cur:
+                out.append((cur, cover[k][0]))
+            cur = max(cur, cover[k][1])
+            k += 1
+        if cur < b:
+            out.append((cur, b))
+    return out
+
+
+def compile_edl(
+    tracks: Sequence[Sequence[Dict[str, Any]]],
+    default_source: str,
+    durations: Optional[Dict[str, float]] = None,
+    hidden_tracks: Sequence[int] = (),
+) -> CompiledEDL:
+    """
+    tracks は上から順（先頭ほど優先）のクリップ列。clip["enabled"] が False のクリップと
+    hidden_tracks のトラックは無視する。durations（ソース → 秒）があれば尺の外を切り捨てる。
+    """
+    durations = durations or {}
+    by_source: Dict[str, List[Span]] = {}
+    first_seen: Dict[str, float] = {}
+    cover: List[Tuple[str, Span]] = []     # これまでの（上位）トラックが占める区間
+    n_clips = dropped = 0
+    hidden_sec = 0.0
+
+    for ti, clips in enumerate(tracks):
+        if ti in hidden_tracks:
+            continue
+        track_spans: Dict[str, List[Span]] = {}
+        for clip in clips:
+            n_clips += 1
+            a = max(0.0, float(clip.get("start", 0.0)))
+            b = a + float(clip.get("duration", 0.0))
+            src = clip_source(clip, default_source)
+            limit = durations.get(src)
+            if limit is not None:
+                b = min(b, limit)
+            if not clip.get("enabled", True) or not src or b - a <= MERGE_GAP_SEC:
+                dropped += 1
+                continue
+            track_spans.setdefault(src, []).append((a, b))
+
+        for src, spans in track_spans.items():
+            spans = _merge(spans)
+            others = _merge(s for owner, s in cover if owner != src)
+            visible = _subtract(spans, others)
+            hidden_sec += sum(b - a for a, b in spans) - sum(b - a for a, b in visible)
+            if visible:
+                by_source.setdefault(src, []).extend(visible)
+                first_seen.setdefault(src, min(a for a, _ in visible))
+        cover.extend((src, s) for src, spans in track_spans.items() for s in spans)
+
+    sources = sorted(by_source, key=lambda s: first_seen[s])
+    entries: List[Dict[str, Any]] = []
+    for si, src in enumerate(sources):
+        for a, b in _merge(by_source[src]):
+            entries.append({"in": round(a, 6), "out": round(b, 6), "enabled": True, "source": si})
+    # タイムライン順（= 各ソース内では前方向）。ソースが入れ替わる回数も最小になる
+    entries.sort(key=lambda e: (e["in"], e["source"]))
+
+    switches = sum(1 for p, q in zip(entries, entries[1:]) if p["source"] != q["source"])
+    stats: Dict[str, float] = {
+        "clips":        n_clips,
+        "entries":      len(entries),
+        "merged":       max(0, n_clips - dropped - len(entries)),
+        "dropped":      dropped,
+        "hidden_sec":   round(hidden_sec, 6),
+        "seeks":        len(entries),           # 1 エントリ = 1 シーク
+        "source_switches": switches,
+    }
+    return CompiledEDL(sources, entries, stats)
+
+
+def compile_timeline(timeline: Any, default_source: str,
+                     durations: Optional[Dict[str, float]] = None) -> CompiledEDL:
+    """TimelineWidget の全トラックから compile_edl する"""
+    tracks = [t.clips for t in timeline._tracks]
+    hidden = [i for i, t in enumerate(timeline._tracks) if getattr(t, "hidden", False)]
+    return compile_edl(tracks, default_source, durations, hidden)
+
+
+def describe(compiled: CompiledEDL) -> str:
+    s = compiled.stats
+    return (f"{int(s['clips'])} クリップ → {int(s['entries'])} エントリ"
+            f"（結合 {int(s['merged'])} / 除外 {int(s['dropped'])}"
+            f" / 隠れ {s['hidden_sec']:.1f}s）  ソース {len(compiled.sources)}: "
+            + ", ".join(os.path.basename(p) for p in compiled.sources))
@@ -0,0 +1,157 @@
+"""
+engine_pool.py — VO-SE Cut Studio
+VideoEngine ハンドルのプール
+  ■ ハンドルごとに別のデマルチプレクサ / デコーダを持つので、借りている間は他のスレッドと干渉しない
+  ■ 同じファイルを読み込み済みのハンドルを優先して貸す（load_video を省く）
+  ■ 統計: ハンドル数・貸し出し回数・再利用・待ち時間
+プレビュー用の CutStudioMain.video はプールに入れない（GUI スレッド専用）。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import video_engine as _ve_mod
+
+DEFAULT_MAX_HANDLES = 4
+
+
+class EnginePoolTimeoutError(RuntimeError):
+    """timeout 秒以内にハンドルを借りられなかった"""
+
+
+class EnginePool:
+    """
+    スレッドセーフな VideoEngine ハンドルのプール。
+    ハンドルは必要になった時に max_handles 個まで作る。
+        with pool.engine(path) as eng:
+            peaks = eng.waveform_range(0.0, eng.duration, 512)
+    """
+
+    def __init__(self, lib_path: Optional[str] = None,
+                 max_handles: int = DEFAULT_MAX_HANDLES) -> None:
+        self.lib_path    = lib_path
+        self.max_handles = max(1, max_handles)
+        self._cond       = threading.Condition()
+        self._idle:  List[Any] = []
+        self._count  = 0
+        self._closed = False
+        self._stats: Dict[str, float] = {
+            "created":      0,   # 作ったハンドル数
+            "checkouts":    0,   # 貸し出し回数
+            "reused":       0,   # 既存ハンドルの再利用
+            "source_hits":  0,   # 同じファイルを読み込み済みのハンドル（load_video を省いた）
+            "waits":        0,   # 空きを待った回数
+            "wait_sec":     0.0, # 待ち時間の合計
+            "max_wait_sec": 0.0,
+            "peak_in_use":  0,
+        }
+
+    # ── 貸し出し ────────────────────────────────────────────────
+
+    def acquire(self, source: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+        """
+        ハンドルを 1 つ借りる。source を渡すとそのファイルを読み込んだ状態で返す
+        （読み込めなければハンドルを返却して None）。使い終わったら release すること。
+        """
+        t0 = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("EnginePool is shut down")
+                if self._idle:
+                    engine = self._take_idle(source)
+                    self._stats["reused"] += 1
+                    break
+                if self._count < self.max_handles:
+                    self._count += 1
+                    engine = None   # ロックの外で作る（ライブラリの初回読み込みは遅い）
+                    break
+                waited = True
+                remaining = None if timeout is None else timeout - (time.perf_counter() - t0)
+                if remaining is not None and remaining <= 0:
+                    raise EnginePoolTimeoutError(f"no VideoEngine handle within {timeout}s")
+                self._cond.wait(remaining)
+            self._stats["checkouts"] += 1
+            in_use = self._count - len(self._idle)
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], in_use)
+            if waited:
+                wait = time.perf_counter() - t0
+                self._stats["waits"]        += 1
+                self._stats["wait_sec"]     += wait
+                self._stats["max_wait_sec"]  = max(self._stats["max_wait_sec"], wait)
+
+        if engine is None:
+            engine = _ve_mod.VideoEngine(self.lib_path)
+            with self._cond:
+                self._stats["created"] += 1
+        engine.reset_cancel()   # 前の借り手が cancel したフラグを持ち越さない
+        if source is not None and engine.source != source:
+            if not engine.load_video(source):
+                self.release(engine)
+                return None
+        elif source is not None:
+            with self._cond:
+                self._stats["source_hits"] += 1
+        return engine
+
+    def _take_idle(self, source: Optional[str]) -> Any:
+        if source is not None:
+            for i, engine in enumerate(self._idle):
+                if engine.source == source:
+                    return self._idle.pop(i)
+        return self._idle.pop()
+
+    def release(self, engine: Any) -> None:
+        """借りたハンドルを返す。進捗コールバックは外す（読み込んだファイルはそのまま残す）"""
+        engine.on_progress = None
+        with self._cond:
+            if self._closed or not engine.available:
+                self._count -= 1
+                engine.close()
+            else:
+                self._idle.append(engine)
+            self._cond.notify()
+
+    @contextmanager
+    def engine(self, source: Optional[str] = None,
+               timeout: Optional[float] = None) -> Iterator[Any]:
+        """acquire / release の with 版。source を読み込めなかった場合は None を渡す"""
+        engine = self.acquire(source, timeout)
+        try:
+            yield engine
+        finally:
+            if engine is not None:
+                self.release(engine)
+
+    # ── よく使う処理 ────────────────────────────────────────────
+
+    def waveform(self, path: str, chunks: int = 512) -> List[float]:
+        """path の peaks_max（extract_waveform と同じ形）。読み込めなければ空リスト"""
+        with self.engine(path) as eng:
+            return eng.extract_waveform(chunks) if eng is not None else []
+
+    # ── 統計・終了 ──────────────────────────────────────────────
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"]   = self._count
+            stats["idle"]   = len(self._idle)
+            stats["in_use"] = self._count - len(self._idle)
+        stats["mean_wait_sec"] = stats["wait_sec"] / stats["waits"] if stats["waits"] else 0.0
+        stats["reuse_rate"]    = stats["reused"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        """空いているハンドルを破棄する。貸し出し中のものは返却時に破棄される"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for engine in idle:
+            engine.close()
@@ -0,0 +1,333 @@
+"""
+export_job.py — VO-SE Cut Studio
+バックグラウンド書き出しジョブ
+  ■ plan_segments : EDL をキーフレーム位置で N 本のセグメントに分ける
+  ■ ExportJob     : セグメントをワーカープロセス（各自の VideoEngine ハンドル）で並列エンコードし、
+                    ストリームコピーで 1 本に結合する。進捗・中止・エンコード fps を通知する
+GUI スレッドは一切ブロックしない。コールバックはジョブのスレッドから呼ばれるので、
+Qt 側では Signal 経由で受け取ること。
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import video_engine as _ve_mod
+from frame_index import load_or_build
+
+# {"in": 秒, "out": 秒, "enabled": True, "source": ソース番号（省略時 0）}
+EDLEntry = Dict[str, Any]
+
+MIN_SEGMENT_SEC   = 2.0   # これより短いセグメントは作らない（エンコーダ起動コストの方が大きい）
+SEGMENTS_PER_PROC = 3     # 進捗の細かさのため、ワーカー数より多めに分ける
+
+
+# 複数ソースを 1 本に結合するとき揃っていなければならない項目（MediaInfo の属性名 → 表示名）。
+# 映像はソースの解像度・fps のまま再エンコードされ、音声はソースからストリームコピーされる。
+# 結合は先頭セグメントのストリーム設定でコピーするので、1 つでも違えば壊れたファイルになる。
+SOURCE_MATCH_FIELDS = (
+    ("width", "幅"), ("height", "高さ"), ("fps", "fps"),
+    ("audio_codec", "音声コーデック"), ("audio_profile", "音声プロファイル"),
+    ("sample_rate", "サンプルレート"), ("channels", "チャンネル数"),
+)
+
+
+def source_mismatches(sources: Sequence[str], infos: Sequence[Optional[Any]]) -> List[str]:
+    """
+    sources を 1 本に書き出せない理由（揃っていない項目）を返す。空なら書き出せる。
+    infos は sources と同じ順の media_probe.MediaInfo（プローブできなかったものは None）。
+    """
+    if len(sources) <= 1:
+        return []
+    problems = [f"{os.path.basename(src)}: 形式を読み取れません"
+                for src, info in zip(sources, infos) if info is None]
+    known = [(src, info) for src, info in zip(sources, infos) if info is not None]
+    if not known:
+        return problems
+    ref_src, ref = known[0]
+    for src, info in known[1:]:
+        for attr, label in SOURCE_MATCH_FIELDS:
+            a, b = getattr(ref, attr), getattr(info, attr)
+            same = abs(a - b) < 0.01 if attr == "fps" else a == b
+            if not same:
+                problems.append(f"{label}: {os.path.basename(ref_src)}={a} / "
+                                f"{os.path.basename(src)}={b}")
+    return problems
+
+
+def default_workers() -> int:
+    """エンコーダ自体もマルチスレッドなので、コア数の半分をプロセス数にする"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# ══════════════════════════════════════════════════════════════════
+# セグメント分割
+# ══════════════════════════════════════════════════════════════════
+
+def plan_segments(
+    entries: Sequence[EDLEntry],
+    parts: int,
+    snap: Optional[Callable[[float], float]] = None,
+    min_sec: float = MIN_SEGMENT_SEC,
+) -> List[List[EDLEntry]]:
+    """
+    EDL を合計尺がほぼ等しい parts 本のサブ EDL に分ける。
+    エントリ境界はそのまま使い、長いエントリは snap（VideoEngine.nearest_keyframe）が返す
+    キーフレームで切る。キーフレームで切ればワーカーのシークが無駄なデコードなしで着地する。
+    1 セグメントには 1 ソースしか入れない（ソースが変わる所で必ず区切る）。
+    snap は主ソースのキーフレーム索引なので、それ以外のソースの長いエントリは時間で切る。
+    """
+    spans = [(float(e["in"]), float(e["out"]), int(e.get("source", 0))) for e in entries
+             if e.get("enabled", True) and float(e["out"]) > float(e["in"])]
+    total = sum(b - a for a, b, _ in spans)
+    if not spans:
+        return []
+    target = max(min_sec, total / max(1, parts))
+
+    segments: List[List[EDLEntry]] = []
+    current:  List[EDLEntry] = []
+    acc = 0.0
+
+    def flush() -> None:
+        nonlocal current, acc
+        if current:
+            segments.append(current)
+        current, acc = [], 0.0
+
+    for a, b, src in spans:
+        if current and current[-1]["source"] != src:
+            flush()
+        while b - a > 1e-6:
+            room = target - acc
+            if b - a <= room + min_sec * 0.5:
+                current.append({"in": a, "out": b, "enabled": True, "source": src})
+                acc += b - a
+                break
+            cut = snap(a + room) if snap is not None and src == 0 else a + room
+            if not (a + min_sec * 0.5 < cut < b - min_sec * 0.5):
+                if acc > 0.0:
+                    flush()
+                    continue
+                current.append({"in": a, "out": b, "enabled": True, "source": src})
+                acc += b - a
+                break
+            current.append({"in": a, "out": cut, "enabled": True, "source": src})
+            flush()
+            a = cut
+        if acc >= target:
+            flush()
+    flush()
+    return segments
+
+
+def segment_duration(segment: Sequence[EDLEntry]) -> float:
+    return sum(float(e["out"]) - float(e["in"]) for e in segment)
+
+
+# ══════════════════════════════════════════════════════════════════
+# ワーカープロセス（プロセスごとに VideoEngine ハンドルを 1 つ持つ）
+# ══════════════════════════════════════════════════════════════════
+
+_worker_engine:   Optional[Any] = None
+# 親プロセスへ (セグメント番号, セグメント内の進捗) を送るキュー
+_worker_progress: Optional[Any] = None
+
+
+def _init_worker(lib_path: str, progress_queue: Any = None) -> None:
+    global _worker_engine, _worker_progress
+    _worker_engine   = _ve_mod.VideoEngine(lib_path)
+    _worker_progress = progress_queue
+
+
+SegmentResult = Tuple[int, Optional[Dict[str, float]]]   # (セグメント番号, レポート or 失敗時 None)
+
+
+def _encode_segment(task: Tuple[int, str, str, str, str, int]) -> SegmentResult:
+    index, source, edl_json, out_path, mode, quality = task
+    engine = _worker_engine
+    if engine is None or not engine.available:
+        return index, None
+    if engine.source != source:
+        if not engine.load_video(source):
+            return index, None
+        load_or_build(engine, source)   # サイドカーがあれば走査しない
+    if _worker_progress is not None:
+        engine.on_progress = lambda fraction, _stage: _worker_progress.put((index, fraction))
+    try:
+        return index, engine.export(edl_json, out_path, mode, quality)
+    finally:
+        engine.on_progress = None
+
+
+# ══════════════════════════════════════════════════════════════════
+# ジョブ
+# ══════════════════════════════════════════════════════════════════
+
+@dataclass
+class ExportProgress:
+    done_sec:       float
+    total_sec:      float
+    segments_done:  int
+    segments_total: int
+    elapsed:        float
+    encode_fps:     float   # 1 秒あたりに書き出したフレーム数（全ワーカー合計）
+    copied_sec:     float = 0.0   # ストリームコピーで済んだ尺（smart / copy）
+
+    @property
+    def fraction(self) -> float:
+        return self.done_sec / self.total_sec if self.total_sec > 0 else 0.0
+
+
+class ExportJob:
+    """
+    EDL → 並列セグメントエンコード → 結合 をバックグラウンドで行う。
+    mode は video_engine.EXPORT_MODES（既定の smart はカット端の GOP だけ再エンコード）。
+    sources はエントリの "source" 番号 → 動画パス（省略時は engine で読み込み中の動画だけ）。
+    ソースが複数あるとコーデック設定が揃わないので、copy / smart は reencode に切り替える。
+    その場合も解像度・fps・音声形式は揃っている必要がある
+    （呼び出し側で source_mismatches を確認する）。
+    on_progress(ExportProgress) / on_finished(ok, message) はジョブのスレッドから呼ばれる。
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        entries: Sequence[EDLEntry],
+        out_path: str,
+        quality: int = 23,
+        mode: str = "smart",
+        workers: Optional[int] = None,
+        sources: Optional[Sequence[str]] = None,
+        on_progress: Optional[Callable[[ExportProgress], None]] = None,
+        on_finished: Optional[Callable[[bool, str], None]] = None,
+    ) -> None:
+        self.sources  = list(sources) if sources else [engine.source]
+        self.lib_path = engine.lib_path
+        self.fps      = engine.fps or 30.0
+        self.out_path = out_path
+        self.quality  = quality
+        self.mode     = mode if len(self.sources) == 1 else "reencode"
+        self.workers  = workers or default_workers()
+        snap = engine.nearest_keyframe if self.sources[0] == engine.source else None
+        self.segments = plan_segments(entries, self.workers * SEGMENTS_PER_PROC, snap=snap)
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self._engine    = engine
+        self._cancel    = threading.Event()
+        self._thread:   Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="vose-export", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """実行中のエンコードプロセスごと止める（出力ファイルは作られない）"""
+        self._cancel.set()
+
+    # ── 内部 ────────────────────────────────────────────────────
+
+    def _finish(self, ok: bool, message: str) -> None:
+        if self.on_finished is not None:
+            self.on_finished(ok, message)
+
+    def _run(self) -> None:
+        if not self.segments:
+            self._finish(False, "EDL に有効な区間がありません")
+            return
+        out_dir = os.path.dirname(os.path.abspath(self.out_path))
+        ext     = os.path.splitext(self.out_path)[1] or ".mp4"
+        tmp_dir = tempfile.mkdtemp(prefix=".vose_export_", dir=out_dir)
+        try:
+            ok, message = self._encode_all(tmp_dir, ext)
+        except Exception as e:
+            ok, message = False, f"書き出しエラー: {e}"
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._finish(ok, message)
+
+    def _encode_all(self, tmp_dir: str, ext: str) -> Tuple[bool, str]:
+        parts = [os.path.join(tmp_dir, f"seg{i:04d}{ext}") for i in range(len(self.segments))]
+        durations = [segment_duration(s) for s in self.segments]
+        total     = sum(durations)
+        tasks = [
+            (i, self.sources[seg[0]["source"]], json.dumps(seg, ensure_ascii=False),
+             parts[i], self.mode, self.quality)
+            for i, seg in enumerate(self.segments)
+        ]
+
+        results: queue.Queue[SegmentResult] = queue.Queue()
+        ctx      = mp.get_context("spawn")
+        partials = ctx.Queue()   # ワーカーのネイティブ進捗（セグメント内）
+        pool = ctx.Pool(min(self.workers, len(tasks)), initializer=_init_worker,
+                        initargs=(self.lib_path, partials))
+        t0 = time.perf_counter()
+        try:
+            for task in tasks:
+                pool.apply_async(_encode_segment, (task,), callback=results.put,
+                                 error_callback=lambda _e, i=task[0]: results.put((i, None)))
+            done, done_sec, copied_sec = 0, 0.0, 0.0
+            running:   Dict[int, float] = {}   # 書き出し中セグメント → 進捗 0..1
+            completed: Set[int] = set()
+            while done < len(tasks):
+                if self._cancel.is_set():
+                    pool.terminate()
+                    return False, "書き出しを中止しました"
+                received = False
+                try:
+                    index, report = results.get(timeout=0.1)
+                    received = True
+                except queue.Empty:
+                    pass
+                while True:
+                    try:
+                        seg, fraction = partials.get_nowait()
+                    except queue.Empty:
+                        break
+                    if seg not in completed:
+                        running[seg] = fraction
+                if received:
+                    if report is None:
+                        pool.terminate()
+                        return False, f"セグメント {index + 1} の書き出しに失敗しました"
+                    completed.add(index)
+                    running.pop(index, None)
+                    done       += 1
+                    done_sec   += durations[index]
+                    copied_sec += report.get("copied_sec", 0.0)
+                if self.on_progress is not None:
+                    elapsed = time.perf_counter() - t0
+                    current = done_sec + sum(f * durations[i] for i, f in running.items())
+                    self.on_progress(ExportProgress(
+                        current, total, done, len(tasks), elapsed,
+                        current * self.fps / elapsed if elapsed > 0 else 0.0,
+                        copied_sec,
+                    ))
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+
+        if self._cancel.is_set():
+            return False, "書き出しを中止しました"
+        if len(parts) == 1:
+            shutil.move(parts[0], self.out_path)
+        elif not self._engine.concat_files(parts, self.out_path):
+            return False, "セグメントの結合に失敗しました"
+        elapsed = time.perf_counter() - t0
+        fps = total * self.fps / elapsed if elapsed > 0 else 0.0
+        share = copied_sec / total if total > 0 else 0.0
+        return True, (f"{os.path.basename(self.out_path)}  {total:.1f}s  "
+                      f"{len(parts)} セグメント × {min(self.workers, len(parts))} プロセス  "
+                      f"{fps:.1f} fps  コピー {share * 100:.0f}%")
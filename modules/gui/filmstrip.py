@@ -0,0 +1,261 @@
+"""
+filmstrip.py — VO-SE Cut Studio
+タイムラインの動画クリップに並べるサムネイル（フィルムストリップ）
+  ■ 時刻の並び : px_per_sec から決まる等間隔（段階的な間隔なのでズームしてもキャッシュが当たる）
+  ■ 取り出し   : 等間隔の時刻に最も近いキーフレームだけを縮小サイズでデコードする
+                 （キーフレームは frame_index のサイドカーから。デコードは 1 フレームで済む）
+  ■ キャッシュ : メモリ（LRU）と ディスク（元ファイルのパス・サイズ・更新時刻 × 時刻 × 高さ）
+  ■ FilmstripCache.lookup はメモリを見るだけなので paint から呼んでもブロックしない。
+    足りないものは request で積み、バックグラウンドのスレッドが作って on_ready(source) を呼ぶ
+Qt 側では on_ready を Signal 経由で受け取り、トラックを update すること。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import video_engine as _ve_mod
+from engine_pool import EnginePool
+from frame_index import FrameIndex, load_or_build, load_sidecar
+
+DEFAULT_THUMB_DIR = os.path.join(os.path.expanduser("~"), ".vose_cut_studio", "thumbs")
+
+THUMB_H       = 54      # サムネイルの高さ（トラックのクリップ高さに合わせる）
+SLOT_W        = 96      # 1 枚ぶんの幅の目安（16:9）。これ以上の間隔で並べる
+# 並べる間隔（秒）
+STEPS         = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+MEMORY_ITEMS  = 1500    # メモリに置く枚数（96×54×4 バイト ≒ 20 KB / 枚）
+MAX_PENDING   = 512     # 積んでおく要求の上限（古いものから捨てる）
+BATCH         = 16      # 1 回のハンドル貸し出しで作る枚数（同じソースを時刻順に）
+NOTIFY_SEC    = 0.1     # on_ready を呼ぶ最短間隔
+
+Key = Tuple[str, int]   # (ソースの絶対パス, 時刻 ms)
+
+
+def step_for(px_per_sec: float, slot_w: int = SLOT_W) -> float:
+    """px_per_sec で 1 枚が slot_w 以上の幅になる最小の間隔（秒）"""
+    need = slot_w / max(px_per_sec, 1e-6)
+    for step in STEPS:
+        if step >= need:
+            return step
+    return STEPS[-1]
+
+
+def slot_times(start: float, end: float, step: float) -> List[float]:
+    """[start, end) と重なる step 刻みの時刻（各サムネイルの左端）"""
+    first = int(start // step)
+    last  = int(np.ceil(end / step))
+    return [k * step for k in range(first, last) if k * step < end]
+
+
+def _identity_key(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class FilmstripCache:
+    """
+    フィルムストリップのサムネイル置き場と、それを作るバックグラウンドのスレッド。
+        img = cache.lookup(path, t)        # (h, w, 4) uint8 RGB32 or None（ブロックしない）
+        cache.request(path, [t, ...])      # 無いものを作らせる。新しい要求ほど先に処理する
+    """
+
+    def __init__(
+        self,
+        pool: EnginePool,
+        thumb_h: int = THUMB_H,
+        cache_dir: str = DEFAULT_THUMB_DIR,
+        on_ready: Optional[Callable[[str], None]] = None,
+        memory_items: int = MEMORY_ITEMS,
+    ) -> None:
+        self.pool         = pool
+        self.thumb_h      = thumb_h
+        self.cache_dir    = cache_dir
+        self.on_ready     = on_ready
+        self.memory_items = memory_items
+        self._cond     = threading.Condition()
+        self._memory:  OrderedDict[Key, np.ndarray] = OrderedDict()
+        self._pending: OrderedDict[Key, None] = OrderedDict()   # 末尾ほど新しい
+        self._failed:  Set[Key] = set()
+        self._idents:  Dict[str, Optional[str]] = {}
+        self._indexes: Dict[str, Optional[FrameIndex]] = {}
+        self._closed   = False
+        self._stats: Dict[str, float] = {
+            "memory_hits": 0, "disk_hits": 0, "decoded": 0, "keyframe_reuse": 0, "decode_sec": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="vose-filmstrip", daemon=True)
+        self._thread.start()
+
+    # ── GUI スレッドから ─────────────────────────────────────────
+
+    def lookup(self, source: str, time_sec: float) -> Optional[np.ndarray]:
+        key = (source, int(round(time_sec * 1000)))
+        with self._cond:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return image
+
+    def request(self, source: str, times: List[float]) -> None:
+        """times（秒）のサムネイルを作らせる。既にあるもの・作れなかったものは無視する"""
+        with self._cond:
+            for t in times:
+                key = (source, int(round(t * 1000)))
+                if key in self._memory or key in self._failed:
+                    continue
+                self._pending[key] = None
+                self._pending.move_to_end(key)
+            while len(self._pending) > MAX_PENDING:
+                self._pending.popitem(last=False)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+            stats["pending"]      = len(self._pending)
+        return stats
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    # ── バックグラウンド ─────────────────────────────────────────
+
+    def _next_batch(self) -> List[Key]:
+        """一番新しい要求のソースから BATCH 件、時刻順で（前方向のデコードになる）"""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return []
+            source = next(reversed(self._pending))[0]
+            keys = [k for k in reversed(self._pending) if k[0] == source][:BATCH]
+            for k in keys:
+                del self._pending[k]
+        return sorted(keys, key=lambda k: k[1])
+
+    def _store(self, key: Key, image: Optional[np.ndarray]) -> None:
+        with self._cond:
+            if image is None:
+                self._failed.add(key)
+                return
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, source: str, ms: int) -> Optional[str]:
+        if source not in self._idents:
+            self._idents[source] = _identity_key(source)
+        ident = self._idents[source]
+        if ident is None:
+            return None
+        return os.path.join(self.cache_dir, ident[:2], ident, f"{ms}_{self.thumb_h}.npy")
+
+    def _load_disk(self, path: str) -> Optional[np.ndarray]:
+        try:
+            image = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        return image if image.ndim == 3 and image.shape[2] == 4 else None
+
+    def _save_disk(self, path: str, image: np.ndarray) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.save(f, image, allow_pickle=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️  サムネイルを保存できません: {path} ({e})")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _keyframe(self, source: str, engine: Any, time_sec: float) -> float:
+        """time_sec に最も近いキーフレーム（インデックスが無ければ time_sec のまま）"""
+        if source not in self._indexes:
+            index = load_sidecar(source)
+            self._indexes[source] = index if index is not None else load_or_build(engine, source)
+        index = self._indexes[source]
+        if index is None:
+            return time_sec
+        before = index.nearest_keyframe(time_sec)
+        after  = index.next_keyframe(time_sec)
+        if after is not None and after - time_sec < time_sec - before:
+            return after
+        return before
+
+    def _run(self) -> None:
+        while True:
+            keys = self._next_batch()
+            if not keys:
+                return
+            source = keys[0][0]
+            todo: List[Tuple[Key, str]] = []
+            for key in keys:
+                path = self._disk_path(source, key[1])
+                image = self._load_disk(path) if path is not None and os.path.exists(path) else None
+                if image is not None:
+                    self._store(key, image)
+                    with self._cond:
+                        self._stats["disk_hits"] += 1
+                elif path is not None:
+                    todo.append((key, path))
+                else:
+                    self._store(key, None)
+            if todo:
+                self._decode(source, todo)
+            if self.on_ready is not None:
+                self.on_ready(source)
+
+    def _decode(self, source: str, todo: List[Tuple[Key, str]]) -> None:
+        last_notify = time.perf_counter()
+        try:
+            with self.pool.engine(source) as engine:
+                if engine is None:
+                    for key, _path in todo:
+                        self._store(key, None)
+                    return
+                w, h = _ve_mod.fit_size(engine.width, engine.height, SLOT_W * 4, self.thumb_h)
+                # 長い GOP では複数の時刻が同じキーフレームになる
+                by_keyframe: Dict[int, np.ndarray] = {}
+                for key, path in todo:
+                    if self._closed:
+                        return
+                    kf = self._keyframe(source, engine, key[1] / 1000.0)
+                    kf_ms = int(round(kf * 1000))
+                    image = by_keyframe.get(kf_ms)
+                    if image is None:
+                        t0 = time.perf_counter()
+                        frame = engine.grab_frame(kf, w, h)
+                        with self._cond:
+                            self._stats["decode_sec"] += time.perf_counter() - t0
+                            self._stats["decoded"]    += 1
+                        if frame is not None:
+                            image = frame.array
+                            by_keyframe[kf_ms] = image
+                    else:
+                        with self._cond:
+                            self._stats["keyframe_reuse"] += 1
+                    if image is not None:
+                        self._save_disk(path, image)
+                    self._store(key, image)
+                    now = time.perf_counter()
+                    if self.on_ready is not None and now - last_notify >= NOTIFY_SEC:
+                        last_notify = now
+                        self.on_ready(source)
+        except Exception as e:
+            print(f"⚠️  サムネイル作成エラー: {source} ({e})")
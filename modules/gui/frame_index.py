@@ -0,0 +1,224 @@
+"""
+frame_index.py — VO-SE Cut Studio
+動画のフレームインデックス（全ビデオパケットの PTS・ファイル位置・キーフレームフラグ）
+  ■ FrameIndex   : NumPy 配列で持ち、時刻 → フレーム / キーフレームを二分探索で引く
+  ■ サイドカー   : 元ファイルのパス・サイズ・更新時刻をキーにしたバイナリ（次回から走査なしで読む）
+  ■ IndexBuilder : EnginePool のハンドルでバックグラウンドに作る（GUI のハンドルとは競合しない）
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+import video_engine as _ve_mod
+from engine_pool import EnginePool
+
+FRAME_INDEX_DTYPE = _ve_mod.FRAME_INDEX_DTYPE
+FLAG_KEY = 1
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".vose_cut_studio", "index")
+
+_MAGIC  = b"VOSEIDX1"
+_HEADER = struct.Struct("<8sqqiiq")   # magic, src_size, src_mtime_ns, tb_num, tb_den, count
+
+
+class FrameIndex:
+    """PTS 順のフレーム表。times / key_times は秒（float64）"""
+
+    def __init__(self, entries: np.ndarray, time_base: Tuple[int, int]) -> None:
+        self.entries   = entries
+        self.time_base = time_base
+        self.times     = entries["pts"] * (time_base[0] / time_base[1])
+        self.key_times = self.times[(entries["flags"] & FLAG_KEY) != 0]
+
+    def __len__(self) -> int:
+        return int(self.entries.shape[0])
+
+    def frame_at(self, time_sec: float) -> int:
+        """time_sec に表示されているフレームの番号（最初のフレームより前なら 0）"""
+        return max(0, int(np.searchsorted(self.times, time_sec, side="right")) - 1)
+
+    def frame_time(self, frame: int) -> float:
+        return float(self.times[min(max(frame, 0), len(self) - 1)])
+
+    def nearest_keyframe(self, time_sec: float) -> float:
+        """time_sec 以前で最も近いキーフレーム（VideoEngine.nearest_keyframe と同じ規則）"""
+        if self.key_times.size == 0:
+            return time_sec
+        i = int(np.searchsorted(self.key_times, time_sec, side="right")) - 1
+        return float(self.key_times[max(i, 0)])
+
+    def next_keyframe(self, time_sec: float) -> Optional[float]:
+        """time_sec 以降の最初のキーフレーム。無ければ None"""
+        i = int(np.searchsorted(self.key_times, time_sec, side="left"))
+        return float(self.key_times[i]) if i < self.key_times.size else None
+
+    def snap(self, time_sec: float) -> float:
+        """フレーム境界に丸める（カット位置のフレーム精度合わせ）"""
+        return self.frame_time(self.frame_at(time_sec + 1e-6))
+
+
+# ══════════════════════════════════════════════════════════════════
+# サイドカー
+# ══════════════════════════════════════════════════════════════════
+
+def _identity(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def sidecar_path(path: str, index_dir: str = DEFAULT_INDEX_DIR) -> str:
+    """元ファイルの絶対パスから決まるサイドカーの場所（内容の一致はヘッダで確かめる）"""
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(index_dir, f"{key}.vosidx")
+
+
+def load_sidecar(path: str, index_dir: str = DEFAULT_INDEX_DIR) -> Optional[FrameIndex]:
+    """保存済みのインデックスを読む。無い・壊れている・元ファイルが変わっている場合は None"""
+    ident = _identity(path)
+    side  = sidecar_path(path, index_dir)
+    if ident is None or not os.path.exists(side):
+        return None
+    try:
+        with open(side, "rb") as f:
+            magic, size, mtime, num, den, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or (size, mtime) != ident[1:] or den <= 0:
+                return None
+            entries = np.fromfile(f, dtype=FRAME_INDEX_DTYPE, count=count)
+    except (OSError, struct.error, ValueError):
+        return None
+    if entries.shape[0] != count or count == 0:
+        return None
+    return FrameIndex(entries, (num, den))
+
+
+def save_sidecar(path: str, index: FrameIndex, index_dir: str = DEFAULT_INDEX_DIR) -> bool:
+    ident = _identity(path)
+    if ident is None or len(index) == 0:
+        return False
+    side = sidecar_path(path, index_dir)
+    tmp  = f"{side}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, ident[1], ident[2], *index.time_base, len(index)))
+            index.entries.astype(FRAME_INDEX_DTYPE, copy=False).tofile(f)
+        os.replace(tmp, side)
+    except OSError as e:
+        print(f"⚠️  インデックスを保存できません: {side} ({e})")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+    return True
+
+
+def from_engine(engine: Any) -> Optional[FrameIndex]:
+    """engine が持っているフレーム表を FrameIndex にする（build_keyframe_index の後）"""
+    table = engine.frame_index_table()
+    return FrameIndex(*table) if table is not None else None
+
+
+def load_or_build(engine: Any, path: str,
+                  index_dir: str = DEFAULT_INDEX_DIR) -> Optional[FrameIndex]:
+    """
+    engine（path を読み込み済み）にインデックスを入れる。
+    サイドカーがあれば読み、無ければ走査して保存する。
+    呼び出し元のスレッドで実行する（ワーカープロセスなど、ブロックしてよい所で使う）。
+    """
+    index = load_sidecar(path, index_dir)
+    if index is not None and engine.set_frame_index(index.entries):
+        return index
+    if engine.build_keyframe_index() <= 0:
+        return None
+    index = from_engine(engine)
+    if index is not None:
+        save_sidecar(path, index, index_dir)
+    return index
+
+
+# ══════════════════════════════════════════════════════════════════
+# バックグラウンド作成
+# ══════════════════════════════════════════════════════════════════
+
+class IndexBuilder:
+    """
+    path のインデックスをプールから借りたハンドルで作り、サイドカーに保存する。
+    on_progress(fraction) / on_finished(builder, FrameIndex or None) はビルダーのスレッドから
+    呼ばれるので、Qt 側では Signal 経由で受け取ること（同じ path を作り直す場合もあるので、
+    どのビルダーの結果かは builder で見分ける）。cancel はハンドルを借りる前に呼んでも効く。
+    """
+
+    def __init__(
+        self,
+        pool: EnginePool,
+        path: str,
+        index_dir: str = DEFAULT_INDEX_DIR,
+        on_progress: Optional[Callable[[float], None]] = None,
+        on_finished: Optional[Callable[[IndexBuilder, Optional[FrameIndex]], None]] = None,
+    ) -> None:
+        self.pool        = pool
+        self.path        = path
+        self.index_dir   = index_dir
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self._cancel     = threading.Event()
+        self._lock       = threading.Lock()   # _engine の受け渡しと cancel を直列にする
+        self._engine: Optional[Any] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="vose-index", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancel.set()
+            if self._engine is not None:
+                self._engine.cancel()
+
+    def _build(self, engine: Any) -> Optional[FrameIndex]:
+        if self.on_progress is not None:
+            report = self.on_progress
+            engine.on_progress = lambda fraction, _stage: report(fraction)
+        if engine.build_keyframe_index() <= 0:
+            return None
+        index = from_engine(engine)
+        if index is not None and not self._cancel.is_set():
+            save_sidecar(self.path, index, self.index_dir)
+        return index
+
+    def _run(self) -> None:
+        index: Optional[FrameIndex] = None
+        try:
+            with self.pool.engine(self.path) as engine:
+                with self._lock:
+                    # 借りるまでの間に cancel されていたら作らない
+                    self._engine = engine if not self._cancel.is_set() else None
+                try:
+                    if self._engine is not None:
+                        index = self._build(self._engine)
+                finally:
+                    with self._lock:
+                        self._engine = None
+        except Exception as e:
+            print(f"❌ インデックス作成エラー: {self.path} ({e})")
+            index = None
+        if self._cancel.is_set():
+            index = None
+        if self.on_finished is not None:
+            self.on_finished(self, index)
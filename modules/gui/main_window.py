@@ -17,22 +17,30 @@ Phase 2 変更点 (全面リライト):
 
 from __future__ import annotations
 
-import ctypes
 import json
+import multiprocessing
 import os
 import platform
 import sys
-import traceback
 import wave
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import video_engine as _ve_mod
+from asset_import import AssetImporter, AssetMedia, ImportProgress
+from edl_compiler import VIDEO_EXTS, clip_source, compile_timeline, describe
+from engine_pool import EnginePool
+from export_job import ExportJob, ExportProgress, source_mismatches
+from filmstrip import FilmstripCache, slot_times, step_for
+from frame_index import FrameIndex, IndexBuilder, load_sidecar
+from media_probe import MediaInfo, ProbeCache, describe_media
 
 from playback_engine import PlaybackEngine, TransportController
 
 from PySide6.QtCore import (
     QRect,
     QRectF,
+    QSize,
     Qt,
     QTimer,
     Signal,
@@ -44,6 +52,8 @@ from PySide6.QtGui import (
     QContextMenuEvent,
     QFont,
     QFontMetrics,
+    QIcon,
+    QImage,
     QKeySequence,
     QMouseEvent,
     QPainter,
@@ -80,6 +90,68 @@ from PySide6.QtWidgets import (
 )
 
 
+# modules/gui から直接起動したとき（python modules/gui/main_window.py）も modules.talk を
+# import できるようにリポジトリ直下をパスの末尾に加える（PyInstaller 版は --paths . で同梱済み）
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if os.path.isdir(os.path.join(_REPO_ROOT, "modules", "talk")) and _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+if TYPE_CHECKING:
+    from modules.talk.render_bridge import (
+        SAMPLE_RATE,
+        RenderBridge,
+        waveform_peaks,
+        write_wav_async,
+    )
+    from modules.talk.resynth import ResynthPool, VoiceEdit
+else:
+    try:
+        from modules.talk.render_bridge import (
+            SAMPLE_RATE,
+            RenderBridge,
+            waveform_peaks,
+            write_wav_async,
+        )
+        from modules.talk.resynth import VoiceEdit
+    except ImportError as e:
+        print(f"modules.talk not available: {e}")
+        import numpy as np
+
+        SAMPLE_RATE = 44100
+
+        class RenderBridge:
+            available = False
+
+            def resynth_pool(self, max_workers: Optional[int] = None) -> None:
+                return None
+
+        class VoiceEdit:
+            pass
+
+        def waveform_peaks(pcm: Any, chunks: int = 512) -> List[float]:
+            """render_bridge.waveform_peaks と同じ peaks_max（VideoEngine.extract_waveform 互換）"""
+            x = np.asarray(pcm)
+            if x.ndim > 1:
+                x = x.mean(axis=1)
+            peaks = np.zeros(max(chunks, 0), dtype=np.float32)
+            size = max(1, len(x) // chunks) if chunks > 0 else 1
+            used = min(len(peaks), len(x) // size)
+            if used:
+                block = x[:used * size].reshape(used, size).max(axis=1)
+                if np.issubdtype(x.dtype, np.integer):
+                    block = block / float(np.iinfo(x.dtype).max + 1)
+                peaks[:used] = np.maximum(block, 0.0)
+            return peaks.tolist()
+
+        def write_wav_async(output_path: str, pcm: Any, sample_rate: int = 44100) -> None:
+            """int16 モノラル PCM をその場で WAV に書く"""
+            with wave.open(output_path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(sample_rate)
+                w.writeframes(pcm.astype("<i2").tobytes())
+
+
 _SYS = platform.system()
 _FONT_FAMILY = (
     ".AppleSystemUIFont" if _SYS == "Darwin" else "Segoe UI" if _SYS == "Windows" else "Inter"
@@ -103,9 +175,11 @@ if TYPE_CHECKING:
         def set_voice(self, path: str) -> bool: ...
         def synthesize(self, text: str, output_path: str,
                        speed: float = 1.0) -> Tuple[bool, str]: ...
+        def synthesize_to_buffer(self, text: str,
+                                 speed: float = 1.0) -> Tuple[Any, int, str]: ...
 
     def generate_talk_events(
-        text: str, analyzer: "IntonationAnalyzer"
+        text: str, analyzer: IntonationAnalyzer
     ) -> List[Dict[str, Any]]: ...
 else:
     try:
@@ -143,95 +217,27 @@ def get_wav_duration_sec(file_path: str) -> float:
 # C++ バインディング (VOSEBridge)
 # ══════════════════════════════════════════════════════════════════
 
-class NoteEvent(ctypes.Structure):
-    _fields_ = [
-        ("wav_path",          ctypes.c_char_p),
-        ("pitch_length",      ctypes.c_int),
-        ("pitch_curve",       ctypes.POINTER(ctypes.c_double)),
-        ("gender_curve",      ctypes.POINTER(ctypes.c_double)),
-        ("tension_curve",     ctypes.POINTER(ctypes.c_double)),
-        ("breath_curve",      ctypes.POINTER(ctypes.c_double)),
-        ("offset_ms",         ctypes.c_double),
-        ("consonant_ms",      ctypes.c_double),
-        ("cutoff_ms",         ctypes.c_double),
-        ("pre_utterance_ms",  ctypes.c_double),
-        ("overlap_ms",        ctypes.c_double),
-    ]
-
-
 class VOSEBridge:
+    """
+    modules/talk/render_bridge.RenderBridge の GUI 向けラッパー（RenderBridge を持つだけ）。
+    ライブラリのロード・NoteEvent のマーシャリングは RenderBridge に一本化。
+    """
+
     def __init__(self) -> None:
-        self.lib: Optional[ctypes.CDLL] = None
-        self.keep_alive: List[Any] = []
-        self._load_engine()
-
-    def _load_engine(self) -> None:
-        is_mac   = (_SYS == "Darwin")
-        ext      = ".dylib" if is_mac else (".dll" if _SYS == "Windows" else ".so")
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        lib_path = os.path.join(base_dir, "bin", f"libvo_se_cut{ext}")
-        if not os.path.exists(lib_path):
-            print(f"⚠️  Bridge not found: {lib_path}")
-            return
-        try:
-            if is_mac:
-                self.lib = ctypes.CDLL(lib_path, mode=ctypes.RTLD_GLOBAL)
-            else:
-                self.lib = ctypes.CDLL(lib_path)
-            if hasattr(self.lib, "init_official_engine"):
-                self.lib.init_official_engine.argtypes = []
-                self.lib.init_official_engine.restype  = None
-                self.lib.init_official_engine()
-            self.lib.execute_render.argtypes = [
-                ctypes.POINTER(NoteEvent), ctypes.c_int,
-                ctypes.c_char_p, ctypes.c_int,
-            ]
-            self.lib.execute_render.restype = None
-            print(f"✅  VO-SE Bridge loaded: {lib_path}")
-        except Exception as e:
-            print(f"❌  Bridge load failed: {e}\n{traceback.format_exc()}")
-            self.lib = None
+        self.renderer = RenderBridge()
 
-    def render(self, notes_list: List[Dict[str, Any]],
-               output_file: str = "output.wav") -> None:
-        if not self.lib or not notes_list:
-            return
-        count      = len(notes_list)
-        NotesArray = NoteEvent * count
-        c_notes    = NotesArray()
-        self.keep_alive = []
-
-        for i, data in enumerate(notes_list):
-            phoneme = str(data.get("phoneme", "a"))
-            pitch   = list(data.get("pitch", [150.0] * 50))
-            length  = len(pitch)
-            gender  = list(data.get("gender",  [0.5] * length))[:length]
-            tension = list(data.get("tension", [0.5] * length))[:length]
-            breath  = list(data.get("breath",  [0.1] * length))[:length]
-
-            c_wav = phoneme.encode("utf-8")
-            c_p   = (ctypes.c_double * length)(*pitch)
-            c_g   = (ctypes.c_double * length)(*gender)
-            c_t   = (ctypes.c_double * length)(*tension)
-            c_b   = (ctypes.c_double * length)(*breath)
-            self.keep_alive.extend([c_wav, c_p, c_g, c_t, c_b])
-
-            c_notes[i].wav_path         = c_wav
-            c_notes[i].pitch_length     = length
-            c_notes[i].pitch_curve      = c_p
-            c_notes[i].gender_curve     = c_g
-            c_notes[i].tension_curve    = c_t
-            c_notes[i].breath_curve     = c_b
-            c_notes[i].offset_ms        = float(data.get("offset", 0.0))
-            c_notes[i].consonant_ms     = float(data.get("consonant", 0.0))
-            c_notes[i].cutoff_ms        = float(data.get("cutoff", 0.0))
-            c_notes[i].pre_utterance_ms = float(data.get("pre_utterance", 0.0))
-            c_notes[i].overlap_ms       = float(data.get("overlap", 0.0))
+    @property
+    def available(self) -> bool:
+        return self.renderer.available
 
-        try:
-            self.lib.execute_render(c_notes, count, output_file.encode("utf-8"))
-        except Exception as e:
-            print(f"❌  execute_render error: {e}\n{traceback.format_exc()}")
+    def render_to_buffer(self, notes: List[Dict[str, Any]]) -> Optional[Any]:
+        """トークイベントを float64 PCM（SAMPLE_RATE）にメモリでレンダーする。失敗時 None"""
+        if not self.renderer.available or not notes:
+            return None
+        return self.renderer.render_to_buffer(notes)
+
+    def resynth_pool(self, max_workers: Optional[int] = None) -> Optional[ResynthPool]:
+        return self.renderer.resynth_pool(max_workers)
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -514,6 +520,7 @@ class TimelineTrack(QFrame):
         waveform : List[float]  peaks_max キャッシュ
     """
     synthesize_requested = Signal(str, float)  # (text, start_sec)
+    resynth_requested    = Signal(object)      # clip（録音のピッチ・声質編集）
     clip_changed         = Signal()            # Undo/Redo 後に親へ通知
     HEADER_W = 110
 
@@ -530,6 +537,8 @@ class TimelineTrack(QFrame):
         self.clips: List[Dict[str, Any]] = []
         self.px_per_sec:    float = 100.0
         self.scroll_offset: float = 0.0   # 秒
+        # 動画クリップのサムネイル（TimelineWidget が設定）
+        self.filmstrip:     Optional[FilmstripCache] = None
 
         # ドラッグ状態
         self._drag_clip:     Optional[Dict[str, Any]] = None
@@ -711,11 +720,16 @@ class TimelineTrack(QFrame):
             return
         menu      = QMenu(self)
         synth_act = menu.addAction("🎙️  音声を合成")
+        edit_act  = None
+        if clip.get("wav_path") and os.path.isfile(clip["wav_path"]):
+            edit_act = menu.addAction("🎚️  ピッチ・声質を編集")
         menu.addSeparator()
         del_act   = menu.addAction("🗑️  削除")
         chosen    = menu.exec(event.globalPos())
         if chosen == synth_act:
             self.synthesize_requested.emit(clip["raw_text"], clip["start"])
+        elif edit_act is not None and chosen == edit_act:
+            self.resynth_requested.emit(clip)
         elif chosen == del_act:
             if self.undo_stack:
                 self.undo_stack.push(RemoveClipCmd(self, clip))
@@ -771,9 +785,12 @@ class TimelineTrack(QFrame):
         p.setPen(QPen(border, 0.75))
         p.drawRoundedRect(rect, 5.0, 5.0)
 
-        # 波形
+        # フィルムストリップ（動画クリップ）/ 波形
         wf: List[float] = clip.get("waveform", [])
-        if wf and CW > 8:
+        source = clip.get("wav_path") or ""
+        if self.filmstrip is not None and source.lower().endswith(VIDEO_EXTS) and CW > 8:
+            self._paint_filmstrip(p, clip, source, rect)
+        elif wf and CW > 8:
             self._paint_waveform(p, wf, CX, CY, CW, CH, c)
         else:
             # 上部グロス (Appleの立体感を出すグラデーション層)
@@ -797,6 +814,45 @@ class TimelineTrack(QFrame):
         p.drawRoundedRect(QRectF(CX,          CY + 6, 4, CH - 12), 2.0, 2.0)
         p.drawRoundedRect(QRectF(CX + CW - 4, CY + 6, 4, CH - 12), 2.0, 2.0)
 
+    def _paint_filmstrip(self, p: QPainter, clip: Dict[str, Any], source: str,
+                         rect: QRectF) -> None:
+        """
+        見えている範囲だけ、px_per_sec に合わせた間隔でサムネイルを並べる。
+        キャッシュに無いものはバックグラウンドに要求して、今回は描かない（paint はブロックしない）。
+        """
+        step = step_for(self.px_per_sec)
+        t0 = max(clip["start"], self.screen_to_sec(self.HEADER_W))
+        t1 = min(clip["start"] + clip["duration"], self.screen_to_sec(self.width()))
+        inner = rect.adjusted(1, 1, -1, -1)
+        p.save()
+        clip_path = QPainterPath()
+        clip_path.addRoundedRect(inner, 4.0, 4.0)
+        p.setClipPath(clip_path, Qt.ClipOperation.IntersectClip)
+        missing: List[float] = []
+        for t in slot_times(t0, t1, step):
+            image = self.filmstrip.lookup(source, t)  # type: ignore[union-attr]
+            if image is None:
+                missing.append(t)
+                continue
+            h, w = image.shape[:2]
+            qimg  = QImage(image.data, w, h, w * 4, QImage.Format.Format_RGB32)
+            scale = inner.height() / h
+            sx = self.sec_to_screen(t)
+            x  = max(sx, inner.left())
+            dw = min(w * scale, step * self.px_per_sec) - (x - sx)
+            dw = min(dw, inner.right() - x)
+            if dw <= 0:
+                continue
+            p.drawImage(QRectF(x, inner.top(), dw, inner.height()), qimg,
+                        QRectF((x - sx) / scale, 0, dw / scale, h))
+        p.restore()
+        if missing:
+            self.filmstrip.request(source, missing)  # type: ignore[union-attr]
+        # ラベルを読めるように少し暗くする
+        p.setBrush(QBrush(QColor(0, 0, 0, 90)))
+        p.setPen(Qt.PenStyle.NoPen)
+        p.drawRoundedRect(inner, 4.0, 4.0)
+
     def _paint_waveform(self, p: QPainter, wf: List[float],
                         cx: float, cy: float, cw: float, ch: float,
                         base_color: QColor) -> None:
@@ -842,6 +898,7 @@ class TimelineWidget(QWidget):
         self.setStyleSheet("background-color: #141416;")
         self.undo_stack  = undo_stack
         self.px_per_sec  = self.PPS_DEF
+        self.filmstrip:  Optional[FilmstripCache] = None
         self._tracks: List[TimelineTrack] = []
         self._init_ui()
 
@@ -914,6 +971,7 @@ class TimelineWidget(QWidget):
         track = TimelineTrack(name, color, self.undo_stack)
         track.px_per_sec    = self.px_per_sec
         track.scroll_offset = 0.0
+        track.filmstrip     = self.filmstrip
         track.clip_changed.connect(self.update_scroll_range)
         self._track_layout.insertWidget(
             self._track_layout.count() - 1, track)  # stretch の前に挿入
@@ -926,6 +984,17 @@ class TimelineWidget(QWidget):
             random.randint(80, 220), random.randint(80, 220), random.randint(80, 220))
         return self._make_track(name, c)
 
+    def set_filmstrip(self, filmstrip: Optional[FilmstripCache]) -> None:
+        """動画クリップにサムネイルを並べる（None で無効）"""
+        self.filmstrip = filmstrip
+        for t in self._tracks:
+            t.filmstrip = filmstrip
+            t.update()
+
+    def refresh_tracks(self) -> None:
+        for t in self._tracks:
+            t.update()
+
     # ── ズーム ────────────────────────────────────────────────────
 
     def zoom(self, factor_delta: float) -> None:
@@ -1016,30 +1085,32 @@ class PreviewView(QGraphicsView):
         self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
         self._scene.setSceneRect(0, 0, 1920, 1080)
         self.centerOn(960, 540)
-        self._scene.addRect(
+        bg = self._scene.addRect(
             self._scene.sceneRect(),
             QPen(QColor(50, 50, 55), 2),
             QBrush(QColor(12, 12, 14)),
         )
+        bg.setZValue(-2)
         ph = self._scene.addText("プレビューエリア")
         ph.setDefaultTextColor(QColor(65, 65, 70))
         ph.setFont(QFont(_FONT_FAMILY, 20))
         ph.setPos(960 - ph.boundingRect().width() / 2, 540 - 14)
+        self._placeholder = ph
         self.current_character: Optional[QGraphicsPixmapItem] = None
-
-    def show_frame(self, ppm_path: str) -> None:
-        """PPM ファイルをプレビューに表示する。"""
-        if not os.path.exists(ppm_path):
-            return
-        pix = QPixmap(ppm_path)
-        if pix.isNull():
-            return
-        for item in self._scene.items():
-            if isinstance(item, QGraphicsPixmapItem):
-                self._scene.removeItem(item)
-        item = QGraphicsPixmapItem(pix)
-        item.setPos(0, 0)
-        self._scene.addItem(item)
+        # 動画フレームは 1 つのアイテムを使い回す（キャラクター画像より下）
+        self._frame_item = QGraphicsPixmapItem()
+        self._frame_item.setZValue(-1)
+        self._scene.addItem(self._frame_item)
+
+    def show_image(self, frame: _ve_mod.FrameBuffer) -> None:
+        """VideoEngine.grab_frame の RGB32 バッファを表示する（QImage はバッファをそのまま参照）"""
+        image = QImage(frame.array.data, frame.width, frame.height, frame.stride,
+                       QImage.Format.Format_RGB32)
+        self._frame_item.setPixmap(QPixmap.fromImage(image))
+        rect = self._scene.sceneRect()
+        self._frame_item.setPos((rect.width() - frame.width) / 2,
+                                (rect.height() - frame.height) / 2)
+        self._placeholder.hide()
 
     def add_character(self, image_path: str) -> None:
         pix = QPixmap(image_path)
@@ -1067,6 +1138,20 @@ class PreviewView(QGraphicsView):
 # ══════════════════════════════════════════════════════════════════
 
 class CutStudioMain(QMainWindow):
+    # ワーカー・バックグラウンドジョブの結果は Signal で GUI スレッドへ渡す
+    resynth_finished = Signal(object, object, object)  # (track, clip, ResynthResult)
+    export_progress  = Signal(object)                  # ExportProgress
+    export_finished  = Signal(bool, str)
+    index_progress   = Signal(float)                   # フレームインデックス作成の進捗 0..1
+    index_finished   = Signal(object, object)          # (IndexBuilder, FrameIndex or None)
+    import_found     = Signal(object)                  # List[str]（見つかった素材）
+    import_probed    = Signal(object)                  # List[(path, MediaInfo or None)]
+    import_media     = Signal(object)                  # AssetMedia（サムネイル・波形）
+    import_progress  = Signal(object)                  # ImportProgress
+    import_finished  = Signal(str)
+    tts_finished     = Signal(object)                  # (text, start, wav_path, subtitle, pcm, sr)
+    filmstrip_ready  = Signal(str)                     # サムネイルができたソース
+
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle("VO-SE Cut Studio")
@@ -1075,9 +1160,33 @@ class CutStudioMain(QMainWindow):
 
         # ── エンジン ──────────────────────────────────────────────
         self.video = _ve_mod.VideoEngine()
+        # プレビュー以外の重い処理（波形・インデックス・取り込み）は別ハンドルで並列に
+        self.engines = EnginePool(self.video.lib_path)
+        # 尺・ストリーム情報の永続キャッシュ（変わっていないファイルは開かない）
+        self.probe   = ProbeCache()
         self.bridge = VOSEBridge()
         self.analyzer:      Optional[Any] = None
         self.talk_manager:  Optional[Any] = None
+        self._resynth_pool: Optional[Any] = None   # 初回の編集時に作る
+        self._export_job:   Optional[ExportJob] = None
+        self._tts_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vose-tts")
+        self.tts_finished.connect(self._on_tts_finished)
+        self.resynth_finished.connect(self._on_resynth_finished)
+        self.export_progress.connect(self._on_export_progress)
+        self.export_finished.connect(self._on_export_finished)
+        self.frame_index:    Optional[FrameIndex] = None   # 読み込み中の動画のフレーム表
+        self._index_builder: Optional[IndexBuilder] = None
+        self._importers:     List[AssetImporter] = []
+        self._asset_items:   Dict[str, QListWidgetItem] = {}   # 絶対パス → 素材一覧の項目
+        self._asset_media:   Dict[str, AssetMedia] = {}        # 取り込み時に作ったサムネイル・波形
+        self.index_progress.connect(self._on_index_progress)
+        self.index_finished.connect(self._on_index_finished)
+        self.import_found.connect(self._on_import_found)
+        self.import_probed.connect(self._on_import_probed)
+        self.import_media.connect(self._on_import_media)
+        self.import_progress.connect(self._on_import_progress)
+        self.import_finished.connect(self._on_import_finished)
+        self.filmstrip_ready.connect(lambda _source: self.timeline.refresh_tracks())
         if is_engine_available:
             self.analyzer     = IntonationAnalyzer()
             self.talk_manager = TalkManager()
@@ -1094,6 +1203,10 @@ class CutStudioMain(QMainWindow):
 
         self._init_ui()
 
+        # 動画クリップのフィルムストリップ（キーフレームだけをバックグラウンドで縮小デコード）
+        self.filmstrip = FilmstripCache(self.engines, on_ready=self.filmstrip_ready.emit)
+        self.timeline.set_filmstrip(self.filmstrip)
+
         # ── PlaybackEngine ─────────────────────────────────────────
         self.playback_engine = PlaybackEngine(
             preview_view    = self.video_preview,
@@ -1101,6 +1214,12 @@ class CutStudioMain(QMainWindow):
             status_bar      = self._status,
         )
         self.playback_engine.position_updated.connect(self._on_position_updated)
+        # 合成した声の試聴用（動画の音声ソースを差し替えない・再生ヘッドも動かさない）
+        self.voice_player = PlaybackEngine(
+            preview_view    = self.video_preview,
+            timeline_header = None,
+            status_bar      = self._status,
+        )
         self.timeline.header._on_seek_from_header = (
             lambda sec: self.playback_engine.seek(sec)
         )
@@ -1122,6 +1241,9 @@ class CutStudioMain(QMainWindow):
         self._setup_shortcuts()
 
         # ── プレビューフレーム更新タイマー ─────────────────────────
+        # 100ms ごとに変化を確かめ、フレームかソースが変わったときだけデコードする
+        self._preview_key: Optional[Tuple[str, int, int, int]] = None
+        self._preview_buf: Optional[_ve_mod.FrameBuffer] = None
         self._preview_timer = QTimer(self)
         self._preview_timer.setInterval(100)
         self._preview_timer.timeout.connect(self._update_preview_frame)
@@ -1154,7 +1276,7 @@ class CutStudioMain(QMainWindow):
 
         self.timeline = TimelineWidget(self.undo_stack)
         for track in [self.timeline.voice_track, self.timeline.video_track]:
-            track.synthesize_requested.connect(self._on_synthesize_from_clip)
+            self._connect_track(track)
         tl_layout.addWidget(self.timeline)
 
         v_split.addWidget(h_split)
@@ -1259,7 +1381,11 @@ class CutStudioMain(QMainWindow):
         self.asset_list = QListWidget()
         self.asset_list.setFixedHeight(130)
         self.asset_list.setToolTip("ダブルクリックでタイムラインに配置")
+        self.asset_list.setIconSize(QSize(48, 27))
         self.asset_list.itemDoubleClicked.connect(self._on_asset_double_clicked)
+        # 見えている素材のサムネイル・波形を先に作る
+        self.asset_list.verticalScrollBar().valueChanged.connect(
+            lambda _v: self._prioritize_visible_assets())
         ly.addWidget(self.asset_list)
 
         add_btn = QPushButton("＋  ファイルを追加")
@@ -1275,6 +1401,12 @@ class CutStudioMain(QMainWindow):
         add_btn.clicked.connect(self._on_add_asset)
         ly.addWidget(add_btn)
 
+        folder_btn = QPushButton("＋  フォルダを追加")
+        folder_btn.setFixedHeight(28)
+        folder_btn.setStyleSheet(add_btn.styleSheet())
+        folder_btn.clicked.connect(self._on_add_folder)
+        ly.addWidget(folder_btn)
+
         ly.addWidget(self._divider())
         ly.addSpacing(4)
 
@@ -1359,6 +1491,7 @@ class CutStudioMain(QMainWindow):
         sc("Shift+Left",  lambda: self._nudge(-5.0))
         sc("Shift+Right", lambda: self._nudge(5.0))
         sc("Home",    lambda: self.playback_engine.seek(0.0))
+        sc("Escape",  self._cancel_export)
 
     def _toggle_play(self) -> None:
         if hasattr(self, "transport"):
@@ -1386,12 +1519,20 @@ class CutStudioMain(QMainWindow):
     # ── Slot: プレビューフレーム更新 ──────────────────────────────
 
     def _update_preview_frame(self) -> None:
-        if not self.video.available:
+        # プレイヘッドのフレームかソースが変わったときだけデコードする
+        if not self.video.available or not self.video.source:
             return
-        sec      = self.timeline.header.playhead_sec
-        tmp_path = "/tmp/vose_preview_frame.ppm"
-        if self.video.save_preview(sec, tmp_path):
-            self.video_preview.show_frame(tmp_path)
+        sec   = self.timeline.header.playhead_sec
+        fps   = self.video.fps or 30.0
+        w, h  = _ve_mod.fit_size(self.video.width, self.video.height, 1920, 1080)
+        key   = (self.video.source, int(sec * fps), w, h)
+        if key == self._preview_key:
+            return
+        self._preview_key = key
+        frame = self.video.grab_frame(sec, w, h, self._preview_buf)
+        if frame is not None:
+            self._preview_buf = frame
+            self.video_preview.show_image(frame)
 
     # ── Slot: 素材追加・配置 ──────────────────────────────────────
 
@@ -1400,48 +1541,133 @@ class CutStudioMain(QMainWindow):
             self, "素材ファイルを追加", "",
             "動画・音声 (*.mp4 *.mov *.mkv *.avi *.wav *.mp3 *.aac *.flac)"
         )
+        if paths:
+            self._start_import(paths)
+
+    def _on_add_folder(self) -> None:
+        folder = QFileDialog.getExistingDirectory(self, "素材フォルダを追加")
+        if folder:
+            self._start_import([folder])
+
+    def _start_import(self, paths: List[str]) -> None:
+        """一覧への追加・プローブ・サムネイル・波形をバックグラウンドで行う（GUI は止めない）"""
+        self._importers = [imp for imp in self._importers if imp.running]
+        importer = AssetImporter(
+            self.engines, self.probe, paths, skip=self._asset_items,
+            on_found=self.import_found.emit,
+            on_probed=self.import_probed.emit,
+            on_media=self.import_media.emit,
+            on_progress=self.import_progress.emit,
+            on_finished=self.import_finished.emit,
+        )
+        self._importers.append(importer)
+        importer.start()
+        self._status.showMessage("📂  素材を走査中…")
+
+    def _prioritize_visible_assets(self) -> None:
+        if not self._importers:
+            return
+        view = self.asset_list.viewport().rect()
+        visible = [path for path, item in self._asset_items.items()
+                   if self.asset_list.visualItemRect(item).intersects(view)]
+        for importer in self._importers:
+            importer.prioritize(visible)
+
+    @Slot(object)
+    def _on_import_found(self, paths: List[str]) -> None:
         for path in paths:
+            if path in self._asset_items:
+                continue
             name = os.path.basename(path)
             icon = "🔊" if path.lower().endswith(
                 (".wav", ".mp3", ".aac", ".flac")) else "🎬"
             item = QListWidgetItem(f"{icon}  {name}")
             item.setData(Qt.ItemDataRole.UserRole, path)
+            item.setToolTip(f"{path}\n解析中…")
             self.asset_list.addItem(item)
+            self._asset_items[path] = item
+        self._prioritize_visible_assets()
+
+    @Slot(object)
+    def _on_import_probed(self, results: List[Tuple[str, Optional[MediaInfo]]]) -> None:
+        for path, info in results:
+            item = self._asset_items.get(path)
+            if item is None:
+                continue
+            if info is None:
+                item.setToolTip(f"{path}\n⚠️  読み込めない形式です")
+                item.setForeground(QColor(142, 142, 147))
+            else:
+                item.setToolTip(f"{path}\n{describe_media(info)}")
+
+    @Slot(object)
+    def _on_import_media(self, media: AssetMedia) -> None:
+        self._asset_media[media.path] = media
+        item = self._asset_items.get(media.path)
+        if item is None or media.thumbnail is None:
+            return
+        h, w = media.thumbnail.shape[:2]
+        image = QImage(media.thumbnail.data, w, h, w * 4, QImage.Format.Format_RGB32).copy()
+        item.setIcon(QIcon(QPixmap.fromImage(image)))
+        name = os.path.basename(media.path)
+        item.setText(name)
+
+    @Slot(object)
+    def _on_import_progress(self, progress: ImportProgress) -> None:
+        self._status.showMessage(
+            f"📂  取り込み中  プローブ {progress.probed}/{progress.total}"
+            f"  解析 {progress.analyzed}/{progress.total}"
+            f"  {progress.files_per_sec:.1f} ファイル/秒")
+
+    @Slot(str)
+    def _on_import_finished(self, message: str) -> None:
+        self._status.showMessage(f"✅  {message}")
+        print(f"✅ {message}  プローブキャッシュ: {self.probe.stats()}")
 
     def _on_asset_double_clicked(self, item: QListWidgetItem) -> None:
         path = item.data(Qt.ItemDataRole.UserRole)
         if not path:
             return
 
+        info = self.probe.get(path)
+
         # VideoEngine にロード
         if self.video.available:
             ok = self.video.load_video(path)
             if ok:
-                self.video.build_keyframe_index()
-                self._status.showMessage(
-                    f"✅  ロード: {os.path.basename(path)}"
-                    f"  {self.video.duration:.1f}s  "
-                    f"{self.video.width}×{self.video.height}"
+                self._load_frame_index(path)
+                self._status.showMessage(f"✅  ロード: {os.path.basename(path)}  " + (
+                    describe_media(info) if info is not None else
+                    f"{self.video.duration:.1f}s  {self.video.width}×{self.video.height}"
                     f"  {self.video.fps:.2f}fps"
-                )
+                ))
 
         # 再生エンジンにロード
-        self.playback_engine.load(path)
+        self.playback_engine.load(path, info.duration if info is not None else None)
 
         # タイムラインにクリップ追加
         start = self.timeline.header.playhead_sec
-        if path.lower().endswith((".wav", ".mp3", ".aac", ".flac")):
-            dur   = get_wav_duration_sec(path) if path.endswith(".wav") else 5.0
+        if info is not None and info.duration > 0:
+            dur = info.duration
+        elif path.lower().endswith(".wav"):
+            dur = get_wav_duration_sec(path)
+        elif self.video.available and self.video.duration > 0:
+            dur = self.video.duration
+        else:
+            dur = 5.0
+        is_audio = path.lower().endswith((".wav", ".mp3", ".aac", ".flac")) or \
+            (info is not None and not info.has_video)
+        if is_audio:
             color = QColor(10, 132, 255)
             track = self.timeline.voice_track
         else:
-            dur   = self.video.duration if self.video.available and self.video.duration > 0 else 5.0
             color = QColor(48, 209, 88)
             track = self.timeline.video_track
 
-        # 波形抽出
-        wf: List[float] = []
-        if self.video.available and path.lower().endswith((".wav",)):
+        # 波形抽出（取り込み時に作ったものがあればそれを使う）
+        media = self._asset_media.get(path)
+        wf: List[float] = list(media.peaks) if media is not None else []
+        if not wf and self.video.available and path.lower().endswith((".wav",)):
             wf = self.video.extract_waveform(512)
 
         name = os.path.basename(path)
@@ -1452,6 +1678,42 @@ class CutStudioMain(QMainWindow):
         self.timeline.update_scroll_range()
         self.timeline.scroll_to_playhead(start + dur)
 
+    def _load_frame_index(self, path: str) -> None:
+        """保存済みのインデックスがあれば即座に使い、無ければバックグラウンドで作る"""
+        if self._index_builder is not None:
+            self._index_builder.cancel()
+            self._index_builder = None
+        self.frame_index = None
+        if self.video.width <= 0:   # 音声のみ
+            return
+        index = load_sidecar(path)
+        if index is not None and self.video.set_frame_index(index.entries):
+            self.frame_index = index
+            return
+        self._index_builder = IndexBuilder(
+            self.engines, path,
+            on_progress=self.index_progress.emit,
+            on_finished=self.index_finished.emit,
+        )
+        self._index_builder.start()
+
+    @Slot(float)
+    def _on_index_progress(self, fraction: float) -> None:
+        self._status.showMessage(f"🔎  フレームインデックス作成中  {fraction * 100:.0f}%")
+
+    @Slot(object, object)
+    def _on_index_finished(self, builder: IndexBuilder, index: Optional[FrameIndex]) -> None:
+        if builder is not self._index_builder:
+            return   # 中止したビルダー（別の動画へ切り替えた・同じ動画を読み直した）
+        self._index_builder = None
+        if index is not None and self.video.set_frame_index(index.entries):
+            self.frame_index = index
+            self._status.showMessage(
+                f"✅  フレームインデックス: {len(index)} フレーム / "
+                f"キーフレーム {index.key_times.size}")
+        else:
+            self._status.showMessage("⚠️  フレームインデックスを作成できませんでした")
+
     # ── Slot: TTS 合成 ────────────────────────────────────────────
 
     def _on_generate_clicked(self) -> None:
@@ -1461,73 +1723,126 @@ class CutStudioMain(QMainWindow):
         self.generate_button.setEnabled(False)
         self.generate_button.setText("合成中…")
         self._status.showMessage("🎙️  合成中…")
+        start = self.timeline.header.playhead_sec
+        if self.talk_manager:
+            self._start_tts(text, start, "output_tts.wav", subtitle=True)
+        else:
+            # エンジンが無いときは音声なしの仮クリップ（2 秒）だけ置く
+            self._on_tts_finished((text, start, "output_tts.wav", True, None, 0))
 
-        wav_path = "output_tts.wav"
-        dur      = 2.0
+    def _on_synthesize_from_clip(self, text: str, start_sec: float) -> None:
+        if not text or not self.talk_manager:
+            self._status.showMessage("⚠️  TalkManager が初期化されていません")
+            return
+        self._status.showMessage(f"🎙️  クリップから合成中: {text[:20]}…")
+        self._start_tts(text, start_sec, "output_clip_tts.wav", subtitle=False)
 
-        if self.talk_manager:
-            ok, _ = self.talk_manager.synthesize(text, wav_path)
-            if not ok:
-                self._status.showMessage("❌  TTS 合成に失敗しました")
-                self.generate_button.setEnabled(True)
-                self.generate_button.setText("音声を合成して配置")
-                return
-            dur = get_wav_duration_sec(wav_path)
+    def _start_tts(self, text: str, start: float, wav_path: str, subtitle: bool) -> None:
+        """
+        合成は GUI スレッドを止めないようワーカーで行い、結果は tts_finished で受け取る。
+        VO-SE エンジンと解析器があればトークイベントをメモリにレンダーし、
+        レンダーできなければ TalkManager（pyopenjtalk）の音声を使う。
+        """
+        def job() -> None:
+            try:
+                pcm, sr = None, SAMPLE_RATE
+                if self.analyzer and self.bridge.available:
+                    pcm = self.bridge.render_to_buffer(generate_talk_events(text, self.analyzer))
+                if pcm is None:
+                    pcm, sr, _ = self.talk_manager.synthesize_to_buffer(text)
+            except Exception as e:
+                print(f"❌ TTS 合成エラー: {e}")
+                pcm, sr = None, 0
+            self.tts_finished.emit((text, start, wav_path, subtitle, pcm, sr))
+
+        self._tts_pool.submit(job)
+
+    def _on_tts_finished(self, result: Tuple[Any, ...]) -> None:
+        text, start, wav_path, subtitle, pcm, sr = result
+        if subtitle:
+            self.generate_button.setEnabled(True)
+            self.generate_button.setText("音声を合成して配置")
+        if self.talk_manager and (pcm is None or not len(pcm) or sr <= 0):
+            self._status.showMessage("❌  TTS 合成に失敗しました")
+            return
 
-        # 波形抽出
+        # 配置・波形・プレビューはメモリ上の PCM から行い、WAV 保存はバックグラウンドで行う
+        dur        = 2.0
         wf: List[float] = []
-        if self.video.available and os.path.exists(wav_path):
-            tmp_ve = _ve_mod.VideoEngine()
-            if tmp_ve.available:
-                tmp_ve.load_video(wav_path)
-                wf = tmp_ve.extract_waveform(512)
-
-        start      = self.timeline.header.playhead_sec
         short_text = (text[:16] + "…") if len(text) > 16 else text
-
+        if pcm is not None:
+            dur = len(pcm) / float(sr)
+            wf  = waveform_peaks(pcm, 512)
+            write_wav_async(wav_path, pcm, sr)
         self.timeline.voice_track.add_clip(
             start, dur, f"🎙  {short_text}",
             color=QColor(10, 132, 255), raw_text=text,
             wav_path=wav_path, waveform=wf,
         )
-        self.timeline.video_track.add_clip(
-            start, dur, f"💬  {short_text}",
-            color=QColor(48, 209, 88), raw_text=text,
-        )
+        if subtitle:
+            self.timeline.video_track.add_clip(
+                start, dur, f"💬  {short_text}",
+                color=QColor(48, 209, 88), raw_text=text,
+            )
+            self.tts_input.clear()
         self.timeline.header.set_playhead(start + dur)
         self.timeline.update_scroll_range()
         self.timeline.scroll_to_playhead(start + dur)
 
-        if is_engine_available and self.analyzer:
-            notes = generate_talk_events(text, self.analyzer)
-            if notes:
-                self.bridge.render(notes, output_file="output_rendered.wav")
-
-        self.tts_input.clear()
+        # 試聴はボイス用のプレーヤーで（読み込み中の動画の音声ソースはそのまま）
+        if pcm is not None and not self.playback_engine.is_playing and \
+                self.voice_player.load_buffer(pcm, sr, label=short_text):
+            self.voice_player.play()
         self._status.showMessage(f"✅  合成完了: {short_text}")
-        self.generate_button.setEnabled(True)
-        self.generate_button.setText("音声を合成して配置")
 
-    def _on_synthesize_from_clip(self, text: str, start_sec: float) -> None:
-        if not text or not self.talk_manager:
-            self._status.showMessage("⚠️  TalkManager が初期化されていません")
+    # ── Slot: 録音のピッチ・声質編集（WORLD 再合成） ────────────────
+
+    def _connect_track(self, track: TimelineTrack) -> None:
+        track.synthesize_requested.connect(self._on_synthesize_from_clip)
+        track.resynth_requested.connect(
+            lambda clip, t=track: self._on_resynth_requested(t, clip))
+
+    def _on_resynth_requested(self, track: TimelineTrack, clip: Dict[str, Any]) -> None:
+        if self._resynth_pool is None:
+            self._resynth_pool = self.bridge.resynth_pool()
+        if self._resynth_pool is None:
+            self._status.showMessage("⚠️  VO-SE エンジンが読み込まれていません")
             return
-        self._status.showMessage(f"🎙️  クリップから合成中: {text[:20]}…")
-        wav_path = "output_clip_tts.wav"
-        ok, _    = self.talk_manager.synthesize(text, wav_path)
+        semitones, ok = QInputDialog.getDouble(
+            self, "ピッチ・声質を編集", "ピッチ（半音）:", 0.0, -24.0, 24.0, 1)
         if not ok:
-            self._status.showMessage("❌  TTS 合成に失敗しました")
             return
-        dur        = get_wav_duration_sec(wav_path)
-        short_text = (text[:16] + "…") if len(text) > 16 else text
-        self.timeline.voice_track.add_clip(
-            start_sec, dur, f"🎙  {short_text}",
-            color=QColor(10, 132, 255), raw_text=text, wav_path=wav_path,
-        )
-        self.timeline.header.set_playhead(start_sec + dur)
+        gender, ok = QInputDialog.getDouble(
+            self, "ピッチ・声質を編集", "声質 gender（0.5 = そのまま）:", 0.5, 0.0, 1.0, 2)
+        if not ok:
+            return
+        breath, ok = QInputDialog.getDouble(
+            self, "ピッチ・声質を編集", "息成分 breath（0.5 = そのまま）:", 0.5, 0.0, 1.0, 2)
+        if not ok:
+            return
+        edit = VoiceEdit(pitch_shift=semitones, gender=gender, breath=breath)
+        if edit.is_identity():
+            return
+        self._status.showMessage(f"🎚️  再合成中: {os.path.basename(clip['wav_path'])}")
+        future = self._resynth_pool.submit(clip["wav_path"], edit)
+        future.add_done_callback(
+            lambda f: self.resynth_finished.emit(
+                track, clip, f.result() if f.exception() is None else None))
+
+    @Slot(object, object, object)
+    def _on_resynth_finished(self, track: TimelineTrack, clip: Dict[str, Any],
+                             result: Optional[Any]) -> None:
+        if result is None or not result.ok:
+            self._status.showMessage("❌  再合成に失敗しました")
+            return
+        name  = os.path.basename(result.output)
+        short = (name[:18] + "…") if len(name) > 18 else name
+        track.add_clip(clip["start"], result.duration, f"🎚  {short}",
+                       color=track.track_color, raw_text=result.output,
+                       wav_path=result.output, waveform=result.peaks)
         self.timeline.update_scroll_range()
-        self.timeline.scroll_to_playhead(start_sec + dur)
-        self._status.showMessage(f"✅  クリップ合成完了: {short_text}")
+        self._status.showMessage(
+            f"✅  再合成完了: {name}  {result.duration:.1f}s  RTF {result.rtf:.2f}")
 
     # ── Slot: トラック追加 ────────────────────────────────────────
 
@@ -1537,36 +1852,84 @@ class CutStudioMain(QMainWindow):
         )
         if ok and name:
             new_track = self.timeline.add_track(name)
-            new_track.synthesize_requested.connect(self._on_synthesize_from_clip)
+            self._connect_track(new_track)
             self._status.showMessage(f"✅  トラック追加: {name}")
 
     # ── Slot: 書き出し ────────────────────────────────────────────
 
     def _on_export_clicked(self) -> None:
+        # 書き出し中はボタン（と Esc）で中止
+        if self._export_job is not None and self._export_job.running:
+            self._export_job.cancel()
+            self._status.showMessage("⏹  書き出しを中止しています…")
+            return
+        if not self.video.available:
+            self._status.showMessage("⚠️  VideoEngine が利用できません")
+            return
+
+        # 全トラックを秒ベースの EDL にまとめる（隣接区間の結合・隠れ区間の除外・前方向の並び）
+        # 各ソースの尺はプローブキャッシュから（尺を超えるクリップ区間を切り捨てる）
+        sources = sorted({clip_source(c, self.video.source)
+                          for t in self.timeline._tracks for c in t.clips} - {""})
+        infos = dict(zip(sources, self.probe.get_many(sources)))
+        durations = {src: info.duration for src, info in infos.items()
+                     if info is not None and info.duration > 0}
+        if self.video.duration > 0:
+            durations[self.video.source] = self.video.duration
+        compiled = compile_timeline(self.timeline, self.video.source, durations)
+
+        # 複数ソースは解像度・fps・音声形式が揃っていないと 1 本に結合できない
+        problems = source_mismatches(
+            compiled.sources, [infos.get(src) or self.probe.get(src) for src in compiled.sources])
+        if problems:
+            for problem in problems:
+                print(f"❌ 書き出し不可: {problem}")
+            self._status.showMessage(
+                f"⚠️  形式の異なるソースが混在しているため書き出せません: {problems[0]}"
+                + (f" ほか {len(problems) - 1} 件" if len(problems) > 1 else ""))
+            return
+
         path, _ = QFileDialog.getSaveFileName(
             self, "書き出し先を選択", "output.mp4",
             "MP4 (*.mp4);;MOV (*.mov);;MKV (*.mkv)"
         )
         if not path:
             return
-        self._status.showMessage(f"📤  書き出し中: {path} …")
 
-        if self.video.available:
-            # 秒ベースで EDL JSON を生成 (px_per_sec 依存なし)
-            clips = [
-                (c["start"], c["duration"])
-                for c in self.timeline.voice_track.clips
-            ]
-            edl_json = json.dumps([
-                {"in": s, "out": s + d, "enabled": True}
-                for s, d in clips if d > 0
-            ], ensure_ascii=False)
-            ok  = self.video.export_hw(edl_json, path, quality=23)
-            msg = (f"✅  書き出し完了: {path}"
-                   if ok else "❌  書き出しに失敗しました")
-        else:
-            msg = "⚠️  VideoEngine が利用できません"
-        self._status.showMessage(msg)
+        print(f"✅ EDL: {describe(compiled)}")
+        # セグメントを並列プロセスでスマートカット書き出しし、ストリームコピーで結合する
+        self._export_job = ExportJob(
+            self.video, compiled.entries, path, quality=23, mode="smart",
+            sources=compiled.sources,
+            on_progress=self.export_progress.emit,
+            on_finished=self.export_finished.emit,
+        )
+        self._export_job.start()
+        if self._export_btn:
+            self._export_btn.setText("中止")
+        self._status.showMessage(
+            f"📤  書き出し中: {os.path.basename(path)}  "
+            f"({len(self._export_job.segments)} セグメント / "
+            f"{int(compiled.stats['clips'])} クリップ → "
+            f"{int(compiled.stats['entries'])} エントリ)…")
+
+    def _cancel_export(self) -> None:
+        if self._export_job is not None and self._export_job.running:
+            self._on_export_clicked()
+
+    @Slot(object)
+    def _on_export_progress(self, progress: ExportProgress) -> None:
+        self._status.showMessage(
+            f"📤  書き出し中  {progress.fraction * 100:.0f}%  "
+            f"({progress.segments_done}/{progress.segments_total})  "
+            f"{progress.encode_fps:.1f} fps  コピー {progress.copied_sec:.1f}s  — Esc で中止")
+
+    @Slot(bool, str)
+    def _on_export_finished(self, ok: bool, message: str) -> None:
+        self._export_job = None
+        if self._export_btn:
+            self._export_btn.setText("書き出し")
+        self._status.showMessage(f"✅  書き出し完了: {message}" if ok else f"❌  {message}")
 
     # ── Slot: プロジェクト保存 ────────────────────────────────────
 
@@ -1641,6 +2004,16 @@ class CutStudioMain(QMainWindow):
         version = data.get("version", 1)
         tracks_data = data.get("tracks", [])
 
+        # 波形はプールのハンドルで並列に取り出す（同じファイルは 1 回だけ）
+        wav_paths = sorted({
+            c.get("wav_path", "") for t in tracks_data for c in t.get("clips", [])
+            if c.get("wav_path") and os.path.exists(c.get("wav_path", ""))
+        })
+        waveforms: Dict[str, List[float]] = {}
+        if wav_paths and self.video.available:
+            with ThreadPoolExecutor(max_workers=self.engines.max_handles) as ex:
+                waveforms = dict(zip(wav_paths, ex.map(self.engines.waveform, wav_paths)))
+
         for i, t_data in enumerate(tracks_data):
             # 既存トラックを再利用 or 新規作成
             if i < len(self.timeline._tracks):
@@ -1652,7 +2025,7 @@ class CutStudioMain(QMainWindow):
                     t_data.get("name", f"トラック {i+1}"),
                     QColor(t_data.get("color", "#0a84ff")),
                 )
-                track.synthesize_requested.connect(self._on_synthesize_from_clip)
+                self._connect_track(track)
 
             for c_data in t_data.get("clips", []):
                 if version >= 2:
@@ -1665,12 +2038,7 @@ class CutStudioMain(QMainWindow):
                     dur   = float(c_data.get("width", 200)) / pps
 
                 wav_path = c_data.get("wav_path", "")
-                wf: List[float] = []
-                if wav_path and os.path.exists(wav_path) and self.video.available:
-                    tmp_ve = _ve_mod.VideoEngine()
-                    if tmp_ve.available:
-                        tmp_ve.load_video(wav_path)
-                        wf = tmp_ve.extract_waveform(512)
+                wf: List[float] = waveforms.get(wav_path, [])
 
                 clip: Dict[str, Any] = {
                     "start":    start,
@@ -1699,6 +2067,19 @@ class CutStudioMain(QMainWindow):
             pass
         self._preview_timer.stop()
         self.playback_engine.stop()
+        self.voice_player.stop()
+        self._tts_pool.shutdown(wait=False)
+        if self._resynth_pool is not None:
+            self._resynth_pool.shutdown()
+        if self._export_job is not None:
+            self._export_job.cancel()
+        if self._index_builder is not None:
+            self._index_builder.cancel()
+        for importer in self._importers:
+            importer.cancel()
+        self.filmstrip.shutdown()
+        self.engines.shutdown()
+        self.probe.close()
         super().closeEvent(event)
 
     # ── helpers ──────────────────────────────────────────────────
@@ -1726,6 +2107,8 @@ class CutStudioMain(QMainWindow):
 # ══════════════════════════════════════════════════════════════════
 
 if __name__ == "__main__":
+    # 書き出しワーカー（spawn）を PyInstaller 版でも起動できるように
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     if _SYS == "Darwin":
@@ -0,0 +1,273 @@
+"""
+media_probe.py — VO-SE Cut Studio
+素材ファイルのプローブ（尺・ストリーム・コーデック・解像度・fps・サンプルレート・チャンネル）
+  ■ probe_file : PyAV で開ける形式ならすべて読む（PyAV が無ければ WAV だけ wave で読む）
+  ■ ProbeCache : 結果をローカルの SQLite に保存する。キーはパス・サイズ・更新時刻なので、
+                 変わっていないファイルはコンテナを開かずに返す
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import wave
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import av  # pip install av
+    _AV_AVAILABLE = True
+except ImportError:
+    _AV_AVAILABLE = False
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".vose_cut_studio", "probe.sqlite3")
+
+PROBE_VERSION = 2   # MediaInfo の項目を変えたら上げる（古い行は読み直す）
+
+
+@dataclass
+class MediaInfo:
+    path:           str
+    size:           int
+    mtime_ns:       int
+    duration:       float = 0.0
+    format_name:    str   = ""
+    streams:        int   = 0
+    video_codec:    str   = ""
+    width:          int   = 0
+    height:         int   = 0
+    fps:            float = 0.0
+    audio_codec:    str   = ""
+    sample_rate:    int   = 0
+    channels:       int   = 0
+    channel_layout: str   = ""
+    audio_profile:  str   = ""   # AAC の LC / HE-AAC など（ストリームコピーで結合できるかの判定用）
+    bit_rate:       int   = 0
+
+    @property
+    def has_video(self) -> bool:
+        return bool(self.video_codec) and self.width > 0
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_codec) and self.sample_rate > 0
+
+    @classmethod
+    def from_json(cls, text: str) -> MediaInfo:
+        data = json.loads(text)
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _probe_av(path: str, info: MediaInfo) -> None:
+    with av.open(path) as container:
+        info.format_name = container.format.name or ""
+        info.streams     = len(container.streams)
+        info.bit_rate    = int(container.bit_rate or 0)
+        if container.duration is not None:
+            info.duration = float(container.duration) / 1_000_000   # AV_TIME_BASE = 1e6
+        if container.streams.video:
+            vs = container.streams.video[0]
+            info.video_codec = vs.codec_context.name or ""
+            info.width       = int(vs.codec_context.width or 0)
+            info.height      = int(vs.codec_context.height or 0)
+            rate = vs.average_rate or vs.guessed_rate
+            info.fps = float(rate) if rate else 0.0
+            if info.duration <= 0.0 and vs.duration is not None and vs.time_base:
+                info.duration = float(vs.duration * vs.time_base)
+        if container.streams.audio:
+            aus = container.streams.audio[0]
+            info.audio_codec    = aus.codec_context.name or ""
+            info.sample_rate    = int(aus.codec_context.sample_rate or 0)
+            info.channels       = int(getattr(aus.codec_context, "channels", 0) or 0)
+            info.channel_layout = getattr(aus.codec_context.layout, "name", "") or ""
+            info.audio_profile  = str(getattr(aus.codec_context, "profile", "") or "")
+            if info.duration <= 0.0 and aus.duration is not None and aus.time_base:
+                info.duration = float(aus.duration * aus.time_base)
+
+
+def _probe_wave(path: str, info: MediaInfo) -> None:
+    with wave.open(path, "rb") as wr:
+        info.format_name = "wav"
+        info.streams     = 1
+        info.audio_codec = f"pcm_s{wr.getsampwidth() * 8}le"
+        info.sample_rate = wr.getframerate()
+        info.channels    = wr.getnchannels()
+        info.channel_layout = {1: "mono", 2: "stereo"}.get(info.channels, "")
+        info.duration    = wr.getnframes() / float(wr.getframerate())
+
+
+def probe_file(path: str) -> Optional[MediaInfo]:
+    """path をプローブする（キャッシュなし）。開けなければ None"""
+    st = _stat(path)
+    if st is None:
+        return None
+    info = MediaInfo(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    try:
+        if _AV_AVAILABLE:
+            _probe_av(path, info)
+        elif path.lower().endswith(".wav"):
+            _probe_wave(path, info)
+        else:
+            return None
+    except Exception as e:
+        print(f"⚠️  プローブ失敗: {path} ({e})")
+        return None
+    return info
+
+
+def describe_media(info: MediaInfo) -> str:
+    """ステータスバー用の 1 行（例: "12.3s  1920×1080  29.97fps  h264 / aac 48000Hz 2ch"）"""
+    parts = [f"{info.duration:.1f}s"]
+    if info.has_video:
+        parts.append(f"{info.width}×{info.height}  {info.fps:.2f}fps")
+    codecs = [c for c in (info.video_codec, info.audio_codec) if c]
+    if info.has_audio:
+        codecs[-1] += f" {info.sample_rate}Hz {info.channels}ch"
+    if codecs:
+        parts.append(" / ".join(codecs))
+    return "  ".join(parts)
+
+
+# ══════════════════════════════════════════════════════════════════
+# SQLite キャッシュ
+# ══════════════════════════════════════════════════════════════════
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    version   INTEGER NOT NULL,
+    info      TEXT    NOT NULL,
+    probed_at REAL    NOT NULL
+)
+"""
+
+
+class ProbeCache:
+    """
+    プローブ結果の永続キャッシュ。複数スレッドから呼んでよい（接続は 1 本をロックで共有）。
+    get_many はキャッシュに無いファイルだけをスレッドで並列にプローブする。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH) -> None:
+        self.db_path = db_path
+        self._lock   = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, float] = {"hits": 0, "misses": 0, "failures": 0, "probe_sec": 0.0}
+        try:
+            if db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(_SCHEMA)
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  プローブキャッシュを開けません: {db_path} ({e})")
+            self._db = None
+
+    def _lookup(self, path: str, st: os.stat_result) -> Optional[MediaInfo]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT info FROM media "
+                "WHERE path = ? AND size = ? AND mtime_ns = ? AND version = ?",
+                (path, st.st_size, st.st_mtime_ns, PROBE_VERSION),
+            ).fetchone()
+        return MediaInfo.from_json(row[0]) if row else None
+
+    def _store(self, infos: Sequence[MediaInfo]) -> None:
+        if self._db is None or not infos:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO media (path, size, mtime_ns, version, info, probed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(i.path, i.size, i.mtime_ns, PROBE_VERSION, json.dumps(asdict(i)), now)
+                 for i in infos],
+            )
+            self._db.commit()
+
+    def _probe_timed(self, path: str) -> Optional[MediaInfo]:
+        t0 = time.perf_counter()
+        info = probe_file(path)
+        with self._lock:
+            self._stats["probe_sec"] += time.perf_counter() - t0
+            self._stats["misses"]    += 1
+            if info is None:
+                self._stats["failures"] += 1
+        return info
+
+    def get(self, path: str) -> Optional[MediaInfo]:
+        """path の MediaInfo。変わっていなければ SQLite から、そうでなければプローブして保存する"""
+        return self.get_many([path])[0]
+
+    def get_many(self, paths: Sequence[str], workers: int = 4,
+                 executor: Optional[Executor] = None) -> List[Optional[MediaInfo]]:
+        """
+        paths と同じ順で返す。キャッシュに無いものは workers 本のスレッドで並列にプローブする。
+        executor（ProcessPoolExecutor など）を渡すとそちらで probe_file を実行する。
+        """
+        results: List[Optional[MediaInfo]] = [None] * len(paths)
+        todo: List[int] = []
+        for i, p in enumerate(paths):
+            st = _stat(p)
+            if st is None:
+                continue
+            cached = self._lookup(os.path.abspath(p), st)
+            if cached is not None:
+                results[i] = cached
+                with self._lock:
+                    self._stats["hits"] += 1
+            else:
+                todo.append(i)
+
+        if executor is not None and todo:
+            t0 = time.perf_counter()
+            infos = list(executor.map(probe_file, [paths[i] for i in todo]))
+            with self._lock:
+                self._stats["probe_sec"] += time.perf_counter() - t0
+                self._stats["misses"]    += len(todo)
+                self._stats["failures"]  += sum(1 for info in infos if info is None)
+            for i, info in zip(todo, infos):
+                results[i] = info
+        elif len(todo) == 1:
+            results[todo[0]] = self._probe_timed(paths[todo[0]])
+        elif todo:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as ex:
+                for i, info in zip(todo, ex.map(self._probe_timed, [paths[i] for i in todo])):
+                    results[i] = info
+        self._store([results[i] for i in todo if results[i] is not None])  # type: ignore[misc]
+        return results
+
+    def forget(self, path: str) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM media WHERE path = ?", (os.path.abspath(path),))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = (self._db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+                                if self._db is not None else 0)
+        return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
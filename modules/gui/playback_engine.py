@@ -7,6 +7,8 @@ VO-SE Cut Studio — 再生エンジン
   - QTimer(display_timer) が ~16ms ごとに起動し、キューから1フレームを取り出して
     PreviewView に表示する（映像同期）
   - 音声は PyAudio + threading.Thread でデコードキューから並走再生
+  - 合成直後の音声はファイルを介さず load_buffer() で PCM をそのまま再生できる
+    （BufferFeeder がデコーダの代わりに音声キューへ積む）
   - タイムライン再生ヘッドは positionChanged シグナル経由で同期
 
 使い方:
@@ -18,6 +20,7 @@ VO-SE Cut Studio — 再生エンジン
   engine.pause()  # ⏸
   engine.stop()   # ⏹
   engine.seek(3.5)  # 秒単位シーク
+  engine.load_buffer(pcm, 48000)   # メモリ上の PCM をロード
 """
 from __future__ import annotations
 
@@ -25,7 +28,9 @@ import time
 import queue
 import threading
 import traceback
-from typing import Optional, Callable
+from typing import Any, Optional, Callable
+
+import numpy as np
 
 # ──────────────────────────────────────────────────────────────────
 # PyAV (python-av) — FFmpeg バインディング
@@ -219,6 +224,73 @@ class DecoderWorker(QObject):
                       w * 3, QImage.Format.Format_RGB888).copy()
 
 
+# ══════════════════════════════════════════════════════════════════
+# BufferFeeder — メモリ上の PCM を音声キューに積む
+# ══════════════════════════════════════════════════════════════════
+
+class BufferFeeder:
+    """
+    int16 モノラル PCM を _AUDIO_CHUNK_FRAMES ずつ audio_queue に積む。
+    DecoderWorker と同じ stop_event / seek_event で制御する。
+    """
+
+    def __init__(
+        self,
+        pcm:         np.ndarray,
+        sample_rate: int,
+        audio_queue: queue.Queue,
+        stop_event:  threading.Event,
+        seek_event:  threading.Event,
+    ) -> None:
+        self.pcm          = pcm
+        self.sample_rate  = sample_rate
+        self.audio_queue  = audio_queue
+        self.stop_event   = stop_event
+        self.seek_event   = seek_event
+        self.seek_target: float = 0.0
+        self._paused      = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float = 1.0) -> None:
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def request_seek(self, sec: float) -> None:
+        self.seek_target = sec
+        self.seek_event.set()
+
+    def set_paused(self, paused: bool) -> None:
+        self._paused = paused
+
+    def _run(self) -> None:
+        pos = int(self.seek_target * self.sample_rate)
+        while not self.stop_event.is_set():
+            if self.seek_event.is_set():
+                self.seek_event.clear()
+                pos = int(self.seek_target * self.sample_rate)
+                while not self.audio_queue.empty():
+                    try:
+                        self.audio_queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+            while self._paused and not self.stop_event.is_set():
+                time.sleep(0.02)
+
+            chunk = self.pcm[pos:pos + _AUDIO_CHUNK_FRAMES]
+            if len(chunk) == 0:
+                break
+            try:
+                self.audio_queue.put((pos / self.sample_rate, chunk.tobytes()), timeout=0.1)
+            except queue.Full:
+                continue
+            pos += len(chunk)
+
+
 # ══════════════════════════════════════════════════════════════════
 # AudioPlayer — threading.Thread で PyAudio 出力
 # ══════════════════════════════════════════════════════════════════
@@ -308,7 +380,7 @@ class PlaybackEngine(QObject):
     def __init__(
         self,
         preview_view,       # PreviewView インスタンス
-        timeline_header,    # TimelineHeader インスタンス
+        timeline_header,    # TimelineHeader インスタンス（None なら再生ヘッドを動かさない）
         status_bar: Optional[QStatusBar] = None,
     ) -> None:
         super().__init__()
@@ -318,6 +390,8 @@ class PlaybackEngine(QObject):
         self._status        = status_bar
 
         self._file_path:    Optional[str]  = None
+        self._pcm:          Optional[np.ndarray] = None   # load_buffer 時の int16 PCM
+        self._pcm_rate:     int            = 44100
         self._duration:     float          = 0.0
         self._position:     float          = 0.0
         self._playing:      bool           = False
@@ -335,6 +409,9 @@ class PlaybackEngine(QObject):
         self._decoder_thread: Optional[QThread]       = None
         self._decoder_worker: Optional[DecoderWorker] = None
 
+        # メモリ PCM の供給スレッド
+        self._feeder: Optional[BufferFeeder] = None
+
         # 音声プレーヤー
         self._audio_player  = AudioPlayer(self._audio_queue)
 
@@ -349,31 +426,60 @@ class PlaybackEngine(QObject):
 
     # ── 公開 API ─────────────────────────────────────────────────
 
-    def load(self, file_path: str) -> bool:
-        """動画ファイルをロードして準備する。"""
+    def load(self, file_path: str, duration: Optional[float] = None) -> bool:
+        """
+        動画ファイルをロードして準備する。
+        duration（media_probe で分かっている尺）を渡すとコンテナを開かずに済ませる。
+        """
         self.stop()
         if not _AV_AVAILABLE:
             self._show_status("❌  PyAV が必要です: pip install av")
             return False
 
-        try:
-            container = av.open(file_path)
-            dur = float(container.duration) / 1_000_000  # AV_TIME_BASE = 1e6
-            container.close()
-        except Exception as e:
-            self._show_status(f"❌  ロード失敗: {e}")
-            return False
+        if duration is not None and duration > 0:
+            dur = float(duration)
+        else:
+            try:
+                container = av.open(file_path)
+                dur = float(container.duration) / 1_000_000  # AV_TIME_BASE = 1e6
+                container.close()
+            except Exception as e:
+                self._show_status(f"❌  ロード失敗: {e}")
+                return False
 
         self._file_path = file_path
+        self._pcm       = None
         self._duration  = dur
         self._position  = 0.0
         self.duration_known.emit(dur)
         self._show_status(f"📂  読み込み完了: {file_path}  ({dur:.1f}s)")
         return True
 
+    def load_buffer(self, pcm: Any, sample_rate: int, label: str = "合成音声") -> bool:
+        """
+        メモリ上のモノラル PCM をロードする（ファイル・PyAV 不要）。
+        float 配列は -1.0〜1.0 として int16 に変換する。
+        """
+        self.stop()
+        x = np.asarray(pcm)
+        if x.ndim > 1:
+            x = x.mean(axis=1)
+        if len(x) == 0 or sample_rate <= 0:
+            return False
+        if np.issubdtype(x.dtype, np.floating):
+            x = np.clip(x * 32767.0, -32768, 32767)
+        self._pcm       = np.ascontiguousarray(x, dtype=np.int16)
+        self._pcm_rate  = int(sample_rate)
+        self._file_path = None
+        self._duration  = len(self._pcm) / float(self._pcm_rate)
+        self._position  = 0.0
+        self.duration_known.emit(self._duration)
+        self._show_status(f"📂  読み込み完了: {label}  ({self._duration:.1f}s)")
+        return True
+
     def play(self) -> None:
         """再生開始 / ポーズ解除"""
-        if not self._file_path:
+        if not self._file_path and self._pcm is None:
             return
 
         if self._playing:
@@ -381,10 +487,18 @@ class PlaybackEngine(QObject):
 
         self._playing = True
 
-        if self._decoder_worker and not self._stop_event.is_set():
+        if self._feeder and not self._stop_event.is_set():
+            # ポーズ解除（メモリ PCM）
+            self._feeder.set_paused(False)
+            self._audio_player.resume()
+        elif self._decoder_worker and not self._stop_event.is_set():
             # ポーズ解除
             self._decoder_worker.set_paused(False)
             self._audio_player.resume()
+        elif self._pcm is not None:
+            # 新規再生（メモリ PCM）
+            self._start_feeder()
+            self._audio_player.start(self._pcm_rate, 1)
         else:
             # 新規再生
             self._start_decoder()
@@ -403,6 +517,8 @@ class PlaybackEngine(QObject):
         self._playing = False
         if self._decoder_worker:
             self._decoder_worker.set_paused(True)
+        if self._feeder:
+            self._feeder.set_paused(True)
         self._audio_player.pause()
         self._display_timer.stop()
         self.playback_paused.emit()
@@ -421,6 +537,10 @@ class PlaybackEngine(QObject):
             self._decoder_thread = None
             self._decoder_worker = None
 
+        if self._feeder:
+            self._feeder.join()
+            self._feeder = None
+
         # キューをフラッシュ
         for q in (self._video_queue, self._audio_queue):
             while not q.empty():
@@ -446,6 +566,8 @@ class PlaybackEngine(QObject):
 
         if self._decoder_worker:
             self._decoder_worker.request_seek(sec)
+        if self._feeder:
+            self._feeder.request_seek(sec)
         self._show_status(f"⏩  シーク: {self._fmt_time(sec)}")
 
     def step_forward(self, sec: float = 5.0) -> None:
@@ -493,6 +615,18 @@ class PlaybackEngine(QObject):
         self._decoder_worker.error_occurred.connect(self._on_decoder_error)
         self._decoder_thread.start()
 
+    def _start_feeder(self) -> None:
+        self._stop_event.clear()
+        self._feeder = BufferFeeder(
+            self._pcm,
+            self._pcm_rate,
+            self._audio_queue,
+            self._stop_event,
+            self._seek_event,
+        )
+        self._feeder.seek_target = self._position
+        self._feeder.start()
+
     # ── 内部: 表示タイマーコールバック(~60fps) ──────────────────
 
     @Slot()
@@ -562,6 +696,8 @@ class PlaybackEngine(QObject):
     # ── 内部: タイムラインヘッド同期 ─────────────────────────────
 
     def _update_header(self, sec: float) -> None:
+        if self._header is None:
+            return
         px = int(sec * self._px_per_sec)
         self._header.set_playhead(px)
 
@@ -5,13 +5,101 @@ video_engine.py — VO-SE Cut Studio
 from __future__ import annotations
 
 import ctypes
+import json
 import os
 import platform
+import queue
 import sys
-from typing import List, Optional, Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 _SYS = platform.system()
 
+# 書き出しモード: copy = キーフレーム単位のストリームコピー（速いがカット位置は GOP 精度）
+#                 reencode = 全体を再エンコード（正確だが遅い）
+#                 smart = GOP 内部はコピー、カット端だけ再エンコード
+EXPORT_MODES = ("copy", "reencode", "smart")
+
+
+class SmartCutReport(ctypes.Structure):
+    """src/engine/video_engine.hpp の vose::SmartCutReport と同順"""
+    _fields_ = [
+        ("copied_sec",       ctypes.c_double),
+        ("reencoded_sec",    ctypes.c_double),
+        ("copied_packets",   ctypes.c_int64),
+        ("reencoded_frames", ctypes.c_int64),
+        ("entries",          ctypes.c_int),
+        ("full_reencode",    ctypes.c_int),
+    ]
+
+
+# src/engine/video_engine.hpp の vose::FrameIndexEntry と同順（24 バイト）
+FRAME_INDEX_DTYPE = np.dtype([
+    ("pts",      "<i8"),
+    ("file_pos", "<i8"),
+    ("flags",    "<i4"),
+    ("size",     "<i4"),
+])
+
+# waveform_range の行
+WAVE_MIN, WAVE_MAX, WAVE_RMS = 0, 1, 2
+
+# 進捗・中止コールバック（vose_set_callbacks）。書き出し / インデックス作成のスレッドから呼ばれる
+PROGRESS_FUNC = ctypes.CFUNCTYPE(None, ctypes.c_double, ctypes.c_char_p, ctypes.c_void_p)
+CANCEL_FUNC   = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p)
+
+
+class EngineProgress(NamedTuple):
+    fraction: float   # 0..1
+    stage:    str     # "エクスポート中" など C++ 側の段階名
+    elapsed:  float   # 開始からの秒
+    rate:     float   # 1 秒あたりの進捗（fraction / elapsed）
+
+    @property
+    def eta(self) -> float:
+        return (1.0 - self.fraction) / self.rate if self.rate > 0 else 0.0
+
+
+class FrameBuffer:
+    """
+    grab_frame の出力先。(height, width, 4) の uint8 配列を使い回す。
+    並びは RGB32（0xffRRGGBB のネイティブエンディアン）なので、
+    QImage(buf.array.data, buf.width, buf.height, buf.stride, QImage.Format.Format_RGB32)
+    でコピーせずに包める。
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.array    = np.zeros((height, width, 4), dtype=np.uint8)
+        self.time_sec = -1.0   # 最後に書き込んだ要求時刻
+
+    @property
+    def width(self) -> int:
+        return int(self.array.shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self.array.shape[0])
+
+    @property
+    def stride(self) -> int:
+        return int(self.array.strides[0])
+
+
+def fit_size(src_w: int, src_h: int, max_w: int, max_h: int) -> Tuple[int, int]:
+    """アスペクト比を保って max_w × max_h に収まる偶数サイズ"""
+    if src_w <= 0 or src_h <= 0:
+        return max_w, max_h
+    scale = min(max_w / src_w, max_h / src_h)
+    return max(2, int(src_w * scale) & ~1), max(2, int(src_h * scale) & ~1)
+
+
+# ライブラリはパスごとに 1 回だけ読み込み、全ハンドルで共有する（シグネチャ設定も 1 回）
+_LIBS: Dict[str, ctypes.CDLL] = {}
+_LIBS_LOCK = threading.Lock()
+
 
 def _find_lib() -> str:
     """
@@ -49,6 +137,11 @@ class VideoEngine:
     def __init__(self, lib_path: Optional[str] = None) -> None:
         self.lib:    Optional[ctypes.CDLL] = None
         self.handle: Optional[ctypes.c_void_p] = None
+        self.source: str = ""   # 最後に load_video したファイル
+        # 書き出し・インデックス作成中に (fraction, stage) で呼ばれる。Qt では Signal.emit を渡す
+        self.on_progress: Optional[Callable[[float, str], None]] = None
+        self._cancel = threading.Event()
+        self._native_callbacks: Tuple[Any, Any] = (None, None)   # GC されないよう保持
         self._path = lib_path or _find_lib()
         self._load()
 
@@ -59,14 +152,21 @@ class VideoEngine:
             print(f"⚠️  Engine library not found: {self._path}")
             return
         try:
-            if _SYS == "Darwin":
-                lib = ctypes.CDLL(self._path, mode=ctypes.RTLD_GLOBAL)
-            else:
-                lib = ctypes.CDLL(self._path)
-            self._setup_signatures(lib)
+            with _LIBS_LOCK:
+                lib = _LIBS.get(self._path)
+                first = lib is None
+                if lib is None:
+                    if _SYS == "Darwin":
+                        lib = ctypes.CDLL(self._path, mode=ctypes.RTLD_GLOBAL)
+                    else:
+                        lib = ctypes.CDLL(self._path)
+                    self._setup_signatures(lib)
+                    _LIBS[self._path] = lib
             self.lib    = lib
             self.handle = lib.vose_create()
-            print(f"✅  VideoEngine loaded: {self._path}")
+            self._install_callbacks()
+            if first:
+                print(f"✅  VideoEngine loaded: {self._path}")
         except Exception as exc:
             print(f"⚠️  Failed to load VideoEngine: {exc}")
             self.lib    = None
@@ -102,6 +202,13 @@ class VideoEngine:
         ]
         lib.vose_save_frame.restype  = ctypes.c_int
 
+        # get_frame: (handle, time, uint8*, width, height, stride) → int
+        lib.vose_get_frame.argtypes = [
+            ctypes.c_void_p, ctypes.c_double, ctypes.c_void_p,
+            ctypes.c_int, ctypes.c_int, ctypes.c_int,
+        ]
+        lib.vose_get_frame.restype = ctypes.c_int
+
         # waveform: (handle, float*, buf_size, chunks) → int
         lib.vose_waveform.argtypes = [
             ctypes.c_void_p,
@@ -111,6 +218,13 @@ class VideoEngine:
         ]
         lib.vose_waveform.restype = ctypes.c_int
 
+        # waveform_range: (handle, t0, t1, bins, float* mins, float* maxs, float* rms) → int
+        _fp = ctypes.POINTER(ctypes.c_float)
+        lib.vose_waveform_range.argtypes = [
+            ctypes.c_void_p, ctypes.c_double, ctypes.c_double, ctypes.c_int, _fp, _fp, _fp,
+        ]
+        lib.vose_waveform_range.restype = ctypes.c_int
+
         lib.vose_export_edl.argtypes = [
             ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p,
         ]
@@ -121,22 +235,73 @@ class VideoEngine:
         ]
         lib.vose_export_hw.restype = ctypes.c_int
 
+        lib.vose_export_smart.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int,
+            ctypes.POINTER(SmartCutReport),
+        ]
+        lib.vose_export_smart.restype = ctypes.c_int
+
+        lib.vose_export_with_subtitles.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+        ]
+        lib.vose_export_with_subtitles.restype = ctypes.c_int
+
+        lib.vose_concat_files.argtypes = [
+            ctypes.POINTER(ctypes.c_char_p), ctypes.c_int, ctypes.c_char_p,
+        ]
+        lib.vose_concat_files.restype = ctypes.c_int
+
+        lib.vose_set_callbacks.argtypes = [
+            ctypes.c_void_p, PROGRESS_FUNC, CANCEL_FUNC, ctypes.c_void_p,
+        ]
+        lib.vose_set_callbacks.restype = None
+
         lib.vose_build_keyframe_index.argtypes = [ctypes.c_void_p]
         lib.vose_build_keyframe_index.restype  = ctypes.c_int
 
+        lib.vose_frame_index_count.argtypes = [ctypes.c_void_p]
+        lib.vose_frame_index_count.restype  = ctypes.c_int
+        lib.vose_copy_frame_index.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        lib.vose_copy_frame_index.restype  = ctypes.c_int
+        lib.vose_set_frame_index.argtypes  = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        lib.vose_set_frame_index.restype   = ctypes.c_int
+        lib.vose_video_time_base.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+        ]
+        lib.vose_video_time_base.restype = ctypes.c_int
+
         lib.vose_nearest_keyframe.argtypes = [ctypes.c_void_p, ctypes.c_double]
         lib.vose_nearest_keyframe.restype  = ctypes.c_double
 
+    def _install_callbacks(self) -> None:
+        def progress(fraction: float, stage: Optional[bytes], _user: Any) -> None:
+            cb = self.on_progress
+            if cb is not None:
+                cb(fraction, stage.decode("utf-8", "replace") if stage else "")
+
+        def cancel(_user: Any) -> int:
+            return 1 if self._cancel.is_set() else 0
+
+        self._native_callbacks = (PROGRESS_FUNC(progress), CANCEL_FUNC(cancel))
+        self.lib.vose_set_callbacks(self.handle, *self._native_callbacks, None)  # type: ignore[union-attr]
+
     # ── 公開 API ───────────────────────────────────────────────────
 
     @property
     def available(self) -> bool:
         return self.lib is not None and self.handle is not None
 
+    @property
+    def lib_path(self) -> str:
+        return self._path
+
     def load_video(self, path: str) -> bool:
         if not self.available:
             return False
-        return self.lib.vose_load(self.handle, path.encode("utf-8")) == 1  # type: ignore[union-attr]
+        ok = self.lib.vose_load(self.handle, path.encode("utf-8")) == 1  # type: ignore[union-attr]
+        # 失敗時はネイティブ側で前のファイルも解放されている
+        self.source = path if ok else ""
+        return ok
 
     @property
     def duration(self) -> float:
@@ -175,6 +340,25 @@ class VideoEngine:
             ) == 1
         return False
 
+    def grab_frame(self, time_sec: float, width: int, height: int,
+                   buffer: Optional[FrameBuffer] = None) -> Optional[FrameBuffer]:
+        """
+        time_sec のフレームを width × height の RGB32 でメモリに直接デコードする
+        （ファイルを経由しない）。
+        buffer が同じサイズならそれに上書きして返す。失敗時は None。
+        """
+        if not self.available:
+            return None
+        if buffer is None or buffer.width != width or buffer.height != height:
+            buffer = FrameBuffer(width, height)
+        ok = self.lib.vose_get_frame(  # type: ignore[union-attr]
+            self.handle, time_sec, buffer.array.ctypes.data, width, height, buffer.stride,
+        ) == 1
+        if not ok:
+            return None
+        buffer.time_sec = time_sec
+        return buffer
+
     def extract_waveform(self, chunks: int = 512) -> List[float]:
         """peaks_max を chunks 個返す。失敗時は空リスト。"""
         if not self.available:
@@ -183,8 +367,27 @@ class VideoEngine:
         n = self.lib.vose_waveform(self.handle, buf, chunks, chunks)  # type: ignore[union-attr]
         return list(buf[:max(0, n)])
 
+    def waveform_range(self, t0: float, t1: float, bins: int,
+                       out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        [t0, t1) 秒を bins 個に分けた波形を (3, bins) の float32 配列で返す。
+        行は WAVE_MIN / WAVE_MAX / WAVE_RMS。ネイティブ側が配列へ直接書き込む。
+        音声の解析は最初の 1 回だけなので、ズームやスクロールのたびに表示範囲だけを頼んでよい。
+        out に同じ形の配列を渡すと使い回す。音声なし・失敗時は None。
+        """
+        if not self.available or bins <= 0 or t1 <= t0:
+            return None
+        if out is None or out.shape != (3, bins) or out.dtype != np.float32 \
+                or not out.flags["C_CONTIGUOUS"]:
+            out = np.empty((3, bins), dtype=np.float32)
+        fp = ctypes.POINTER(ctypes.c_float)
+        rows = [out[i].ctypes.data_as(fp) for i in (WAVE_MIN, WAVE_MAX, WAVE_RMS)]
+        n = self.lib.vose_waveform_range(self.handle, t0, t1, bins, *rows)  # type: ignore[union-attr]
+        return out if n == bins else None
+
     def export_edl(self, edl_json: str, out_path: str) -> bool:
         if self.available:
+            self._cancel.clear()
             return self.lib.vose_export_edl(  # type: ignore[union-attr]
                 self.handle,
                 edl_json.encode("utf-8"),
@@ -195,6 +398,7 @@ class VideoEngine:
     def export_hw(self, edl_json: str, out_path: str, quality: int = 23) -> bool:
         """Apple VideoToolbox (macOS) または libx264 でエンコードしてエクスポート。"""
         if self.available:
+            self._cancel.clear()
             return self.lib.vose_export_hw(  # type: ignore[union-attr]
                 self.handle,
                 edl_json.encode("utf-8"),
@@ -203,11 +407,155 @@ class VideoEngine:
             ) == 1
         return False
 
+    def export_smart(self, edl_json: str, out_path: str,
+                     quality: int = 23) -> Optional[Dict[str, float]]:
+        """
+        スマートカット書き出し。カット端の不完全な GOP だけ再エンコードし、残りはコピーする。
+        成功時はレポート（copied_sec / reencoded_sec / copied_share など）、失敗時は None。
+        """
+        if not self.available:
+            return None
+        report = SmartCutReport()
+        self._cancel.clear()
+        ok = self.lib.vose_export_smart(  # type: ignore[union-attr]
+            self.handle,
+            edl_json.encode("utf-8"),
+            out_path.encode("utf-8"),
+            quality,
+            ctypes.byref(report),
+        ) == 1
+        if not ok:
+            return None
+        stats: Dict[str, float] = {
+            name: getattr(report, name) for name, _ in SmartCutReport._fields_
+        }
+        total = report.copied_sec + report.reencoded_sec
+        stats["copied_share"] = report.copied_sec / total if total > 0 else 0.0
+        return stats
+
+    def export(self, edl_json: str, out_path: str, mode: str = "smart",
+               quality: int = 23) -> Optional[Dict[str, float]]:
+        """
+        EXPORT_MODES のいずれかで書き出す。成功時はレポート（smart 以外は尺のみ）、失敗時は None。
+        """
+        if mode == "smart":
+            return self.export_smart(edl_json, out_path, quality)
+        if mode == "copy":
+            ok = self.export_edl(edl_json, out_path)
+        elif mode == "reencode":
+            ok = self.export_hw(edl_json, out_path, quality)
+        else:
+            raise ValueError(f"unknown export mode: {mode!r} {EXPORT_MODES}")
+        if not ok:
+            return None
+        total = sum(e["out"] - e["in"] for e in json.loads(edl_json) if e.get("enabled", True))
+        copied = total if mode == "copy" else 0.0
+        return {"copied_sec": copied, "reencoded_sec": total - copied,
+                "copied_share": 1.0 if mode == "copy" else 0.0}
+
+    def export_with_subtitles(self, edl_json: str, subtitle_json_path: str, out_path: str) -> bool:
+        """VO-SE 字幕 JSON を焼き込んで再エンコード書き出しする。"""
+        if self.available:
+            self._cancel.clear()
+            return self.lib.vose_export_with_subtitles(  # type: ignore[union-attr]
+                self.handle,
+                edl_json.encode("utf-8"),
+                subtitle_json_path.encode("utf-8"),
+                out_path.encode("utf-8"),
+            ) == 1
+        return False
+
+    def concat_files(self, inputs: List[str], out_path: str) -> bool:
+        """同じ設定で書き出したファイル群をストリームコピーで結合する（再エンコードなし）。"""
+        if self.lib is None or not inputs:
+            return False
+        paths = (ctypes.c_char_p * len(inputs))(*[p.encode("utf-8") for p in inputs])
+        return self.lib.vose_concat_files(paths, len(inputs), out_path.encode("utf-8")) == 1
+
     def build_keyframe_index(self) -> int:
+        """
+        キーフレーム数を返す。cancel() で中断した場合は 0（索引は空のまま）。
+        中止フラグはここでは下ろさないので、呼ぶ前の cancel() も効く（下ろすのは reset_cancel）。
+        """
         if self.available:
             return int(self.lib.vose_build_keyframe_index(self.handle))  # type: ignore[union-attr]
         return 0
 
+    # ── 進捗・中止 ────────────────────────────────────────────────
+
+    def cancel(self) -> None:
+        """実行中の書き出し / インデックス作成を止める（その呼び出しは失敗として返る）"""
+        self._cancel.set()
+
+    def reset_cancel(self) -> None:
+        """cancel() のフラグを下ろす（EnginePool はハンドルを貸すたびに呼ぶ）"""
+        self._cancel.clear()
+
+    def iter_progress(self, method: Callable[..., Any], *args: Any,
+                      **kwargs: Any) -> Generator[EngineProgress, None, Any]:
+        """
+        method（self.export / self.build_keyframe_index など）を別スレッドで実行し、
+        進捗を EngineProgress として順に返す。
+        戻り値は StopIteration.value（yield from で受け取れる）。
+            for p in engine.iter_progress(engine.export, edl_json, out): print(p.fraction)
+        実行中は on_progress を一時的に差し替える。
+        """
+        events: queue.Queue[Optional[Tuple[float, str]]] = queue.Queue()
+        result: List[Any] = [None]
+
+        def run() -> None:
+            try:
+                result[0] = method(*args, **kwargs)
+            finally:
+                events.put(None)
+
+        previous = self.on_progress
+        self.on_progress = lambda f, stage: events.put((f, stage))
+        t0 = time.perf_counter()
+        worker = threading.Thread(target=run, name="vose-engine", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = events.get()
+                if item is None:
+                    break
+                elapsed = time.perf_counter() - t0
+                fraction, stage = item
+                yield EngineProgress(fraction, stage, elapsed,
+                                     fraction / elapsed if elapsed > 0 else 0.0)
+        finally:
+            # 途中で反復をやめた場合も、ネイティブ側を止めてから戻す
+            if worker.is_alive():
+                self._cancel.set()
+                worker.join()
+            self.on_progress = previous
+        return result[0]
+
+    def frame_index_table(self) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+        """
+        build_keyframe_index で作った全フレームの表（PTS 順、FRAME_INDEX_DTYPE）と
+        PTS の time_base (num, den)。表が無ければ None。
+        """
+        if not self.available:
+            return None
+        num, den = ctypes.c_int(), ctypes.c_int()
+        if self.lib.vose_video_time_base(self.handle, ctypes.byref(num), ctypes.byref(den)) != 1:  # type: ignore[union-attr]
+            return None
+        count = int(self.lib.vose_frame_index_count(self.handle))  # type: ignore[union-attr]
+        if count <= 0:
+            return None
+        entries = np.empty(count, dtype=FRAME_INDEX_DTYPE)
+        n = self.lib.vose_copy_frame_index(self.handle, entries.ctypes.data, count)  # type: ignore[union-attr]
+        return entries[:n], (num.value, den.value)
+
+    def set_frame_index(self, entries: np.ndarray) -> bool:
+        """保存済みの表を読み込む（ファイルを走査せずにキーフレーム索引ができる）"""
+        if not self.available or entries.size == 0:
+            return False
+        entries = np.ascontiguousarray(entries, dtype=FRAME_INDEX_DTYPE)
+        return self.lib.vose_set_frame_index(  # type: ignore[union-attr]
+            self.handle, entries.ctypes.data, int(entries.shape[0])) == 1
+
     def nearest_keyframe(self, time_sec: float) -> float:
         if self.available:
             return float(self.lib.vose_nearest_keyframe(self.handle, time_sec))  # type: ignore[union-attr]
@@ -223,7 +571,6 @@ class VideoEngine:
         px_per_sec を受け取ることでズーム連動に対応。
         内部座標が「秒」の場合は px_per_sec=1.0 を渡す。
         """
-        import json
         entries = [
             {
                 "in":      round(x / px_per_sec, 6),
@@ -235,10 +582,15 @@ class VideoEngine:
         ]
         return json.dumps(entries, ensure_ascii=False)
 
-    def __del__(self) -> None:
+    def close(self) -> None:
+        """ネイティブハンドルを破棄する（以後 available は False）"""
         if self.available:
             try:
                 self.lib.vose_destroy(self.handle)  # type: ignore[union-attr]
             except Exception:
                 pass
             self.handle = None
+            self.source = ""
+
+    def __del__(self) -> None:
+        self.close()
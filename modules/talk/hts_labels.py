@@ -0,0 +1,306 @@
+"""
+hts_labels.py
+VO-SE Cut Studio — HTS フルコンテキストラベル高速パーサ
+- parse_labels              : ラベル列 → NumPy 構造化配列（一括変換）
+- records_to_accent_phrases : 構造化配列 → AccentPhrase リスト（互換レイヤ）
+- phoneme_id / phoneme_name : 音素 ID テーブル
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+# ══════════════════════════════════════════════════════════════
+# 1. データクラス
+# ══════════════════════════════════════════════════════════════
+
+# Pyright の list[Unknown] エラーを防ぐための型付きファクトリ関数
+def _default_float_list() -> List[float]:
+    return []
+
+
+@dataclass
+class AccentPhrase:
+    """アクセント句の解析結果"""
+    text: str
+    mora_count: int
+    accent_position: int
+    f0_values: List[float] = field(default_factory=_default_float_list)
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. 音素 ID テーブル
+# ══════════════════════════════════════════════════════════════
+
+# pyopenjtalk (OpenJTalk) が出力する音素セット。未知の音素は実行時に追加登録する。
+PHONEMES: Tuple[str, ...] = (
+    "xx", "sil", "pau",
+    "a", "i", "u", "e", "o", "A", "I", "U", "E", "O", "N", "cl",
+    "k", "ky", "kw", "g", "gy", "gw", "s", "sh", "z", "j",
+    "t", "ts", "ty", "ch", "d", "dy", "n", "ny", "h", "hy", "f",
+    "b", "by", "p", "py", "m", "my", "r", "ry", "w", "y", "v",
+)
+
+_phoneme_names: List[str] = list(PHONEMES)
+_phoneme_index: Dict[str, int] = {p: i for i, p in enumerate(PHONEMES)}
+
+# テキスト・モーラとして数えない音素（xx はパース不能ラベル）。
+# PHONEMES の先頭に並べてあるので「ID < 件数」で判定できる。
+SILENCE_PHONEMES: Tuple[str, ...] = PHONEMES[:3]
+_N_SILENCE = len(SILENCE_PHONEMES)
+
+# ラベル上で "xx"（未定義）だった整数フィールドの値
+UNDEFINED: int = int(np.iinfo(np.int16).min)
+_UNDEFINED_STR = str(UNDEFINED)
+
+
+def phoneme_id(name: str) -> int:
+    """音素名から ID を返す。未登録の音素はテーブル末尾に追加する。"""
+    idx = _phoneme_index.get(name)
+    if idx is None:
+        idx = _phoneme_index.setdefault(name, len(_phoneme_names))
+        if idx == len(_phoneme_names):
+            _phoneme_names.append(name)
+    return idx
+
+
+def phoneme_name(idx: int) -> str:
+    """ID から音素名を返す"""
+    return _phoneme_names[idx]
+
+
+def phoneme_names() -> List[str]:
+    """現在の音素テーブル（ID 順）のコピーを返す"""
+    return list(_phoneme_names)
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. 構造化配列レイアウト
+# ══════════════════════════════════════════════════════════════
+
+LABEL_DTYPE = np.dtype([
+    ("phoneme_id",   np.int16),    # 音素 ID (p3)
+    ("accent_dist",  np.int16),    # A:a1 アクセント核からの相対位置
+    ("mora_pos",     np.int16),    # A:a2 アクセント句内モーラ位置（前から）
+    ("mora_pos_rev", np.int16),    # A:a3 アクセント句内モーラ位置（後ろから）
+    ("mora_count",   np.int16),    # F:f1 アクセント句のモーラ数
+    ("accent_type",  np.int16),    # F:f2 アクセント型（核の位置）
+    ("phrase_id",    np.int32),    # アクセント句の通し番号（0 起点）
+    ("start",        np.float64),  # 開始時刻 秒（時間情報なしは NaN）
+    ("end",          np.float64),  # 終了時刻 秒（時間情報なしは NaN）
+])
+
+# "start end p1^p2-p3+p4=p5/A:a1+a2+a3/B:.../E:.../F:f1_f2#..." を 1 ラベルずつ分解する
+# （一括スキャンで列数が揃わない不正な入力のためのフォールバック）
+_LABEL_RE = re.compile(
+    r"\s*(?:(\d+)\s+(\d+)\s+)?"
+    r"[^\^\s]*\^[^-]*-([^+]+)\+[^/]*"
+    r"(?:/A:([^/]*))?"
+    r"(?:/B:[^/]*)?(?:/C:[^/]*)?(?:/D:[^/]*)?"
+    r"((?:/E:[^/]*)?/F:([^_/]*_[^#/]*)[^/]*)?"
+)
+_UNPARSED: Tuple[str, ...] = ("xx", "xx", "xx", "xx+xx+xx", "", "xx_xx")
+
+# 一括スキャン用: 改行で連結したラベル全体に対してフィールドごとに findall する。
+# どのパターンもリテラルの接頭辞を持つため、正規表現エンジンの走査は線形に近い。
+_SCAN_TIME_RE = re.compile(r"\n\s*(\d+)\s+(\d+)\s")
+_SCAN_P3_RE   = re.compile(r"\^[^-\n]*-([^+\n]*)\+")
+_SCAN_A_RE    = re.compile(r"/A:([^/\n]*)")
+_SCAN_EF_RE   = re.compile(r"(/E:[^/\n]*/F:[^/\n]*)")
+_SCAN_F_RE    = re.compile(r"/F:([^_\n]*_[^#\n]*)")
+
+# 整数フィールドとして fromstring に渡せる文字だけで構成されているか
+_NON_INT_RE = re.compile(r"[^0-9+\-_]")
+
+# HTS ラベルの時刻単位 (100ns) → 秒
+_HTS_TIME_UNIT = 1e-7
+
+
+# ══════════════════════════════════════════════════════════════
+# 4. 一括パース
+# ══════════════════════════════════════════════════════════════
+
+class _LabelColumns:
+    """ラベル列から切り出した文字列フィールド（列指向）"""
+    __slots__ = ("p3", "a_fields", "phrase_keys", "f_fields", "starts", "ends")
+
+    def __init__(
+        self,
+        p3: Sequence[str],
+        a_fields: Sequence[str],
+        phrase_keys: Sequence[str],
+        f_fields: Sequence[str],
+        starts: Sequence[str] = (),
+        ends: Sequence[str] = (),
+    ) -> None:
+        self.p3          = p3
+        self.a_fields    = a_fields     # "a1+a2+a3"
+        self.phrase_keys = phrase_keys  # "/E:...../F:....." 句の同一性判定用
+        self.f_fields    = f_fields     # "f1_f2"
+        self.starts      = starts
+        self.ends        = ends
+
+
+def _scan_columns(labels: Sequence[str]) -> Optional[_LabelColumns]:
+    """全ラベルを 1 本の文字列として走査する。件数が合わなければ None。"""
+    n = len(labels)
+    text = "\n" + "\n".join(labels)
+
+    p3 = _SCAN_P3_RE.findall(text)
+    a_fields = _SCAN_A_RE.findall(text)
+    phrase_keys = _SCAN_EF_RE.findall(text)
+    f_fields = _SCAN_F_RE.findall(text)
+    if not (len(p3) == len(a_fields) == len(phrase_keys) == len(f_fields) == n):
+        return None
+
+    cols = _LabelColumns(p3, a_fields, phrase_keys, f_fields)
+
+    if _SCAN_TIME_RE.match(text):
+        times = _SCAN_TIME_RE.findall(text)
+        if len(times) != n:
+            return None
+        cols.starts, cols.ends = zip(*times)
+    return cols
+
+
+def _match_columns(labels: Sequence[str]) -> _LabelColumns:
+    """1 ラベルずつ正規表現で分解する（フォールバック）"""
+    match = _LABEL_RE.match
+    rows = [m.groups("xx") if m else _UNPARSED for m in map(match, labels)]
+    starts, ends, p3, a_fields, phrase_keys, f_fields = zip(*rows)
+    return _LabelColumns(p3, a_fields, phrase_keys, f_fields, starts, ends)
+
+
+def _int_fields(values: Sequence[str], sep: str, width: int) -> NDArray[np.int16]:
+    """
+    "1+2+3" 形式のフィールド列を (n, width) の int16 に一括変換する。
+    "xx" は UNDEFINED。区切りが崩れている場合は 1 値ずつ変換する。
+    """
+    n = len(values)
+    joined = sep.join(values).replace("xx", _UNDEFINED_STR)
+    out: Optional[NDArray[np.int16]] = None
+    if not _NON_INT_RE.search(joined):
+        out = np.fromstring(joined, dtype=np.int16, sep=sep)
+    if out is None or out.size != n * width:
+        out = np.array([
+            [_safe_int(v) for v in (f.split(sep) + ["xx"] * width)[:width]]
+            for f in values
+        ], dtype=np.int16)
+    return out.reshape(n, width)
+
+
+def _safe_int(value: str) -> int:
+    try:
+        return max(UNDEFINED, min(int(value), np.iinfo(np.int16).max))
+    except ValueError:
+        return UNDEFINED
+
+
+def _time_column(values: Sequence[str]) -> NDArray[np.float64]:
+    col = np.asarray(values)
+    missing = col == "xx"
+    out = np.where(missing, "0", col).astype(np.float64) * _HTS_TIME_UNIT
+    out[missing] = np.nan
+    return out
+
+
+def _phoneme_ids(p3: Sequence[str]) -> NDArray[np.int16]:
+    try:
+        return np.fromiter(map(_phoneme_index.__getitem__, p3), dtype=np.int16, count=len(p3))
+    except KeyError:
+        return np.fromiter(map(phoneme_id, p3), dtype=np.int16, count=len(p3))
+
+
+def parse_labels(labels: Sequence[str]) -> NDArray[np.void]:
+    """
+    HTS フルコンテキストラベル列を LABEL_DTYPE の構造化配列に変換する。
+    ラベルごとの split / find を行わず、連結文字列へのフィールド単位 findall と
+    列単位の NumPy 変換で処理する。パースできないラベルは音素 "xx" として残す。
+    """
+    n = len(labels)
+    records = np.zeros(n, dtype=LABEL_DTYPE)
+    if n == 0:
+        return records
+
+    cols = _scan_columns(labels) or _match_columns(labels)
+
+    records["phoneme_id"] = _phoneme_ids(cols.p3)
+
+    a = _int_fields(cols.a_fields, "+", 3)
+    records["accent_dist"]  = a[:, 0]
+    records["mora_pos"]     = a[:, 1]
+    records["mora_pos_rev"] = a[:, 2]
+
+    f = _int_fields(cols.f_fields, "_", 2)
+    records["mora_count"]  = f[:, 0]
+    records["accent_type"] = f[:, 1]
+
+    # E（直前のアクセント句）と F（現在のアクセント句）のどちらかが変われば句境界
+    keys = cols.phrase_keys
+    boundary = np.fromiter(map(str.__ne__, keys[1:], keys[:-1]), dtype=np.int32, count=n - 1)
+    np.cumsum(boundary, out=records["phrase_id"][1:])
+
+    if len(cols.starts) == n:
+        records["start"] = _time_column(cols.starts)
+        records["end"]   = _time_column(cols.ends)
+    else:
+        records["start"] = np.nan
+        records["end"]   = np.nan
+    return records
+
+
+def voiced_mask(records: NDArray[np.void]) -> NDArray[np.bool_]:
+    """sil / pau / 未解析ラベル以外を True とするマスク"""
+    return records["phoneme_id"] >= _N_SILENCE
+
+
+# ══════════════════════════════════════════════════════════════
+# 5. 互換レイヤ
+# ══════════════════════════════════════════════════════════════
+
+def records_to_accent_phrases(records: NDArray[np.void]) -> List[AccentPhrase]:
+    """
+    構造化配列から AccentPhrase リストを組み立てる。
+    text / mora_count は無音を除いた音素列、accent_position は F:f2（アクセント型）。
+    """
+    keep = voiced_mask(records)
+    ids = records["phoneme_id"][keep].tolist()
+    if not ids:
+        return []
+
+    accent = records["accent_type"][keep].astype(np.int32)
+    accent[accent == UNDEFINED] = 0
+    f0 = np.where(accent == 0, 130.0, 150.0 + accent * 5.0).tolist()
+    acc = accent.tolist()
+
+    bounds = (np.flatnonzero(np.diff(records["phrase_id"][keep])) + 1).tolist()
+    names = _phoneme_names
+    phrases: List[AccentPhrase] = []
+    for s, e in zip([0] + bounds, bounds + [len(ids)]):
+        phrases.append(AccentPhrase(
+            text="".join([names[i] for i in ids[s:e]]),
+            mora_count=e - s,
+            accent_position=acc[s],
+            f0_values=f0[s:e],
+        ))
+    return phrases
+
+
+__all__ = [
+    "AccentPhrase",
+    "LABEL_DTYPE",
+    "PHONEMES",
+    "SILENCE_PHONEMES",
+    "UNDEFINED",
+    "parse_labels",
+    "phoneme_id",
+    "phoneme_name",
+    "phoneme_names",
+    "records_to_accent_phrases",
+    "voiced_mask",
+]
@@ -0,0 +1,392 @@
+"""
+oto.py
+VO-SE Cut Studio — UTAU oto.ini ローダー
+- OtoEntry    : include/vose_core.h と同じレイアウトの ctypes 構造体
+- OTO_DTYPE   : OtoEntry 配列を NumPy 側から一括で組み立てるための同一レイアウト dtype
+- OtoTable    : oto.ini の列指向表現（エイリアス索引つき）
+- parse_oto   : oto.ini テキスト → OtoTable
+- load_oto    : 音源フォルダ（サブフォルダの oto.ini を含む）を読む。
+                内容ハッシュでバイナリキャッシュ
+- upload_oto  : set_oto_data に連続した OtoEntry 配列を 1 回で渡す
+- apply_oto   : TalkEventBatch のタイミング列をエイリアス検索で一括で埋める
+"""
+
+from __future__ import annotations
+
+import codecs
+import ctypes
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .talk_events import TalkEventBatch
+
+# ══════════════════════════════════════════════════════════════
+# 1. C++ 構造体バインディング
+# ══════════════════════════════════════════════════════════════
+
+class OtoEntry(ctypes.Structure):
+    """VO-SE C++ エンジン用構造体（include/vose_core.h の OtoEntry と同順）"""
+    _fields_ = [
+        ("filename",     ctypes.c_char_p),
+        ("cutoff",       ctypes.c_double),
+        ("alias",        ctypes.c_char * 64),
+        ("wav_path",     ctypes.c_char * 512),
+        ("offset",       ctypes.c_double),
+        ("consonant",    ctypes.c_double),
+        ("blank",        ctypes.c_double),
+        ("preutterance", ctypes.c_double),
+        ("overlap",      ctypes.c_double),
+    ]
+
+
+OTO_DTYPE = np.dtype({
+    "names":    [name for name, _ in OtoEntry._fields_],
+    "formats":  [np.uintp, np.float64, "S64", "S512",
+                 np.float64, np.float64, np.float64, np.float64, np.float64],
+    "offsets":  [getattr(OtoEntry, name).offset for name, _ in OtoEntry._fields_],
+    "itemsize": ctypes.sizeof(OtoEntry),
+})
+
+# oto.ini の数値列（ファイル上の順）
+OTO_FIELDS = ("offset", "consonant", "cutoff", "preutterance", "overlap")
+
+# OTO_FIELDS → TalkEventBatch のタイミング列
+BATCH_TIMING_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("offset",        "offset"),
+    ("consonant",     "consonant"),
+    ("cutoff",        "cutoff"),
+    ("pre_utterance", "preutterance"),
+    ("overlap",       "overlap"),
+)
+
+OTO_FILE_NAME: str = "oto.ini"
+
+# chardet に渡す先頭バイト数と、推定を cp932 より優先する確信度
+CHARDET_SAMPLE_BYTES:   int = 4096
+CHARDET_MIN_CONFIDENCE: float = 0.7
+
+# バイナリキャッシュの既定の置き場（エンジンの解析キャッシュと同じ cache/）
+DEFAULT_OTO_CACHE_DIR: str = "cache"
+OTO_CACHE_VERSION: int = 1
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. OtoTable
+# ══════════════════════════════════════════════════════════════
+
+class OtoTable:
+    """
+    oto.ini の列指向表現。数値は oto.ini に書かれた値（ms）のまま持つ。
+    エイリアスが空の行はファイル名（拡張子なし）をエイリアスにする。
+    同じエイリアスが複数あるときは UTAU と同じく先に現れた行を使う。
+    """
+
+    __slots__ = (
+        "root", "alias", "filename", "directory",
+        "offset", "consonant", "cutoff", "preutterance", "overlap",
+        "_keys", "_rows",
+    )
+
+    def __init__(
+        self,
+        alias: Sequence[str],
+        filename: Sequence[str],
+        directory: Sequence[str],
+        values: NDArray[np.float64],
+        root: str = "",
+    ) -> None:
+        n = len(alias)
+        self.root = root
+        self.alias: NDArray[np.str_] = np.asarray(alias, dtype=str).reshape(n)
+        self.filename: NDArray[np.str_] = np.asarray(filename, dtype=str).reshape(n)
+        self.directory: NDArray[np.str_] = np.asarray(directory, dtype=str).reshape(n)
+        values = np.asarray(values, dtype=np.float64).reshape(n, len(OTO_FIELDS))
+        self.offset       = np.ascontiguousarray(values[:, 0])
+        self.consonant    = np.ascontiguousarray(values[:, 1])
+        self.cutoff       = np.ascontiguousarray(values[:, 2])
+        self.preutterance = np.ascontiguousarray(values[:, 3])
+        self.overlap      = np.ascontiguousarray(values[:, 4])
+
+        # エイリアス索引：ソート済みの一意なエイリアスと、その最初の行番号
+        self._keys, self._rows = np.unique(self.alias, return_index=True)
+
+    def __len__(self) -> int:
+        return len(self.alias)
+
+    def __contains__(self, alias: object) -> bool:
+        return bool(self.lookup([str(alias)])[0] >= 0)
+
+    def values(self) -> NDArray[np.float64]:
+        """(行数, 5) の数値列（OTO_FIELDS の順）"""
+        return np.stack([getattr(self, f) for f in OTO_FIELDS], axis=1)
+
+    def lookup(self, aliases: Sequence[str]) -> NDArray[np.int64]:
+        """エイリアス列 → 行番号（無ければ -1）。二分探索で一括に引く"""
+        query = np.asarray(aliases, dtype=str).reshape(-1)
+        if len(self._keys) == 0 or len(query) == 0:
+            return np.full(len(query), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._keys, query), len(self._keys) - 1)
+        hit = self._keys[pos] == query
+        return np.where(hit, self._rows[pos], -1).astype(np.int64)
+
+    def timings(self, aliases: Sequence[str]) -> Dict[str, NDArray[np.float64]]:
+        """エイリアス列ぶんの OTO_FIELDS（見つからないエイリアスは 0.0）"""
+        rows = self.lookup(aliases)
+        found = rows >= 0
+        safe = np.where(found, rows, 0)
+        out: Dict[str, NDArray[np.float64]] = {}
+        for name in OTO_FIELDS:
+            column = getattr(self, name)
+            out[name] = np.where(found, column[safe], 0.0) if len(column) else np.zeros(len(rows))
+        return out
+
+    def wav_paths(self) -> NDArray[np.str_]:
+        """各行の WAV の絶対パス（root / directory / filename）"""
+        base = os.path.join(self.root, "")
+        prefix = np.where(
+            self.directory == "", base, np.char.add(np.char.add(base, self.directory), os.sep)
+        )
+        return np.char.add(prefix, self.filename)
+
+    def to_entries(self) -> NDArray[np.void]:
+        """
+        エイリアスごとに 1 件の OtoEntry 配列（OTO_DTYPE）を作る。
+        cutoff はエンジンの解釈（正 = 先頭からの位置、負 = 末尾からの距離）に直す：
+            oto.ini の cutoff > 0（右ブランク）→ -cutoff
+            oto.ini の cutoff = 0（末尾まで）  → -0.0（符号ビットで末尾からと判定される）
+            oto.ini の cutoff < 0（offset からの長さ）→ offset - cutoff
+        元の値は blank に入れる。filename は使わないので NULL。
+        """
+        rows = self._rows
+        entries = np.zeros(len(rows), dtype=OTO_DTYPE)
+        entries["alias"] = _fixed_bytes(self.alias[rows], 64)
+        entries["wav_path"] = _fixed_bytes(self.wav_paths()[rows], 512)
+        cutoff = self.cutoff[rows]
+        offset = self.offset[rows]
+        entries["cutoff"]       = np.where(cutoff < 0, offset - cutoff, -cutoff)
+        entries["blank"]        = cutoff
+        entries["offset"]       = offset
+        entries["consonant"]    = self.consonant[rows]
+        entries["preutterance"] = self.preutterance[rows]
+        entries["overlap"]      = self.overlap[rows]
+        return entries
+
+    @classmethod
+    def concat(cls, tables: Sequence[OtoTable], root: str = "") -> OtoTable:
+        if not tables:
+            return cls([], [], [], np.zeros((0, len(OTO_FIELDS))), root)
+        return cls(
+            np.concatenate([t.alias for t in tables]),
+            np.concatenate([t.filename for t in tables]),
+            np.concatenate([t.directory for t in tables]),
+            np.concatenate([t.values() for t in tables]),
+            root,
+        )
+
+
+def _fixed_bytes(values: NDArray[np.str_], width: int) -> NDArray[np.bytes_]:
+    """UTF-8 の固定長 char[width]。NUL 終端を残すため width - 1 バイトで文字境界に切る"""
+    encoded = [v.encode("utf-8") for v in values.tolist()]
+    for i, b in enumerate(encoded):
+        if len(b) >= width:
+            encoded[i] = b[:width - 1].decode("utf-8", "ignore").encode("utf-8")
+    return np.array(encoded, dtype=f"S{width}")
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. パース
+# ══════════════════════════════════════════════════════════════
+
+def decode_oto_bytes(raw: bytes) -> str:
+    """
+    oto.ini のバイト列を文字列にする。UTF-8（BOM 付き含む）で読めなければ chardet で推定する。
+    推定の確信度が低いとき（短い日本語の cp932 は他のコードページと誤判定されやすい）は
+    UTAU の既定である cp932 を先に試す。
+    """
+    if raw.startswith(codecs.BOM_UTF8):
+        return raw[len(codecs.BOM_UTF8):].decode("utf-8", "replace")
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    import chardet  # UTF-8 でないファイルだけで使う
+
+    result = chardet.detect(raw[:CHARDET_SAMPLE_BYTES])
+    guess = result.get("encoding")
+    confident = (result.get("confidence") or 0.0) >= CHARDET_MIN_CONFIDENCE
+    for encoding in ((guess, "cp932") if confident else ("cp932", guess)):
+        if not encoding:
+            continue
+        try:
+            return raw.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return raw.decode("cp932", "replace")
+
+
+def _number(text: str) -> float:
+    """oto.ini の数値欄。空欄は 0、数値でなければ NaN（その行は捨てる）"""
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan") if text.strip() else 0.0
+
+
+def parse_oto(text: str, directory: str = "", root: str = "") -> OtoTable:
+    """
+    oto.ini の本文をパースする。1 行は
+        ファイル名=エイリアス,左ブランク,固定範囲,右ブランク,先行発声,オーバーラップ
+    数値の欠け・空欄は 0。'=' の無い行と数値にならない行は読み飛ばす。
+    directory は root から見た oto.ini のフォルダ（ファイル名の解決に使う）。
+    """
+    aliases: List[str] = []
+    filenames: List[str] = []
+    numbers: List[str] = []
+    for line in text.splitlines():
+        name, sep, rest = line.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        fields = (rest + ",,,,,").split(",", 6)
+        aliases.append(fields[0])
+        filenames.append(name)
+        numbers += fields[1:6]
+
+    values = np.array([_number(x) for x in numbers], dtype=np.float64)
+    values = values.reshape(len(filenames), len(OTO_FIELDS))
+    bad = np.isnan(values).any(axis=1)
+    if bad.any():
+        keep = np.flatnonzero(~bad).tolist()
+        aliases = [aliases[i] for i in keep]
+        filenames = [filenames[i] for i in keep]
+        values = values[keep]
+
+    alias = [a.strip() or os.path.splitext(f)[0] for a, f in zip(aliases, filenames)]
+    return OtoTable(alias, filenames, [directory] * len(filenames), values, root)
+
+
+# ══════════════════════════════════════════════════════════════
+# 4. 読み込み（バイナリキャッシュつき）
+# ══════════════════════════════════════════════════════════════
+
+def find_oto_files(root: str) -> List[str]:
+    """root 以下の oto.ini（大文字小文字を問わない）をパス順に返す"""
+    found: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in filenames:
+            if name.lower() == OTO_FILE_NAME:
+                found.append(os.path.join(dirpath, name))
+    return sorted(found)
+
+
+def _cache_key(root: str, files: Sequence[str], blobs: Sequence[bytes]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"oto-v{OTO_CACHE_VERSION}".encode())
+    for path, raw in zip(files, blobs):
+        h.update(os.path.relpath(path, root).replace(os.sep, "/").encode("utf-8"))
+        h.update(len(raw).to_bytes(8, "little"))
+        h.update(raw)
+    return h.hexdigest()
+
+
+def _load_cache(path: str, root: str) -> Optional[OtoTable]:
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return OtoTable(z["alias"], z["filename"], z["directory"], z["values"], root)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_cache(path: str, table: OtoTable) -> None:
+    tmp_path = path + ".tmp.npz"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            tmp_path,
+            alias=table.alias, filename=table.filename,
+            directory=table.directory, values=table.values(),
+        )
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  oto cache not saved: {e}")
+
+
+def load_oto(root: str, cache_dir: Optional[str] = DEFAULT_OTO_CACHE_DIR) -> Optional[OtoTable]:
+    """
+    音源フォルダの oto.ini を全部読んで 1 つの OtoTable にする（マルチピッチ音源の
+    サブフォルダも含む。エイリアスが重なったらパス順で先のものが優先）。
+    oto.ini 群の内容ハッシュをキーに cache_dir へ .npz を保存し、次回からはパースしない。
+    cache_dir=None でキャッシュしない。oto.ini が無ければ None。
+    """
+    root = os.path.abspath(root)
+    files = find_oto_files(root)
+    if not files:
+        print(f"⚠️  oto.ini not found: {root}")
+        return None
+    try:
+        blobs = []
+        for path in files:
+            with open(path, "rb") as f:
+                blobs.append(f.read())
+    except OSError as e:
+        print(f"❌ oto.ini Load Error: {e}")
+        return None
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, f"oto_{_cache_key(root, files, blobs)}.npz")
+        table = _load_cache(cache_path, root) if os.path.exists(cache_path) else None
+        if table is not None:
+            return table
+
+    tables = []
+    for path, raw in zip(files, blobs):
+        directory = os.path.relpath(os.path.dirname(path), root)
+        tables.append(parse_oto(decode_oto_bytes(raw), "" if directory == "." else directory, root))
+    table = OtoTable.concat(tables, root)
+    if cache_path is not None:
+        _save_cache(cache_path, table)
+    print(f"✅ oto.ini Loaded: {root} ({len(table)} aliases, {len(files)} files)")
+    return table
+
+
+# ══════════════════════════════════════════════════════════════
+# 5. エンジン・バッチへの反映
+# ══════════════════════════════════════════════════════════════
+
+def upload_oto(lib: Any, table: OtoTable) -> int:
+    """
+    set_oto_data に OtoEntry 配列を 1 回で渡す（エンジン側でコピーされるので
+    配列は呼び出し後に解放してよい）。渡した件数を返す。
+    """
+    entries = table.to_entries()
+    lib.set_oto_data(entries.ctypes.data_as(ctypes.POINTER(OtoEntry)), len(entries))
+    return len(entries)
+
+
+def apply_oto(batch: TalkEventBatch, table: OtoTable) -> TalkEventBatch:
+    """batch のタイミング列（offset, consonant, cutoff, pre_utterance, overlap）を埋める"""
+    values = table.timings(batch.phonemes)
+    for attr, field in BATCH_TIMING_FIELDS:
+        getattr(batch, attr)[:] = values[field]
+    return batch
+
+
+__all__ = [
+    "DEFAULT_OTO_CACHE_DIR",
+    "OTO_DTYPE",
+    "OTO_FIELDS",
+    "OtoEntry",
+    "OtoTable",
+    "apply_oto",
+    "decode_oto_bytes",
+    "find_oto_files",
+    "load_oto",
+    "parse_oto",
+    "upload_oto",
+]
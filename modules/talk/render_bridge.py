@@ -0,0 +1,864 @@
+"""
+render_bridge.py
+VO-SE Cut Studio — C++ レンダラー共通ブリッジ
+- NoteEvent          : include/vose_core.h と同じレイアウトの ctypes 構造体（VoseCacheStats も）
+- find_core_library  : libvo_se_cut の探索
+- load_core_library  : ライブラリのロード（プロセス内で 1 回だけ）
+- load_voice_bank    : .vbank の mmap（プロセス内で 1 回だけ）
+- RenderBridge       : TalkEventBatch → NoteEvent 配列（ゼロコピー）→ PCM バッファ
+                       （analyze_batch で任意音声の WORLD 一括解析、resynth_pool で録音の再合成も）
+- split_segments     : ポーズ・アクセント句境界での分割
+- stitch_segments    : 分割レンダー結果のクロスフェード結合
+- SegmentCache       : セグメント単位のレンダー結果キャッシュ（差分再レンダー）
+- write_wav(_async)  : PCM バッファの WAV 書き出し（任意・非同期可）
+- waveform_peaks     : PCM バッファからタイムライン用のピーク列を作る
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import hashlib
+import os
+import platform
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+from numpy.typing import NDArray
+
+from .oto import OtoEntry, OtoTable, load_oto, upload_oto
+from .resynth import ResynthPool, setup_resynth_signatures
+from .talk_events import TalkEventBatch
+from .voice_bank import VoiceBank, analysis_dir, find_voice_bank, open_voice_bank, resource_dirs
+from .world_analysis import Source, WorldFeatures, analyze_batch, setup_world_signatures
+
+_SYS = platform.system()
+_sf: Any = sf
+
+# ══════════════════════════════════════════════════════════════
+# 1. C++ 構造体バインディング
+# ══════════════════════════════════════════════════════════════
+
+class NoteEvent(ctypes.Structure):
+    """VO-SE C++ エンジン用構造体（include/vose_core.h の NoteEvent と同順）"""
+    _pack_ = 8
+    _fields_ = [
+        ("wav_path",      ctypes.c_char_p),
+        ("pitch_curve",   ctypes.POINTER(ctypes.c_double)),
+        ("pitch_length",  ctypes.c_int),
+        ("gender_curve",  ctypes.POINTER(ctypes.c_double)),
+        ("tension_curve", ctypes.POINTER(ctypes.c_double)),
+        ("breath_curve",  ctypes.POINTER(ctypes.c_double)),
+    ]
+
+
+class VoseCacheStats(ctypes.Structure):
+    """解析ディスクキャッシュの統計（include/vose_core.h の VoseCacheStats と同順）"""
+    _fields_ = [
+        ("hits",          ctypes.c_int64),
+        ("misses",        ctypes.c_int64),
+        ("memory_hits",   ctypes.c_int64),
+        ("evictions",     ctypes.c_int64),
+        ("bytes_read",    ctypes.c_int64),
+        ("bytes_written", ctypes.c_int64),
+        ("entries",       ctypes.c_int64),
+        ("total_bytes",   ctypes.c_int64),
+        ("budget_bytes",  ctypes.c_int64),
+        ("load_seconds",  ctypes.c_double),
+    ]
+
+
+# NoteEvent 配列を NumPy 側から一括で書き込むための同一レイアウト dtype
+NOTE_DTYPE = np.dtype({
+    "names":    [name for name, _ in NoteEvent._fields_],
+    "formats":  [np.uintp, np.uintp, np.int32, np.uintp, np.uintp, np.uintp],
+    "offsets":  [getattr(NoteEvent, name).offset for name, _ in NoteEvent._fields_],
+    "itemsize": ctypes.sizeof(NoteEvent),
+})
+
+_CURVE_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("pitch_curve",   "pitch"),
+    ("gender_curve",  "gender"),
+    ("tension_curve", "tension"),
+    ("breath_curve",  "breath"),
+)
+_DOUBLE_SIZE = np.dtype(np.float64).itemsize
+
+# execute_render の mode_flag
+MODE_PCM16:   int = 0
+MODE_FLOAT32: int = 1
+
+# vose_core.cpp の kFs / kCrossfadeSamples と同じ値
+SAMPLE_RATE:       int = 44100
+CROSSFADE_SAMPLES: int = int(SAMPLE_RATE * 0.030)
+
+# ポーズ音素（直前のセグメントの末尾に付けて分割する）
+PAUSE_PHONEMES = frozenset(("pau", "sil"))
+
+# これより短いセグメントは直前のセグメントに併合する
+MIN_SEGMENT_NOTES: int = 4
+
+# セグメントキャッシュの既定容量（float64 で約 3 分ぶん）
+DEFAULT_CACHE_BYTES: int = 64 * 1024 * 1024
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. ライブラリのロード
+# ══════════════════════════════════════════════════════════════
+
+_LIB_NAMES = {
+    "Darwin":  "libvo_se_cut.dylib",
+    "Windows": "libvo_se_cut.dll",
+    "Linux":   "libvo_se_cut.so",
+}
+
+_lib_cache: Dict[str, ctypes.CDLL] = {}
+_lib_lock = threading.Lock()
+
+
+def find_core_library() -> str:
+    """
+    OS 別に libvo_se_cut のパスを解決する。
+    検索順は voice_bank.resource_dirs（PyInstaller 展開先 → 実行ファイルと同じディレクトリ
+    → リポジトリ直下 bin/ → modules/gui/bin/）。
+    """
+    lib_name = _LIB_NAMES.get(_SYS, "libvo_se_cut.so")
+    dirs = resource_dirs()
+    for base in dirs:
+        path = os.path.join(base, lib_name)
+        if os.path.exists(path):
+            return path
+    repo_bin = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "bin"))
+    return os.path.join(repo_bin, lib_name)   # 存在しなくても返す（後でエラー表示）
+
+
+def _setup_signatures(lib: ctypes.CDLL) -> None:
+    lib.init_official_engine.argtypes = []
+    lib.init_official_engine.restype  = None
+
+    lib.load_embedded_resource.argtypes = [
+        ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_int16),
+        ctypes.c_int,
+    ]
+    lib.load_embedded_resource.restype = None
+
+    lib.unload_embedded_resource.argtypes = [ctypes.c_char_p]
+    lib.unload_embedded_resource.restype  = None
+
+    lib.prebake_analysis.argtypes = [
+        ctypes.POINTER(ctypes.c_int16),
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+    ]
+    lib.prebake_analysis.restype = ctypes.c_int
+
+    lib.set_analysis_cache_dir.argtypes = [ctypes.c_char_p]
+    lib.set_analysis_cache_dir.restype  = None
+
+    lib.set_oto_data.argtypes = [ctypes.POINTER(OtoEntry), ctypes.c_int]
+    lib.set_oto_data.restype  = None
+
+    lib.set_engine_cache_dir.argtypes = [ctypes.c_char_p]
+    lib.set_engine_cache_dir.restype  = None
+    lib.set_engine_cache_limit.argtypes = [ctypes.c_int64]
+    lib.set_engine_cache_limit.restype  = None
+    lib.set_engine_cache_mmap.argtypes = [ctypes.c_int]
+    lib.set_engine_cache_mmap.restype  = None
+    lib.get_engine_cache_stats.argtypes = [ctypes.POINTER(VoseCacheStats)]
+    lib.get_engine_cache_stats.restype  = None
+    lib.reset_engine_cache_stats.argtypes = []
+    lib.reset_engine_cache_stats.restype  = None
+    lib.clear_engine_cache.argtypes = []
+    lib.clear_engine_cache.restype  = None
+
+    setup_world_signatures(lib)
+    setup_resynth_signatures(lib)
+
+    lib.execute_render.argtypes = [
+        ctypes.POINTER(NoteEvent),
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+    ]
+    lib.execute_render.restype = None
+
+    lib.query_render_length.argtypes = [ctypes.POINTER(NoteEvent), ctypes.c_int]
+    lib.query_render_length.restype  = ctypes.c_int64
+
+    lib.execute_render_to_buffer.argtypes = [
+        ctypes.POINTER(NoteEvent),
+        ctypes.c_int,
+        ctypes.POINTER(ctypes.c_double),
+        ctypes.c_int64,
+    ]
+    lib.execute_render_to_buffer.restype = ctypes.c_int64
+
+
+def load_core_library(lib_path: Optional[str] = None) -> Optional[ctypes.CDLL]:
+    """
+    libvo_se_cut をロードして初期化する。同じパスは 2 回目以降キャッシュを返す。
+    失敗時は None（例外は投げない）。
+    """
+    path = os.path.abspath(lib_path or find_core_library())
+    with _lib_lock:
+        lib = _lib_cache.get(path)
+        if lib is not None:
+            return lib
+        if not os.path.exists(path):
+            print(f"⚠️  VO-SE Engine not found: {path}")
+            return None
+        try:
+            if _SYS == "Darwin":
+                lib = ctypes.CDLL(path, mode=ctypes.RTLD_GLOBAL)
+            else:
+                lib = ctypes.CDLL(path)
+            _setup_signatures(lib)
+            lib.init_official_engine()
+        except Exception as e:
+            print(f"❌ Engine Load Error: {e}\n{traceback.format_exc()}")
+            return None
+        _lib_cache[path] = lib
+        print(f"✅ VO-SE Engine Initialized: {path}")
+        return lib
+
+
+_bank_cache: Dict[str, Optional[VoiceBank]] = {}
+
+
+def load_voice_bank(
+    bank_path: Optional[str] = None,
+    budget_bytes: Optional[int] = None,
+) -> Optional[VoiceBank]:
+    """
+    .vbank を mmap する。同じパスは 2 回目以降キャッシュを返す。
+    bank_path=None で既定の配置を探し、無ければ None（内蔵音源だけで動かす）。
+    budget_bytes を渡すとエンジンに常駐させる音源の上限を差し替える。
+    """
+    path = bank_path or find_voice_bank()
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _lib_lock:
+        if path not in _bank_cache:
+            _bank_cache[path] = open_voice_bank(path)
+        bank = _bank_cache[path]
+        if bank is not None and budget_bytes is not None:
+            bank.budget_bytes = budget_bytes
+        return bank
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. レンダーブリッジ
+# ══════════════════════════════════════════════════════════════
+
+NotesLike = TalkEventBatch | Sequence[Dict[str, Any]]
+
+
+class RenderBridge:
+    """
+    Python ↔ C++ レンダラーブリッジ。
+    カーブは TalkEventBatch の連続配列をそのまま指し、要素ごとのコピーは行わない。
+    NoteEvent 配列はスレッドごとにプールして次回のレンダーで再利用する。
+    cache_bytes > 0 ならセグメント単位のレンダー結果を保持し、編集されたセグメント
+    だけを再レンダーする（0 でキャッシュ無効）。
+    音源バンク（.vbank）があれば、レンダーに使う音素だけをその都度デコードして
+    エンジンに登録し、常駐量が bank_budget を超えたら古い音素から外す。
+    load_oto で oto.ini を登録すると、音素名と同じエイリアスのタイミングでレンダーする。
+    """
+
+    def __init__(
+        self,
+        lib_path: Optional[str] = None,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        bank_path: Optional[str] = None,
+        bank_budget: Optional[int] = None,
+    ) -> None:
+        self.lib: Optional[ctypes.CDLL] = load_core_library(lib_path)
+        self.voice_bank: Optional[VoiceBank] = (
+            load_voice_bank(bank_path, bank_budget) if self.lib is not None else None
+        )
+        if self.voice_bank is not None and self.lib is not None:
+            # pack_voice が焼いた解析キャッシュがあれば、初回レンダーでも WORLD 解析を省く
+            prebaked = analysis_dir(self.voice_bank.path)
+            if os.path.isdir(prebaked):
+                self.lib.set_analysis_cache_dir(os.fsencode(prebaked))
+        self.segment_cache: Optional[SegmentCache] = (
+            SegmentCache(cache_bytes) if cache_bytes > 0 else None
+        )
+        self.oto: Optional[OtoTable] = None
+        self._local = threading.local()
+        # 音素名 → NUL 終端バッファ（アドレスを NoteEvent.wav_path に入れる）
+        self._names: Dict[str, ctypes.Array[ctypes.c_char]] = {}
+        self._names_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.lib is not None
+
+    # ----------------------------------------------------------
+    # マーシャリング
+    # ----------------------------------------------------------
+
+    def _pool(self, n: int) -> NDArray[np.void]:
+        pool: Optional[NDArray[np.void]] = getattr(self._local, "pool", None)
+        if pool is None or len(pool) < n:
+            pool = np.zeros(max(n, 2 * len(pool) if pool is not None else n), dtype=NOTE_DTYPE)
+            self._local.pool = pool
+        return pool[:n]
+
+    def _name_address(self, name: str) -> int:
+        buf = self._names.get(name)
+        if buf is None:
+            with self._names_lock:
+                buf = self._names.setdefault(
+                    name, ctypes.create_string_buffer(name.encode("utf-8")))
+        return ctypes.addressof(buf)
+
+    def marshal(self, notes: NotesLike) -> Tuple[Any, int, TalkEventBatch]:
+        """
+        NoteEvent 配列を組み立てて (ポインタ, 件数, 参照を保持すべき batch) を返す。
+        返した batch が生きている間だけポインタは有効。
+        """
+        batch = notes if isinstance(notes, TalkEventBatch) else TalkEventBatch.from_dicts(notes)
+        n = len(batch)
+        if self.voice_bank is not None and self.lib is not None:
+            self.voice_bank.register(self.lib, batch.phonemes)
+        view = self._pool(n)
+        if n == 0:
+            return ctypes.cast(view.ctypes.data, ctypes.POINTER(NoteEvent)), 0, batch
+
+        starts = batch.offsets[:-1] * _DOUBLE_SIZE
+        for field, attr in _CURVE_FIELDS:
+            view[field] = getattr(batch, attr).ctypes.data + starts
+        view["pitch_length"] = batch.lengths
+        view["wav_path"] = [self._name_address(p) for p in batch.phonemes]
+
+        return view.ctypes.data_as(ctypes.POINTER(NoteEvent)), n, batch
+
+    # ----------------------------------------------------------
+    # レンダリング
+    # ----------------------------------------------------------
+
+    def _plan(
+        self,
+        batch: TalkEventBatch,
+        max_workers: Optional[int],
+        use_cache: bool,
+    ) -> Tuple[List[Segment], int, Optional[SegmentCache]]:
+        """
+        (分割セグメント, 同時にレンダーするスレッド数, 使うキャッシュ)。分割しない場合は
+        セグメントが空。キャッシュを使うときはワーカー数に関係なく常にセグメント単位で扱う
+        （max_workers=1 なら変更のあったセグメントを順にレンダーする）。
+        use_cache=False ではワーカーが 2 以上で 2 つ以上に分割できるときだけ分割する
+        （max_workers=1 と合わせると分割しない 1 回のレンダー）。
+        """
+        workers = max(1, max_workers or os.cpu_count() or 1)
+        cache = self.segment_cache if use_cache else None
+        if cache is None and workers <= 1:
+            return [], 1, None
+        segments = split_segments(batch)
+        if cache is None and len(segments) < 2:
+            return [], 1, None
+        segments = [(s, e, xf and self._overlaps(batch, s)) for s, e, xf in segments]
+        return segments, min(workers, len(segments)), cache
+
+    def _overlaps(self, batch: TalkEventBatch, i: int) -> bool:
+        """
+        エンジンがノート i - 1 と i を重ねるか。音源の無いノートの前後は重ねないので、
+        2 ノートをまとめた長さと別々の長さの差で判定する（合成はしない）。
+        """
+        pair = self._query(batch.slice(i - 1, i + 1))
+        return pair < self._query(batch.slice(i - 1, i)) + self._query(batch.slice(i, i + 1))
+
+    def voice_stats(self) -> Dict[str, float]:
+        """音源バンクの常駐キャッシュ統計（VoiceBank.stats）。バンクが無ければ空"""
+        return self.voice_bank.stats() if self.voice_bank is not None else {}
+
+    def load_oto(self, source: str | OtoTable) -> bool:
+        """
+        oto.ini（音源フォルダのパスか OtoTable）をエンジンに一括登録する。
+        以後のレンダーは音素名と同じエイリアスのタイミングを使う。
+        """
+        if self.lib is None:
+            return False
+        table = load_oto(source) if isinstance(source, str) else source
+        if table is None:
+            return False
+        upload_oto(self.lib, table)
+        self.oto = table
+        self.clear_render_cache()
+        return True
+
+    # ----------------------------------------------------------
+    # 解析ディスクキャッシュ（エンジン全体で共有）
+    # ----------------------------------------------------------
+
+    def configure_engine_cache(
+        self,
+        max_bytes: Optional[int] = None,
+        directory: Optional[str] = None,
+        use_mmap: Optional[bool] = None,
+    ) -> None:
+        """
+        WORLD 解析のディスクキャッシュを設定する（None の項目は変えない）。
+        max_bytes を超えると最終アクセスの古い .vsc から消す（0 で無制限）。
+        use_mmap=True でキャッシュファイルをコピーせずに mmap して使う。
+        """
+        if self.lib is None:
+            return
+        if directory is not None:
+            self.lib.set_engine_cache_dir(os.fsencode(directory))
+        if max_bytes is not None:
+            self.lib.set_engine_cache_limit(max_bytes)
+        if use_mmap is not None:
+            self.lib.set_engine_cache_mmap(int(use_mmap))
+
+    def engine_cache_stats(self) -> Dict[str, float]:
+        """解析キャッシュの統計（ヒット・ミス・追い出し件数、読み込み時間・バイト数、使用量）"""
+        if self.lib is None:
+            return {}
+        stats = VoseCacheStats()
+        self.lib.get_engine_cache_stats(ctypes.byref(stats))
+        return {name: getattr(stats, name) for name, _ in VoseCacheStats._fields_}
+
+    def reset_engine_cache_stats(self) -> None:
+        if self.lib is not None:
+            self.lib.reset_engine_cache_stats()
+
+    def clear_engine_cache(self) -> None:
+        """メモリ上の解析結果とディスクキャッシュを破棄する（事前解析は残る）"""
+        if self.lib is not None:
+            self.lib.clear_engine_cache()
+
+    # ----------------------------------------------------------
+    # 任意音声の WORLD 解析（ユーザー録音・取り込みクリップ）
+    # ----------------------------------------------------------
+
+    def analyze_batch(
+        self, sources: Sequence[Source], **kwargs: Any
+    ) -> List[Optional[WorldFeatures]]:
+        """world_analysis.analyze_batch をこのエンジンで実行する。ライブラリが無ければ全て None"""
+        if self.lib is None:
+            return [None] * len(sources)
+        return analyze_batch(self.lib, sources, **kwargs)
+
+    def resynth_pool(self, max_workers: Optional[int] = None) -> Optional[ResynthPool]:
+        """録音クリップ再合成用のワーカープール（resynth.ResynthPool）。ライブラリが無ければ None"""
+        return ResynthPool(self.lib, max_workers) if self.lib is not None else None
+
+    def clear_render_cache(self) -> None:
+        """セグメントキャッシュを破棄する（音源・oto を差し替えたときに呼ぶ）"""
+        if self.segment_cache is not None:
+            self.segment_cache.clear()
+
+    def _query(self, batch: TalkEventBatch) -> int:
+        if self.lib is None or len(batch) == 0:
+            return 0
+        c_notes, count, _batch = self.marshal(batch)
+        return max(0, int(self.lib.query_render_length(c_notes, count)))
+
+    def query_length(
+        self,
+        notes: NotesLike,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> int:
+        """
+        render_to_buffer が返すサンプル数（44.1 kHz モノラル）。合成は行わない。
+        呼び出し側でバッファを確保するときは max_workers / use_cache を render_to_buffer と揃える。
+        """
+        batch = notes if isinstance(notes, TalkEventBatch) else TalkEventBatch.from_dicts(notes)
+        segments, _, cache = self._plan(batch, max_workers, use_cache)
+        if not segments:
+            return self._query(batch)
+        lengths = []
+        for s, e, _ in segments:
+            hit = cache.get(segment_key(batch, s, e)) if cache is not None else None
+            lengths.append(len(hit) if hit is not None else self._query(batch.slice(s, e)))
+        return stitched_length(lengths, [xf for _, _, xf in segments])
+
+    def render_to_buffer(
+        self,
+        notes: NotesLike,
+        out: Optional[NDArray[np.float64]] = None,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> Optional[NDArray[np.float64]]:
+        """
+        C++ レンダラーの出力（-1.0〜1.0 の float64 モノラル PCM）をメモリに受け取る。
+        out を渡すとそこへ直接書き込み、先頭 query_length() 件のビューを返す。
+        ポーズ・句境界で 2 つ以上に分割できる場合はセグメントをスレッドプールで
+        並列にレンダーして結合する（ctypes 呼び出し中は GIL が解放される）。
+        キャッシュ済みのセグメントは再レンダーせず、変更のあったものだけを描き直す
+        （max_workers=1 でも同じ。max_workers は同時にレンダーするスレッド数だけを決める）。
+        use_cache=False, max_workers=1 で分割しない 1 回のレンダー呼び出しにする（基準の出力）。
+        失敗時は None。
+        """
+        if self.lib is None:
+            return None
+
+        batch = notes if isinstance(notes, TalkEventBatch) else TalkEventBatch.from_dicts(notes)
+        if len(batch) == 0:
+            return None
+
+        segments, workers, cache = self._plan(batch, max_workers, use_cache)
+        try:
+            with self._voices(batch):
+                if not segments:
+                    return self.render_into(batch, out)
+                return _SegmentRenderer(self, batch, cache).run(segments, workers, out)
+        except Exception as e:
+            print(f"❌ execute_render error: {e}\n{traceback.format_exc()}")
+            return None
+
+    def _voices(self, batch: TalkEventBatch) -> ContextManager[None]:
+        """レンダー中は batch の音素をエンジンに常駐させたまま固定する"""
+        if self.voice_bank is None or self.lib is None:
+            return contextlib.nullcontext()
+        return self.voice_bank.use(self.lib, batch.phonemes)
+
+    def render_into(
+        self,
+        batch: TalkEventBatch,
+        out: Optional[NDArray[np.float64]] = None,
+    ) -> Optional[NDArray[np.float64]]:
+        """分割せずに 1 回の execute_render_to_buffer でレンダーする"""
+        if self.lib is None:
+            return None
+        c_notes, count, _batch = self.marshal(batch)
+        n = int(self.lib.query_render_length(c_notes, count))
+        if n <= 0:
+            return None
+        buf = output_buffer(out, n)
+        if buf is None:
+            return None
+        self.lib.execute_render_to_buffer(
+            c_notes, count, buf.ctypes.data_as(ctypes.POINTER(ctypes.c_double)), n
+        )
+        return buf
+
+    def render(
+        self,
+        notes: NotesLike,
+        output_path: str,
+        mode_flag: int = MODE_PCM16,
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> bool:
+        """render_to_buffer の結果を WAV に書き出す（同期）"""
+        pcm = self.render_to_buffer(notes, max_workers=max_workers, use_cache=use_cache)
+        if pcm is None:
+            return False
+        return write_wav(output_path, pcm, SAMPLE_RATE, mode_flag)
+
+
+# ══════════════════════════════════════════════════════════════
+# 4. 分割レンダリング
+# ══════════════════════════════════════════════════════════════
+
+Segment = Tuple[int, int, bool]   # (開始, 終了, 直前セグメントとクロスフェードするか)
+
+
+def split_segments(batch: TalkEventBatch, min_notes: int = MIN_SEGMENT_NOTES) -> List[Segment]:
+    """
+    ポーズ・アクセント句の境界で音素列を分割する。
+    ポーズ音素は直前のセグメントの末尾に付ける。エンジンは隣り合うノートを
+    ポーズも含めてすべて 30 ms 重ねるので、どの境界も同じクロスフェードで結合する。
+    """
+    n = len(batch)
+    if n == 0:
+        return []
+
+    pause = np.fromiter((p in PAUSE_PHONEMES for p in batch.phonemes), dtype=bool, count=n)
+    phrase = batch.phrase_id
+    # i の直前で切る: i が有声で、直前がポーズか別の句
+    cut = np.zeros(n, dtype=bool)
+    cut[1:] = ~pause[1:] & (pause[:-1] | (phrase[1:] != phrase[:-1]))
+
+    segments: List[Segment] = []
+    start = 0
+    for i in np.flatnonzero(cut).tolist():
+        segments.append((start, i, False))
+        start = i
+    segments.append((start, n, False))
+
+    # 先頭以外は直前とクロスフェード、短すぎるセグメントは併合する
+    merged: List[Segment] = []
+    for s, e, _ in segments:
+        xfade = s > 0
+        if merged and (e - s < min_notes or merged[-1][1] - merged[-1][0] < min_notes):
+            ps, _, pxf = merged.pop()
+            merged.append((ps, e, pxf))
+        else:
+            merged.append((s, e, xfade))
+    return merged
+
+
+def stitched_length(lengths: Sequence[int], crossfade: Sequence[bool]) -> int:
+    """stitch_segments が返すサンプル数"""
+    pos = 0
+    for length, xf_flag in zip(lengths, crossfade):
+        pos += length - (min(CROSSFADE_SAMPLES, length, pos) if xf_flag else 0)
+    return pos
+
+
+def stitch_segments(
+    chunks: Sequence[NDArray[np.float64]],
+    crossfade: Sequence[bool],
+    out: Optional[NDArray[np.float64]] = None,
+) -> Optional[NDArray[np.float64]]:
+    """
+    セグメントのレンダー結果を結合する。crossfade[i] が True のチャンクは直前の末尾と
+    CROSSFADE_SAMPLES だけ重ね、vose_core の apply_crossfade と同じ raised-cosine で混ぜる。
+    out を渡すとそこへ書き込む（長さ不足なら None）。
+    """
+    buf = output_buffer(out, stitched_length([len(c) for c in chunks], crossfade))
+    if buf is None:
+        return None
+    pos = 0
+    for chunk, xf_flag in zip(chunks, crossfade):
+        xf = min(CROSSFADE_SAMPLES, len(chunk), pos) if xf_flag else 0
+        if xf:
+            fade_in = 0.5 * (1.0 - np.cos(np.pi * np.arange(xf) / xf))
+            head = buf[pos - xf:pos]
+            head *= 1.0 - fade_in
+            head += chunk[:xf] * fade_in
+        body = len(chunk) - xf
+        buf[pos:pos + body] = chunk[xf:]
+        pos += body
+    return buf
+
+
+class _SegmentRenderer:
+    """RenderBridge.render_to_buffer の分割パス（1 回のレンダーごとに作る）"""
+
+    def __init__(
+        self,
+        bridge: RenderBridge,
+        batch: TalkEventBatch,
+        cache: Optional[SegmentCache] = None,
+    ) -> None:
+        self.bridge = bridge
+        self.batch = batch
+        self.cache = cache
+
+    def render_one(self, start: int, end: int) -> Optional[NDArray[np.float64]]:
+        return self.bridge.render_into(self.batch.slice(start, end))
+
+    def run(
+        self,
+        segments: List[Segment],
+        max_workers: int,
+        out: Optional[NDArray[np.float64]] = None,
+    ) -> Optional[NDArray[np.float64]]:
+        cache = self.cache
+        keys: List[bytes] = []
+        chunks: List[Optional[NDArray[np.float64]]] = []
+        if cache is not None:
+            keys = [segment_key(self.batch, s, e) for s, e, _ in segments]
+            chunks = [cache.get(k) for k in keys]
+        else:
+            chunks = [None] * len(segments)
+
+        dirty = [i for i, c in enumerate(chunks) if c is None]
+        if len(dirty) == 1 or max_workers <= 1:
+            for i in dirty:
+                chunks[i] = self.render_one(segments[i][0], segments[i][1])
+        elif dirty:
+            workers = min(max_workers, len(dirty))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vose_render") as ex:
+                futures = {
+                    i: ex.submit(self.render_one, segments[i][0], segments[i][1]) for i in dirty
+                }
+                for i, f in futures.items():
+                    chunks[i] = f.result()
+
+        if any(c is None for c in chunks):
+            return None
+        if cache is not None:
+            for i in dirty:
+                cache.put(keys[i], chunks[i])  # type: ignore[arg-type]
+        return stitch_segments(
+            [c for c in chunks if c is not None], [xf for _, _, xf in segments], out
+        )
+
+
+# ══════════════════════════════════════════════════════════════
+# 5. セグメントキャッシュ
+# ══════════════════════════════════════════════════════════════
+
+def segment_key(batch: TalkEventBatch, start: int, end: int) -> bytes:
+    """
+    セグメント [start, end) のレンダー結果と、その両端の結合を決める入力のハッシュ。
+    エンジンに渡る音素名・カーブ長・4 本のカーブだけを対象にする
+    （タイミング列と phrase_id は NoteEvent に入らないので出力に影響しない）。
+    境界をまたぐクロスフェードは隣接ノートにも依存するので、直前・直後の 1 ノートも含める。
+    境界付近の編集では両側のセグメントが描き直しになる。
+    """
+    lo, hi = max(0, start - 1), min(len(batch), end + 1)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{start - lo}:{hi - end}\0".encode("ascii"))
+    h.update("\0".join(batch.phonemes[lo:hi]).encode("utf-8"))
+    h.update(np.diff(batch.offsets[lo:hi + 1]).tobytes())
+    s, e = int(batch.offsets[lo]), int(batch.offsets[hi])
+    for _, attr in _CURVE_FIELDS:
+        h.update(getattr(batch, attr)[s:e])
+    return h.digest()
+
+
+class SegmentCache:
+    """
+    segment_key → レンダー済み PCM の LRU キャッシュ（容量はバイト数で制限）。
+    保持する配列は読み取り専用にして共有する。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, NDArray[np.float64]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[NDArray[np.float64]]:
+        with self._lock:
+            chunk = self._entries.get(key)
+            if chunk is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return chunk
+
+    def put(self, key: bytes, chunk: NDArray[np.float64]) -> None:
+        if chunk.nbytes > self.max_bytes:
+            return
+        chunk.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = chunk
+            self.nbytes += chunk.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+# ══════════════════════════════════════════════════════════════
+# 6. PCM バッファ
+# ══════════════════════════════════════════════════════════════
+
+_writer: Optional[ThreadPoolExecutor] = None
+_writer_lock = threading.Lock()
+
+
+def output_buffer(out: Optional[NDArray[np.float64]], n: int) -> Optional[NDArray[np.float64]]:
+    """
+    長さ n の書き込み先を返す。out が None なら新規確保、
+    渡された場合は連続した float64 で n 件以上あることを確認して先頭 n 件のビューを返す。
+    """
+    if out is None:
+        return np.empty(n, dtype=np.float64)
+    if out.dtype != np.float64 or out.ndim != 1 or not out.flags.c_contiguous:
+        print("⚠️  output buffer must be a contiguous 1-D float64 array")
+        return None
+    if len(out) < n:
+        print(f"⚠️  output buffer too small: {len(out)} < {n}")
+        return None
+    return out[:n]
+
+
+def write_wav(
+    output_path: str,
+    pcm: NDArray[Any],
+    sample_rate: int = SAMPLE_RATE,
+    mode_flag: int = MODE_PCM16,
+) -> bool:
+    """PCM バッファを WAV に書き出す（MODE_FLOAT32 なら 32bit float）"""
+    try:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        subtype = "FLOAT" if mode_flag == MODE_FLOAT32 else "PCM_16"
+        _sf.write(output_path, pcm, sample_rate, subtype=subtype)
+        return True
+    except Exception as e:
+        print(f"❌ WAV write error: {output_path}: {e}")
+        return False
+
+
+def write_wav_async(
+    output_path: str,
+    pcm: NDArray[Any],
+    sample_rate: int = SAMPLE_RATE,
+    mode_flag: int = MODE_PCM16,
+) -> Future[bool]:
+    """
+    write_wav を専用のライタースレッドで実行する（書き出し順は呼び出し順）。
+    完了までは pcm を書き換えないこと。
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vose_wav_writer")
+        return _writer.submit(write_wav, output_path, pcm, sample_rate, mode_flag)
+
+
+def waveform_peaks(pcm: NDArray[Any], chunks: int = 512) -> List[float]:
+    """
+    VideoEngine.extract_waveform と同じ peaks_max を PCM バッファから直接求める。
+    整数 PCM はフルスケールで正規化する。
+    """
+    x = np.asarray(pcm)
+    if x.ndim > 1:
+        x = x.mean(axis=1)
+    peaks = np.zeros(chunks, dtype=np.float32)
+    total = len(x)
+    if total == 0 or chunks <= 0:
+        return peaks.tolist()
+
+    size = max(1, total // chunks)
+    used = min(chunks, total // size)
+    block = x[:used * size].reshape(used, size).max(axis=1)
+    if np.issubdtype(x.dtype, np.integer):
+        block = block / float(np.iinfo(x.dtype).max + 1)
+    peaks[:used] = np.maximum(block, 0.0)
+    return peaks.tolist()
+
+
+__all__ = [
+    "MODE_FLOAT32",
+    "MODE_PCM16",
+    "NOTE_DTYPE",
+    "NoteEvent",
+    "RenderBridge",
+    "SegmentCache",
+    "VoseCacheStats",
+    "find_core_library",
+    "load_core_library",
+    "load_voice_bank",
+    "output_buffer",
+    "segment_key",
+    "split_segments",
+    "stitch_segments",
+    "stitched_length",
+    "waveform_peaks",
+    "write_wav",
+    "write_wav_async",
+]
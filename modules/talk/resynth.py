@@ -0,0 +1,340 @@
+"""
+resynth.py
+VO-SE Cut Studio — 録音クリップのストリーミング WORLD 再合成（ピッチ・フォルマント編集）
+- VoseVoiceCurves     : include/vose_core.h と同じレイアウトの ctypes 構造体
+- VoiceEdit           : ピッチ（半音）・gender・tension・breath の編集内容
+                        （定数かクリップ全体のカーブ）
+- ResynthResult       : 出力パス・長さ・処理時間・実時間比（RTF）
+- resynthesize_file   : 重なりつきブロックで 解析 → 加工 → 合成 し、WAV へ逐次書き出す
+- ResynthPool         : ブロック処理と書き出しジョブを回すワーカープール
+- resynth_output_path : 元クリップの隣に重複しない出力パスを決める
+メモリに載るのは処理中のブロック（最大 max_workers 個）だけなので、長い録音でも一定量で済む。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from numpy.typing import NDArray
+
+_sf: Any = sf
+
+# ══════════════════════════════════════════════════════════════
+# 1. C++ 構造体バインディング
+# ══════════════════════════════════════════════════════════════
+
+class VoseVoiceCurves(ctypes.Structure):
+    """VO-SE C++ エンジン用構造体（include/vose_core.h の VoseVoiceCurves と同順）"""
+    _fields_ = [
+        ("pitch_shift", ctypes.POINTER(ctypes.c_double)),
+        ("gender",      ctypes.POINTER(ctypes.c_double)),
+        ("tension",     ctypes.POINTER(ctypes.c_double)),
+        ("breath",      ctypes.POINTER(ctypes.c_double)),
+        ("length",      ctypes.c_int),
+    ]
+
+
+def setup_resynth_signatures(lib: ctypes.CDLL) -> None:
+    """resynthesize_block のシグネチャを設定する（render_bridge._setup_signatures から呼ぶ）"""
+    lib.resynthesize_block.argtypes = [
+        ctypes.POINTER(ctypes.c_double),
+        ctypes.c_int64,
+        ctypes.c_int,
+        ctypes.POINTER(VoseVoiceCurves),
+        ctypes.POINTER(ctypes.c_double),
+    ]
+    lib.resynthesize_block.restype = ctypes.c_int
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. 編集内容
+# ══════════════════════════════════════════════════════════════
+
+BLOCK_SEC   = 4.0    # 1 ブロックの長さ
+OVERLAP_SEC = 0.05   # 隣のブロックとのクロスフェード長
+CONTEXT_SEC = 0.1    # 解析用に前後へ余分に読む長さ（出力では捨てる）
+CURVE_HOP   = 0.005  # ブロックへ渡すカーブの刻み（エンジンの kFramePeriod と同じ）
+PEAK_CHUNKS = 512    # 書き出しながら集めるタイムライン用ピーク数
+
+Curve = float | NDArray[np.float64] | List[float]
+
+# VoiceEdit の項目 → (VoseVoiceCurves のフィールド, 無変更の値)
+CURVE_FIELDS: Tuple[Tuple[str, float], ...] = (
+    ("pitch_shift", 0.0),
+    ("gender",      0.5),
+    ("tension",     0.5),
+    ("breath",      0.5),
+)
+
+
+@dataclass
+class VoiceEdit:
+    """
+    録音クリップへの編集。各項目は定数か、クリップ全体に等間隔で引き伸ばすカーブ。
+    pitch_shift は半音、gender / tension / breath は NoteEvent と同じ 0〜1（0.5 で無変更）。
+    """
+    pitch_shift: Curve = 0.0
+    gender:      Curve = 0.5
+    tension:     Curve = 0.5
+    breath:      Curve = 0.5
+
+    def is_identity(self) -> bool:
+        return all(np.allclose(getattr(self, name), neutral) for name, neutral in CURVE_FIELDS)
+
+    def sample(self, t0: float, t1: float, duration: float) -> Dict[str, NDArray[np.float64]]:
+        """クリップ内の [t0, t1) 秒を CURVE_HOP 刻みで切り出す（無変更の項目は含めない）"""
+        times = np.arange(t0, t1 + CURVE_HOP, CURVE_HOP)
+        out: Dict[str, NDArray[np.float64]] = {}
+        for name, neutral in CURVE_FIELDS:
+            curve = np.atleast_1d(np.asarray(getattr(self, name), dtype=np.float64))
+            if np.allclose(curve, neutral):
+                continue
+            if curve.size == 1:
+                out[name] = np.full(times.size, curve[0])
+            else:
+                grid = np.linspace(0.0, max(duration, 1e-9), curve.size)
+                out[name] = np.interp(times, grid, curve)
+        return out
+
+
+@dataclass
+class ResynthResult:
+    source:   str
+    output:   str
+    duration: float           # 秒（音声の長さ）
+    elapsed:  float           # 秒（処理時間）
+    blocks:   int
+    ok:       bool = True
+    channels: int = 1
+    peaks:    List[float] = field(default_factory=list)   # タイムライン用（waveform_peaks と同じ）
+
+    @property
+    def rtf(self) -> float:
+        """実時間比（処理時間 / 音声の長さ）。1 未満なら実時間より速い"""
+        return self.elapsed / self.duration if self.duration > 0 else 0.0
+
+
+def resynth_output_path(source: str, suffix: str = "_edit") -> str:
+    """元クリップと同じフォルダに <名前>_edit<n>.wav を作る（既存ファイルは上書きしない）"""
+    stem = os.path.splitext(source)[0]
+    n = 1
+    while os.path.exists(f"{stem}{suffix}{n}.wav"):
+        n += 1
+    return f"{stem}{suffix}{n}.wav"
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. ブロック処理
+# ══════════════════════════════════════════════════════════════
+
+def _ptr(a: Optional[NDArray[np.float64]]) -> Any:
+    if a is None:
+        return None
+    return a.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+
+
+def _block_plan(frames: int, block: int, overlap: int) -> List[Tuple[int, int]]:
+    """出力ブロック [start, end) の列。隣同士は overlap サンプル重なる"""
+    if frames <= block:
+        return [(0, frames)]
+    plan: List[Tuple[int, int]] = []
+    start = 0
+    while True:
+        end = min(start + block, frames)
+        plan.append((start, end))
+        if end >= frames:
+            return plan
+        start = end - overlap
+
+
+def _accumulate_peaks(
+    peaks: NDArray[np.float64], y: NDArray[np.float64], pos: int, total: int
+) -> None:
+    """
+    waveform_peaks と同じ区切り（total // チャンク数）で、
+    書き出し中のブロックのピークを足し込む
+    """
+    size = max(1, total // len(peaks))
+    end  = min(pos + len(y), min(len(peaks), total // size) * size)
+    if end <= pos:
+        return
+    first  = pos // size
+    starts = np.r_[0, np.arange((first + 1) * size - pos, end - pos, size)]
+    vals   = np.maximum.reduceat(y[:end - pos], starts)
+    k = np.arange(first, first + len(vals))
+    peaks[k] = np.maximum(peaks[k], vals)
+
+
+def _process_block(
+    lib: ctypes.CDLL,
+    x: NDArray[np.float64],
+    fs: int,
+    curves: Dict[str, NDArray[np.float64]],
+    trim: Tuple[int, int],
+) -> Optional[NDArray[np.float64]]:
+    """1 ブロック（チャンネルごと）を再合成し、解析用の前後余白を落として返す"""
+    out = np.empty_like(x)
+    c = VoseVoiceCurves()
+    c.length = min((a.size for a in curves.values()), default=0)
+    for name, arr in curves.items():
+        setattr(c, name, _ptr(arr))
+    for ch in range(x.shape[1]):
+        src = np.ascontiguousarray(x[:, ch])
+        dst = np.empty_like(src)
+        if lib.resynthesize_block(_ptr(src), src.size, fs, ctypes.byref(c), _ptr(dst)) != 0:
+            return None
+        out[:, ch] = dst
+    return out[trim[0]:trim[1]]
+
+
+def resynthesize_file(
+    lib: ctypes.CDLL,
+    source: str,
+    edit: VoiceEdit,
+    output: Optional[str] = None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    max_in_flight: int = 2,
+    block_sec: float = BLOCK_SEC,
+    overlap_sec: float = OVERLAP_SEC,
+    progress: Optional[Callable[[float], None]] = None,
+) -> ResynthResult:
+    """
+    source を block_sec ごとに読み、executor 上で最大 max_in_flight ブロックを並列に再合成して
+    output（既定は resynth_output_path）へ順に書き出す。
+    ブロック境界は overlap_sec でクロスフェードする。
+    """
+    output = output or resynth_output_path(source)
+    t_begin = time.perf_counter()
+    try:
+        src = _sf.SoundFile(source)
+    except Exception as e:
+        print(f"❌ Resynth source open failed: {source} ({e})")
+        return ResynthResult(source, output, 0.0, 0.0, 0, ok=False)
+
+    with src:
+        fs, total, channels = src.samplerate, src.frames, src.channels
+        block   = max(1, int(block_sec * fs))
+        overlap = min(int(overlap_sec * fs), block // 2)
+        context = int(CONTEXT_SEC * fs)
+        plan    = _block_plan(total, block, overlap)
+        duration = total / float(fs) if fs else 0.0
+        fade_in  = 0.5 - 0.5 * np.cos(np.pi * (np.arange(overlap) + 0.5) / max(overlap, 1))
+
+        own_pool = executor is None
+        pool = executor or ThreadPoolExecutor(max_workers=max(1, max_in_flight))
+        pending: Deque[Future[Optional[NDArray[np.float64]]]] = deque()
+        tail: Optional[NDArray[np.float64]] = None
+        peaks = np.full(PEAK_CHUNKS, -np.inf)
+        pos, ok = 0, True
+
+        def read(start: int, end: int) -> Future[Optional[NDArray[np.float64]]]:
+            lo, hi = max(0, start - context), min(total, end + context)
+            src.seek(lo)
+            x = src.read(hi - lo, dtype="float64", always_2d=True)
+            curves = edit.sample(lo / fs, hi / fs, duration)
+            return pool.submit(_process_block, lib, x, fs, curves, (start - lo, end - lo))
+
+        try:
+            with _sf.SoundFile(output, "w", samplerate=fs, channels=channels,
+                               subtype="PCM_16") as dst:
+                queued, written = 0, 0
+                while written < len(plan):
+                    while queued < len(plan) and len(pending) < max(1, max_in_flight):
+                        pending.append(read(*plan[queued]))
+                        queued += 1
+                    y = pending.popleft().result()
+                    written += 1
+                    if y is None:
+                        print(f"❌ Resynth failed: {source} (block {written})")
+                        ok = False
+                        break
+                    if tail is not None and overlap > 0:
+                        n = min(overlap, len(tail), len(y))
+                        y[:n] = tail[:n] * (1.0 - fade_in[:n, None]) + y[:n] * fade_in[:n, None]
+                    last = written == len(plan)
+                    keep = len(y) if last else max(0, len(y) - overlap)
+                    out = np.clip(y[:keep], -1.0, 1.0)
+                    dst.write(out)
+                    _accumulate_peaks(peaks, out.mean(axis=1), pos, total)
+                    pos += keep
+                    tail = None if last else y[keep:]
+                    if progress is not None:
+                        progress(written / len(plan))
+        except Exception as e:
+            print(f"❌ Resynth failed: {source} ({e})")
+            ok = False
+        finally:
+            for f in pending:
+                f.cancel()
+            if own_pool:
+                pool.shutdown(wait=True)
+
+    if not ok:
+        with contextlib.suppress(OSError):
+            os.remove(output)
+    result = ResynthResult(source, output, duration, time.perf_counter() - t_begin,
+                           len(plan), ok=ok, channels=channels,
+                           peaks=np.maximum(peaks, 0.0).tolist() if ok else [])
+    if ok:
+        print(f"✅ Resynth: {os.path.basename(output)}  {duration:.1f}s  RTF {result.rtf:.2f}")
+    return result
+
+
+# ══════════════════════════════════════════════════════════════
+# 4. ワーカープール
+# ══════════════════════════════════════════════════════════════
+
+class ResynthPool:
+    """
+    再合成ジョブ用のプール。ブロック処理（ネイティブ側で GIL を手放す）は max_workers 本の
+    スレッドで回し、ファイル単位のジョブは別の小さなプールで順番待ちさせる。
+    """
+
+    def __init__(self, lib: ctypes.CDLL, max_workers: Optional[int] = None,
+                 max_jobs: int = 2) -> None:
+        self.lib         = lib
+        self.max_workers = max_workers or max(1, os.cpu_count() or 1)
+        self._blocks = ThreadPoolExecutor(max_workers=self.max_workers,
+                                          thread_name_prefix="resynth-block")
+        self._jobs   = ThreadPoolExecutor(max_workers=max(1, max_jobs),
+                                          thread_name_prefix="resynth-job")
+
+    def run(self, source: str, edit: VoiceEdit, output: Optional[str] = None,
+            progress: Optional[Callable[[float], None]] = None) -> ResynthResult:
+        return resynthesize_file(self.lib, source, edit, output, executor=self._blocks,
+                                 max_in_flight=self.max_workers, progress=progress)
+
+    def submit(self, source: str, edit: VoiceEdit, output: Optional[str] = None,
+               progress: Optional[Callable[[float], None]] = None) -> Future[ResynthResult]:
+        """
+        バックグラウンドで run する。完了は Future で受け取る
+        （コールバックはワーカースレッドで呼ばれる）
+        """
+        return self._jobs.submit(self.run, source, edit, output, progress)
+
+    def shutdown(self) -> None:
+        self._jobs.shutdown(wait=True)
+        self._blocks.shutdown(wait=True)
+
+
+__all__ = [
+    "BLOCK_SEC",
+    "CONTEXT_SEC",
+    "OVERLAP_SEC",
+    "ResynthPool",
+    "ResynthResult",
+    "VoiceEdit",
+    "VoseVoiceCurves",
+    "resynth_output_path",
+    "resynthesize_file",
+    "setup_resynth_signatures",
+]
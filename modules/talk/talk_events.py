@@ -0,0 +1,261 @@
+"""
+talk_events.py
+VO-SE Cut Studio — トークイベントのバッチ表現
+- TalkEventBatch     : 全音素ぶんのカーブを連続した float64 配列で保持する
+- build_talk_batch   : 音素列 + アクセント型からバッチを一括生成する
+- batch_from_records : hts_labels の構造化配列からバッチを生成する
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .hts_labels import UNDEFINED, phoneme_id, phoneme_names
+
+# ══════════════════════════════════════════════════════════════
+# 1. 定数
+# ══════════════════════════════════════════════════════════════
+
+# 1 音素あたりのカーブ長（旧 generate_accent_curve と同じ 50 フレーム）
+CURVE_FRAMES: int = 50
+
+DEFAULT_GENDER:  float = 0.5
+DEFAULT_TENSION: float = 0.5
+DEFAULT_BREATH:  float = 0.1
+
+# pitch を持たない旧 dict ノートに与えるカーブ
+DEFAULT_PITCH_CURVE = np.full(CURVE_FRAMES, 150.0)
+
+# ピッチを持つ（有声として扱う）音素
+VOICED_PHONEMES = frozenset(("a", "i", "u", "e", "o", "N", "m", "n", "r", "w", "y", "v"))
+
+# 旧 dict 形式のキー
+CURVE_KEYS = ("pitch", "gender", "tension", "breath")
+TIMING_KEYS = ("offset", "consonant", "cutoff", "pre_utterance", "overlap")
+
+
+def _voiced_lut(ids: NDArray[np.int16]) -> NDArray[np.bool_]:
+    """音素 ID → 有声フラグ（未登録 ID にも追従する）"""
+    size = int(ids.max()) + 1 if len(ids) else 0
+    voiced_ids = [phoneme_id(p) for p in VOICED_PHONEMES]
+    lut = np.zeros(max(size, max(voiced_ids) + 1), dtype=bool)
+    lut[voiced_ids] = True
+    return lut[ids]
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. TalkEventBatch
+# ══════════════════════════════════════════════════════════════
+
+class TalkEventBatch:
+    """
+    トークイベント列の列指向表現。
+    i 番目の音素のカーブは curve[offsets[i]:offsets[i + 1]] に入っている。
+    batch[i] は旧来の dict 形式（カーブは配列のビュー）、
+    as_dicts() は旧来と同じ list の dict を返す。
+    """
+
+    __slots__ = (
+        "phonemes", "offsets", "phrase_id",
+        "pitch", "gender", "tension", "breath",
+        "offset", "consonant", "cutoff", "pre_utterance", "overlap",
+    )
+
+    def __init__(
+        self,
+        phonemes: Sequence[str],
+        offsets: NDArray[np.int64],
+        pitch: NDArray[np.float64],
+        gender: NDArray[np.float64],
+        tension: NDArray[np.float64],
+        breath: NDArray[np.float64],
+        timings: Optional[Dict[str, NDArray[np.float64]]] = None,
+        phrase_id: Optional[NDArray[np.int32]] = None,
+    ) -> None:
+        n = len(phonemes)
+        self.phonemes: List[str] = list(phonemes)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        if len(self.offsets) != n + 1:
+            raise ValueError("offsets must have len(phonemes) + 1 entries")
+
+        total = int(self.offsets[-1])
+        self.pitch   = self._curve(pitch, total)
+        self.gender  = self._curve(gender, total)
+        self.tension = self._curve(tension, total)
+        self.breath  = self._curve(breath, total)
+
+        timings = timings or {}
+        self.offset        = self._column(timings.get("offset"), n)
+        self.consonant     = self._column(timings.get("consonant"), n)
+        self.cutoff        = self._column(timings.get("cutoff"), n)
+        self.pre_utterance = self._column(timings.get("pre_utterance"), n)
+        self.overlap       = self._column(timings.get("overlap"), n)
+
+        # アクセント句の通し番号（句・ポーズ境界での分割レンダリングに使う）
+        if phrase_id is None:
+            self.phrase_id = np.zeros(n, dtype=np.int32)
+        else:
+            self.phrase_id = np.ascontiguousarray(phrase_id, dtype=np.int32).reshape(n)
+
+    @staticmethod
+    def _curve(values: NDArray[np.float64], total: int) -> NDArray[np.float64]:
+        arr = np.ascontiguousarray(values, dtype=np.float64)
+        if arr.shape != (total,):
+            raise ValueError(f"curve length {arr.shape} != ({total},)")
+        return arr
+
+    @staticmethod
+    def _column(values: Optional[NDArray[np.float64]], n: int) -> NDArray[np.float64]:
+        if values is None:
+            return np.zeros(n, dtype=np.float64)
+        return np.ascontiguousarray(values, dtype=np.float64).reshape(n)
+
+    # ----------------------------------------------------------
+    # 旧 dict 互換
+    # ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.phonemes)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += len(self.phonemes)
+        s, e = int(self.offsets[i]), int(self.offsets[i + 1])
+        return {
+            "phoneme":       self.phonemes[i],
+            "pitch":         self.pitch[s:e],
+            "gender":        self.gender[s:e],
+            "tension":       self.tension[s:e],
+            "breath":        self.breath[s:e],
+            "offset":        float(self.offset[i]),
+            "consonant":     float(self.consonant[i]),
+            "cutoff":        float(self.cutoff[i]),
+            "pre_utterance": float(self.pre_utterance[i]),
+            "overlap":       float(self.overlap[i]),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(len(self.phonemes)))
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """旧 generate_talk_events と同じ形の dict リストを返す（カーブは list にコピーする）"""
+        notes = list(self)
+        for note in notes:
+            for key in ("pitch", "gender", "tension", "breath"):
+                note[key] = note[key].tolist()
+        return notes
+
+    def slice(self, start: int, end: int) -> TalkEventBatch:
+        """[start, end) の音素だけを持つバッチを返す（カーブ・列はビュー）"""
+        s, e = int(self.offsets[start]), int(self.offsets[end])
+        return TalkEventBatch(
+            self.phonemes[start:end],
+            self.offsets[start:end + 1] - s,
+            self.pitch[s:e],
+            self.gender[s:e],
+            self.tension[s:e],
+            self.breath[s:e],
+            {key: getattr(self, key)[start:end] for key in TIMING_KEYS},
+            self.phrase_id[start:end],
+        )
+
+    @property
+    def lengths(self) -> NDArray[np.int64]:
+        """音素ごとのカーブ長"""
+        return np.diff(self.offsets)
+
+    @classmethod
+    def from_dicts(cls, notes: Sequence[Dict[str, Any]]) -> TalkEventBatch:
+        """
+        旧 dict リストからバッチを作る。
+        pitch が無いノートは 150 Hz × CURVE_FRAMES、他のカーブは pitch の長さに
+        切り詰め / デフォルト値で埋めて揃える。
+        """
+        pitches = [
+            np.asarray(n.get("pitch", DEFAULT_PITCH_CURVE), dtype=np.float64).reshape(-1)
+            for n in notes
+        ]
+        lengths = np.array([len(p) for p in pitches], dtype=np.int64)
+        offsets = np.zeros(len(notes) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        def concat(key: str, default: float) -> NDArray[np.float64]:
+            out = np.full(int(offsets[-1]), default, dtype=np.float64)
+            for n, s, e in zip(notes, offsets[:-1].tolist(), offsets[1:].tolist()):
+                values = n.get(key)
+                if values is not None:
+                    arr = np.asarray(values, dtype=np.float64).reshape(-1)[:e - s]
+                    out[s:s + len(arr)] = arr
+            return out
+
+        timings = {
+            key: np.array([float(n.get(key, 0.0)) for n in notes], dtype=np.float64)
+            for key in TIMING_KEYS
+        }
+        return cls(
+            [str(n.get("phoneme", "a")) for n in notes],
+            offsets,
+            np.concatenate(pitches) if pitches else np.zeros(0, dtype=np.float64),
+            concat("gender", DEFAULT_GENDER),
+            concat("tension", DEFAULT_TENSION),
+            concat("breath", DEFAULT_BREATH),
+            timings,
+        )
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. 一括生成
+# ══════════════════════════════════════════════════════════════
+
+def build_talk_batch(
+    ids: NDArray[np.int16],
+    accent: NDArray[np.integer[Any]],
+    frames: int = CURVE_FRAMES,
+    phrase_id: Optional[NDArray[np.int32]] = None,
+) -> TalkEventBatch:
+    """
+    音素 ID 列とアクセント型から TalkEventBatch を生成する。
+    有声音素は 150 + 5 * accent Hz の平坦カーブ、無声音素は 0 Hz。
+    """
+    ids = np.asarray(ids, dtype=np.int16)
+    names = phoneme_names()
+    n = len(ids)
+    total = n * frames
+
+    base_f0 = np.where(_voiced_lut(ids), 150.0 + np.asarray(accent, dtype=np.float64) * 5.0, 0.0)
+    offsets = np.arange(0, total + 1, frames, dtype=np.int64)
+
+    return TalkEventBatch(
+        [names[i] for i in ids.tolist()],
+        offsets,
+        np.repeat(base_f0, frames),
+        np.full(total, DEFAULT_GENDER),
+        np.full(total, DEFAULT_TENSION),
+        np.full(total, DEFAULT_BREATH),
+        phrase_id=phrase_id,
+    )
+
+
+def batch_from_records(records: NDArray[np.void], frames: int = CURVE_FRAMES) -> TalkEventBatch:
+    """
+    hts_labels.parse_labels の結果から TalkEventBatch を生成する。
+    g2p と同じく文頭・文末の sil を除き、pau は残す。
+    """
+    pid = records["phoneme_id"]
+    keep = (pid != phoneme_id("sil")) & (pid != phoneme_id("xx"))
+    sel = records[keep]
+    accent = sel["accent_type"].astype(np.int32)
+    accent[accent == UNDEFINED] = 0
+    return build_talk_batch(sel["phoneme_id"], accent, frames, sel["phrase_id"])
+
+
+__all__ = [
+    "CURVE_FRAMES",
+    "TalkEventBatch",
+    "VOICED_PHONEMES",
+    "batch_from_records",
+    "build_talk_batch",
+]
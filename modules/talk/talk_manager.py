@@ -2,19 +2,16 @@
 talk_manager.py
 VO-SE Cut Studio — コアエンジン統合モジュール
 - IntonationAnalyzer : pyopenjtalk による音素・F0解析
-- generate_talk_events: トークイベント生成
-- NoteEvent           : C++ 構造体バインディング
-- VoseRendererBridge  : DLL/dylib ブリッジ
+- generate_talk_batch : トークイベント生成（TalkEventBatch）
+- generate_talk_events: トークイベント生成（旧 dict 形式）
+- VoseRendererBridge  : DLL/dylib ブリッジ（render_bridge.RenderBridge の旧名）
 - TalkManager         : 音声合成マネージャー
 """
 
 from __future__ import annotations
 
 import os
-import ctypes
-import platform
 import traceback
-from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple, cast, TYPE_CHECKING
 
 import numpy as np
@@ -23,32 +20,19 @@ import pyopenjtalk
 import soundfile as sf
 from PySide6.QtCore import QObject
 
+# AccentPhrase は hts_labels に移動（互換のためここから再公開）
+from .hts_labels import AccentPhrase, parse_labels, records_to_accent_phrases
+from .oto import OtoTable, apply_oto
+from .render_bridge import NoteEvent, RenderBridge
+from .talk_events import CURVE_FRAMES, VOICED_PHONEMES, TalkEventBatch, batch_from_records
+
 # --- Pyright 対策: 型情報を持たない外部ライブラリを Any にキャストして警告を抑制 ---
 _pyopenjtalk: Any = pyopenjtalk
 _sf: Any = sf
 
 
-
 # ══════════════════════════════════════════════════════════════
-# 1. データクラス
-# ══════════════════════════════════════════════════════════════
-
-# Pyright の list[Unknown] エラーを防ぐための型付きファクトリ関数
-def _default_float_list() -> List[float]:
-    return []
-
-
-@dataclass
-class AccentPhrase:
-    """アクセント句の解析結果"""
-    text: str
-    mora_count: int
-    accent_position: int
-    f0_values: List[float] = field(default_factory=_default_float_list)
-
-
-# ══════════════════════════════════════════════════════════════
-# 2. イントネーション解析
+# 1. イントネーション解析
 # ══════════════════════════════════════════════════════════════
 
 class IntonationAnalyzer:
@@ -107,6 +91,18 @@ class IntonationAnalyzer:
             print(f"[IntonationAnalyzer] accent parse error: {e}")
             return []
 
+    def analyze_to_label_records(self, text: str) -> NDArray[np.void]:
+        """
+        フルコンテキストラベルを hts_labels.LABEL_DTYPE の構造化配列で返す。
+        """
+        if not text:
+            return parse_labels([])
+        try:
+            return parse_labels(self._get_labels(text))
+        except Exception as e:
+            print(f"[IntonationAnalyzer] label parse error: {e}")
+            return parse_labels([])
+
     # ----------------------------------------------------------
     # 内部実装
     # ----------------------------------------------------------
@@ -124,61 +120,11 @@ class IntonationAnalyzer:
         """
         HTS フルコンテキストラベルからアクセント句・F0 を抽出する。
         """
-        phrases: List[AccentPhrase] = []
-        current_moras: List[Tuple[str, float]] = []
-        accent_pos: int = 0
-        prev_phrase_id: str = ""
-
-        for label in labels:
-            parts = label.split("-")
-            phoneme = parts[1] if len(parts) > 1 else "?"
-            phrase_id = self._extract_field(label, "/E:")
-
-            if phrase_id != prev_phrase_id and current_moras:
-                phrases.append(AccentPhrase(
-                    text="".join(m[0] for m in current_moras),
-                    mora_count=len(current_moras),
-                    accent_position=accent_pos,
-                    f0_values=[m[1] for m in current_moras],
-                ))
-                current_moras = []
-
-            try:
-                a_field = self._extract_field(label, "/A:")
-                accent_pos = int(a_field.split("_")[0]) if a_field else 0
-            except (ValueError, IndexError):
-                accent_pos = 0
-
-            f0 = 130.0 if accent_pos == 0 else 150.0 + accent_pos * 5.0
-
-            if phoneme not in ("sil", "pau", "?"):
-                current_moras.append((phoneme, f0))
-
-            prev_phrase_id = phrase_id
-
-        if current_moras:
-            phrases.append(AccentPhrase(
-                text="".join(m[0] for m in current_moras),
-                mora_count=len(current_moras),
-                accent_position=accent_pos,
-                f0_values=[m[1] for m in current_moras],
-            ))
-
-        return phrases
-
-    @staticmethod
-    def _extract_field(label: str, key: str) -> str:
-        """HTS ラベルから特定フィールドの値を抽出する"""
-        idx = label.find(key)
-        if idx == -1:
-            return ""
-        start = idx + len(key)
-        end = label.find("/", start)
-        return label[start:end] if end != -1 else label[start:]
+        return records_to_accent_phrases(parse_labels(labels))
 
 
 # ══════════════════════════════════════════════════════════════
-# 3. エンジン動的ロード（実行時のみ）
+# 2. エンジン動的ロード（実行時のみ）
 # ══════════════════════════════════════════════════════════════
 
 if not TYPE_CHECKING:
@@ -195,145 +141,52 @@ else:
 
 
 # ══════════════════════════════════════════════════════════════
-# 4. トークイベント生成
+# 3. トークイベント生成
 # ══════════════════════════════════════════════════════════════
 
 def generate_accent_curve(phoneme: str, accent_pos: int = 0) -> List[float]:
     """音素とアクセント位置からピッチカーブを生成する"""
     base_f0 = 150.0 + accent_pos * 5.0
-    voiced = phoneme in list("aeiou") + ["N", "m", "n", "r", "w", "y", "v"]
-    return [base_f0 if voiced else 0.0] * 50
+    voiced = phoneme in VOICED_PHONEMES
+    return [base_f0 if voiced else 0.0] * CURVE_FRAMES
+
+
+def generate_talk_batch(
+    text: str,
+    analyzer: IntonationAnalyzer,
+    oto: Optional[OtoTable] = None,
+) -> TalkEventBatch:
+    """
+    VO-SE エンジン用トークイベントを TalkEventBatch（連続配列）で生成する。
+    フロントエンドは 1 回だけ走らせ、音素とアクセント型を同じラベルから取る。
+    oto を渡すと offset / consonant / cutoff / pre_utterance / overlap を
+    音素名のエイリアスから一括で埋める（見つからない音素は 0.0）。
+    """
+    batch = batch_from_records(analyzer.analyze_to_label_records(text))
+    if oto is not None:
+        apply_oto(batch, oto)
+    return batch
 
 
 def generate_talk_events(
     text: str,
     analyzer: IntonationAnalyzer,
+    oto: Optional[OtoTable] = None,
 ) -> List[Dict[str, Any]]:
-    """VO-SE エンジン用トークイベントリストを生成する"""
-    phonemes: List[str] = analyzer.analyze_to_phonemes(text)
-    accent_phrases: List[AccentPhrase] = analyzer.analyze_to_accent_phrases(text)
-
-    accent_map: Dict[int, int] = {}
-    idx = 0
-    for phrase in accent_phrases:
-        for _ in range(phrase.mora_count):
-            accent_map[idx] = phrase.accent_position
-            idx += 1
-
-    talk_notes: List[Dict[str, Any]] = []
-    for i, phoneme in enumerate(phonemes):
-        accent_pos = accent_map.get(i, 0)
-        pitch_curve = generate_accent_curve(phoneme, accent_pos)
-        length = len(pitch_curve)
-
-        talk_notes.append({
-            "phoneme":       phoneme,
-            "pitch":         pitch_curve,
-            "gender":        [0.5] * length,
-            "tension":       [0.5] * length,
-            "breath":        [0.1] * length,
-            "offset":        0.0,
-            "consonant":     0.0,
-            "cutoff":        0.0,
-            "pre_utterance": 0.0,
-            "overlap":       0.0,
-        })
-
-    return talk_notes
+    """VO-SE エンジン用トークイベントリストを生成する（旧 dict 形式）"""
+    return generate_talk_batch(text, analyzer, oto).as_dicts()
 
 
 # ══════════════════════════════════════════════════════════════
-# 5. C++ 構造体バインディング
+# 4. C++ ブリッジ（render_bridge に統合済み）
 # ══════════════════════════════════════════════════════════════
 
-class NoteEvent(ctypes.Structure):
-    """VO-SE C++ エンジン用構造体"""
-    _fields_ = [
-        ("wav_path",           ctypes.c_char_p),
-        ("pitch_length",       ctypes.c_int),
-        ("pitch_curve",        ctypes.POINTER(ctypes.c_double)),
-        ("gender_curve",       ctypes.POINTER(ctypes.c_double)),
-        ("tension_curve",      ctypes.POINTER(ctypes.c_double)),
-        ("breath_curve",       ctypes.POINTER(ctypes.c_double)),
-        ("offset_ms",          ctypes.c_double),
-        ("consonant_ms",       ctypes.c_double),
-        ("cutoff_ms",          ctypes.c_double),
-        ("pre_utterance_ms",   ctypes.c_double),
-        ("overlap_ms",         ctypes.c_double),
-    ]
-
-
-class VoseRendererBridge:
-    """Python ↔ C++ DLL/dylib ブリッジ"""
-
-    def __init__(self, dll_path: str) -> None:
-        self.lib: Optional[ctypes.CDLL] = None
-        try:
-            if platform.system() == "Darwin":
-                self.lib = ctypes.CDLL(dll_path, mode=ctypes.RTLD_GLOBAL)
-            else:
-                self.lib = ctypes.CDLL(dll_path)
-
-            if self.lib:
-                self.lib.init_official_engine.argtypes = []
-                self.lib.init_official_engine.restype = None
-
-                self.lib.execute_render.argtypes = [
-                    ctypes.POINTER(NoteEvent),
-                    ctypes.c_int,
-                    ctypes.c_char_p,
-                ]
-                self.lib.execute_render.restype = None
-
-                self.lib.init_official_engine()
-                print(f"✅ VO-SE Engine Initialized: {dll_path}")
-
-        except Exception as e:
-            print(f"❌ Engine Load Error: {e}\n{traceback.format_exc()}")
-            self.lib = None
-
-    def render(self, notes_data: List[Dict[str, Any]], output_path: str) -> bool:
-        """NoteEvent 配列に変換して C++ レンダラーに渡す"""
-        if self.lib is None:
-            return False
-
-        note_count = len(notes_data)
-        if note_count == 0:
-            return False
-
-        NotesArray = NoteEvent * note_count
-        c_notes = NotesArray()
-        keep_alive: List[Any] = []
-
-        for i, data in enumerate(notes_data):
-            p_arr = (ctypes.c_double * len(data["pitch"]))(*data["pitch"])
-            g_arr = (ctypes.c_double * len(data["gender"]))(*data["gender"])
-            t_arr = (ctypes.c_double * len(data["tension"]))(*data["tension"])
-            b_arr = (ctypes.c_double * len(data["breath"]))(*data["breath"])
-            keep_alive.extend([p_arr, g_arr, t_arr, b_arr])
-
-            c_notes[i].wav_path         = cast(str, data["phoneme"]).encode("utf-8")
-            c_notes[i].pitch_length     = len(data["pitch"])
-            c_notes[i].pitch_curve      = p_arr
-            c_notes[i].gender_curve     = g_arr
-            c_notes[i].tension_curve    = t_arr
-            c_notes[i].breath_curve     = b_arr
-            c_notes[i].offset_ms        = float(data.get("offset", 0.0))
-            c_notes[i].consonant_ms     = float(data.get("consonant", 0.0))
-            c_notes[i].cutoff_ms        = float(data.get("cutoff", 0.0))
-            c_notes[i].pre_utterance_ms = float(data.get("pre_utterance", 0.0))
-            c_notes[i].overlap_ms       = float(data.get("overlap", 0.0))
-
-        try:
-            self.lib.execute_render(c_notes, note_count, output_path.encode("utf-8"))
-            return True
-        except Exception as e:
-            print(f"❌ execute_render error: {e}")
-            return False
+class VoseRendererBridge(RenderBridge):
+    """Python ↔ C++ DLL/dylib ブリッジ（旧 API 互換）"""
 
 
 # ══════════════════════════════════════════════════════════════
-# 6. 音声合成マネージャー
+# 5. 音声合成マネージャー
 # ══════════════════════════════════════════════════════════════
 
 class TalkManager(QObject):
@@ -357,14 +210,35 @@ class TalkManager(QObject):
         speed: float = 1.0,
     ) -> Tuple[bool, str]:
         """テキストを WAV に合成して保存する"""
-        if not text:
-            return False, "テキストが空です。"
+        pcm, sr, message = self.synthesize_to_buffer(text, speed)
+        if pcm is None:
+            return False, message
 
         try:
             output_dir = os.path.dirname(output_path)
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
 
+            _sf.write(output_path, pcm, sr)
+
+            return True, output_path
+
+        except Exception as e:
+            return False, str(e)
+
+    def synthesize_to_buffer(
+        self,
+        text: str,
+        speed: float = 1.0,
+    ) -> Tuple[Optional[NDArray[np.int16]], int, str]:
+        """
+        テキストを int16 モノラル PCM に合成してメモリで返す（ファイルは書かない）。
+        戻り値は (PCM, サンプルレート, メッセージ)。失敗時 PCM は None。
+        """
+        if not text:
+            return None, 0, "テキストが空です。"
+
+        try:
             x: Optional[NDArray[Any]] = None
             sr: int = 48000
             options: Dict[str, Any] = {"speed": float(speed)}
@@ -376,19 +250,17 @@ class TalkManager(QObject):
                 x, sr = self._tts_default(text, options)
 
             if x is None:
-                return False, "音声データの生成に失敗しました。"
+                return None, sr, "音声データの生成に失敗しました。"
 
             if len(x) == 0:
-                return False, "生成された音声が空です。"
+                return None, sr, "生成された音声が空です。"
 
             x_int16 = np.clip(np.asarray(x), -32768, 32767).astype(np.int16)
 
-            _sf.write(output_path, x_int16, sr)
-
-            return True, output_path
+            return x_int16, sr, ""
 
         except Exception as e:
-            return False, str(e)
+            return None, 0, str(e)
 
     def _tts_with_voice(
         self,
@@ -432,6 +304,8 @@ __all__ = [
     "NoteEvent",
     "VoseRendererBridge",
     "TalkManager",
+    "TalkEventBatch",
     "generate_accent_curve",
+    "generate_talk_batch",
     "generate_talk_events",
 ]
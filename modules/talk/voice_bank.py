@@ -0,0 +1,509 @@
+"""
+voice_bank.py
+VO-SE Cut Studio — バイナリ音源バンク（.vbank）
+- write_voice_bank : 音源列をヘッダ + インデックス + 64 バイト境界のブロブに書き出す
+- encode_samples   : 可逆圧縮（差分 + バイトプレーン分離 + deflate / FLAC）
+- VoiceBank        : .vbank を mmap で開き、使う音素だけを初回にデコードして登録する。
+                     エンジン側の常駐量は LRU で予算内に収める
+- find_voice_bank  : 既定の配置から .vbank を探す
+- analysis_dir     : バンク横の事前解析キャッシュ（.vsc）ディレクトリ
+
+ファイル構成（リトルエンディアン）:
+    [0]                 BANK_HEADER_DTYPE (64 バイト)
+    [index_offset]      BANK_ENTRY_DTYPE × entry_count
+    [strings_offset]    エントリ名（UTF-8 を連結、NUL 終端なし）
+    [entry.offset]      codec で符号化したモノラル 16bit PCM（各エントリ 64 バイト境界）
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import io
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import soundfile as sf
+from numpy.typing import NDArray
+
+_sf: Any = sf
+
+# ══════════════════════════════════════════════════════════════
+# 1. フォーマット定義
+# ══════════════════════════════════════════════════════════════
+
+BANK_MAGIC:   bytes = b"VOSEBNK1"
+BANK_VERSION: int = 2
+BANK_ALIGN:   int = 64
+
+DEFAULT_BANK_NAME: str = "voice_bank.vbank"
+
+# pack_voice が焼いた WORLD 解析キャッシュ（.vsc）を置くディレクトリの拡張子
+ANALYSIS_DIR_SUFFIX: str = ".analysis"
+
+# エントリの符号化方式
+CODEC_RAW:   int = 0      # int16 そのまま（mmap ビューをコピーせずに渡せる）
+CODEC_DELTA: int = 1      # 1 次差分 → 上位/下位バイト分離 → zlib
+CODEC_FLAC:  int = 2      # soundfile (libsndfile) の FLAC
+
+CODEC_NAMES: Dict[str, int] = {"raw": CODEC_RAW, "delta": CODEC_DELTA, "flac": CODEC_FLAC}
+
+# エンジンに常駐させる音源の既定予算（C++ 側の double 波形換算）
+DEFAULT_RESIDENT_BYTES: int = 256 * 1024 * 1024
+
+BANK_HEADER_DTYPE = np.dtype([
+    ("magic",          "S8"),
+    ("version",        "<u4"),
+    ("entry_count",    "<u4"),
+    ("index_offset",   "<u8"),
+    ("strings_offset", "<u8"),
+    ("strings_size",   "<u8"),
+    ("data_offset",    "<u8"),
+    ("file_size",      "<u8"),
+    ("reserved",       "<u8"),
+])
+
+BANK_ENTRY_DTYPE = np.dtype([
+    ("name_offset", "<u4"),    # strings 領域内のオフセット
+    ("name_len",    "<u4"),
+    ("offset",      "<u8"),    # ブロブのファイル先頭からのバイト位置（BANK_ALIGN の倍数）
+    ("nbytes",      "<u8"),    # ブロブのバイト数（符号化後）
+    ("samples",     "<u8"),    # デコード後のサンプル数
+    ("sample_rate", "<u4"),
+    ("channels",    "<u2"),    # 元ファイルのチャンネル数（格納はモノラル）
+    ("bits",        "<u2"),
+    ("peak",        "<f4"),    # |x| の最大値（-1.0〜1.0 換算）
+    ("rms",         "<f4"),
+    ("crc32",       "<u4"),    # デコード後サンプル列の CRC32
+    ("codec",       "<u2"),
+    ("reserved",    "<u2"),
+])
+
+_SAMPLE_DTYPE = np.dtype("<i2")
+
+
+def _align(n: int) -> int:
+    return (n + BANK_ALIGN - 1) // BANK_ALIGN * BANK_ALIGN
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. 符号化
+# ══════════════════════════════════════════════════════════════
+
+def sample_stats(data: NDArray[np.int16]) -> Tuple[float, float, int]:
+    """(peak, rms, crc32)。peak / rms は -1.0〜1.0 換算"""
+    if len(data) == 0:
+        return 0.0, 0.0, zlib.crc32(b"")
+    absmax = int(np.abs(data, dtype=np.int32).max())
+    rms = float(np.sqrt(np.mean(np.square(data, dtype=np.float64))))
+    return absmax / 32768.0, rms / 32768.0, zlib.crc32(np.ascontiguousarray(data))
+
+
+def encode_samples(data: NDArray[np.int16], codec: int, sample_rate: int = 44100) -> bytes:
+    """モノラル int16 を codec で可逆符号化する"""
+    data = np.ascontiguousarray(data, dtype=_SAMPLE_DTYPE)
+    if codec == CODEC_RAW:
+        return data.tobytes()
+    if codec == CODEC_DELTA:
+        # 差分は int16 の折り返し演算で取る（cumsum で同じく折り返して元に戻る）
+        delta = np.diff(data, prepend=np.int16(0))
+        planes = delta.view(np.uint8).reshape(-1, 2).T
+        return zlib.compress(planes.tobytes(), 6)
+    if codec == CODEC_FLAC:
+        buf = io.BytesIO()
+        _sf.write(buf, data, sample_rate, format="FLAC", subtype="PCM_16")
+        return buf.getvalue()
+    raise ValueError(f"unknown codec: {codec}")
+
+
+def decode_samples(blob: Any, codec: int, samples: int) -> NDArray[np.int16]:
+    """encode_samples の逆。CODEC_RAW は blob のビューを返す（コピーしない）"""
+    if samples == 0 and codec in (CODEC_RAW, CODEC_DELTA, CODEC_FLAC):
+        # 0 サンプルの FLAC はヘッダだけで libsndfile が読めないので、符号化に関係なく空を返す
+        return np.zeros(0, dtype=_SAMPLE_DTYPE)
+    if codec == CODEC_RAW:
+        return np.frombuffer(blob, dtype=_SAMPLE_DTYPE, count=samples)
+    if codec == CODEC_DELTA:
+        planes = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(2, samples)
+        delta = np.ascontiguousarray(planes.T).view(_SAMPLE_DTYPE).reshape(-1)
+        return np.cumsum(delta, dtype=_SAMPLE_DTYPE)
+    if codec == CODEC_FLAC:
+        data, _ = _sf.read(io.BytesIO(bytes(blob)), dtype="int16", always_2d=False)
+        return np.ascontiguousarray(data, dtype=_SAMPLE_DTYPE)[:samples]
+    raise ValueError(f"unknown codec: {codec}")
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. 書き出し
+# ══════════════════════════════════════════════════════════════
+
+@dataclass
+class BankSource:
+    """
+    バンクに入れる 1 エントリ。read() はモノラル int16 の sample_count 件を返す。
+    encoded を渡した場合は codec で符号化済みのブロブとしてそのまま書く
+    （再パック時に前回のバンクからデコードせずにコピーする用途。
+    peak / rms / crc32 も前回の値を渡す）。
+    """
+    name: str
+    sample_count: int
+    sample_rate: int
+    channels: int
+    read: Optional[Callable[[], NDArray[np.int16]]] = None
+    peak: Optional[float] = None
+    rms: Optional[float] = None
+    crc32: Optional[int] = None
+    codec: int = CODEC_RAW
+    encoded: Optional[Callable[[], bytes]] = None
+
+
+def write_voice_bank(
+    path: str,
+    sources: Sequence[BankSource],
+    codec: int = CODEC_RAW,
+) -> NDArray[np.void]:
+    """
+    sources を .vbank に書き出してインデックスを返す。codec は encoded を持たない
+    エントリの符号化方式。ブロブは 1 件ずつ読み込んで書くので、全音源を同時に保持しない。
+    read() の長さが sample_count と違うエントリは ValueError。
+    """
+    names = [s.name.encode("utf-8") for s in sources]
+    n = len(sources)
+
+    index = np.zeros(n, dtype=BANK_ENTRY_DTYPE)
+    index_offset = BANK_HEADER_DTYPE.itemsize
+    strings_offset = index_offset + index.nbytes
+    strings = b"".join(names)
+
+    name_lens = np.array([len(b) for b in names], dtype=np.int64)
+    index["name_len"] = name_lens
+    index["name_offset"] = np.concatenate(([0], np.cumsum(name_lens)[:-1])) if n else []
+    index["samples"] = [s.sample_count for s in sources]
+    index["sample_rate"] = [s.sample_rate for s in sources]
+    index["channels"] = [s.channels for s in sources]
+    index["bits"] = 16
+    data_offset = _align(strings_offset + len(strings))
+
+    header = np.zeros(1, dtype=BANK_HEADER_DTYPE)
+    header["magic"] = BANK_MAGIC
+    header["version"] = BANK_VERSION
+    header["entry_count"] = n
+    header["index_offset"] = index_offset
+    header["strings_offset"] = strings_offset
+    header["strings_size"] = len(strings)
+    header["data_offset"] = data_offset
+
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        header.tofile(f)         # ヘッダとインデックスはブロブを書いた後で上書きする
+        index.tofile(f)
+        f.write(strings)
+        pos = data_offset
+        for i, src in enumerate(sources):
+            if src.encoded is not None:
+                blob = src.encoded()
+                index["codec"][i] = src.codec
+                index["peak"][i] = src.peak or 0.0
+                index["rms"][i] = src.rms or 0.0
+                index["crc32"][i] = src.crc32 or 0
+            else:
+                if src.read is None:
+                    raise ValueError(f"{src.name}: no sample source")
+                data = np.ascontiguousarray(src.read(), dtype=_SAMPLE_DTYPE).reshape(-1)
+                if len(data) != src.sample_count:
+                    raise ValueError(
+                        f"{src.name}: expected {src.sample_count} samples, got {len(data)}"
+                    )
+                blob = encode_samples(data, codec, src.sample_rate)
+                peak, rms, crc = sample_stats(data)
+                index["codec"][i] = codec
+                index["peak"][i] = peak
+                index["rms"][i] = rms
+                index["crc32"][i] = crc
+            f.seek(pos)
+            f.write(blob)
+            index["offset"][i] = pos
+            index["nbytes"][i] = len(blob)
+            pos = _align(pos + len(blob))
+        f.truncate(pos)
+        header["file_size"] = pos
+        f.seek(0)
+        header.tofile(f)
+        index.tofile(f)
+    os.replace(tmp_path, path)
+    return index
+
+
+def read_bank_blob(path: str, offset: int, nbytes: int) -> bytes:
+    """バンクから 1 エントリぶんのブロブを mmap せずに読む（再パック時のコピー用）"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(nbytes)
+
+
+# ══════════════════════════════════════════════════════════════
+# 4. 読み込み（mmap + 遅延デコード + LRU 常駐）
+# ══════════════════════════════════════════════════════════════
+
+class VoiceBank:
+    """
+    .vbank を読み取り専用で mmap する。
+    register() / use() はレンダーに必要なエントリだけを初回にデコードして
+    load_embedded_resource し、エンジン側の常駐量が budget_bytes を超えたら
+    最も長く使われていないエントリから unload_embedded_resource で外す。
+    常駐量はエンジンが保持する double 波形（8 バイト / サンプル）で数える。
+    """
+
+    def __init__(self, path: str, budget_bytes: int = DEFAULT_RESIDENT_BYTES) -> None:
+        self.path = os.path.abspath(path)
+        self.budget_bytes = budget_bytes
+        mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if len(mm) < BANK_HEADER_DTYPE.itemsize:
+            raise ValueError(f"not a voice bank (too short): {path}")
+        header = mm[:BANK_HEADER_DTYPE.itemsize].view(BANK_HEADER_DTYPE)[0]
+        if bytes(header["magic"]) != BANK_MAGIC:
+            raise ValueError(f"not a voice bank (bad magic): {path}")
+        if int(header["version"]) != BANK_VERSION:
+            raise ValueError(
+                f"unsupported voice bank version {int(header['version'])} "
+                f"(re-run modules/tools/pack_voice.py): {path}"
+            )
+        if int(header["file_size"]) > len(mm):
+            raise ValueError(f"truncated voice bank: {path}")
+
+        n = int(header["entry_count"])
+        io_ = int(header["index_offset"])
+        so = int(header["strings_offset"])
+        self._mm = mm
+        index_end = io_ + n * BANK_ENTRY_DTYPE.itemsize
+        self.index: NDArray[np.void] = mm[io_:index_end].view(BANK_ENTRY_DTYPE)
+        strings = bytes(mm[so:so + int(header["strings_size"])])
+        name_offsets = self.index["name_offset"].tolist()
+        name_lens = self.index["name_len"].tolist()
+        self._names: List[str] = [
+            strings[o:o + ln].decode("utf-8") for o, ln in zip(name_offsets, name_lens)
+        ]
+        self._lookup: Dict[str, int] = {name: i for i, name in enumerate(self._names)}
+
+        # ライブラリハンドル → 常駐エントリ名（LRU 順）と常駐バイト数
+        self._resident: Dict[int, OrderedDict[str, int]] = {}
+        self._resident_bytes: Dict[int, int] = {}
+        self._pinned: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decode_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._lookup
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def info(self, name: str) -> NDArray[np.void]:
+        """エントリのメタデータ（BANK_ENTRY_DTYPE のレコード）"""
+        return self.index[self._lookup[name]]
+
+    def samples(self, name: str) -> NDArray[np.int16]:
+        """
+        エントリの int16 PCM。CODEC_RAW は mmap 上の読み取り専用ビュー（コピーしない）、
+        圧縮エントリは呼ぶたびにデコードする。
+        """
+        rec = self.index[self._lookup[name]]
+        start = int(rec["offset"])
+        blob = self._mm[start:start + int(rec["nbytes"])]
+        t0 = time.perf_counter()
+        data = decode_samples(blob, int(rec["codec"]), int(rec["samples"]))
+        if int(rec["codec"]) != CODEC_RAW:
+            self.decode_seconds += time.perf_counter() - t0
+        return data
+
+    def verify(self, name: str) -> bool:
+        """デコード結果の CRC32 を照合する"""
+        return zlib.crc32(self.samples(name)) == int(self.info(name)["crc32"])
+
+    def stats(self) -> Dict[str, float]:
+        """常駐キャッシュの統計（ヒット・ミス・追い出し件数、デコード時間、常駐量）"""
+        with self._lock:
+            return {
+                "hits":           self.hits,
+                "misses":         self.misses,
+                "evictions":      self.evictions,
+                "decode_seconds": self.decode_seconds,
+                "resident":       sum(len(r) for r in self._resident.values()),
+                "resident_bytes": sum(self._resident_bytes.values()),
+                "budget_bytes":   self.budget_bytes,
+            }
+
+    def register(self, lib: Any, names: Optional[Iterable[str]] = None) -> int:
+        """
+        names のうちバンクにあり、lib に常駐していないエントリをデコードして
+        load_embedded_resource で登録し、件数を返す。names=None で全件。
+        登録後に予算を超えていれば、names 以外の古いエントリから外す。
+        """
+        wanted = set(self._names if names is None else names)
+        with self._lock:
+            added = self._register(lib, wanted)
+            self._evict(lib, wanted)
+        return added
+
+    @contextlib.contextmanager
+    def use(self, lib: Any, names: Iterable[str]) -> Iterator[None]:
+        """
+        with 中は names を常駐させたまま固定する（並列レンダー中に
+        他スレッドの register で追い出されないようにする）。
+        """
+        wanted = {nm for nm in names if nm in self._lookup}
+        with self._lock:
+            self._register(lib, wanted)
+            for nm in wanted:
+                self._pinned[nm] = self._pinned.get(nm, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for nm in wanted:
+                    left = self._pinned.get(nm, 0) - 1
+                    if left > 0:
+                        self._pinned[nm] = left
+                    else:
+                        self._pinned.pop(nm, None)
+                self._evict(lib, set())
+
+    def _register(self, lib: Any, wanted: Set[str]) -> int:
+        key = int(getattr(lib, "_handle", id(lib)))
+        resident = self._resident.setdefault(key, OrderedDict())
+        added = 0
+        for nm in wanted:
+            if nm not in self._lookup:
+                continue
+            if nm in resident:
+                resident.move_to_end(nm)
+                self.hits += 1
+                continue
+            self.misses += 1
+            data = self.samples(nm)
+            lib.load_embedded_resource(
+                nm.encode("utf-8"),
+                data.ctypes.data_as(ctypes.POINTER(ctypes.c_int16)),
+                len(data),
+            )
+            cost = len(data) * 8
+            resident[nm] = cost
+            self._resident_bytes[key] = self._resident_bytes.get(key, 0) + cost
+            added += 1
+        return added
+
+    def _evict(self, lib: Any, keep: Set[str]) -> None:
+        key = int(getattr(lib, "_handle", id(lib)))
+        resident = self._resident.get(key)
+        if not resident or not hasattr(lib, "unload_embedded_resource"):
+            return
+        for nm in list(resident):
+            if self._resident_bytes.get(key, 0) <= self.budget_bytes:
+                break
+            if nm in keep or nm in self._pinned:
+                continue
+            lib.unload_embedded_resource(nm.encode("utf-8"))
+            self._resident_bytes[key] -= resident.pop(nm)
+            self.evictions += 1
+
+
+# ══════════════════════════════════════════════════════════════
+# 5. 探索
+# ══════════════════════════════════════════════════════════════
+
+def resource_dirs() -> List[str]:
+    """
+    libvo_se_cut や .vbank を探すディレクトリ（優先順）。
+    PyInstaller 展開先 → 実行ファイルと同じディレクトリ → リポジトリ直下 bin/
+    → modules/gui/bin/（旧配置）
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    repo_root = os.path.abspath(os.path.join(here, "..", ".."))
+    exe_dir = os.path.dirname(os.path.abspath(sys.argv[0])) if sys.argv and sys.argv[0] else here
+
+    dirs: List[str] = []
+    meipass = getattr(sys, "_MEIPASS", None)
+    if meipass:
+        dirs.append(os.path.join(meipass, "bin"))
+    dirs += [
+        os.path.join(exe_dir, "bin"),
+        exe_dir,
+        os.path.join(repo_root, "bin"),
+        os.path.join(repo_root, "modules", "gui", "bin"),
+    ]
+    return dirs
+
+
+def find_voice_bank(name: str = DEFAULT_BANK_NAME) -> Optional[str]:
+    for base in resource_dirs():
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def analysis_dir(bank_path: str) -> str:
+    """バンクと同じ場所に置く事前解析キャッシュのディレクトリ（voice_bank.analysis/）"""
+    return os.path.splitext(bank_path)[0] + ANALYSIS_DIR_SUFFIX
+
+
+def open_voice_bank(
+    path: Optional[str] = None,
+    budget_bytes: int = DEFAULT_RESIDENT_BYTES,
+) -> Optional[VoiceBank]:
+    """
+    .vbank を開く。path=None なら既定の配置を探し、見つからなければ None
+    （内蔵音源だけで動かす）。壊れたファイルはエラー表示して None。
+    """
+    path = path or find_voice_bank()
+    if not path:
+        return None
+    try:
+        bank = VoiceBank(path, budget_bytes)
+    except (OSError, ValueError) as e:
+        print(f"❌ Voice Bank Load Error: {e}")
+        return None
+    print(f"✅ Voice Bank Mapped: {path} ({len(bank)} entries)")
+    return bank
+
+
+__all__ = [
+    "ANALYSIS_DIR_SUFFIX",
+    "BANK_ENTRY_DTYPE",
+    "BANK_HEADER_DTYPE",
+    "BankSource",
+    "CODEC_DELTA",
+    "CODEC_FLAC",
+    "CODEC_NAMES",
+    "CODEC_RAW",
+    "DEFAULT_BANK_NAME",
+    "DEFAULT_RESIDENT_BYTES",
+    "VoiceBank",
+    "analysis_dir",
+    "decode_samples",
+    "encode_samples",
+    "find_voice_bank",
+    "open_voice_bank",
+    "read_bank_blob",
+    "resource_dirs",
+    "sample_stats",
+    "write_voice_bank",
+]
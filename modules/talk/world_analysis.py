@@ -0,0 +1,240 @@
+"""
+world_analysis.py
+VO-SE Cut Studio — ユーザー録音・取り込みクリップの WORLD 一括解析
+- VoseWorldOptions / VoseWorldJob : include/vose_core.h と同じレイアウトの ctypes 構造体
+- WorldFeatures   : 1 クリップ分の F0・スペクトル包絡・非周期性指標（NumPy 配列）
+- load_mono       : 音声ファイル → float64 モノラル波形
+- analyze_batch   : 複数のファイル / 配列をネイティブスレッドで並列解析する
+- analyze         : 1 クリップ版の薄いラッパー
+出力配列は Python 側で確保し、C++ がそこへ直接書き込む（戻り値のコピーはしない）。
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+from numpy.typing import NDArray
+
+_sf: Any = sf
+
+# ══════════════════════════════════════════════════════════════
+# 1. C++ 構造体バインディング
+# ══════════════════════════════════════════════════════════════
+
+F0_HARVEST = 0
+F0_DIO     = 1
+F0_METHODS = {"harvest": F0_HARVEST, "dio": F0_DIO}
+
+DEFAULT_FRAME_PERIOD = 5.0    # ms（エンジンの kFramePeriod と同じ）
+DEFAULT_F0_FLOOR     = 71.0   # Hz（WORLD の既定値）
+DEFAULT_F0_CEIL      = 800.0  # Hz
+
+
+class VoseWorldOptions(ctypes.Structure):
+    """VO-SE C++ エンジン用構造体（include/vose_core.h の VoseWorldOptions と同順）"""
+    _fields_ = [
+        ("frame_period", ctypes.c_double),
+        ("f0_floor",     ctypes.c_double),
+        ("f0_ceil",      ctypes.c_double),
+        ("f0_method",    ctypes.c_int),
+        ("num_threads",  ctypes.c_int),
+    ]
+
+
+class VoseWorldJob(ctypes.Structure):
+    """VO-SE C++ エンジン用構造体（include/vose_core.h の VoseWorldJob と同順）"""
+    _fields_ = [
+        ("x",            ctypes.POINTER(ctypes.c_double)),
+        ("length",       ctypes.c_int64),
+        ("fs",           ctypes.c_int),
+        ("frames",       ctypes.c_int),
+        ("time",         ctypes.POINTER(ctypes.c_double)),
+        ("f0",           ctypes.POINTER(ctypes.c_double)),
+        ("spectrogram",  ctypes.POINTER(ctypes.c_double)),
+        ("aperiodicity", ctypes.POINTER(ctypes.c_double)),
+        ("fft_size",     ctypes.c_int),
+        ("status",       ctypes.c_int),
+    ]
+
+
+def setup_world_signatures(lib: ctypes.CDLL) -> None:
+    """world_batch.cpp の関数シグネチャを設定する（render_bridge._setup_signatures から呼ぶ）"""
+    lib.world_analysis_frames.argtypes = [
+        ctypes.POINTER(VoseWorldOptions), ctypes.c_int, ctypes.c_int64,
+    ]
+    lib.world_analysis_frames.restype = ctypes.c_int
+    lib.world_analysis_fft_size.argtypes = [ctypes.POINTER(VoseWorldOptions), ctypes.c_int]
+    lib.world_analysis_fft_size.restype  = ctypes.c_int
+    lib.world_analyze_batch.argtypes = [
+        ctypes.POINTER(VoseWorldOptions), ctypes.POINTER(VoseWorldJob), ctypes.c_int,
+    ]
+    lib.world_analyze_batch.restype = ctypes.c_int
+
+
+# ══════════════════════════════════════════════════════════════
+# 2. 解析結果
+# ══════════════════════════════════════════════════════════════
+
+@dataclass
+class WorldFeatures:
+    """1 クリップ分の WORLD パラメータ。spectrogram / aperiodicity は (frames, fft_size // 2 + 1)"""
+    f0:           NDArray[np.float64]
+    time:         NDArray[np.float64]
+    spectrogram:  Optional[NDArray[np.float64]]
+    aperiodicity: Optional[NDArray[np.float64]]
+    sample_rate:  int
+    frame_period: float
+    source:       str = ""
+
+    @property
+    def frames(self) -> int:
+        return int(self.f0.shape[0])
+
+    @property
+    def fft_size(self) -> int:
+        return (self.spectrogram.shape[1] - 1) * 2 if self.spectrogram is not None else 0
+
+    @property
+    def voiced(self) -> NDArray[np.bool_]:
+        return self.f0 > 0.0
+
+
+Source = str | NDArray[Any] | Tuple[NDArray[Any], int]
+
+
+def load_mono(path: str) -> Optional[Tuple[NDArray[np.float64], int]]:
+    """音声ファイルを float64 モノラル（チャンネル平均）で読む。失敗時は None"""
+    try:
+        data, fs = _sf.read(path, dtype="float64", always_2d=True)
+    except Exception as e:
+        print(f"❌ Audio load failed: {path} ({e})")
+        return None
+    mono = data[:, 0] if data.shape[1] == 1 else data.mean(axis=1)
+    return np.ascontiguousarray(mono), int(fs)
+
+
+def _resolve(
+    source: Source, sample_rate: Optional[int]
+) -> Optional[Tuple[NDArray[np.float64], int, str]]:
+    if isinstance(source, (str, os.PathLike)):
+        loaded = load_mono(os.fspath(source))
+        return (loaded[0], loaded[1], os.fspath(source)) if loaded is not None else None
+    if isinstance(source, tuple):
+        x, fs = source
+    else:
+        x, fs = source, sample_rate
+    if fs is None:
+        print("⚠️ analyze_batch: NumPy 入力には sample_rate が必要です")
+        return None
+    x = np.asarray(x)
+    if x.ndim == 2:
+        x = x.mean(axis=1)
+    if np.issubdtype(x.dtype, np.integer):
+        x = x / float(np.iinfo(x.dtype).max)
+    return np.ascontiguousarray(x, dtype=np.float64), int(fs), ""
+
+
+def _ptr(a: Optional[NDArray[np.float64]]) -> Any:
+    if a is None:
+        return None
+    return a.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+
+
+# ══════════════════════════════════════════════════════════════
+# 3. 一括解析
+# ══════════════════════════════════════════════════════════════
+
+def analyze_batch(
+    lib: ctypes.CDLL,
+    sources: Sequence[Source],
+    sample_rate: Optional[int] = None,
+    method: str = "harvest",
+    frame_period: float = DEFAULT_FRAME_PERIOD,
+    f0_floor: float = DEFAULT_F0_FLOOR,
+    f0_ceil: float = DEFAULT_F0_CEIL,
+    spectral: bool = True,
+    num_threads: int = 0,
+) -> List[Optional[WorldFeatures]]:
+    """
+    ファイルパス・NumPy 配列・(配列, サンプルレート) の列をまとめて解析する。
+    method は "harvest"（高品質）か "dio"（高速、StoneMask で補正）。
+    spectral=False なら F0 だけを求める（CheapTrick / D4C を省く）。
+    num_threads=0 でハードウェアスレッド数。入力と同じ順で返し、失敗した要素は None。
+    """
+    if method not in F0_METHODS:
+        raise ValueError(f"unknown F0 method: {method!r} (harvest / dio)")
+
+    options = VoseWorldOptions(frame_period, f0_floor, f0_ceil, F0_METHODS[method], num_threads)
+    results: List[Optional[WorldFeatures]] = [None] * len(sources)
+    jobs    = (VoseWorldJob * max(1, len(sources)))()
+    inputs: List[NDArray[np.float64]] = []   # ネイティブ側が読み終わるまで波形を生かしておく
+    slots:  List[int] = []
+
+    for i, source in enumerate(sources):
+        resolved = _resolve(source, sample_rate)
+        if resolved is None or resolved[0].size == 0:
+            continue
+        x, fs, name = resolved
+        frames = lib.world_analysis_frames(ctypes.byref(options), fs, x.size)
+        if frames <= 0:
+            print(f"⚠️ analyze_batch: invalid options or input #{i}")
+            continue
+        fft_size = lib.world_analysis_fft_size(ctypes.byref(options), fs) if spectral else 0
+        bins     = fft_size // 2 + 1
+        feat = WorldFeatures(
+            f0=np.empty(frames),
+            time=np.empty(frames),
+            spectrogram=np.empty((frames, bins)) if spectral else None,
+            aperiodicity=np.empty((frames, bins)) if spectral else None,
+            sample_rate=fs,
+            frame_period=frame_period,
+            source=name,
+        )
+        job = jobs[len(slots)]
+        job.x, job.length, job.fs, job.frames = _ptr(x), x.size, fs, frames
+        job.time, job.f0 = _ptr(feat.time), _ptr(feat.f0)
+        job.spectrogram, job.aperiodicity = _ptr(feat.spectrogram), _ptr(feat.aperiodicity)
+        job.fft_size = fft_size
+        inputs.append(x)
+        slots.append(i)
+        results[i] = feat
+
+    if slots:
+        lib.world_analyze_batch(ctypes.byref(options), jobs, len(slots))
+        for k, i in enumerate(slots):
+            if jobs[k].status != 0:
+                print(f"❌ WORLD analysis failed: #{i} (status {jobs[k].status})")
+                results[i] = None
+    return results
+
+
+def analyze(
+    lib: ctypes.CDLL,
+    source: Source,
+    sample_rate: Optional[int] = None,
+    **kwargs: Any,
+) -> Optional[WorldFeatures]:
+    """1 クリップだけ解析する（analyze_batch と同じ引数）"""
+    return analyze_batch(lib, [source], sample_rate, **kwargs)[0]
+
+
+__all__ = [
+    "DEFAULT_F0_CEIL",
+    "DEFAULT_F0_FLOOR",
+    "DEFAULT_FRAME_PERIOD",
+    "F0_DIO",
+    "F0_HARVEST",
+    "F0_METHODS",
+    "VoseWorldJob",
+    "VoseWorldOptions",
+    "WorldFeatures",
+    "analyze",
+    "analyze_batch",
+    "load_mono",
+    "setup_world_signatures",
+]
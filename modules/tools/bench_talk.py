@@ -0,0 +1,339 @@
+"""
+bench_talk.py
+VO-SE Cut Studio — トーク系処理のベンチマーク
+- labels : HTS ラベルパーサ（旧 split 実装 vs hts_labels.parse_labels）
+- events : トークイベント生成（旧 dict/list 実装 vs TalkEventBatch）
+- marshal: NoteEvent 配列への変換（旧 ctypes 配列コピー vs RenderBridge.marshal）
+
+使い方:
+    python modules/tools/bench_talk.py [--sentences 10000] [--phonemes 5000]
+
+pyopenjtalk が入っていれば実際のフロントエンド出力、無ければ同じ書式の
+合成ラベルでコーパスを作る。
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# リポジトリ直下から modules.* を import できるようにする
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from modules.talk.hts_labels import (  # noqa: E402
+    AccentPhrase,
+    parse_labels,
+    phoneme_name,
+    records_to_accent_phrases,
+)
+from modules.talk.render_bridge import RenderBridge  # noqa: E402
+from modules.talk.talk_events import batch_from_records  # noqa: E402
+
+_SAMPLE_TEXTS = [
+    "こんにちは、今日はいい天気ですね。",
+    "動画の編集を始めましょう。",
+    "音声合成エンジンのテストを行っています。",
+    "明日の予定を確認してください。",
+    "東京都の天気は晴れのち曇りです。",
+]
+
+_CONSONANTS = ["k", "s", "t", "n", "h", "m", "r", "w", "g", "z", "d", "b", "p", "sh", "ch", ""]
+_VOWELS = ["a", "i", "u", "e", "o"]
+
+
+# ══════════════════════════════════════════════════════════════
+# コーパス生成
+# ══════════════════════════════════════════════════════════════
+
+def _synthetic_sentence(rng: random.Random) -> List[str]:
+    """make_label と同じ書式の合成フルコンテキストラベルを作る"""
+    phrases: List[Tuple[List[str], int, int]] = []
+    for _ in range(rng.randint(1, 4)):
+        moras = rng.randint(2, 6)
+        phones: List[str] = []
+        for _ in range(moras):
+            c = rng.choice(_CONSONANTS)
+            if c:
+                phones.append(c)
+            phones.append(rng.choice(_VOWELS))
+        phrases.append((phones, moras, rng.randint(0, moras)))
+
+    seq: List[Tuple[str, str, str, str]] = [
+        ("sil", "xx+xx+xx", "xx_xx!xx_xx-xx", "xx_xx#xx_xx@xx_xx|xx_xx"),
+    ]
+    prev_f = "xx_xx!xx_xx-xx"
+    for i, (phones, moras, acc) in enumerate(phrases):
+        f_field = f"{moras}_{acc}#0_xx@{i + 1}_{len(phrases)}|1_{moras}"
+        for j, p in enumerate(phones):
+            pos = j // 2 + 1
+            seq.append((p, f"{pos - acc}+{pos}+{moras - pos + 1}", prev_f, f_field))
+        prev_f = f"{moras}_{acc}!0_xx-1"
+    seq.append(("sil", "xx+xx+xx", prev_f, "xx_xx#xx_xx@xx_xx|xx_xx"))
+
+    names = ["xx", "xx"] + [s[0] for s in seq] + ["xx", "xx"]
+    labels: List[str] = []
+    for k, (p, a, e, f) in enumerate(seq):
+        ctx = names[k:k + 5]
+        labels.append(
+            f"{ctx[0]}^{ctx[1]}-{ctx[2]}+{ctx[3]}={ctx[4]}"
+            f"/A:{a}/B:xx-xx_xx/C:xx_xx+xx/D:xx+xx_xx/E:{e}/F:{f}"
+            f"/G:xx_xx%xx_xx_xx/H:xx_xx/I:xx-xx@xx+xx&xx-xx|xx+xx/J:xx_xx/K:1+1-5"
+        )
+    return labels
+
+
+def build_corpus(n_sentences: int, seed: int = 0) -> List[List[str]]:
+    """ベンチマーク用のラベルコーパス（文ごとのラベル列）を作る"""
+    try:
+        import pyopenjtalk  # type: ignore[import-untyped]
+
+        samples = [list(pyopenjtalk.make_label(pyopenjtalk.run_frontend(t))) for t in _SAMPLE_TEXTS]
+        print(f"corpus: pyopenjtalk labels ({len(samples)} texts, cycled)")
+        return [samples[i % len(samples)] for i in range(n_sentences)]
+    except Exception:
+        rng = random.Random(seed)
+        print("corpus: synthetic labels (pyopenjtalk not available)")
+        return [_synthetic_sentence(rng) for _ in range(n_sentences)]
+
+
+# ══════════════════════════════════════════════════════════════
+# 旧実装（比較用に IntonationAnalyzer._parse_labels から移植）
+# ══════════════════════════════════════════════════════════════
+
+def _extract_field(label: str, key: str) -> str:
+    idx = label.find(key)
+    if idx == -1:
+        return ""
+    start = idx + len(key)
+    end = label.find("/", start)
+    return label[start:end] if end != -1 else label[start:]
+
+
+def legacy_parse_labels(labels: Sequence[str]) -> List[AccentPhrase]:
+    phrases: List[AccentPhrase] = []
+    current_moras: List[Tuple[str, float]] = []
+    accent_pos = 0
+    prev_phrase_id = ""
+
+    for label in labels:
+        parts = label.split("-")
+        phoneme = parts[1] if len(parts) > 1 else "?"
+        phrase_id = _extract_field(label, "/E:")
+
+        if phrase_id != prev_phrase_id and current_moras:
+            phrases.append(AccentPhrase(
+                text="".join(m[0] for m in current_moras),
+                mora_count=len(current_moras),
+                accent_position=accent_pos,
+                f0_values=[m[1] for m in current_moras],
+            ))
+            current_moras = []
+
+        try:
+            a_field = _extract_field(label, "/A:")
+            accent_pos = int(a_field.split("_")[0]) if a_field else 0
+        except (ValueError, IndexError):
+            accent_pos = 0
+
+        f0 = 130.0 if accent_pos == 0 else 150.0 + accent_pos * 5.0
+        if phoneme not in ("sil", "pau", "?"):
+            current_moras.append((phoneme, f0))
+        prev_phrase_id = phrase_id
+
+    if current_moras:
+        phrases.append(AccentPhrase(
+            text="".join(m[0] for m in current_moras),
+            mora_count=len(current_moras),
+            accent_position=accent_pos,
+            f0_values=[m[1] for m in current_moras],
+        ))
+    return phrases
+
+
+def legacy_generate_talk_events(
+    phonemes: List[str],
+    accent_phrases: List[AccentPhrase],
+) -> List[Dict[str, Any]]:
+    """旧 talk_manager.generate_talk_events（g2p / アクセント句取得後の部分）"""
+    accent_map: Dict[int, int] = {}
+    idx = 0
+    for phrase in accent_phrases:
+        for _ in range(phrase.mora_count):
+            accent_map[idx] = phrase.accent_position
+            idx += 1
+
+    talk_notes: List[Dict[str, Any]] = []
+    for i, phoneme in enumerate(phonemes):
+        accent_pos = accent_map.get(i, 0)
+        base_f0 = 150.0 + accent_pos * 5.0
+        voiced = phoneme in list("aeiou") + ["N", "m", "n", "r", "w", "y", "v"]
+        pitch_curve = [base_f0 if voiced else 0.0] * 50
+        length = len(pitch_curve)
+        talk_notes.append({
+            "phoneme":       phoneme,
+            "pitch":         pitch_curve,
+            "gender":        [0.5] * length,
+            "tension":       [0.5] * length,
+            "breath":        [0.1] * length,
+            "offset":        0.0,
+            "consonant":     0.0,
+            "cutoff":        0.0,
+            "pre_utterance": 0.0,
+            "overlap":       0.0,
+        })
+    return talk_notes
+
+
+class _LegacyNoteEvent(ctypes.Structure):
+    _fields_ = [
+        ("wav_path",      ctypes.c_char_p),
+        ("pitch_curve",   ctypes.POINTER(ctypes.c_double)),
+        ("pitch_length",  ctypes.c_int),
+        ("gender_curve",  ctypes.POINTER(ctypes.c_double)),
+        ("tension_curve", ctypes.POINTER(ctypes.c_double)),
+        ("breath_curve",  ctypes.POINTER(ctypes.c_double)),
+    ]
+
+
+def legacy_marshal(notes_data: List[Dict[str, Any]]) -> Tuple[Any, List[Any]]:
+    """旧 VoseRendererBridge.render のマーシャリング部分"""
+    c_notes = (_LegacyNoteEvent * len(notes_data))()
+    keep_alive: List[Any] = []
+    for i, data in enumerate(notes_data):
+        p_arr = (ctypes.c_double * len(data["pitch"]))(*data["pitch"])
+        g_arr = (ctypes.c_double * len(data["gender"]))(*data["gender"])
+        t_arr = (ctypes.c_double * len(data["tension"]))(*data["tension"])
+        b_arr = (ctypes.c_double * len(data["breath"]))(*data["breath"])
+        keep_alive.extend([p_arr, g_arr, t_arr, b_arr])
+        c_notes[i].wav_path      = str(data["phoneme"]).encode("utf-8")
+        c_notes[i].pitch_length  = len(data["pitch"])
+        c_notes[i].pitch_curve   = p_arr
+        c_notes[i].gender_curve  = g_arr
+        c_notes[i].tension_curve = t_arr
+        c_notes[i].breath_curve  = b_arr
+    return c_notes, keep_alive
+
+
+# ══════════════════════════════════════════════════════════════
+# 計測
+# ══════════════════════════════════════════════════════════════
+
+def _timeit(name: str, fn: Callable[[], object], n_labels: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"  {name:<34} {best * 1e3:9.1f} ms  ({n_labels / best / 1e6:6.2f} M labels/s)")
+    return best
+
+
+def bench_labels(corpus: List[List[str]], repeat: int) -> None:
+    flat = [label for sentence in corpus for label in sentence]
+    print(f"labels: {len(corpus)} sentences / {len(flat)} labels (best of {repeat})")
+
+    t_legacy = _timeit(
+        "legacy split parser -> AccentPhrase",
+        lambda: [legacy_parse_labels(s) for s in corpus], len(flat), repeat)
+    t_compat = _timeit(
+        "parse_labels -> AccentPhrase",
+        lambda: [records_to_accent_phrases(parse_labels(s)) for s in corpus], len(flat), repeat)
+    t_rec = _timeit(
+        "parse_labels per sentence",
+        lambda: [parse_labels(s) for s in corpus], len(flat), repeat)
+    t_flat = _timeit(
+        "parse_labels whole corpus",
+        lambda: parse_labels(flat), len(flat), repeat)
+
+    print(f"  speedup: compat x{t_legacy / t_compat:.1f}, "
+          f"records x{t_legacy / t_rec:.1f}, batch x{t_legacy / t_flat:.1f}")
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """(最良時間 秒, 結果を保持したままのピークメモリ bytes)"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def bench_events(corpus: List[List[str]], n_phonemes: int, repeat: int) -> None:
+    """n_phonemes 音素ぶんの台本でトークイベント生成を比較する"""
+    labels: List[str] = []
+    for sentence in corpus:
+        labels.extend(sentence)
+        if len(labels) >= n_phonemes:
+            break
+    records = parse_labels(labels)
+    phonemes = [phoneme_name(i) for i in records["phoneme_id"].tolist() if phoneme_name(i) != "sil"]
+    phrases = records_to_accent_phrases(records)
+    print(f"events: {len(phonemes)} phonemes (best of {repeat}, peak memory via tracemalloc)")
+
+    t_old, m_old = _measure(lambda: legacy_generate_talk_events(phonemes, phrases), repeat)
+    t_new, m_new = _measure(lambda: batch_from_records(records), repeat)
+    t_view, m_view = _measure(lambda: batch_from_records(records).as_dicts(), repeat)
+    for name, t, m in (
+        ("legacy dict/list events", t_old, m_old),
+        ("TalkEventBatch", t_new, m_new),
+        ("TalkEventBatch + as_dicts", t_view, m_view),
+    ):
+        print(f"  {name:<34} {t * 1e3:9.2f} ms  {m / 1e6:8.2f} MB")
+    print(f"  batch: x{t_old / t_new:.1f} faster, x{m_old / max(m_new, 1):.1f} less memory")
+
+
+def bench_marshal(corpus: List[List[str]], n_phonemes: int, repeat: int) -> None:
+    """n_phonemes 音素ぶんのノートを NoteEvent 配列に変換する時間を比較する"""
+    labels: List[str] = []
+    for sentence in corpus:
+        labels.extend(sentence)
+        if len(labels) >= n_phonemes:
+            break
+    batch = batch_from_records(parse_labels(labels))
+    legacy_notes = batch.as_dicts()
+    n = len(batch)
+    bridge = RenderBridge()       # マーシャリングはライブラリが無くても動く
+    bridge.marshal(batch)         # プールと音素名バッファを温める
+    print(f"marshal: {n} notes (best of {repeat})")
+
+    for name, fn in (
+        ("legacy ctypes list copy", lambda: legacy_marshal(legacy_notes)),
+        ("RenderBridge.marshal (batch)", lambda: bridge.marshal(batch)),
+        ("RenderBridge.marshal (dicts)", lambda: bridge.marshal(legacy_notes)),
+    ):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        print(f"  {name:<34} {best * 1e3:9.2f} ms  ({best / n * 1e6:7.2f} us/note)")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=10000)
+    parser.add_argument("--phonemes", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.sentences)
+    bench_labels(corpus, args.repeat)
+    bench_events(corpus, args.phonemes, args.repeat)
+    bench_marshal(corpus, args.phonemes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,237 @@
-import wave
-import numpy as np
+import argparse
+import ctypes
 import glob
+import hashlib
+import json
 import os
-from typing import List, Tuple
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# リポジトリ直下から modules.* を import できるようにする
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from modules.talk.render_bridge import find_core_library, load_core_library  # noqa: E402
+from modules.talk.voice_bank import (  # noqa: E402
+    CODEC_NAMES,
+    DEFAULT_BANK_NAME,
+    BankSource,
+    VoiceBank,
+    analysis_dir,
+    encode_samples,
+    read_bank_blob,
+    sample_stats,
+    write_voice_bank,
+)
+
+MANIFEST_VERSION = 3      # 3: 解析キャッシュのヘッダが 16 バイトになったので焼き直す
+MANIFEST_NAME = "voice_bank.manifest.json"
+DEFAULT_CODEC = "flac"
+
+# 符号化済みエントリ: (blob, samples, sample_rate, channels, peak, rms, crc32)
+Encoded = Tuple[bytes, int, int, int, float, float, int]
+
+
+def _entry_name(wav_path: str) -> str:
+    parts = os.path.normpath(wav_path).split(os.sep)
+    folder_name = parts[-2] if len(parts) > 2 else ""
+    file_base = os.path.splitext(parts[-1])[0]
+
+    if folder_name != "official_voices":
+        return f"{folder_name}_{file_base}"
+    return file_base
+
 
+def _file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _decode_wav(wav_path: str) -> Tuple[np.ndarray, int, int]:
+    """WAV → (モノラル int16, sample_rate, channels)"""
+    with wave.open(wav_path, 'rb') as f:
+        channels = f.getnchannels()
+        sample_width = f.getsampwidth()
+        sample_rate = f.getframerate()
+        frames = f.getnframes()
+        if sample_width != 2:
+            raise ValueError(f"16bit PCM only (sampwidth={sample_width})")
+        data = np.frombuffer(f.readframes(frames), dtype="<i2")
+    if channels > 1:
+        # 多チャンネルはモノラルにダウンミックスする
+        mixed = data.reshape(-1, channels).mean(axis=1)
+        data = np.round(mixed).astype(np.int16)
+    return data[:frames], sample_rate, channels
+
+
+def _encode_wav(wav_path: str, codec: int) -> Encoded:
+    """WAV → 符号化済みブロブ（ProcessPoolExecutor のワーカーで実行する）"""
+    data, sample_rate, channels = _decode_wav(wav_path)
+    peak, rms, crc = sample_stats(data)
+    blob = encode_samples(data, codec, sample_rate)
+    return blob, len(data), sample_rate, channels, peak, rms, crc
+
+
+_worker_banks: Dict[str, VoiceBank] = {}
+
+
+def _prebake(lib_path: str, bank_path: str, name: str, cache_dir: str) -> str:
+    """
+    1 エントリの WORLD 解析を cache_dir/<キー>.vsc に書いてキーを返す
+    （ProcessPoolExecutor のワーカーで実行する。ライブラリとバンクはプロセスごとに 1 回だけ開く）。
+    """
+    lib = load_core_library(lib_path)
+    if lib is None:
+        raise RuntimeError(f"VO-SE Engine not available: {lib_path}")
+    bank = _worker_banks.get(bank_path)
+    if bank is None:
+        bank = _worker_banks[bank_path] = VoiceBank(bank_path)
+    data = np.ascontiguousarray(bank.samples(name))
+    key = ctypes.create_string_buffer(17)
+    frames = lib.prebake_analysis(
+        data.ctypes.data_as(ctypes.POINTER(ctypes.c_int16)), len(data),
+        os.fsencode(cache_dir), key,
+    )
+    if frames <= 0:
+        raise RuntimeError("analysis failed")
+    return key.value.decode("ascii")
+
+
+def _bake_analysis(
+    bank_path: str,
+    names: List[str],
+    entries: Dict[str, Dict[str, Any]],
+    jobs: Optional[int],
+    lib_path: Optional[str],
+) -> int:
+    """
+    バンク内の全エントリについて WORLD 解析（F0・スペクトル包絡・非周期性）を事前に行い、
+    エンジンのディスクキャッシュと同じ VoseCacheHeader 形式で voice_bank.analysis/ に置く。
+    マニフェストの "analysis"（キャッシュキー）が残っていて .vsc もあるエントリは省く。
+    使われなくなった .vsc は消す。焼いた件数を返す。
+    """
+    cache_dir = analysis_dir(bank_path)
+    # 音源が 0 件・エンジンが無い場合も空のフォルダは置く（CI の ls / PyInstaller の --add-data 用）
+    os.makedirs(cache_dir, exist_ok=True)
+    lib_path = os.path.abspath(lib_path or find_core_library())
+    if not os.path.exists(lib_path):
+        print(f"Warning: VO-SE Engine not found ({lib_path}). Skipping analysis pre-bake.")
+        return 0
+
+    def baked(name: str) -> bool:
+        key = entries[name].get("analysis")
+        return bool(key) and os.path.exists(os.path.join(cache_dir, f"{key}.vsc"))
+
+    todo = [name for name in names if not baked(name)]
+    if len(todo) == 1 or jobs == 1:
+        for name in todo:
+            try:
+                entries[name]["analysis"] = _prebake(lib_path, bank_path, name, cache_dir)
+            except Exception as e:
+                print(f"Error analyzing {name}: {e}")
+    elif todo:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futures = {
+                name: ex.submit(_prebake, lib_path, bank_path, name, cache_dir) for name in todo
+            }
+            for name, future in futures.items():
+                try:
+                    entries[name]["analysis"] = future.result()
+                except Exception as e:
+                    print(f"Error analyzing {name}: {e}")
+
+    keep = {f"{entries[name].get('analysis')}.vsc" for name in names}
+    for fname in os.listdir(cache_dir):
+        if fname.endswith(".vsc") and fname not in keep:
+            os.remove(os.path.join(cache_dir, fname))
+
+    done = sum(1 for name in todo if entries[name].get("analysis"))
+    print(f"Analysis: {done} baked, {len(names) - len(todo)} reused ({cache_dir}).")
+    return done
+
+
+def _stat(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _load_manifest(manifest_path: str, bank_path: str) -> Dict[str, Any]:
+    """
+    前回のマニフェストを読む。バンク本体がマニフェストと一致しない
+    （消された・別ビルドで上書きされた）場合は空扱いにして全件作り直す。
+    """
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        if manifest.get("bank") != _stat(bank_path):
+            return {}
+        return manifest
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_header(output_path: str, bank_name: str, entry_count: int) -> None:
+    """
+    組み込みビルド用の小さなヘッダ。音源本体は .vbank に入り、
+    Python 側（RenderBridge）が mmap して使う音素だけを登録する。
+    内容が変わらないときは書き換えない（C++ の再ビルドを起こさない）。
+    """
+    text = (
+        "#pragma once\n"
+        "#include <stdint.h>\n\n"
+        "// Generated by modules/tools/pack_voice.py\n"
+        "// 音源は VOSE_VOICE_BANK_FILE に格納（load_embedded_resource で遅延登録）\n"
+        f'#define VOSE_VOICE_BANK_FILE    "{bank_name}"\n'
+        f"#define VOSE_VOICE_BANK_ENTRIES {entry_count}\n\n"
+        "inline void register_all_embedded_voices() {}\n"
+    )
+    try:
+        with open(output_path, encoding='utf-8') as h:
+            if h.read() == text:
+                return
+    except OSError:
+        pass
+    with open(output_path, 'w', encoding='utf-8') as h:
+        h.write(text)
+
+
+def pack_all_voices(
+    force: bool = False,
+    jobs: Optional[int] = None,
+    codec: str = DEFAULT_CODEC,
+    analyze: bool = True,
+    lib_path: Optional[str] = None,
+    base_dir: Optional[str] = None,
+) -> None:
+    """
+    assets/official_voices/**/*.wav をバンクにまとめる。
+    マニフェスト（WAV のサイズ・mtime・内容ハッシュ、バンク内オフセット、codec）と照合し、
+    追加・変更された WAV だけをプロセスプールで変換・符号化する。変更の無いエントリは
+    前回のバンクから符号化済みブロブをそのままコピーし、全件一致なら何も書かない。
+    codec は raw / delta / flac（いずれも可逆）。codec を変えると全件作り直す。
+    analyze=True ならビルド済みのエンジン（lib_path、既定は find_core_library）で
+    WORLD 解析も事前に済ませる。エンジンが無ければ警告だけ出してバンクは作る。
+    base_dir は assets/ ・ bin/ ・ src/core/ を置くルート（既定はリポジトリ直下）。
+    """
+    t0 = time.perf_counter()
+    codec_id = CODEC_NAMES[codec]
 
-def pack_all_voices() -> None:
     # 1. パスの決定
     base_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "../../")
+        base_dir or os.path.join(os.path.dirname(__file__), "../../")
     )
     output_path = os.path.join(base_dir, "src", "core", "voice_data.h")
+    bank_path = os.path.join(base_dir, "bin", DEFAULT_BANK_NAME)
+    manifest_path = os.path.join(base_dir, "bin", MANIFEST_NAME)
     # CI環境とローカルの両方に対応するため、相対パスを調整
     search_path = os.path.join(base_dir, "assets/official_voices/**/*.wav")
 
@@ -18,70 +239,149 @@ def pack_all_voices() -> None:
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
     # 2. WAVファイルのリストアップ
-    wav_files = glob.glob(search_path, recursive=True)
+    wav_files = sorted(glob.glob(search_path, recursive=True))
 
     print(f"Target Output: {output_path}")
+    print(f"Voice Bank: {bank_path}")
     print(f"Searching in: {search_path}")
+    print(f"Codec: {codec}")
 
-    # --- 重要：ファイルがない場合でも「空のヘッダー」を書き出す ---
+    # --- 重要：ファイルがない場合でも空のバンクとヘッダーを書き出す ---
     if not wav_files:
-        print("Warning: No wav files found. Creating dummy header to satisfy build.")
-        with open(output_path, 'w', encoding='utf-8') as h:
-            h.write("#pragma once\n")
-            h.write("#include <stdint.h>\n\n")
-            h.write("// Dummy function for CI build without assets\n")
-            h.write("inline void register_all_embedded_voices() {}\n")
-        return
+        print("Warning: No wav files found. Creating empty voice bank to satisfy build.")
 
-    voice_entries: List[Tuple[str, str]] = []
+    old = {} if force else _load_manifest(manifest_path, bank_path)
+    old_entries: Dict[str, Dict[str, Any]] = old.get("entries", {})
 
-    with open(output_path, 'w', encoding='utf-8') as h:
-        h.write("#pragma once\n#include <stdint.h>\n\n")
-        h.write("// C++側の関数を呼び出すための宣言\n")
-        h.write(
-            'extern "C" void load_embedded_resource('
-            'const char* phoneme, '
-            'const int16_t* raw_data, '
-            'int sample_count);\n\n'
-        )
-
-        for wav_path in wav_files:
-            parts = os.path.normpath(wav_path).split(os.sep)
-            folder_name = parts[-2] if len(parts) > 2 else ""
-            file_base = os.path.splitext(parts[-1])[0]
-
-            if folder_name != "official_voices":
-                entry_name: str = f"{folder_name}_{file_base}"
-            else:
-                entry_name: str = file_base
-
-            safe_id: str = "".join(f"{ord(c):04x}" for c in entry_name)
-            var_name: str = f"OFFICIAL_VOICE_{safe_id}"
+    # 3. 前回との差分
+    names: List[str] = []
+    sources: Dict[str, str] = {}
+    entries: Dict[str, Dict[str, Any]] = {}
+    dirty: List[str] = []
+    for wav_path in wav_files:
+        name = _entry_name(wav_path)
+        if name in sources:
+            print(f"Error skipping {wav_path}: duplicate entry name '{name}'")
+            continue
+        rel = os.path.relpath(wav_path, base_dir).replace(os.sep, "/")
+        st = _stat(wav_path)
+        prev = old_entries.get(name)
+        names.append(name)
+        sources[name] = wav_path
+        if prev and prev.get("codec") != codec_id:
+            prev = None
+        if prev and prev["source"] == rel and prev["size"] == st["size"] \
+                and prev["mtime_ns"] == st["mtime_ns"]:
+            entries[name] = prev
+            continue
+        digest = _file_hash(wav_path)
+        if prev and prev["source"] == rel and prev["hash"] == digest:
+            entries[name] = {**prev, **st}        # touch されただけ
+            continue
+        entries[name] = {"source": rel, "hash": digest, **st}
+        dirty.append(name)
 
+    if not force and not dirty and names == list(old_entries) and os.path.exists(bank_path):
+        _write_header(output_path, DEFAULT_BANK_NAME, len(names))
+        baked = _bake_analysis(bank_path, names, entries, jobs, lib_path) if analyze else 0
+        if baked or any(entries[n] is not old_entries[n] for n in names):
+            _save_manifest(manifest_path, bank_path, names, entries)
+        print(f"Up to date: {len(names)} voices ({time.perf_counter() - t0:.2f}s).")
+        return
+
+    # 4. 変更分だけ並列に変換・符号化
+    decoded: Dict[str, Encoded] = {}
+    if len(dirty) == 1 or jobs == 1:
+        for name in dirty:
             try:
-                with wave.open(wav_path, 'rb') as f:
-                    frames = f.readframes(f.getnframes())
-                    data = np.frombuffer(frames, dtype=np.int16)
-
-                    h.write(f"// Source: {wav_path}\n")
-                    h.write(f"const int16_t {var_name}[] = {{\n    ")
-                    for i, val in enumerate(data):
-                        h.write(f"{val},")
-                        if (i + 1) % 15 == 0:
-                            h.write("\n    ")
-                    h.write("\n};\n")
-                    h.write(f"const int {var_name}_LEN = {len(data)};\n\n")
-                    voice_entries.append((entry_name, var_name))
+                decoded[name] = _encode_wav(sources[name], codec_id)
             except Exception as e:
-                print(f"Error skipping {wav_path}: {e}")
+                print(f"Error skipping {sources[name]}: {e}")
+    elif dirty:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futures = {name: ex.submit(_encode_wav, sources[name], codec_id) for name in dirty}
+            for name, future in futures.items():
+                try:
+                    decoded[name] = future.result()
+                except Exception as e:
+                    print(f"Error skipping {sources[name]}: {e}")
+
+    # 5. バンクの組み立て（変更の無いエントリは前回のバンクからコピー）
+    bank_sources: List[BankSource] = []
+    for name in names:
+        if name in decoded:
+            blob, samples, sample_rate, channels, peak, rms, crc = decoded[name]
+            bank_sources.append(BankSource(
+                name, samples, sample_rate, channels,
+                peak=peak, rms=rms, crc32=crc, codec=codec_id, encoded=lambda b=blob: b,
+            ))
+        elif name not in dirty:
+            e = entries[name]
+            bank_sources.append(BankSource(
+                name, e["samples"], e["sample_rate"], e["channels"],
+                peak=e["peak"], rms=e["rms"], crc32=e["crc32"], codec=e["codec"],
+                encoded=lambda e=e: read_bank_blob(bank_path, e["offset"], e["nbytes"]),
+            ))
 
-        h.write("inline void register_all_embedded_voices() {\n")
-        for ent_name, v_name in voice_entries:
-            h.write(f'    load_embedded_resource("{ent_name}", {v_name}, {v_name}_LEN);\n')
-        h.write("}\n")
+    index = write_voice_bank(bank_path, bank_sources, codec_id)
+    packed = [s.name for s in bank_sources]
+    for name, rec in zip(packed, index):
+        entries[name].update({
+            "offset":      int(rec["offset"]),
+            "nbytes":      int(rec["nbytes"]),
+            "codec":       int(rec["codec"]),
+            "samples":     int(rec["samples"]),
+            "sample_rate": int(rec["sample_rate"]),
+            "channels":    int(rec["channels"]),
+            "peak":        float(rec["peak"]),
+            "rms":         float(rec["rms"]),
+            "crc32":       int(rec["crc32"]),
+        })
+    if analyze:
+        _bake_analysis(bank_path, packed, entries, jobs, lib_path)
+    _save_manifest(manifest_path, bank_path, packed, entries)
+    _write_header(output_path, DEFAULT_BANK_NAME, len(packed))
 
-    print(f"Success: Packed {len(voice_entries)} voices.")
+    total_mb = int(index["samples"].sum()) * 2 / (1024 * 1024)
+    packed_mb = int(index["nbytes"].sum()) / (1024 * 1024)
+    print(
+        f"Success: Packed {len(packed)} voices ({total_mb:.1f} MB -> {packed_mb:.1f} MB, "
+        f"{len(decoded)} converted, {len(packed) - len(decoded)} copied) "
+        f"in {time.perf_counter() - t0:.2f}s."
+    )
+
+
+def _save_manifest(
+    manifest_path: str,
+    bank_path: str,
+    names: List[str],
+    entries: Dict[str, Dict[str, Any]],
+) -> None:
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "bank":    _stat(bank_path),
+        "entries": {name: entries[name] for name in names},
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
 
 
 if __name__ == "__main__":
-    pack_all_voices()
+    parser = argparse.ArgumentParser(description="assets/official_voices を音源バンクにまとめる")
+    parser.add_argument("--force", action="store_true", help="マニフェストを無視して全件変換する")
+    parser.add_argument("--jobs", type=int, default=None, help="変換プロセス数（既定: CPU 数）")
+    parser.add_argument(
+        "--codec", choices=sorted(CODEC_NAMES), default=DEFAULT_CODEC,
+        help=f"エントリの可逆圧縮方式（既定: {DEFAULT_CODEC}）",
+    )
+    parser.add_argument(
+        "--no-analysis", action="store_true", help="WORLD 解析の事前計算を行わない",
+    )
+    parser.add_argument("--lib", default=None, help="解析に使う libvo_se_cut（既定: 自動検出）")
+    args = parser.parse_args()
+    pack_all_voices(
+        force=args.force, jobs=args.jobs, codec=args.codec,
+        analyze=not args.no_analysis, lib_path=args.lib,
+    )
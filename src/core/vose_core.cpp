@@ -18,6 +18,18 @@
 #include <mutex>
 #include <shared_mutex>
 #include <memory>
+#include <chrono>
+#ifdef _WIN32
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
 #define _USE_MATH_DEFINES
 #ifndef M_PI
 #define M_PI 3.14159265358979323846
@@ -47,6 +59,20 @@ static uint64_t fnv1a_hash(const std::string& str) {
     return hash;
 }
 
+// 内蔵音源（パスを持たない）のキャッシュキー：PCM の内容から求める
+static std::string generate_content_hash(const int16_t* raw_data, int sample_count) {
+    uint64_t hash = 0xcbf29ce484222325ULL;
+    const auto* bytes = reinterpret_cast<const unsigned char*>(raw_data);
+    const size_t n = static_cast<size_t>(sample_count) * sizeof(int16_t);
+    for (size_t i = 0; i < n; ++i) {
+        hash ^= static_cast<uint64_t>(bytes[i]);
+        hash *= 0x100000001b3ULL;
+    }
+    std::stringstream ss;
+    ss << std::hex << std::setw(16) << std::setfill('0') << hash;
+    return ss.str();
+}
+
 static std::string generate_cache_hash(const std::string& wav_path) {
     try {
         fs::path p(wav_path);
@@ -69,15 +95,24 @@ static std::string generate_cache_hash(const std::string& wav_path) {
 // oto.ini DB
 // ============================================================
 
-static std::map<std::string, OtoEntry> g_oto_db;
+// エントリは shared_ptr で持つ（レンダー中に set_oto_data で差し替えられても、
+// 計画済みのノートは古いエントリを最後まで参照できる）
+static std::map<std::string, std::shared_ptr<const OtoEntry>> g_oto_db;
 static std::shared_mutex g_oto_db_mutex;
 
-extern "C" void set_oto_data(const OtoEntry* entries, int count) {
+// Python 側（modules/talk/oto.py）から全エントリを連続配列で一括登録する。
+// 同じエイリアスは先のエントリを優先。filename ポインタは保持しない
+extern "C" DLLEXPORT void set_oto_data(const OtoEntry* entries, int count) {
+    std::map<std::string, std::shared_ptr<const OtoEntry>> db;
+    for (int i = 0; entries && i < count; ++i) {
+        auto e = std::make_shared<OtoEntry>(entries[i]);
+        e->filename = nullptr;
+        e->alias[sizeof(e->alias) - 1]       = '\0';
+        e->wav_path[sizeof(e->wav_path) - 1] = '\0';
+        db.emplace(e->alias, std::move(e));
+    }
     std::unique_lock<std::shared_mutex> lock(g_oto_db_mutex);
-    g_oto_db.clear();
-    if (!entries || count <= 0) return;
-    for (int i = 0; i < count; ++i)
-        g_oto_db[entries[i].alias] = entries[i];
+    g_oto_db.swap(db);
 }
 
 // ============================================================
@@ -86,6 +121,7 @@ extern "C" void set_oto_data(const OtoEntry* entries, int count) {
 
 struct EmbeddedVoice {
     std::string         path;
+    std::string         content_key;   // 内蔵音源のディスクキャッシュ名（path が空のとき使う）
     std::vector<double> waveform;
     int                 fs;
 };
@@ -93,13 +129,45 @@ struct EmbeddedVoice {
 static std::map<std::string, std::shared_ptr<const EmbeddedVoice>> g_voice_db;
 static std::shared_mutex g_voice_db_mutex;
 
+// 読み取り専用の double 列（実体は AnalysisCache::owned か mmap したキャッシュファイル）
+struct DoubleSpan {
+    const double* ptr = nullptr;
+    size_t        len = 0;
+    const double* data()  const { return ptr; }
+    size_t        size()  const { return len; }
+    const double* begin() const { return ptr; }
+    const double* end()   const { return ptr + len; }
+    const double& operator[](size_t i) const { return ptr[i]; }
+};
+
+class MappedFile;
+
 struct AnalysisCache {
-    std::vector<double> f0;
-    std::vector<double> time;
+    DoubleSpan          f0;
+    DoubleSpan          time;
     int                 length    = 0;
-    std::vector<double> flat_spec;
-    std::vector<double> flat_ap;
+    DoubleSpan          flat_spec;
+    DoubleSpan          flat_ap;
     int                 spec_bins = 0;
+
+    // 実体：f0 | time | flat_spec | flat_ap の順に連続して並ぶ（ファイル本体と同じ並び）
+    std::vector<double>               owned;
+    std::shared_ptr<const MappedFile> mapping;
+
+    static size_t doubles_for(int length, int spec_bins) {
+        return 2 * static_cast<size_t>(length)
+             + 2 * static_cast<size_t>(length) * spec_bins;
+    }
+
+    // base から f0 / time / flat_spec / flat_ap のスパンを張る
+    void bind(const double* base) {
+        const size_t n  = static_cast<size_t>(length);
+        const size_t sc = n * spec_bins;
+        f0        = {base,             n};
+        time      = {base + n,         n};
+        flat_spec = {base + 2 * n,      sc};
+        flat_ap   = {base + 2 * n + sc, sc};
+    }
 };
 
 static std::map<std::shared_ptr<const EmbeddedVoice>,
@@ -117,15 +185,15 @@ struct NotePrepass {
     int64_t                              note_samples = 0;
     std::shared_ptr<const EmbeddedVoice> ev;
     std::shared_ptr<const EmbeddedVoice> prev_ev;
-    const OtoEntry*                      oto          = nullptr;
+    std::shared_ptr<const OtoEntry>      oto;
 
     NotePrepass() = default;
     NotePrepass(NoteState s, int64_t ns,
                 std::shared_ptr<const EmbeddedVoice> e,
                 std::shared_ptr<const EmbeddedVoice> pe = nullptr,
-                const OtoEntry* o = nullptr)
+                std::shared_ptr<const OtoEntry> o = nullptr)
         : state(s), note_samples(ns), ev(std::move(e)),
-          prev_ev(std::move(pe)), oto(o) {}
+          prev_ev(std::move(pe)), oto(std::move(o)) {}
 };
 
 // ============================================================
@@ -198,6 +266,26 @@ static int64_t note_samples_safe(int p) {
     return (static_cast<int64_t>(p) - 1) * kFramePeriod / 1000.0 * kFs + 1;
 }
 
+// CheapTrick / D4C は option に nullptr を渡すと即座にクラッシュするため、
+// kFs 用に初期化したものを共有する
+static const CheapTrickOption& cheaptrick_option() {
+    static const CheapTrickOption opt = [] {
+        CheapTrickOption o;
+        InitializeCheapTrickOption(kFs, &o);
+        return o;
+    }();
+    return opt;
+}
+
+static const D4COption& d4c_option() {
+    static const D4COption opt = [] {
+        D4COption o;
+        InitializeD4COption(&o);
+        return o;
+    }();
+    return opt;
+}
+
 // ============================================================
 // find_voice_ref
 // ============================================================
@@ -213,51 +301,327 @@ static std::shared_ptr<const EmbeddedVoice> find_voice_ref(const char* key)
 // ディスクキャッシュ
 // ============================================================
 
-static fs::path get_cache_dir() {
-    fs::path p = "cache";
-    if (!fs::exists(p)) fs::create_directories(p);
-    return p;
+static constexpr uint32_t kCacheMagic   = 0x45534F56;   // 'VOSE'
+static constexpr uint32_t kCacheVersion = 2;             // 2: 16 バイトヘッダ（本体を 8 バイト境界に置く）
+
+static bool valid_cache_header(const VoseCacheHeader& h, uint64_t file_size) {
+    if (h.magic != kCacheMagic || h.version != kCacheVersion) return false;
+    if (h.length <= 0 || h.spec_bins <= 0) return false;
+    return file_size == sizeof(VoseCacheHeader)
+                      + AnalysisCache::doubles_for(h.length, h.spec_bins) * sizeof(double);
 }
 
-static void save_cache(const fs::path& cache_path, const AnalysisCache& cache)
+// 戻り値は書いたバイト数（失敗時 0、書きかけのファイルは残さない）
+static uint64_t save_cache(const fs::path& cache_path, const AnalysisCache& cache)
 {
-    FILE* fp = fopen(cache_path.string().c_str(), "wb");
-    if (!fp) return;
+    const fs::path tmp_path = cache_path.string() + ".tmp";
+    FILE* fp = fopen(tmp_path.string().c_str(), "wb");
+    if (!fp) return 0;
     VoseCacheHeader header;
-    header.magic     = 0x45534F56;
+    header.magic     = kCacheMagic;
     header.length    = cache.length;
     header.spec_bins = cache.spec_bins;
-    fwrite(&header, sizeof(header), 1, fp);
-    fwrite(cache.f0.data(),        sizeof(double), cache.length, fp);
-    fwrite(cache.time.data(),      sizeof(double), cache.length, fp);
+    header.version   = kCacheVersion;
     const size_t sc = static_cast<size_t>(cache.length) * cache.spec_bins;
-    fwrite(cache.flat_spec.data(), sizeof(double), sc, fp);
-    fwrite(cache.flat_ap.data(),   sizeof(double), sc, fp);
-    fclose(fp);
+    bool ok = fwrite(&header, sizeof(header), 1, fp) == 1;
+    ok = ok && fwrite(cache.f0.data(),        sizeof(double), cache.length, fp) == static_cast<size_t>(cache.length);
+    ok = ok && fwrite(cache.time.data(),      sizeof(double), cache.length, fp) == static_cast<size_t>(cache.length);
+    ok = ok && fwrite(cache.flat_spec.data(), sizeof(double), sc, fp) == sc;
+    ok = ok && fwrite(cache.flat_ap.data(),   sizeof(double), sc, fp) == sc;
+    ok = (fclose(fp) == 0) && ok;
+
+    std::error_code ec;
+    if (ok) fs::rename(tmp_path, cache_path, ec);
+    if (!ok || ec) {
+        fs::remove(tmp_path, ec);
+        return 0;
+    }
+    return sizeof(header) + AnalysisCache::doubles_for(cache.length, cache.spec_bins) * sizeof(double);
 }
 
-static std::shared_ptr<AnalysisCache> load_cache(const fs::path& path)
+// ------------------------------------------------------------
+// 読み取り専用 mmap
+// ------------------------------------------------------------
+
+class MappedFile {
+public:
+    static std::shared_ptr<const MappedFile> open(const fs::path& path) {
+        auto m = std::shared_ptr<MappedFile>(new MappedFile());
+#ifdef _WIN32
+        m->file_ = CreateFileW(path.wstring().c_str(), GENERIC_READ,
+                               FILE_SHARE_READ | FILE_SHARE_DELETE, nullptr,
+                               OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+        if (m->file_ == INVALID_HANDLE_VALUE) return nullptr;
+        LARGE_INTEGER size;
+        if (!GetFileSizeEx(m->file_, &size) || size.QuadPart == 0) return nullptr;
+        m->size_ = static_cast<size_t>(size.QuadPart);
+        m->map_ = CreateFileMappingW(m->file_, nullptr, PAGE_READONLY, 0, 0, nullptr);
+        if (!m->map_) return nullptr;
+        m->data_ = MapViewOfFile(m->map_, FILE_MAP_READ, 0, 0, 0);
+#else
+        const int fd = ::open(path.c_str(), O_RDONLY);
+        if (fd < 0) return nullptr;
+        struct stat st;
+        if (fstat(fd, &st) != 0 || st.st_size == 0) { ::close(fd); return nullptr; }
+        m->size_ = static_cast<size_t>(st.st_size);
+        void* p = mmap(nullptr, m->size_, PROT_READ, MAP_PRIVATE, fd, 0);
+        ::close(fd);
+        m->data_ = (p == MAP_FAILED) ? nullptr : p;
+#endif
+        return m->data_ ? m : nullptr;
+    }
+
+    ~MappedFile() {
+#ifdef _WIN32
+        if (data_) UnmapViewOfFile(data_);
+        if (map_)  CloseHandle(map_);
+        if (file_ != INVALID_HANDLE_VALUE) CloseHandle(file_);
+#else
+        if (data_) munmap(data_, size_);
+#endif
+    }
+
+    const unsigned char* data() const { return static_cast<const unsigned char*>(data_); }
+    size_t               size() const { return size_; }
+
+private:
+    MappedFile() = default;
+    void*  data_ = nullptr;
+    size_t size_ = 0;
+#ifdef _WIN32
+    HANDLE file_ = INVALID_HANDLE_VALUE;
+    HANDLE map_  = nullptr;
+#endif
+};
+
+// 戻り値が非 null のとき bytes_read に読んだ（mmap した）バイト数を入れる
+static std::shared_ptr<AnalysisCache> load_cache(const fs::path& path, bool use_mmap,
+                                                 uint64_t& bytes_read)
 {
-    if (!fs::exists(path)) return nullptr;
-    std::ifstream ifs(path, std::ios::binary);
-    VoseCacheHeader header;
-    ifs.read(reinterpret_cast<char*>(&header), sizeof(header));
-    if (header.magic != 0x45534F56) return nullptr;
+    std::error_code ec;
+    const uint64_t file_size = fs::file_size(path, ec);
+    if (ec || file_size < sizeof(VoseCacheHeader)) return nullptr;
+
     auto cache = std::make_shared<AnalysisCache>();
-    cache->length    = header.length;
-    cache->spec_bins = header.spec_bins;
-    cache->f0  .resize(cache->length);
-    cache->time.resize(cache->length);
-    const size_t sc = static_cast<size_t>(cache->length) * cache->spec_bins;
-    cache->flat_spec.resize(sc);
-    cache->flat_ap  .resize(sc);
-    ifs.read(reinterpret_cast<char*>(cache->f0.data()),        sizeof(double)*cache->length);
-    ifs.read(reinterpret_cast<char*>(cache->time.data()),      sizeof(double)*cache->length);
-    ifs.read(reinterpret_cast<char*>(cache->flat_spec.data()), sizeof(double)*sc);
-    ifs.read(reinterpret_cast<char*>(cache->flat_ap.data()),   sizeof(double)*sc);
+    if (use_mmap) {
+        auto m = MappedFile::open(path);
+        if (!m || m->size() != file_size) return nullptr;
+        VoseCacheHeader header;
+        std::memcpy(&header, m->data(), sizeof(header));
+        if (!valid_cache_header(header, file_size)) return nullptr;
+        cache->length    = header.length;
+        cache->spec_bins = header.spec_bins;
+        cache->bind(reinterpret_cast<const double*>(m->data() + sizeof(header)));
+        cache->mapping = std::move(m);
+    } else {
+        std::ifstream ifs(path, std::ios::binary);
+        VoseCacheHeader header;
+        if (!ifs.read(reinterpret_cast<char*>(&header), sizeof(header))) return nullptr;
+        if (!valid_cache_header(header, file_size)) return nullptr;
+        cache->length    = header.length;
+        cache->spec_bins = header.spec_bins;
+        cache->owned.resize(AnalysisCache::doubles_for(header.length, header.spec_bins));
+        if (!ifs.read(reinterpret_cast<char*>(cache->owned.data()),
+                      static_cast<std::streamsize>(cache->owned.size() * sizeof(double))))
+            return nullptr;
+        cache->bind(cache->owned.data());
+    }
+    bytes_read = file_size;
     return cache;
 }
 
+// ------------------------------------------------------------
+// DiskCacheManager : cache/ の容量上限つき LRU
+//   - 初回アクセス時にディレクトリを走査して索引（サイズ・最終アクセス）を作る
+//   - 最終アクセスはファイルの mtime に書き戻すので、次回起動後も LRU 順が保たれる
+//   - 事前解析ディレクトリ（pack_voice）は読むだけで、容量にも追い出しにも含めない
+// ------------------------------------------------------------
+
+class DiskCacheManager {
+public:
+    std::shared_ptr<const AnalysisCache> load(const std::string& key) {
+        const auto t0 = std::chrono::steady_clock::now();
+        fs::path prebaked, managed;
+        bool use_mmap;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            prebaked = prebaked_dir_;
+            managed  = dir_;
+            use_mmap = use_mmap_;
+        }
+        const std::string fname = key + ".vsc";
+
+        uint64_t bytes = 0;
+        std::shared_ptr<AnalysisCache> cache;
+        bool from_managed = false;
+        if (!prebaked.empty())
+            cache = load_cache(prebaked / fname, use_mmap, bytes);
+        if (!cache) {
+            cache = load_cache(managed / fname, use_mmap, bytes);
+            from_managed = static_cast<bool>(cache);
+        }
+        const double secs = std::chrono::duration<double>(
+            std::chrono::steady_clock::now() - t0).count();
+
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (!cache) {
+            ++stats_.misses;
+            return nullptr;
+        }
+        ++stats_.hits;
+        stats_.bytes_read   += static_cast<int64_t>(bytes);
+        stats_.load_seconds += secs;
+        if (from_managed && managed == dir_) {
+            scan_locked();
+            auto it = index_.find(fname);
+            if (it == index_.end()) {
+                it = index_.emplace(fname, Entry{bytes, 0}).first;
+                total_bytes_ += bytes;
+            }
+            it->second.tick = ++clock_;
+            std::error_code ec;
+            fs::last_write_time(dir_ / fname, fs::file_time_type::clock::now(), ec);
+        }
+        return cache;
+    }
+
+    void store(const std::string& key, const AnalysisCache& cache) {
+        fs::path managed;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            managed = dir_;
+        }
+        std::error_code ec;
+        fs::create_directories(managed, ec);
+        const std::string fname = key + ".vsc";
+        const uint64_t bytes = save_cache(managed / fname, cache);
+        if (bytes == 0) return;
+
+        std::lock_guard<std::mutex> lock(mutex_);
+        stats_.bytes_written += static_cast<int64_t>(bytes);
+        if (managed != dir_) return;
+        scan_locked();
+        auto it = index_.find(fname);
+        if (it != index_.end()) total_bytes_ -= it->second.bytes;
+        index_[fname] = Entry{bytes, ++clock_};
+        total_bytes_ += bytes;
+        evict_locked(fname);
+    }
+
+    void set_dir(const fs::path& dir) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        dir_ = dir.empty() ? fs::path("cache") : dir;
+        index_.clear();
+        total_bytes_ = 0;
+        scanned_ = false;
+    }
+
+    void set_prebaked_dir(const fs::path& dir) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        prebaked_dir_ = dir;
+    }
+
+    void set_limit(int64_t max_bytes) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        limit_ = std::max<int64_t>(0, max_bytes);
+        scan_locked();
+        evict_locked("");
+    }
+
+    void set_mmap(bool enable) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        use_mmap_ = enable;
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        std::error_code ec;
+        for (fs::directory_iterator it(dir_, ec), end; !ec && it != end; it.increment(ec)) {
+            if (it->path().extension() == ".vsc") fs::remove(it->path(), ec);
+        }
+        index_.clear();
+        total_bytes_ = 0;
+        scanned_ = true;
+    }
+
+    VoseCacheStats stats() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        scan_locked();
+        VoseCacheStats out = stats_;
+        out.entries      = static_cast<int64_t>(index_.size());
+        out.total_bytes  = static_cast<int64_t>(total_bytes_);
+        out.budget_bytes = limit_;
+        return out;
+    }
+
+    void reset_stats() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        stats_ = VoseCacheStats{};
+    }
+
+    void count_memory_hit() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        ++stats_.memory_hits;
+    }
+
+private:
+    struct Entry {
+        uint64_t bytes;
+        uint64_t tick;    // 大きいほど最近使った
+    };
+
+    void scan_locked() {
+        if (scanned_) return;
+        scanned_ = true;
+        std::vector<std::pair<fs::file_time_type, std::pair<std::string, uint64_t>>> found;
+        std::error_code ec;
+        for (fs::directory_iterator it(dir_, ec), end; !ec && it != end; it.increment(ec)) {
+            if (it->path().extension() != ".vsc") continue;
+            std::error_code fec;
+            const uint64_t bytes = it->file_size(fec);
+            const auto     mtime = it->last_write_time(fec);
+            if (!fec) found.push_back({mtime, {it->path().filename().string(), bytes}});
+        }
+        // 古い順に tick を振る（mtime が最終アクセス）
+        std::sort(found.begin(), found.end());
+        for (auto& f : found) {
+            if (index_.count(f.second.first)) continue;
+            index_[f.second.first] = Entry{f.second.second, ++clock_};
+            total_bytes_ += f.second.second;
+        }
+    }
+
+    void evict_locked(const std::string& keep) {
+        if (limit_ <= 0) return;
+        while (total_bytes_ > static_cast<uint64_t>(limit_) && index_.size() > 1) {
+            auto victim = index_.end();
+            for (auto it = index_.begin(); it != index_.end(); ++it) {
+                if (it->first == keep) continue;
+                if (victim == index_.end() || it->second.tick < victim->second.tick) victim = it;
+            }
+            if (victim == index_.end()) break;
+            std::error_code ec;
+            fs::remove(dir_ / victim->first, ec);   // mmap 中でも POSIX は実体が残る
+            total_bytes_ -= victim->second.bytes;
+            index_.erase(victim);
+            ++stats_.evictions;
+        }
+    }
+
+    std::mutex                   mutex_;
+    fs::path                     dir_          = "cache";
+    fs::path                     prebaked_dir_;         // pack_voice が事前に焼いた解析（読み取り専用）
+    int64_t                      limit_        = 0;     // 0 = 無制限
+    bool                         use_mmap_     = false;
+    bool                         scanned_      = false;
+    std::map<std::string, Entry> index_;
+    uint64_t                     total_bytes_  = 0;
+    uint64_t                     clock_        = 0;
+    VoseCacheStats               stats_        = {};
+};
+
+static DiskCacheManager g_disk_cache;
+
 // ============================================================
 // build_analysis_cache
 // ============================================================
@@ -276,50 +640,53 @@ build_analysis_cache(const EmbeddedVoice& ev, int fft_size, int spec_bins)
 
     const int wav_len     = static_cast<int>(ev.waveform.size());
     const int harvest_len = GetSamplesForHarvest(ev.fs, wav_len, kFramePeriod);
-    cache->f0.resize(harvest_len);
-    cache->time.resize(harvest_len);
     cache->length = harvest_len;
+    cache->owned.resize(AnalysisCache::doubles_for(harvest_len, spec_bins));
+
+    const size_t sc = static_cast<size_t>(harvest_len) * spec_bins;
+    double* f0        = cache->owned.data();
+    double* time_axis = f0 + harvest_len;
+    double* flat_spec = time_axis + harvest_len;
+    double* flat_ap   = flat_spec + sc;
 
-    Harvest(ev.waveform.data(), wav_len, ev.fs, &opt,
-            cache->time.data(), cache->f0.data());
+    Harvest(ev.waveform.data(), wav_len, ev.fs, &opt, time_axis, f0);
 
     {
         std::vector<int> vi;
         vi.reserve(harvest_len);
         for (int i = 0; i < harvest_len; ++i)
-            if (cache->f0[i] > 0.0) vi.push_back(i);
+            if (f0[i] > 0.0) vi.push_back(i);
 
         if (!vi.empty()) {
             for (int i = 0; i < vi.front(); ++i)
-                cache->f0[i] = cache->f0[vi.front()];
+                f0[i] = f0[vi.front()];
             for (int i = vi.back()+1; i < harvest_len; ++i)
-                cache->f0[i] = cache->f0[vi.back()];
+                f0[i] = f0[vi.back()];
             for (int v = 0; v+1 < static_cast<int>(vi.size()); ++v) {
                 const int ia = vi[v], ib = vi[v+1];
                 if (ib-ia <= 1) continue;
-                const double fa = cache->f0[ia], fb = cache->f0[ib];
+                const double fa = f0[ia], fb = f0[ib];
                 for (int i = ia+1; i < ib; ++i)
-                    cache->f0[i] = fa + static_cast<double>(i-ia)/(ib-ia)*(fb-fa);
+                    f0[i] = fa + static_cast<double>(i-ia)/(ib-ia)*(fb-fa);
             }
         } else {
-            std::fill(cache->f0.begin(), cache->f0.end(), 440.0);
+            std::fill(f0, f0 + harvest_len, 440.0);
         }
     }
 
-    const size_t sc = static_cast<size_t>(harvest_len) * spec_bins;
-    cache->flat_spec.resize(sc);
-    cache->flat_ap  .resize(sc);
-
     std::vector<double*> sp(harvest_len), ap(harvest_len);
     for (int i = 0; i < harvest_len; ++i) {
-        sp[i] = &cache->flat_spec[static_cast<size_t>(i)*spec_bins];
-        ap[i] = &cache->flat_ap  [static_cast<size_t>(i)*spec_bins];
+        sp[i] = &flat_spec[static_cast<size_t>(i)*spec_bins];
+        ap[i] = &flat_ap  [static_cast<size_t>(i)*spec_bins];
     }
     CheapTrick(ev.waveform.data(), wav_len, ev.fs,
-               cache->time.data(), cache->f0.data(), harvest_len, nullptr, sp.data());
+               time_axis, f0, harvest_len,
+               &cheaptrick_option(), sp.data());
     D4C(ev.waveform.data(), wav_len, ev.fs,
-        cache->time.data(), cache->f0.data(), harvest_len, fft_size, nullptr, ap.data());
+        time_axis, f0, harvest_len, fft_size,
+        &d4c_option(), ap.data());
 
+    cache->bind(cache->owned.data());
     return cache;
 }
 
@@ -333,12 +700,15 @@ get_or_analyze(std::shared_ptr<const EmbeddedVoice> ev_sp, int fft_size, int spe
     {
         std::shared_lock<std::shared_mutex> rlock(g_analysis_cache_mutex);
         auto it = g_analysis_cache.find(ev_sp);
-        if (it != g_analysis_cache.end()) return it->second;
+        if (it != g_analysis_cache.end()) {
+            g_disk_cache.count_memory_hit();
+            return it->second;
+        }
     }
 
-    const std::string h_str     = generate_cache_hash(ev_sp->path);
-    const fs::path    cache_file = get_cache_dir() / (h_str + ".vsc");
-    auto disk_cache = load_cache(cache_file);
+    const std::string h_str = ev_sp->path.empty() ? ev_sp->content_key
+                                                  : generate_cache_hash(ev_sp->path);
+    auto disk_cache = g_disk_cache.load(h_str);
 
     std::unique_lock<std::shared_mutex> wlock(g_analysis_cache_mutex);
     {
@@ -353,7 +723,7 @@ get_or_analyze(std::shared_ptr<const EmbeddedVoice> ev_sp, int fft_size, int spe
     auto cache = build_analysis_cache(*ev_sp, fft_size, spec_bins);
     g_analysis_cache[ev_sp] = cache;
     wlock.unlock();
-    save_cache(cache_file, *cache);
+    g_disk_cache.store(h_str, *cache);
     return cache;
 }
 
@@ -370,7 +740,8 @@ static double map_time(double t_out_ms, const OtoEntry& oto,
 {
     const double offset     = oto.offset;
     const double fixed      = oto.consonant;
-    const double cutoff_pos = (oto.cutoff < 0)
+    // 負（-0.0 を含む）は末尾からの距離。oto.ini の「右ブランク 0 = 末尾まで」は -0.0 で届く
+    const double cutoff_pos = std::signbit(oto.cutoff)
                               ? source_wav_len_ms + oto.cutoff : oto.cutoff;
     const double source_stretch = cutoff_pos - (offset + fixed);
     const double output_stretch = note_duration_ms - fixed;
@@ -679,52 +1050,27 @@ static void VOSE_Synthesis_local(
 }
 
 // ============================================================
-// extern "C" API
+// RenderPlan  — execute_render / execute_render_to_buffer 共通
+//
+// パス1（NotePrepass 構築）だけで出力サンプル数が確定するので、
+// query_render_length は合成せずにここまでで返す。
 // ============================================================
 
-extern "C" {
-
-void init_official_engine() { register_all_embedded_voices(); }
-
-DLLEXPORT void load_embedded_resource(const char* phoneme,
-                                      const int16_t* raw_data, int sample_count)
-{
-    if (!phoneme || !raw_data || sample_count <= 0) return;
-
-    auto ev = std::make_shared<EmbeddedVoice>();
-    ev->fs = kFs;
-    ev->waveform.resize(sample_count);
-    for (int i = 0; i < sample_count; ++i)
-        ev->waveform[i] = static_cast<double>(raw_data[i]) * kInv32768;
-
-    std::unique_lock<std::shared_mutex> clock(g_analysis_cache_mutex);
-    std::unique_lock<std::shared_mutex> wlock(g_voice_db_mutex);
-    auto old_it = g_voice_db.find(phoneme);
-    if (old_it != g_voice_db.end())
-        g_analysis_cache.erase(old_it->second);
-    g_voice_db[phoneme] = std::move(ev);
-}
-
-// ============================================================
-// execute_render  ★パス2-A スレッドセーフ化済み★
-// ============================================================
+struct RenderPlan {
+    std::vector<NotePrepass> prepass;
+    int64_t                  total_samples      = 0;   // 出力サンプル数
+    int64_t                  pre_buffer_samples = 0;   // 先行発声ぶんの前置バッファ
+};
 
-DLLEXPORT void execute_render(NoteEvent* notes, int note_count,
-                               const char* output_path, int mode_flag)
+static RenderPlan plan_render(const NoteEvent* notes, int note_count)
 {
-    if (!notes || note_count <= 0 || !output_path) return;
-
-    bool is_pro        = (mode_flag == 1);
-    int  out_bit_depth = is_pro ? 32 : 16;
-    int  out_fs        = kFs;
-
-    const int fft_size  = GetFFTSizeForCheapTrick(kFs, nullptr);
-    const int spec_bins = fft_size / 2 + 1;
+    RenderPlan plan;
+    plan.prepass.resize(note_count);
 
     // ----------------------------------------------------------------
     // パス1: NotePrepass 構築
     // ----------------------------------------------------------------
-    std::vector<NotePrepass> prepass(note_count);
+    std::vector<NotePrepass>& prepass = plan.prepass;
     int     max_harvest_len  = 0;
     int64_t total_samples    = 0;
     int     xfade_count      = 0;
@@ -744,12 +1090,12 @@ DLLEXPORT void execute_render(NoteEvent* notes, int note_count,
         const int64_t ns = note_samples_safe(pitch_len);
         auto ev = find_voice_ref(notes[i].wav_path);
 
-        const OtoEntry* found_oto = nullptr;
+        std::shared_ptr<const OtoEntry> found_oto;
         {
             std::shared_lock<std::shared_mutex> lock(g_oto_db_mutex);
             auto oto_it = g_oto_db.find(notes[i].wav_path);
             if (oto_it != g_oto_db.end()) {
-                found_oto = &oto_it->second;
+                found_oto = oto_it->second;
                 max_preutterance = std::max(max_preutterance,
                                             found_oto->preutterance);
             }
@@ -774,14 +1120,27 @@ DLLEXPORT void execute_render(NoteEvent* notes, int note_count,
     }
 
     total_samples -= static_cast<int64_t>(kCrossfadeSamples) * xfade_count;
-    if (total_samples <= 0) return;
+    if (total_samples <= 0) return plan;
+
+    plan.total_samples      = total_samples;
+    plan.pre_buffer_samples = static_cast<int64_t>(max_preutterance * kFs / 1000.0);
+    return plan;
+}
+
+// パス2: 合成して pre_buffer_samples + total_samples 長のバッファを返す
+static std::vector<double> render_plan(NoteEvent* notes, int note_count,
+                                       const RenderPlan& plan)
+{
+    const int fft_size  = cheaptrick_option().fft_size;
+    const int spec_bins = fft_size / 2 + 1;
 
-    const int64_t pre_buffer_samples =
-        static_cast<int64_t>(max_preutterance * kFs / 1000.0);
-    const int64_t buffer_total = total_samples + pre_buffer_samples;
+    const std::vector<NotePrepass>& prepass = plan.prepass;
+    const int64_t pre_buffer_samples = plan.pre_buffer_samples;
+    const int64_t buffer_total       = plan.total_samples + pre_buffer_samples;
 
     std::vector<double> full_song_buffer(buffer_total, 0.0);
 
+
     static const OtoEntry kDefaultOto = {};
 
     // ----------------------------------------------------------------
@@ -944,12 +1303,232 @@ DLLEXPORT void execute_render(NoteEvent* notes, int note_count,
         last_note_rendered = true;
     }
 
+    return full_song_buffer;
+}
+
+// ============================================================
+// extern "C" API
+// ============================================================
+
+extern "C" {
+
+void init_official_engine() { register_all_embedded_voices(); }
+
+DLLEXPORT void load_embedded_resource(const char* phoneme,
+                                      const int16_t* raw_data, int sample_count)
+{
+    if (!phoneme || !raw_data || sample_count <= 0) return;
+
+    auto ev = std::make_shared<EmbeddedVoice>();
+    ev->fs = kFs;
+    ev->content_key = generate_content_hash(raw_data, sample_count);
+    ev->waveform.resize(sample_count);
+    for (int i = 0; i < sample_count; ++i)
+        ev->waveform[i] = static_cast<double>(raw_data[i]) * kInv32768;
+
+    std::unique_lock<std::shared_mutex> clock(g_analysis_cache_mutex);
+    std::unique_lock<std::shared_mutex> wlock(g_voice_db_mutex);
+    auto old_it = g_voice_db.find(phoneme);
+    if (old_it != g_voice_db.end())
+        g_analysis_cache.erase(old_it->second);
+    g_voice_db[phoneme] = std::move(ev);
+}
+
+// 事前解析キャッシュのディレクトリを設定する（NULL / 空文字で解除）
+DLLEXPORT void set_analysis_cache_dir(const char* dir)
+{
+    g_disk_cache.set_prebaked_dir((dir && *dir) ? fs::path(dir) : fs::path());
+}
+
+// 内蔵音源 1 件を解析して cache_dir/<キー>.vsc に書く（レンダー時と同じ設定）。
+// グローバルな音源 DB・キャッシュには触れないので、複数プロセスから並列に呼べる。
+// key_out（17 バイト以上、NULL 可）にキーを返す。戻り値はフレーム数、失敗時 0
+DLLEXPORT int prebake_analysis(const int16_t* raw_data, int sample_count,
+                               const char* cache_dir, char* key_out)
+{
+    if (!raw_data || sample_count <= 0 || !cache_dir) return 0;
+
+    EmbeddedVoice ev;
+    ev.fs = kFs;
+    ev.content_key = generate_content_hash(raw_data, sample_count);
+    ev.waveform.resize(sample_count);
+    for (int i = 0; i < sample_count; ++i)
+        ev.waveform[i] = static_cast<double>(raw_data[i]) * kInv32768;
+
+    const int fft_size  = cheaptrick_option().fft_size;
+    const int spec_bins = fft_size / 2 + 1;
+    try {
+        fs::create_directories(cache_dir);
+        auto cache = build_analysis_cache(ev, fft_size, spec_bins);
+        if (save_cache(fs::path(cache_dir) / (ev.content_key + ".vsc"), *cache) == 0)
+            return 0;
+        if (key_out)
+            std::memcpy(key_out, ev.content_key.c_str(), ev.content_key.size() + 1);
+        return cache->length;
+    } catch (...) {
+        return 0;
+    }
+}
+
+// 音源と解析キャッシュを外す（Python 側の常駐 LRU から呼ばれる）。
+// レンダー中のスレッドは shared_ptr を保持しているので、その呼び出しが終わるまで実体は残る。
+DLLEXPORT void unload_embedded_resource(const char* phoneme)
+{
+    if (!phoneme) return;
+
+    std::unique_lock<std::shared_mutex> clock(g_analysis_cache_mutex);
+    std::unique_lock<std::shared_mutex> wlock(g_voice_db_mutex);
+    auto it = g_voice_db.find(phoneme);
+    if (it == g_voice_db.end()) return;
+    g_analysis_cache.erase(it->second);
+    g_voice_db.erase(it);
+}
+
+// ============================================================
+// execute_render  ★パス2-A スレッドセーフ化済み★
+// ============================================================
+
+DLLEXPORT void execute_render(NoteEvent* notes, int note_count,
+                               const char* output_path, int mode_flag)
+{
+    if (!notes || note_count <= 0 || !output_path) return;
+
+    bool is_pro        = (mode_flag == 1);
+    int  out_bit_depth = is_pro ? 32 : 16;
+    int  out_fs        = kFs;
+
+    const RenderPlan plan = plan_render(notes, note_count);
+    if (plan.total_samples <= 0) return;
+
+    std::vector<double> full_song_buffer = render_plan(notes, note_count, plan);
+
     // ----------------------------------------------------------------
     // WAV 書き出し
     // ----------------------------------------------------------------
-    wavwrite(full_song_buffer.data() + pre_buffer_samples,
-             static_cast<int>(total_samples),
+    wavwrite(full_song_buffer.data() + plan.pre_buffer_samples,
+             static_cast<int>(plan.total_samples),
              out_fs, out_bit_depth, output_path);
 }
 
+// ============================================================
+// メモリ出力 API
+//
+// query_render_length で長さを問い合わせ、呼び出し側が確保した
+// double バッファ（-1.0〜1.0 のモノラル PCM）に直接書き込む。
+// ============================================================
+
+DLLEXPORT int64_t query_render_length(const NoteEvent* notes, int note_count)
+{
+    if (!notes || note_count <= 0) return 0;
+    return plan_render(notes, note_count).total_samples;
+}
+
+DLLEXPORT int64_t execute_render_to_buffer(NoteEvent* notes, int note_count,
+                                           double* out, int64_t capacity)
+{
+    if (!notes || note_count <= 0) return 0;
+
+    const RenderPlan plan = plan_render(notes, note_count);
+    if (plan.total_samples <= 0) return 0;
+    if (!out || capacity <= 0) return plan.total_samples;
+
+    std::vector<double> full_song_buffer = render_plan(notes, note_count, plan);
+    std::copy_n(full_song_buffer.data() + plan.pre_buffer_samples,
+                std::min(plan.total_samples, capacity), out);
+    return plan.total_samples;
+}
+
+// ============================================================
+// resynthesize_block  — 録音クリップのピッチ・フォルマント編集
+//
+// 解析は world_analyze_batch（1 ジョブ）に任せ、音源レンダーと同じ
+// apply_gender_shift / apply_tension_breath で加工する。録音の無声区間を
+// 残したいので F0 補間やビブラート・ノイズ付加（VOSE_Synthesis）は行わない。
+// ============================================================
+
+DLLEXPORT int resynthesize_block(const double* x, int64_t length, int fs,
+                                 const VoseVoiceCurves* curves, double* y)
+{
+    if (!x || !y || length <= 0 || fs <= 0) return -1;
+
+    const VoseWorldOptions options{kFramePeriod, 50.0, 800.0, VOSE_F0_HARVEST, 1};
+    const int frames   = world_analysis_frames(&options, fs, length);
+    const int fft_size = world_analysis_fft_size(&options, fs);
+    if (frames <= 0 || fft_size <= 0) return -1;
+    const int spec_bins = fft_size / 2 + 1;
+    const size_t sc     = static_cast<size_t>(frames) * spec_bins;
+
+    std::vector<double> f0(frames), time_axis(frames), flat_spec(sc), flat_ap(sc);
+    VoseWorldJob job{x, length, fs, frames, time_axis.data(), f0.data(),
+                     flat_spec.data(), flat_ap.data(), fft_size, 0};
+    if (world_analyze_batch(&options, &job, 1) != 1) return job.status ? job.status : -1;
+
+    std::vector<double*> sp(frames), ap(frames);
+    for (int i = 0; i < frames; ++i) {
+        sp[i] = &flat_spec[static_cast<size_t>(i)*spec_bins];
+        ap[i] = &flat_ap  [static_cast<size_t>(i)*spec_bins];
+    }
+
+    if (curves && curves->length > 0) {
+        const int n = curves->length;
+        std::vector<double> tmp(spec_bins);
+        for (int j = 0; j < frames; ++j) {
+            if (curves->pitch_shift && f0[j] > 0.0)
+                f0[j] *= std::exp2(resample_curve(curves->pitch_shift, n, j, frames) / 12.0);
+            const double gender  = curves->gender
+                ? resample_curve(curves->gender,  n, j, frames) : 0.5;
+            const double tension = curves->tension
+                ? resample_curve(curves->tension, n, j, frames) : 0.5;
+            const double breath  = curves->breath
+                ? resample_curve(curves->breath,  n, j, frames) : 0.5;
+            apply_gender_shift  (sp[j], spec_bins, gender, tmp.data());
+            apply_tension_breath(sp[j], ap[j], spec_bins, tension, breath);
+        }
+    }
+
+    Synthesis(f0.data(), frames, sp.data(), ap.data(),
+              fft_size, kFramePeriod, fs, static_cast<int>(length), y);
+    return 0;
+}
+
+// ============================================================
+// ディスクキャッシュ管理
+// ============================================================
+
+DLLEXPORT void set_engine_cache_dir(const char* dir)
+{
+    g_disk_cache.set_dir((dir && *dir) ? fs::path(dir) : fs::path());
+}
+
+DLLEXPORT void set_engine_cache_limit(int64_t max_bytes)
+{
+    g_disk_cache.set_limit(max_bytes);
+}
+
+DLLEXPORT void set_engine_cache_mmap(int enable)
+{
+    g_disk_cache.set_mmap(enable != 0);
+}
+
+DLLEXPORT void get_engine_cache_stats(VoseCacheStats* out)
+{
+    if (out) *out = g_disk_cache.stats();
+}
+
+DLLEXPORT void reset_engine_cache_stats(void)
+{
+    g_disk_cache.reset_stats();
+}
+
+// メモリ上の解析結果とディスクキャッシュ（cache/ の .vsc）をすべて破棄する。
+// 事前解析ディレクトリには触れない
+DLLEXPORT void clear_engine_cache(void)
+{
+    {
+        std::unique_lock<std::shared_mutex> lock(g_analysis_cache_mutex);
+        g_analysis_cache.clear();
+    }
+    g_disk_cache.clear();
+}
+
 } // extern "C"
@@ -0,0 +1,135 @@
+//world_batch.cpp
+// ユーザー録音・取り込みクリップなど任意の音声を WORLD で一括解析する。
+// 出力配列は Python 側（NumPy）が確保し、ここでは直接書き込むだけにする。
+
+#include <vector>
+#include <algorithm>
+#include <atomic>
+#include <climits>
+#include <thread>
+#include "vose_core.h"
+
+#include "world/cheaptrick.h"
+#include "world/d4c.h"
+#include "world/dio.h"
+#include "world/harvest.h"
+#include "world/stonemask.h"
+
+// ============================================================
+// オプション
+// ============================================================
+
+static bool valid_options(const VoseWorldOptions* o) {
+    return o && o->frame_period > 0.0
+             && o->f0_floor > 0.0 && o->f0_ceil > o->f0_floor
+             && (o->f0_method == VOSE_F0_HARVEST || o->f0_method == VOSE_F0_DIO);
+}
+
+static CheapTrickOption cheaptrick_option_for(const VoseWorldOptions* o, int fs) {
+    CheapTrickOption ct;
+    InitializeCheapTrickOption(fs, &ct);
+    ct.f0_floor = o->f0_floor;
+    ct.fft_size = GetFFTSizeForCheapTrick(fs, &ct);
+    return ct;
+}
+
+extern "C" DLLEXPORT int world_analysis_frames(const VoseWorldOptions* options, int fs, int64_t length) {
+    if (!valid_options(options) || fs <= 0 || length <= 0 || length > INT_MAX) return -1;
+    const int n = static_cast<int>(length);
+    return options->f0_method == VOSE_F0_DIO
+        ? GetSamplesForDIO(fs, n, options->frame_period)
+        : GetSamplesForHarvest(fs, n, options->frame_period);
+}
+
+extern "C" DLLEXPORT int world_analysis_fft_size(const VoseWorldOptions* options, int fs) {
+    if (!valid_options(options) || fs <= 0) return -1;
+    return cheaptrick_option_for(options, fs).fft_size;
+}
+
+// ============================================================
+// 1 ジョブの解析
+// ============================================================
+
+static int analyze_job(const VoseWorldOptions* o, VoseWorldJob& job) {
+    const int frames = world_analysis_frames(o, job.fs, job.length);
+    if (!job.x || frames <= 0)              return -1;
+    if (job.frames != frames)               return -2;
+    if (!job.time || !job.f0)               return -3;
+    const bool spectral = job.spectrogram || job.aperiodicity;
+    const CheapTrickOption ct = cheaptrick_option_for(o, job.fs);
+    if (spectral && job.fft_size != ct.fft_size) return -4;
+
+    const int n = static_cast<int>(job.length);
+
+    if (o->f0_method == VOSE_F0_DIO) {
+        DioOption dio;
+        InitializeDioOption(&dio);
+        dio.frame_period = o->frame_period;
+        dio.f0_floor     = o->f0_floor;
+        dio.f0_ceil      = o->f0_ceil;
+        std::vector<double> raw(frames);
+        Dio(job.x, n, job.fs, &dio, job.time, raw.data());
+        StoneMask(job.x, n, job.fs, job.time, raw.data(), frames, job.f0);
+    } else {
+        HarvestOption harvest;
+        InitializeHarvestOption(&harvest);
+        harvest.frame_period = o->frame_period;
+        harvest.f0_floor     = o->f0_floor;
+        harvest.f0_ceil      = o->f0_ceil;
+        Harvest(job.x, n, job.fs, &harvest, job.time, job.f0);
+    }
+    if (!spectral) return 0;
+
+    // WORLD は行ポインタ配列を受け取るので、連続領域（frames × bins）の各行を指させる
+    const size_t bins = static_cast<size_t>(ct.fft_size / 2 + 1);
+    std::vector<double*> rows(frames);
+    if (job.spectrogram) {
+        for (int i = 0; i < frames; ++i) rows[i] = job.spectrogram + i * bins;
+        CheapTrick(job.x, n, job.fs, job.time, job.f0, frames, &ct, rows.data());
+    }
+    if (job.aperiodicity) {
+        D4COption d4c;
+        InitializeD4COption(&d4c);
+        for (int i = 0; i < frames; ++i) rows[i] = job.aperiodicity + i * bins;
+        D4C(job.x, n, job.fs, job.time, job.f0, frames, ct.fft_size, &d4c, rows.data());
+    }
+    return 0;
+}
+
+// ============================================================
+// 並列バッチ
+// ============================================================
+
+extern "C" DLLEXPORT int world_analyze_batch(const VoseWorldOptions* options, VoseWorldJob* jobs, int count) {
+    if (!jobs || count <= 0) return 0;
+    if (!valid_options(options)) {
+        for (int i = 0; i < count; ++i) jobs[i].status = -1;
+        return 0;
+    }
+
+    int workers = options->num_threads > 0
+        ? options->num_threads
+        : static_cast<int>(std::max(1u, std::thread::hardware_concurrency()));
+    workers = std::min(workers, count);
+
+    // 長さがばらつくので静的分割ではなく、共有カウンタから次のジョブを取らせる
+    std::atomic<int> next{0};
+    std::atomic<int> done{0};
+    auto worker = [&] {
+        for (int i = next++; i < count; i = next++) {
+            try {
+                jobs[i].status = analyze_job(options, jobs[i]);
+            } catch (...) {
+                jobs[i].status = -5;
+            }
+            if (jobs[i].status == 0) ++done;
+        }
+    };
+
+    std::vector<std::thread> pool;
+    pool.reserve(workers - 1);
+    for (int t = 1; t < workers; ++t) pool.emplace_back(worker);
+    worker();
+    for (auto& th : pool) th.join();
+    return done.load();
+}
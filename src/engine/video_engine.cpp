@@ -22,10 +22,12 @@
 #include <cassert>
 #include <iomanip>
 #include <cctype>
+#include <cstdio>
 
 extern "C" {
 #include <libavformat/avformat.h>
 #include <libavcodec/avcodec.h>
+#include <libavcodec/bsf.h>
 #include <libavutil/avutil.h>
 #include <libavutil/imgutils.h>
 #include <libavutil/opt.h>
@@ -235,6 +237,12 @@ VideoEngine::~VideoEngine() { releaseResources(); VOSE_LOG("Engine destroyed.");
 
 void VideoEngine::releaseResources() {
     if (swsCtx_)   { sws_freeContext(swsCtx_);     swsCtx_   = nullptr; }
+    if (grabSws_)  { sws_freeContext(grabSws_);    grabSws_  = nullptr; }
+    if (grabFrm_)  { av_frame_free(&grabFrm_); }
+    grabValid_ = false;
+    keyframeIdx_.clear();
+    frameIdx_.clear();
+    waveSum_   = WaveformSummary{};
     if (videoCtx_) { avcodec_free_context(&videoCtx_); }
     if (audioCtx_) { avcodec_free_context(&audioCtx_); }
     if (fmtCtx_)   { avformat_close_input(&fmtCtx_); }
@@ -309,6 +317,13 @@ double VideoEngine::fps()    const {
     AVRational r = fmtCtx_->streams[videoIdx_]->avg_frame_rate;
     return r.den ? av_q2d(r) : 0.0;
 }
+bool VideoEngine::videoTimeBase(int* num, int* den) const {
+    if (!loaded_ || videoIdx_ < 0 || !num || !den) return false;
+    const AVRational tb = fmtCtx_->streams[videoIdx_]->time_base;
+    *num = tb.num;
+    *den = tb.den;
+    return true;
+}
 double VideoEngine::duration() const {
     if (!loaded_) return 0.0;
     if (fmtCtx_->duration != AV_NOPTS_VALUE)
@@ -321,11 +336,23 @@ std::string VideoEngine::codecName() const {
 double VideoEngine::toSeconds(int64_t pts, AVRational tb) const {
     return static_cast<double>(pts) * av_q2d(tb);
 }
-void VideoEngine::reportProgress(double p, const std::string& stage) {
+bool VideoEngine::reportProgress(double p, const std::string& stage) {
+    const auto now = std::chrono::steady_clock::now();
+    if (p < 1.0 && now - lastReport_ < std::chrono::milliseconds(50)) return true;
+    lastReport_ = now;
     if (progressCb_) progressCb_(std::min(p, 1.0), stage);
+    return !(cancelCb_ && cancelCb_());
+}
+
+// 有効エントリの合計尺（書き出しループの進捗の分母）
+static double totalDuration(const std::vector<EDLEntry>& entries) {
+    double total = 0.0;
+    for (const auto& e : entries) total += e.duration();
+    return total > 0.0 ? total : 1.0;
 }
 bool VideoEngine::seekAndFlush(double timeSec) {
     if (!loaded_) return false;
+    grabValid_ = false;
     int ret = -1;
     if (videoIdx_ >= 0) {
         AVStream* vs = fmtCtx_->streams[videoIdx_];
@@ -409,13 +436,68 @@ bool VideoEngine::saveFrame(double timeSec, const std::string& outPath) {
     return true;
 }
 
+bool VideoEngine::grabFrame(double timeSec, uint8_t* dst, int dstW, int dstH, int dstStride) {
+    if (!loaded_ || videoIdx_ < 0 || !dst || dstW <= 0 || dstH <= 0 || dstStride < dstW * 4)
+        return false;
+    AVStream*    vs   = fmtCtx_->streams[videoIdx_];
+    const double fps  = this->fps();
+    const double half = fps > 0.0 ? 0.5 / fps : 0.001;
+    if (!grabFrm_) grabFrm_ = av_frame_alloc();
+
+    bool have = grabValid_ && std::abs(timeSec - grabSec_) < half;   // 同じフレーム → 縮小し直すだけ
+    if (!have) {
+        const bool forward = grabValid_ && timeSec > grabSec_ &&
+            (keyframeIdx_.empty() ? timeSec - grabSec_ < 1.0
+                                  : findNearestKeyframe(timeSec) <= grabSec_ + half);
+        if (!forward) seekAndFlush(keyframeIdx_.empty() ? timeSec : findNearestKeyframe(timeSec));
+        grabValid_ = false;
+
+        AVPacket* pkt = av_packet_alloc();
+        bool eof = false;
+        while (true) {
+            const int r = avcodec_receive_frame(videoCtx_, grabFrm_);
+            if (r == 0) {
+                const double t = toSeconds(grabFrm_->best_effort_timestamp, vs->time_base);
+                if (t >= timeSec - half) { grabSec_ = t; have = true; break; }
+                av_frame_unref(grabFrm_);
+                continue;
+            }
+            if (r != AVERROR(EAGAIN) || eof) break;
+            if (av_read_frame(fmtCtx_, pkt) < 0) {
+                avcodec_send_packet(videoCtx_, nullptr);   // 末尾: 残りを吐き出させる
+                eof = true;
+                continue;
+            }
+            if (pkt->stream_index == videoIdx_) avcodec_send_packet(videoCtx_, pkt);
+            av_packet_unref(pkt);
+        }
+        av_packet_free(&pkt);
+        if (!have) return false;
+    }
+
+    grabSws_ = sws_getCachedContext(grabSws_, grabFrm_->width, grabFrm_->height,
+                                    static_cast<AVPixelFormat>(grabFrm_->format),
+                                    dstW, dstH, AV_PIX_FMT_RGB32,
+                                    SWS_BILINEAR, nullptr, nullptr, nullptr);
+    if (!grabSws_) return false;
+    uint8_t* dstData[4] = {dst, nullptr, nullptr, nullptr};
+    int      dstLine[4] = {dstStride, 0, 0, 0};
+    sws_scale(grabSws_, grabFrm_->data, grabFrm_->linesize, 0, grabFrm_->height, dstData, dstLine);
+    grabValid_ = true;
+    return true;
+}
+
 // ════════════════════════════════════════════════════════════════════
-//  Phase 1: extractWaveform()
+//  Phase 1: extractWaveform() / waveformRange()
+//  音声は 1 回だけデコードして kWaveBlock サンプルごとの min / max / 二乗和に畳み、
+//  以降の要求（任意の時間範囲・解像度）はこの要約から集計する
 // ════════════════════════════════════════════════════════════════════
 
-WaveformData VideoEngine::extractWaveform(int chunks) {
-    WaveformData result;
-    if (!loaded_ || audioIdx_ < 0) return result;
+static constexpr int kWaveBlock = 256;   // 48kHz で約 5.3ms。1 時間で約 67 万ブロック × 12 バイト
+
+bool VideoEngine::buildWaveformSummary() {
+    if (!waveSum_.mx.empty()) return true;
+    if (!loaded_ || audioIdx_ < 0) return false;
 
     SwrContext* swr = swr_alloc();
     AVChannelLayout in_layout;
@@ -433,32 +515,54 @@ WaveformData VideoEngine::extractWaveform(int chunks) {
         VOSE_ERR("swr_init 失敗");
         swr_free(&swr);
         av_channel_layout_uninit(&in_layout);
-        return result;
+        return false;
     }
     av_channel_layout_uninit(&in_layout);
 
     avformat_seek_file(fmtCtx_, audioIdx_, 0, 0, 0, 0);
     avcodec_flush_buffers(audioCtx_);
-
-    double dur = duration();
-    std::vector<float> allSamples;
-    allSamples.reserve(static_cast<size_t>(
-        audioCtx_->sample_rate * std::max(dur, 1.0)) + 1024);
+    grabValid_ = false;
+
+    WaveformSummary sum;
+    sum.sample_rate = audioCtx_->sample_rate;
+    const size_t expect = static_cast<size_t>(sum.sample_rate * std::max(duration(), 1.0)) / kWaveBlock + 1;
+    sum.mn.reserve(expect);
+    sum.mx.reserve(expect);
+    sum.sq.reserve(expect);
+
+    float  mn = 0.0f, mx = 0.0f;
+    double sq = 0.0;
+    int    fill = 0;
+    auto push = [&](const float* x, int n) {
+        for (int i = 0; i < n; i++) {
+            const float v = x[i];
+            if (v > mx) mx = v;
+            if (v < mn) mn = v;
+            sq += static_cast<double>(v) * v;
+            if (++fill == kWaveBlock) {
+                sum.mn.push_back(mn);
+                sum.mx.push_back(mx);
+                sum.sq.push_back(static_cast<float>(sq));
+                mn = mx = 0.0f; sq = 0.0; fill = 0;
+            }
+        }
+        sum.samples += n;
+    };
 
     AVPacket* pkt   = av_packet_alloc();
     AVFrame*  frame = av_frame_alloc();
+    std::vector<float> converted;
 
     while (av_read_frame(fmtCtx_, pkt) >= 0) {
         if (pkt->stream_index == audioIdx_) {
             if (avcodec_send_packet(audioCtx_, pkt) == 0) {
                 while (avcodec_receive_frame(audioCtx_, frame) == 0) {
                     int n = frame->nb_samples;
-                    std::vector<float> converted(static_cast<size_t>(n));
+                    converted.resize(static_cast<size_t>(n));
                     uint8_t* outPtr = reinterpret_cast<uint8_t*>(converted.data());
-                    swr_convert(swr, &outPtr, n,
-                                const_cast<const uint8_t**>(frame->extended_data), n);
-                    allSamples.insert(allSamples.end(),
-                                      converted.begin(), converted.end());
+                    int got = swr_convert(swr, &outPtr, n,
+                                          const_cast<const uint8_t**>(frame->extended_data), n);
+                    if (got > 0) push(converted.data(), got);
                     av_frame_unref(frame);
                 }
             }
@@ -469,36 +573,60 @@ WaveformData VideoEngine::extractWaveform(int chunks) {
     av_packet_free(&pkt);
     swr_free(&swr);
 
-    if (allSamples.empty()) return result;
+    if (fill > 0) {
+        sum.mn.push_back(mn);
+        sum.mx.push_back(mx);
+        sum.sq.push_back(static_cast<float>(sq));
+    }
+    if (sum.samples == 0) return false;
+    VOSE_LOG("波形要約: " << sum.mx.size() << " blocks / " << sum.samples << " samples");
+    waveSum_ = std::move(sum);
+    return true;
+}
 
-    result.sample_rate  = audioCtx_->sample_rate;
+int VideoEngine::waveformRange(double t0, double t1, int bins,
+                               float* mins, float* maxs, float* rms) {
+    if (bins <= 0 || t1 <= t0 || !buildWaveformSummary()) return 0;
+    const WaveformSummary& w = waveSum_;
+    const size_t nb       = w.mx.size();
+    const double blockSec = static_cast<double>(kWaveBlock) / w.sample_rate;
+    const int64_t lastLen = w.samples - static_cast<int64_t>(nb - 1) * kWaveBlock;
+
+    for (int i = 0; i < bins; i++) {
+        const double a = t0 + (t1 - t0) * i / bins;
+        const double b = t0 + (t1 - t0) * (i + 1) / bins;
+        // ブロックより細かい要求は、そのブロックの値を繰り返す
+        const size_t ba = static_cast<size_t>(std::max(0.0, std::floor(a / blockSec)));
+        const size_t bb = std::min(nb, std::max(ba + 1, static_cast<size_t>(std::ceil(b / blockSec))));
+        float  mn = 0.0f, mx = 0.0f;
+        double sq = 0.0;
+        int64_t count = 0;
+        for (size_t k = ba; k < bb; k++) {
+            mn = std::min(mn, w.mn[k]);
+            mx = std::max(mx, w.mx[k]);
+            sq += w.sq[k];
+            count += k + 1 == nb ? lastLen : kWaveBlock;
+        }
+        if (mins) mins[i] = mn;
+        if (maxs) maxs[i] = mx;
+        if (rms)  rms[i]  = count > 0 ? static_cast<float>(std::sqrt(sq / count)) : 0.0f;
+    }
+    return bins;
+}
+
+WaveformData VideoEngine::extractWaveform(int chunks) {
+    WaveformData result;
+    if (chunks <= 0 || !buildWaveformSummary()) return result;
+
+    result.sample_rate  = waveSum_.sample_rate;
     result.channels     = 1;
-    result.duration_sec = dur;
+    result.duration_sec = static_cast<double>(waveSum_.samples) / waveSum_.sample_rate;
     result.chunks       = chunks;
     result.peaks_max.assign(chunks, 0.0f);
     result.peaks_min.assign(chunks, 0.0f);
     result.rms.assign(chunks, 0.0f);
-
-    size_t total     = allSamples.size();
-    size_t chunkSize = std::max<size_t>(1, total / static_cast<size_t>(chunks));
-
-    for (int c = 0; c < chunks; c++) {
-        size_t start = static_cast<size_t>(c) * chunkSize;
-        size_t end   = std::min(start + chunkSize, total);
-        if (start >= total) break;
-        float maxV = 0.0f, minV = 0.0f, sumSq = 0.0f;
-        for (size_t i = start; i < end; i++) {
-            float s = allSamples[i];
-            if (s >  maxV) maxV  = s;
-            if (s <  minV) minV  = s;
-            sumSq += s * s;
-        }
-        result.peaks_max[c] = maxV;
-        result.peaks_min[c] = minV;
-        result.rms[c]       = std::sqrt(sumSq / static_cast<float>(end - start));
-    }
-
-    VOSE_LOG("波形生成: " << chunks << " chunks / " << allSamples.size() << " samples");
+    waveformRange(0.0, result.duration_sec, chunks,
+                  result.peaks_min.data(), result.peaks_max.data(), result.rms.data());
     return result;
 }
 
@@ -509,6 +637,8 @@ WaveformData VideoEngine::extractWaveform(int chunks) {
 std::vector<KeyframeIndex> VideoEngine::buildKeyframeIndex() {
     if (!loaded_ || videoIdx_ < 0) return {};
     keyframeIdx_.clear();
+    frameIdx_.clear();
+    grabValid_ = false;
 
     avformat_seek_file(fmtCtx_, videoIdx_, 0, 0, 0, AVSEEK_FLAG_BACKWARD);
     avcodec_flush_buffers(videoCtx_);
@@ -516,8 +646,17 @@ std::vector<KeyframeIndex> VideoEngine::buildKeyframeIndex() {
     AVStream* vs  = fmtCtx_->streams[videoIdx_];
     AVPacket* pkt = av_packet_alloc();
     double    dur = duration();
-
-    while (av_read_frame(fmtCtx_, pkt) >= 0) {
+    bool cancelled = false;
+
+    while (!cancelled && av_read_frame(fmtCtx_, pkt) >= 0) {
+        if (pkt->stream_index == videoIdx_) {
+            FrameIndexEntry fe;
+            fe.pts      = pkt->pts != AV_NOPTS_VALUE ? pkt->pts : pkt->dts;
+            fe.file_pos = pkt->pos;
+            fe.flags    = (pkt->flags & AV_PKT_FLAG_KEY) ? 1 : 0;
+            fe.size     = pkt->size;
+            if (fe.pts != AV_NOPTS_VALUE) frameIdx_.push_back(fe);
+        }
         if (pkt->stream_index == videoIdx_ && (pkt->flags & AV_PKT_FLAG_KEY)) {
             KeyframeIndex kf;
             kf.pts_raw     = pkt->pts;
@@ -525,16 +664,46 @@ std::vector<KeyframeIndex> VideoEngine::buildKeyframeIndex() {
             kf.pts_seconds = toSeconds(pkt->pts, vs->time_base);
             kf.file_pos    = avio_tell(fmtCtx_->pb);
             keyframeIdx_.push_back(kf);
-            if (dur > 0.0) reportProgress(kf.pts_seconds / dur, "キーフレームインデックス");
+            if (dur > 0.0 && !reportProgress(kf.pts_seconds / dur, "キーフレームインデックス"))
+                cancelled = true;
         }
         av_packet_unref(pkt);
     }
     av_packet_free(&pkt);
+    if (cancelled) {
+        // 途中までの索引は findNearestKeyframe を誤らせるので捨てる
+        keyframeIdx_.clear();
+        frameIdx_.clear();
+        VOSE_LOG("キーフレームインデックス中止");
+        return {};
+    }
+    // パケットはデコード順なので、表示順（PTS 順）に並べ直す
+    std::stable_sort(frameIdx_.begin(), frameIdx_.end(),
+                     [](const FrameIndexEntry& a, const FrameIndexEntry& b) { return a.pts < b.pts; });
     VOSE_LOG("キーフレーム数: " << keyframeIdx_.size());
     reportProgress(1.0, "インデックス完了");
     return keyframeIdx_;
 }
 
+bool VideoEngine::setFrameIndex(const FrameIndexEntry* entries, int count) {
+    if (!loaded_ || videoIdx_ < 0 || !entries || count <= 0) return false;
+    AVStream* vs = fmtCtx_->streams[videoIdx_];
+    frameIdx_.assign(entries, entries + count);
+    keyframeIdx_.clear();
+    for (const auto& fe : frameIdx_) {
+        if (!(fe.flags & 1)) continue;
+        KeyframeIndex kf;
+        kf.pts_raw     = fe.pts;
+        kf.dts_raw     = AV_NOPTS_VALUE;
+        kf.pts_seconds = toSeconds(fe.pts, vs->time_base);
+        kf.file_pos    = fe.file_pos;
+        keyframeIdx_.push_back(kf);
+    }
+    VOSE_LOG("フレームインデックス読込: " << frameIdx_.size() << " フレーム / キーフレーム "
+             << keyframeIdx_.size());
+    return !keyframeIdx_.empty();
+}
+
 double VideoEngine::findNearestKeyframe(double timeSec) const {
     if (keyframeIdx_.empty()) return timeSec;
     auto it = std::upper_bound(
@@ -588,10 +757,13 @@ bool VideoEngine::exportFromEDL(const EDL& edl, const std::string& outPath) {
     std::vector<int64_t> ptsOffsets(outIdx, 0);
     std::vector<int64_t> firstPts(outIdx, AV_NOPTS_VALUE);
     std::vector<bool>    firstPktSeen(outIdx, false);
+    const double total = totalDuration(entries);
+    double doneSec   = 0.0;
+    bool   cancelled = false;
 
-    for (size_t ei = 0; ei < entries.size(); ei++) {
+    for (size_t ei = 0; ei < entries.size() && !cancelled; ei++) {
         const auto& entry = entries[ei];
-        reportProgress(static_cast<double>(ei) / entries.size(), "エクスポート中");
+        if (!reportProgress(doneSec / total, "エクスポート中")) { cancelled = true; break; }
 
         double seekTarget = !keyframeIdx_.empty()
                           ? findNearestKeyframe(entry.in_point)
@@ -618,6 +790,10 @@ bool VideoEngine::exportFromEDL(const EDL& edl, const std::string& outPath) {
                 if (si == videoIdx_) { av_packet_unref(pkt); break; }
                 av_packet_unref(pkt); continue;
             }
+            if (si == videoIdx_ &&
+                !reportProgress((doneSec + pktSec - entry.in_point) / total, "エクスポート中")) {
+                av_packet_unref(pkt); cancelled = true; break;
+            }
 
             if (!firstPktSeen[oi] && pkt->pts != AV_NOPTS_VALUE) {
                 firstPts[oi]     = av_rescale_q(pkt->pts,
@@ -650,11 +826,17 @@ bool VideoEngine::exportFromEDL(const EDL& edl, const std::string& outPath) {
             ptsOffsets[oi2] += static_cast<int64_t>(
                 entry.duration() / av_q2d(outs->time_base));
         }
+        doneSec += entry.duration();
     }
 
     av_write_trailer(outFmt);
     if (!(outFmt->oformat->flags & AVFMT_NOFILE)) avio_closep(&outFmt->pb);
     avformat_free_context(outFmt);
+    if (cancelled) {
+        std::remove(outPath.c_str());
+        VOSE_LOG("EDLエクスポート中止: " << outPath);
+        return false;
+    }
     VOSE_LOG("EDLエクスポート完了: " << outPath);
     reportProgress(1.0, "完了");
     return true;
@@ -985,9 +1167,13 @@ bool VideoEngine::exportWithSubtitles(const EDL& edl,
         }
     };
 
-    for (size_t ei = 0; ei < entries.size(); ei++) {
+    const double total = totalDuration(entries);
+    double doneSec   = 0.0;
+    bool   cancelled = false;
+
+    for (size_t ei = 0; ei < entries.size() && !cancelled; ei++) {
         const auto& entry = entries[ei];
-        reportProgress(static_cast<double>(ei) / entries.size(), "字幕付きエンコード中");
+        if (!reportProgress(doneSec / total, "字幕付きエンコード中")) { cancelled = true; break; }
 
         double seekTarget = !keyframeIdx_.empty()
                           ? findNearestKeyframe(entry.in_point) : entry.in_point;
@@ -999,6 +1185,9 @@ bool VideoEngine::exportWithSubtitles(const EDL& edl,
                                            fmtCtx_->streams[videoIdx_]->time_base);
                 if (pktSec < entry.in_point - 0.002) { av_packet_unref(inPkt); continue; }
                 if (pktSec >= entry.out_point)        { av_packet_unref(inPkt); break; }
+                if (!reportProgress((doneSec + pktSec - entry.in_point) / total, "字幕付きエンコード中")) {
+                    av_packet_unref(inPkt); cancelled = true; break;
+                }
 
                 if (avcodec_send_packet(videoCtx_, inPkt) == 0) {
                     while (avcodec_receive_frame(videoCtx_, decFrame) == 0) {
@@ -1034,6 +1223,7 @@ bool VideoEngine::exportWithSubtitles(const EDL& edl,
             audioOff += static_cast<int64_t>(
                 entry.duration() / av_q2d(outAStream->time_base));
         }
+        doneSec += entry.duration();
     }
 
     av_write_trailer(outFmt);
@@ -1052,6 +1242,11 @@ bool VideoEngine::exportWithSubtitles(const EDL& edl,
     // 一時 ASS ファイル削除
     std::remove(assPath.c_str());
 
+    if (cancelled) {
+        std::remove(outPath.c_str());
+        VOSE_LOG("字幕付きエクスポート中止: " << outPath);
+        return false;
+    }
     VOSE_LOG("字幕付きエクスポート完了: " << outPath);
     reportProgress(1.0, "完了");
     return true;
@@ -1173,9 +1368,13 @@ bool VideoEngine::exportWithVideoToolbox(const EDL& edl,
         }
     };
 
-    for (size_t ei = 0; ei < entries.size(); ei++) {
+    const double total = totalDuration(entries);
+    double doneSec   = 0.0;
+    bool   cancelled = false;
+
+    for (size_t ei = 0; ei < entries.size() && !cancelled; ei++) {
         const auto& entry = entries[ei];
-        reportProgress(static_cast<double>(ei) / entries.size(), "HWエンコード中");
+        if (!reportProgress(doneSec / total, "HWエンコード中")) { cancelled = true; break; }
 
         double seekTarget = !keyframeIdx_.empty()
                           ? findNearestKeyframe(entry.in_point) : entry.in_point;
@@ -1187,6 +1386,9 @@ bool VideoEngine::exportWithVideoToolbox(const EDL& edl,
                                            fmtCtx_->streams[videoIdx_]->time_base);
                 if (pktSec < entry.in_point - 0.002) { av_packet_unref(inPkt); continue; }
                 if (pktSec >= entry.out_point)        { av_packet_unref(inPkt); break; }
+                if (!reportProgress((doneSec + pktSec - entry.in_point) / total, "HWエンコード中")) {
+                    av_packet_unref(inPkt); cancelled = true; break;
+                }
 
                 if (avcodec_send_packet(videoCtx_, inPkt) == 0) {
                     while (avcodec_receive_frame(videoCtx_, decFrame) == 0) {
@@ -1230,6 +1432,7 @@ bool VideoEngine::exportWithVideoToolbox(const EDL& edl,
             audioOff += static_cast<int64_t>(
                 entry.duration() / av_q2d(outAStream->time_base));
         }
+        doneSec += entry.duration();
     }
 
     av_write_trailer(outFmt);
@@ -1242,11 +1445,394 @@ bool VideoEngine::exportWithVideoToolbox(const EDL& edl,
     if (!(outFmt->oformat->flags & AVFMT_NOFILE)) avio_closep(&outFmt->pb);
     avformat_free_context(outFmt);
 
+    if (cancelled) {
+        std::remove(outPath.c_str());
+        VOSE_LOG("HWエクスポート中止: " << outPath);
+        return false;
+    }
     VOSE_LOG("HWエクスポート完了: " << outPath);
     reportProgress(1.0, "完了");
     return true;
 }
 
+// ════════════════════════════════════════════════════════════════════
+//  Phase 6: exportSmartCut()
+//    エントリ [in, out) を キーフレーム K1（in 以上の最初）/ K2（out 以下の最後）で
+//    [in, K1) 再エンコード + [K1, K2) ストリームコピー + [K2, out) 再エンコード に分ける。
+//    コピー側は *_mp4toannexb で Annex-B に揃え、再エンコード側もパラメータセットを
+//    インバンドで出すので、1 本のビデオストリームとして混在できる。
+// ════════════════════════════════════════════════════════════════════
+
+bool VideoEngine::exportSmartCut(const EDL& edl, const std::string& outPath,
+                                 int crfQuality, SmartCutReport* report) {
+    SmartCutReport rep{};
+    auto finish = [&](bool ok) {
+        if (report) *report = rep;
+        return ok;
+    };
+    if (!loaded_ || videoIdx_ < 0) return finish(false);
+    auto entries = edl.getEnabledEntries();
+    if (entries.empty()) return finish(false);
+    if (keyframeIdx_.empty()) buildKeyframeIndex();
+
+    AVStream* inV = fmtCtx_->streams[videoIdx_];
+    AVStream* inA = audioIdx_ >= 0 ? fmtCtx_->streams[audioIdx_] : nullptr;
+    const AVCodecID codecId = inV->codecpar->codec_id;
+    rep.entries = static_cast<int>(entries.size());
+
+    // 再エンコード区間は元と同じコーデックで作る（CRF を指定できるエンコーダを優先）
+    const AVCodec* encoder =
+        codecId == AV_CODEC_ID_H264 ? avcodec_find_encoder_by_name("libx264") :
+        codecId == AV_CODEC_ID_HEVC ? avcodec_find_encoder_by_name("libx265") : nullptr;
+    if (!encoder) encoder = avcodec_find_encoder(codecId);
+    if (!encoder || keyframeIdx_.empty()) {
+        VOSE_LOG("スマートカット非対応 (" << codecName() << ") → 全体を再エンコード");
+        rep.full_reencode = 1;
+        for (const auto& e : entries) rep.reencoded_sec += e.duration();
+        return finish(exportWithVideoToolbox(edl, outPath, crfQuality));
+    }
+
+    // コピーするパケットを Annex-B へ（mp4/mov 由来の avcC / hvcC の場合のみ）
+    AVBSFContext* bsf = nullptr;
+    const char* bsfName = codecId == AV_CODEC_ID_H264 ? "h264_mp4toannexb"
+                        : codecId == AV_CODEC_ID_HEVC ? "hevc_mp4toannexb" : nullptr;
+    if (bsfName && inV->codecpar->extradata_size > 0 && inV->codecpar->extradata[0] == 1) {
+        const AVBitStreamFilter* filter = av_bsf_get_by_name(bsfName);
+        if (filter && av_bsf_alloc(filter, &bsf) == 0) {
+            avcodec_parameters_copy(bsf->par_in, inV->codecpar);
+            bsf->time_base_in = inV->time_base;
+            if (av_bsf_init(bsf) < 0) av_bsf_free(&bsf);
+        }
+    }
+
+    AVFormatContext* outFmt = nullptr;
+    int ret = avformat_alloc_output_context2(&outFmt, nullptr, nullptr, outPath.c_str());
+    if (ret < 0 || !outFmt) {
+        VOSE_ERR("出力コンテキスト生成失敗: " << avErr(ret));
+        av_bsf_free(&bsf);
+        return finish(false);
+    }
+    AVStream* outV = avformat_new_stream(outFmt, nullptr);
+    avcodec_parameters_copy(outV->codecpar, bsf ? bsf->par_out : inV->codecpar);
+    outV->codecpar->codec_tag = 0;
+    outV->time_base = inV->time_base;
+    AVStream* outA = nullptr;
+    if (inA) {
+        outA = avformat_new_stream(outFmt, nullptr);
+        avcodec_parameters_copy(outA->codecpar, inA->codecpar);
+        outA->codecpar->codec_tag = 0;
+        outA->time_base = inA->time_base;
+    }
+    if (!(outFmt->oformat->flags & AVFMT_NOFILE)) {
+        ret = avio_open(&outFmt->pb, outPath.c_str(), AVIO_FLAG_WRITE);
+        if (ret < 0) {
+            VOSE_ERR("avio_open 失敗: " << avErr(ret));
+            avformat_free_context(outFmt);
+            av_bsf_free(&bsf);
+            return finish(false);
+        }
+    }
+    ret = avformat_write_header(outFmt, nullptr);
+    if (ret < 0) {
+        VOSE_ERR("ヘッダ書き込み失敗: " << avErr(ret));
+        if (!(outFmt->oformat->flags & AVFMT_NOFILE)) avio_closep(&outFmt->pb);
+        avformat_free_context(outFmt);
+        av_bsf_free(&bsf);
+        return finish(false);
+    }
+
+    AVPacket* inPkt  = av_packet_alloc();
+    AVPacket* outPkt = av_packet_alloc();
+    AVFrame*  frame  = av_frame_alloc();
+    bool ok = true;
+
+    // 編集点をまたいで DTS が逆行しないように詰める
+    int64_t lastDts[2] = {INT64_MIN, INT64_MIN};
+    auto writePacket = [&](AVPacket* p, int oi) {
+        if (p->dts != AV_NOPTS_VALUE) {
+            if (lastDts[oi] != INT64_MIN && p->dts <= lastDts[oi]) p->dts = lastDts[oi] + 1;
+            if (p->pts != AV_NOPTS_VALUE && p->pts < p->dts) p->pts = p->dts;
+            lastDts[oi] = p->dts;
+        }
+        p->stream_index = oi;
+        p->pos          = -1;
+        if (av_interleaved_write_frame(outFmt, p) < 0) ok = false;
+    };
+    // 元の秒 t を出力の (t - entryIn + offsetSec) へ写すためのずれ（tb 単位）
+    auto shiftFor = [](double entryIn, double offsetSec, AVRational tb) {
+        return static_cast<int64_t>(std::llround((offsetSec - entryIn) / av_q2d(tb)));
+    };
+
+    const double fps = this->fps();
+    const double eps = fps > 0.0 ? 0.5 / fps : 0.002;
+
+    // 元の秒 t（entryIn から始まるエントリ内）まで進んだことを通知する。中止要求なら ok を落とす
+    const double total = totalDuration(entries);
+    bool cancelled = false;
+    auto tick = [&](double t, double entryIn, double offsetSec) {
+        if (!reportProgress((offsetSec + t - entryIn) / total, "スマートカット書き出し中")) {
+            cancelled = true;
+            ok = false;
+        }
+    };
+
+    // [a, b) をデコードして再エンコードする
+    auto reencodeSpan = [&](double a, double b, double entryIn, double offsetSec) {
+        AVCodecContext* enc = avcodec_alloc_context3(encoder);
+        enc->width                  = videoCtx_->width;
+        enc->height                 = videoCtx_->height;
+        enc->pix_fmt                = videoCtx_->pix_fmt;
+        enc->sample_aspect_ratio    = videoCtx_->sample_aspect_ratio;
+        enc->color_range            = inV->codecpar->color_range;
+        enc->color_primaries        = inV->codecpar->color_primaries;
+        enc->color_trc              = inV->codecpar->color_trc;
+        enc->colorspace             = inV->codecpar->color_space;
+        enc->time_base              = inV->time_base;
+        enc->framerate              = inV->avg_frame_rate;
+        enc->profile                = inV->codecpar->profile;
+        enc->level                  = inV->codecpar->level;
+        enc->max_b_frames           = 0;   // 編集点の DTS を単純にする
+        enc->gop_size               = 600;
+        av_opt_set    (enc->priv_data, "preset", "medium",   0);
+        av_opt_set_int(enc->priv_data, "crf",    crfQuality, AV_OPT_SEARCH_CHILDREN);
+        if (avcodec_open2(enc, encoder, nullptr) < 0) {
+            VOSE_ERR("スマートカット用エンコーダ初期化失敗");
+            avcodec_free_context(&enc);
+            ok = false;
+            return;
+        }
+
+        const int64_t shift = shiftFor(entryIn, offsetSec, inV->time_base);
+        bool done = false;
+        auto drainEncoder = [&]() {
+            while (avcodec_receive_packet(enc, outPkt) == 0) {
+                av_packet_rescale_ts(outPkt, enc->time_base, outV->time_base);
+                writePacket(outPkt, 0);
+                av_packet_unref(outPkt);
+            }
+        };
+        auto takeFrames = [&]() {
+            while (avcodec_receive_frame(videoCtx_, frame) == 0) {
+                const int64_t ts = frame->best_effort_timestamp;
+                const double  t  = toSeconds(ts, inV->time_base);
+                if (t >= b - eps) {
+                    done = true;
+                } else if (t >= a - eps) {
+                    frame->pts       = ts + shift;
+                    frame->pict_type = AV_PICTURE_TYPE_NONE;
+                    if (avcodec_send_frame(enc, frame) == 0) rep.reencoded_frames++;
+                    drainEncoder();
+                    tick(t, entryIn, offsetSec);
+                }
+                av_frame_unref(frame);
+            }
+        };
+
+        seekAndFlush(findNearestKeyframe(a));
+        while (!done && ok && av_read_frame(fmtCtx_, inPkt) >= 0) {
+            if (inPkt->stream_index == videoIdx_ && avcodec_send_packet(videoCtx_, inPkt) == 0)
+                takeFrames();
+            av_packet_unref(inPkt);
+        }
+        if (!done) {
+            avcodec_send_packet(videoCtx_, nullptr);
+            takeFrames();
+        }
+        avcodec_flush_buffers(videoCtx_);
+        avcodec_send_frame(enc, nullptr);
+        drainEncoder();
+        avcodec_free_context(&enc);
+        rep.reencoded_sec += b - a;
+    };
+
+    // [k1, k2) のビデオパケットをそのままコピーする（k1 / k2 はキーフレーム）
+    auto copySpan = [&](double k1, double k2, double entryIn, double offsetSec) {
+        const int64_t shift = shiftFor(entryIn, offsetSec, outV->time_base);
+        auto emit = [&](AVPacket* p) {
+            av_packet_rescale_ts(p, inV->time_base, outV->time_base);
+            if (p->pts != AV_NOPTS_VALUE) p->pts += shift;
+            if (p->dts != AV_NOPTS_VALUE) p->dts += shift;
+            writePacket(p, 0);
+            rep.copied_packets++;
+        };
+        seekAndFlush(k1);
+        while (ok && av_read_frame(fmtCtx_, inPkt) >= 0) {
+            if (inPkt->stream_index != videoIdx_) { av_packet_unref(inPkt); continue; }
+            const int64_t ts = inPkt->pts != AV_NOPTS_VALUE ? inPkt->pts : inPkt->dts;
+            const double  t  = toSeconds(ts, inV->time_base);
+            if ((inPkt->flags & AV_PKT_FLAG_KEY) && t >= k2 - eps) { av_packet_unref(inPkt); break; }
+            if (t < k1 - eps) { av_packet_unref(inPkt); continue; }
+            tick(t, entryIn, offsetSec);
+            if (bsf) {
+                if (av_bsf_send_packet(bsf, inPkt) == 0) {
+                    while (av_bsf_receive_packet(bsf, outPkt) == 0) {
+                        emit(outPkt);
+                        av_packet_unref(outPkt);
+                    }
+                }
+            } else {
+                emit(inPkt);
+            }
+            av_packet_unref(inPkt);
+        }
+        rep.copied_sec += k2 - k1;
+    };
+
+    // 音声は [in, out) をコピーするだけ
+    auto copyAudio = [&](double in, double out, double offsetSec) {
+        if (!outA) return;
+        const int64_t shift = shiftFor(in, offsetSec, outA->time_base);
+        seekAndFlush(in);
+        while (ok && av_read_frame(fmtCtx_, inPkt) >= 0) {
+            if (inPkt->stream_index != audioIdx_) { av_packet_unref(inPkt); continue; }
+            const double t = toSeconds(inPkt->pts, inA->time_base);
+            if (t >= out) { av_packet_unref(inPkt); break; }
+            if (t >= in - 0.002) {
+                av_packet_rescale_ts(inPkt, inA->time_base, outA->time_base);
+                if (inPkt->pts != AV_NOPTS_VALUE) inPkt->pts += shift;
+                if (inPkt->dts != AV_NOPTS_VALUE) inPkt->dts += shift;
+                writePacket(inPkt, 1);
+            }
+            av_packet_unref(inPkt);
+        }
+    };
+
+    double offsetSec = 0.0;
+    for (size_t ei = 0; ei < entries.size() && ok; ei++) {
+        const auto& entry = entries[ei];
+        tick(entry.in_point, entry.in_point, offsetSec);
+        if (!ok) break;
+
+        auto first = std::lower_bound(
+            keyframeIdx_.begin(), keyframeIdx_.end(), entry.in_point - eps,
+            [](const KeyframeIndex& kf, double t) { return kf.pts_seconds < t; });
+        const double k1 = first != keyframeIdx_.end() ? first->pts_seconds : entry.out_point;
+        const double k2 = findNearestKeyframe(entry.out_point + eps);
+
+        if (k1 < k2 - eps) {
+            if (k1 > entry.in_point + eps) reencodeSpan(entry.in_point, k1, entry.in_point, offsetSec);
+            copySpan(k1, std::min(k2, entry.out_point), entry.in_point, offsetSec);
+            if (k2 < entry.out_point - eps) reencodeSpan(k2, entry.out_point, entry.in_point, offsetSec);
+        } else {
+            // エントリ内に完全な GOP が無い → 全部再エンコード
+            reencodeSpan(entry.in_point, entry.out_point, entry.in_point, offsetSec);
+        }
+        copyAudio(entry.in_point, entry.out_point, offsetSec);
+        offsetSec += entry.duration();
+    }
+
+    av_write_trailer(outFmt);
+    av_frame_free(&frame);
+    av_packet_free(&inPkt);
+    av_packet_free(&outPkt);
+    av_bsf_free(&bsf);
+    if (!(outFmt->oformat->flags & AVFMT_NOFILE)) avio_closep(&outFmt->pb);
+    avformat_free_context(outFmt);
+
+    if (cancelled) {
+        std::remove(outPath.c_str());
+        VOSE_LOG("スマートカット中止: " << outPath);
+        return finish(false);
+    }
+    VOSE_LOG("スマートカット完了: " << outPath << "  コピー " << rep.copied_sec
+             << "s / 再エンコード " << rep.reencoded_sec << "s");
+    reportProgress(1.0, "完了");
+    return finish(ok);
+}
+
+// ════════════════════════════════════════════════════════════════════
+//  Phase 6: concatFiles()  (並列書き出しセグメントのストリームコピー結合)
+// ════════════════════════════════════════════════════════════════════
+
+bool concatFiles(const std::vector<std::string>& inputs, const std::string& outPath) {
+    if (inputs.empty()) return false;
+
+    AVFormatContext* outFmt = nullptr;
+    int ret = avformat_alloc_output_context2(&outFmt, nullptr, nullptr, outPath.c_str());
+    if (ret < 0 || !outFmt) {
+        VOSE_ERR("出力コンテキスト生成失敗: " << avErr(ret));
+        return false;
+    }
+
+    bool    ok            = true;
+    bool    headerWritten = false;
+    double  offsetSec     = 0.0;   // 次の入力を置く位置（全ストリーム共通）
+    AVPacket* pkt = av_packet_alloc();
+
+    for (size_t fi = 0; fi < inputs.size() && ok; fi++) {
+        AVFormatContext* in = nullptr;
+        if (avformat_open_input(&in, inputs[fi].c_str(), nullptr, nullptr) < 0 ||
+            avformat_find_stream_info(in, nullptr) < 0) {
+            VOSE_ERR("セグメントを開けません: " << inputs[fi]);
+            if (in) avformat_close_input(&in);
+            ok = false;
+            break;
+        }
+
+        if (fi == 0) {
+            for (unsigned i = 0; i < in->nb_streams; i++) {
+                AVStream* out = avformat_new_stream(outFmt, nullptr);
+                if (!out) { ok = false; break; }
+                avcodec_parameters_copy(out->codecpar, in->streams[i]->codecpar);
+                out->codecpar->codec_tag = 0;
+                out->time_base = in->streams[i]->time_base;
+            }
+            if (ok && !(outFmt->oformat->flags & AVFMT_NOFILE)) {
+                ret = avio_open(&outFmt->pb, outPath.c_str(), AVIO_FLAG_WRITE);
+                if (ret < 0) { VOSE_ERR("avio_open 失敗: " << avErr(ret)); ok = false; }
+            }
+            if (ok) {
+                ret = avformat_write_header(outFmt, nullptr);
+                if (ret < 0) { VOSE_ERR("ヘッダ書き込み失敗: " << avErr(ret)); ok = false; }
+                headerWritten = ok;
+            }
+        } else if (in->nb_streams != outFmt->nb_streams) {
+            VOSE_ERR("セグメントのストリーム構成が一致しません: " << inputs[fi]);
+            ok = false;
+        }
+        if (!ok) { avformat_close_input(&in); break; }
+
+        // 各ストリームの先頭 DTS を offsetSec に揃える。入力の終端（最も遅いストリーム）が次の offset
+        const unsigned n = outFmt->nb_streams;
+        std::vector<int64_t> base(n, AV_NOPTS_VALUE);
+        double endSec = offsetSec;
+
+        while (ok && av_read_frame(in, pkt) >= 0) {
+            const unsigned si = static_cast<unsigned>(pkt->stream_index);
+            if (si >= n) { av_packet_unref(pkt); continue; }
+            AVStream* os = outFmt->streams[si];
+            av_packet_rescale_ts(pkt, in->streams[si]->time_base, os->time_base);
+
+            const int64_t ts = pkt->dts != AV_NOPTS_VALUE ? pkt->dts : pkt->pts;
+            if (ts == AV_NOPTS_VALUE) { av_packet_unref(pkt); continue; }
+            if (base[si] == AV_NOPTS_VALUE) base[si] = ts;
+            const int64_t shift = static_cast<int64_t>(std::llround(offsetSec / av_q2d(os->time_base)))
+                                - base[si];
+            if (pkt->pts != AV_NOPTS_VALUE) pkt->pts += shift;
+            if (pkt->dts != AV_NOPTS_VALUE) pkt->dts += shift;
+
+            const int64_t last = std::max(pkt->pts != AV_NOPTS_VALUE ? pkt->pts : pkt->dts,
+                                          pkt->dts != AV_NOPTS_VALUE ? pkt->dts : pkt->pts);
+            endSec = std::max(endSec, static_cast<double>(last + std::max<int64_t>(pkt->duration, 0))
+                                      * av_q2d(os->time_base));
+            pkt->pos          = -1;
+            pkt->stream_index = static_cast<int>(si);
+            ret = av_interleaved_write_frame(outFmt, pkt);
+            av_packet_unref(pkt);
+            if (ret < 0) { VOSE_ERR("パケット書き込み失敗: " << avErr(ret)); ok = false; }
+        }
+        avformat_close_input(&in);
+        offsetSec = endSec;
+    }
+
+    av_packet_free(&pkt);
+    if (headerWritten) av_write_trailer(outFmt);
+    if (!(outFmt->oformat->flags & AVFMT_NOFILE)) avio_closep(&outFmt->pb);
+    avformat_free_context(outFmt);
+    if (ok) VOSE_LOG("セグメント結合完了: " << inputs.size() << " 本 → " << outPath);
+    return ok;
+}
+
 // ════════════════════════════════════════════════════════════════════
 //  C API
 //  ★ vose_waveform のシグネチャを Python ラッパーと完全一致させる
@@ -1272,6 +1858,17 @@ int vose_save_frame(void* h, double time_sec, const char* out_path) {
     return static_cast<vose::VideoEngine*>(h)->saveFrame(time_sec, out_path) ? 1 : 0;
 }
 
+/**
+ * vose_get_frame — time_sec のフレームを呼び出し側のバッファへ RGB32 で書く（ファイルを経由しない）
+ *   buf    : stride × height バイト（呼び出し側で確保）
+ *   width / height : 出力サイズ（元の解像度から縮小・拡大する）
+ *   stride : 1 行のバイト数（width * 4 以上）
+ *   戻り値 : 1 = 成功, 0 = 失敗
+ */
+int vose_get_frame(void* h, double time_sec, uint8_t* buf, int width, int height, int stride) {
+    return static_cast<vose::VideoEngine*>(h)->grabFrame(time_sec, buf, width, height, stride) ? 1 : 0;
+}
+
 /**
  * vose_waveform
  *   h        : VideoEngine ハンドル
@@ -1290,6 +1887,43 @@ int vose_waveform(void* h, float* out_buf, int buf_size, int chunks) {
     return n;
 }
 
+/**
+ * vose_set_callbacks — 進捗通知・中止確認をハンドルに登録する（どちらも NULL 可）
+ *   progress : (進捗 0..1, 段階名 UTF-8, user) — 書き出し・インデックス作成のスレッドから呼ばれる
+ *   cancel   : (user) → 非 0 で中止。中止された書き出しは 0 を返し、書きかけの出力は削除される
+ *   対象     : vose_export_edl / vose_export_hw / vose_export_smart /
+ *              vose_export_with_subtitles / vose_build_keyframe_index
+ */
+typedef void (*vose_progress_fn)(double progress, const char* stage, void* user);
+typedef int  (*vose_cancel_fn)(void* user);
+
+void vose_set_callbacks(void* h, vose_progress_fn progress, vose_cancel_fn cancel, void* user) {
+    auto* eng = static_cast<vose::VideoEngine*>(h);
+    if (progress) {
+        eng->setProgressCallback([progress, user](double p, std::string stage) {
+            progress(p, stage.c_str(), user);
+        });
+    } else {
+        eng->setProgressCallback(nullptr);
+    }
+    if (cancel) {
+        eng->setCancelCallback([cancel, user] { return cancel(user) != 0; });
+    } else {
+        eng->setCancelCallback(nullptr);
+    }
+}
+
+/**
+ * vose_waveform_range — [t0, t1) 秒を bins 個に分けた min / max / RMS（モノラル、-1..1）
+ *   mins / maxs / rms : 呼び出し側が bins 個ずつ確保した float 配列（不要なものは NULL 可）
+ *   初回だけ音声全体をデコードして要約を作り、以降の呼び出しは要約から集計する
+ *   戻り値 : 書き込んだ要素数（音声なし・失敗時は 0）
+ */
+int vose_waveform_range(void* h, double t0, double t1, int bins,
+                        float* mins, float* maxs, float* rms) {
+    return static_cast<vose::VideoEngine*>(h)->waveformRange(t0, t1, bins, mins, maxs, rms);
+}
+
 int vose_export_edl(void* h, const char* edl_json, const char* out_path) {
     auto* eng = static_cast<vose::VideoEngine*>(h);
     vose::EDL edl;
@@ -1304,6 +1938,18 @@ int vose_export_hw(void* h, const char* edl_json,
     return eng->exportWithVideoToolbox(edl, out_path, quality) ? 1 : 0;
 }
 
+/**
+ * vose_export_smart — スマートカット書き出し
+ *   report : NULL 可。コピー / 再エンコードした尺などを書き込む
+ */
+int vose_export_smart(void* h, const char* edl_json, const char* out_path,
+                      int quality, vose::SmartCutReport* report) {
+    auto* eng = static_cast<vose::VideoEngine*>(h);
+    vose::EDL edl;
+    if (!edl.deserialize(edl_json)) return 0;
+    return eng->exportSmartCut(edl, out_path, quality, report) ? 1 : 0;
+}
+
 /**
  * vose_export_with_subtitles — 字幕付きエクスポート C API
  *   edl_json     : EDL JSON 文字列
@@ -1321,6 +1967,40 @@ int vose_export_with_subtitles(void* h,
     return eng->exportWithSubtitles(edl, subs, out_path) ? 1 : 0;
 }
 
+/**
+ * vose_concat_files — 書き出し済みセグメントをストリームコピーで結合（ハンドル不要）
+ *   inputs : ファイルパスの配列（count 個、結合順）
+ */
+int vose_concat_files(const char* const* inputs, int count, const char* out_path) {
+    if (!inputs || count <= 0 || !out_path) return 0;
+    std::vector<std::string> paths(inputs, inputs + count);
+    return vose::concatFiles(paths, out_path) ? 1 : 0;
+}
+
+/**
+ * フレームインデックス（全ビデオパケットの PTS / ファイル位置 / キーフレームフラグ、PTS 順）
+ *   vose_frame_index_count : 件数（vose_build_keyframe_index の後）
+ *   vose_copy_frame_index  : out に最大 capacity 件書き、書いた件数を返す
+ *   vose_set_frame_index   : 保存済みの表を読み込み、走査なしでキーフレーム索引を作る
+ *   vose_video_time_base   : PTS の単位（num / den 秒）
+ */
+int vose_frame_index_count(void* h) {
+    return static_cast<int>(static_cast<vose::VideoEngine*>(h)->frameIndex().size());
+}
+int vose_copy_frame_index(void* h, vose::FrameIndexEntry* out, int capacity) {
+    const auto& idx = static_cast<vose::VideoEngine*>(h)->frameIndex();
+    const int n = std::min(capacity, static_cast<int>(idx.size()));
+    if (!out || n <= 0) return 0;
+    std::copy(idx.begin(), idx.begin() + n, out);
+    return n;
+}
+int vose_set_frame_index(void* h, const vose::FrameIndexEntry* entries, int count) {
+    return static_cast<vose::VideoEngine*>(h)->setFrameIndex(entries, count) ? 1 : 0;
+}
+int vose_video_time_base(void* h, int* num, int* den) {
+    return static_cast<vose::VideoEngine*>(h)->videoTimeBase(num, den) ? 1 : 0;
+}
+
 int    vose_build_keyframe_index(void* h) {
     return static_cast<int>(
         static_cast<vose::VideoEngine*>(h)->buildKeyframeIndex().size());
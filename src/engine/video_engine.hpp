@@ -5,6 +5,7 @@
 #include <vector>
 #include <optional>
 #include <functional>
+#include <chrono>
 #include <cstdint>
 
 // FFmpeg forward declarations
@@ -14,6 +15,7 @@ extern "C" {
     struct AVCodecContext;
     struct SwsContext;
     struct AVRational;
+    struct AVFrame;
     
     // 今後 cpp 側だけでなく hpp 側でも直接 FFmpeg の型を拡張する場合に備え、
     // フィルター関連の構造体もここに安全に宣言しておきます
@@ -47,6 +49,17 @@ struct WaveformData {
     std::vector<float> rms;
 };
 
+/**
+ * 波形の要約：一定サンプル数ごとの min / max / 二乗和（waveformRange の集計元）
+ */
+struct WaveformSummary {
+    int sample_rate = 0;
+    int64_t samples = 0;
+    std::vector<float> mn;
+    std::vector<float> mx;
+    std::vector<float> sq;
+};
+
 /**
  * キーフレームインデックス：高速シーク用
  */
@@ -57,6 +70,16 @@ struct KeyframeIndex {
     int64_t file_pos;
 };
 
+/**
+ * フレームインデックス：全ビデオパケット（PTS 順）。サイドカー保存用の固定レイアウト（24 バイト）
+ */
+struct FrameIndexEntry {
+    int64_t pts;        // ビデオストリームの time_base 単位
+    int64_t file_pos;   // パケット先頭のバイト位置（不明なら -1）
+    int32_t flags;      // bit0 = キーフレーム
+    int32_t size;       // パケットのバイト数
+};
+
 /**
  * 字幕エントリ：VO-SE合成音声との連携用
  */
@@ -80,6 +103,19 @@ struct EDLEntry {
     double duration() const { return out_point - in_point; }
 };
 
+/**
+ * スマートカット書き出しのレポート（ストリームコピーした尺と再エンコードした尺）
+ * C API（vose_export_smart）からそのまま返すので POD のままにする
+ */
+struct SmartCutReport {
+    double  copied_sec;
+    double  reencoded_sec;
+    int64_t copied_packets;
+    int64_t reencoded_frames;
+    int     entries;
+    int     full_reencode;   // 1 = コーデック非対応のため全体を再エンコードした
+};
+
 class EDL {
 public:
     std::vector<EDLEntry> entries;
@@ -113,20 +149,33 @@ public:
     // --- Phase 1 & 2: 抽出・解析 ---
     std::optional<FrameInfo> extractFrame(double timeSec);
     bool saveFrame(double timeSec, const std::string& outPath);
+    // timeSec のフレームを dstW×dstH に縮小して呼び出し側のバッファへ直接書く
+    // （RGB32 = 0xffRRGGBB のネイティブエンディアン、1 行 dstStride バイト）。プレビュー用
+    bool grabFrame(double timeSec, uint8_t* dst, int dstW, int dstH, int dstStride);
     WaveformData extractWaveform(int chunks = 1000);
+    // [t0, t1) 秒を bins 個に分けた min / max / RMS を呼び出し側の配列へ書く（NULL の配列は飛ばす）
+    int waveformRange(double t0, double t1, int bins, float* mins, float* maxs, float* rms);
     std::vector<KeyframeIndex> buildKeyframeIndex();
     double findNearestKeyframe(double timeSec) const;
+    // 保存済みのフレームインデックスを読み込む（ファイルを走査せずにキーフレーム索引も作る）
+    bool setFrameIndex(const FrameIndexEntry* entries, int count);
+    const std::vector<FrameIndexEntry>& frameIndex() const { return frameIdx_; }
+    bool videoTimeBase(int* num, int* den) const;
 
     // --- Phase 4 & 5: エクスポート・最適化 ---
     bool exportFromEDL(const EDL& edl, const std::string& outPath);
     bool exportWithVideoToolbox(const EDL& edl, const std::string& outPath, int crfQuality = 20, const std::string& preset = "medium");
+    // GOP 内部はストリームコピー、カット端の不完全な GOP だけ同じコーデックで再エンコード
+    bool exportSmartCut(const EDL& edl, const std::string& outPath, int crfQuality = 20, SmartCutReport* report = nullptr);
     
     // 字幕連携
     SubtitleTrack subtitleTrackFromVOSE(const std::string& voseJsonPath);
     bool exportWithSubtitles(const EDL& edl, const SubtitleTrack& subs, const std::string& outPath);
 
-    // コールバック
+    // コールバック（書き出し・インデックス作成のスレッドから呼ばれる）
     void setProgressCallback(std::function<void(double, std::string)> cb) { progressCb_ = cb; }
+    // true を返すと実行中の書き出し / インデックス作成を中断する（書きかけの出力は削除）
+    void setCancelCallback(std::function<bool()> cb) { cancelCb_ = cb; }
 
 private:
     std::string filePath_;
@@ -142,16 +191,34 @@ private:
     int audioIdx_ = -1;
 
     std::vector<KeyframeIndex> keyframeIdx_;
+    std::vector<FrameIndexEntry> frameIdx_;
+    WaveformSummary waveSum_;   // 音声を 1 回だけデコードして作る（load / release で破棄）
+    bool buildWaveformSummary();
+
+    // grabFrame の状態。直前のフレームより少し先なら、シークせずにデコードを続ける
+    AVFrame*    grabFrm_   = nullptr;
+    SwsContext* grabSws_   = nullptr;
+    double      grabSec_   = 0.0;
+    bool        grabValid_ = false;   // デマルチプレクサ / デコーダが grabFrm_ の直後にいるか
     std::function<void(double, std::string)> progressCb_;
+    std::function<bool()> cancelCb_;
+    std::chrono::steady_clock::time_point lastReport_{};
 
     // 内部ユーティリティ
     bool seekAndFlush(double timeSec);
     // 引数をintにすることで、hpp側でFFmpegのenum定義との衝突を避ける
     SwsContext* makeSwsCtx(int w, int h, int srcFmt); 
     double toSeconds(int64_t pts, AVRational tb) const;
-    void reportProgress(double p, const std::string& stage);
+    // 進捗を通知し、中止要求が来ていれば false を返す（途中経過の通知は 50ms 間隔に間引く）
+    bool reportProgress(double p, const std::string& stage);
 };
 
+/**
+ * 同じエンコード設定で書き出したファイル群をストリームコピーで 1 本に結合する
+ * （並列書き出しのセグメント結合用。各ファイルのストリーム構成は同じであること）
+ */
+bool concatFiles(const std::vector<std::string>& inputs, const std::string& outPath);
+
 } // namespace vose
 
 #endif // VOSE_VIDEO_ENGINE_HPP
@@ -0,0 +1,132 @@
+"""
+test_edl_compiler.py
+compile_edl（重なりの結合・上位トラックによる遮蔽・尺での切り詰め・長さ 0 の除外）と
+export_job.plan_segments（1 セグメント 1 ソース・キーフレームでの分割）を確認する。
+"""
+
+from __future__ import annotations
+
+import pytest
+from edl_compiler import compile_edl
+from export_job import plan_segments, segment_duration
+
+MAIN = "main.mp4"
+OTHER = "other.mov"
+
+
+def _clip(start: float, duration: float, source: str = "", **kwargs: object) -> dict[str, object]:
+    return {"start": start, "duration": duration, "wav_path": source, **kwargs}
+
+
+def _spans(compiled: object, source: str) -> list[tuple[float, float]]:
+    si = compiled.sources.index(source)
+    return [(e["in"], e["out"]) for e in compiled.entries if e["source"] == si]
+
+
+def test_same_source_overlaps_are_merged() -> None:
+    compiled = compile_edl([[
+        _clip(0.0, 2.0),
+        _clip(1.5, 1.5),
+        _clip(3.0005, 1.0),                  # MERGE_GAP_SEC 以内の隙間はつなぐ
+        _clip(6.0, 1.0),
+    ]], MAIN)
+    assert compiled.sources == [MAIN]
+    assert _spans(compiled, MAIN) == [(0.0, 4.0005), (6.0, 7.0)]
+    assert compiled.stats["merged"] == 2
+    assert compiled.duration == pytest.approx(5.0005)
+
+
+def test_same_source_on_an_upper_track_does_not_occlude() -> None:
+    compiled = compile_edl([[_clip(1.0, 1.0)], [_clip(0.0, 3.0)]], MAIN)
+    assert _spans(compiled, MAIN) == [(0.0, 3.0)]
+    assert compiled.stats["hidden_sec"] == 0.0
+
+
+def test_upper_track_of_another_source_occludes() -> None:
+    compiled = compile_edl([
+        [_clip(1.0, 1.0, OTHER)],
+        [_clip(0.0, 3.0), _clip(1.2, 0.5)],   # 下のトラックは OTHER に隠れる区間を失う
+    ], MAIN)
+    assert compiled.sources == [MAIN, OTHER]
+    assert _spans(compiled, MAIN) == [(0.0, 1.0), (2.0, 3.0)]
+    assert _spans(compiled, OTHER) == [(1.0, 2.0)]
+    assert compiled.stats["hidden_sec"] == pytest.approx(1.0)
+    assert [e["source"] for e in compiled.entries] == [0, 1, 0]
+    assert compiled.stats["source_switches"] == 2
+
+
+def test_non_video_clips_use_the_default_source() -> None:
+    compiled = compile_edl([[_clip(0.0, 1.0, "voice.wav"), _clip(0.5, 1.0)]], MAIN)
+    assert compiled.sources == [MAIN]
+    assert _spans(compiled, MAIN) == [(0.0, 1.5)]
+
+
+def test_clips_are_clamped_to_the_source_duration() -> None:
+    compiled = compile_edl(
+        [[_clip(1.0, 3.0), _clip(5.0, 1.0), _clip(0.0, 1.0, OTHER)]],
+        MAIN,
+        durations={MAIN: 2.5},
+    )
+    assert _spans(compiled, MAIN) == [(1.0, 2.5)]       # 尺の外に始まるクリップは消える
+    assert _spans(compiled, OTHER) == [(0.0, 1.0)]      # 尺の分からないソースはそのまま
+    assert compiled.stats["dropped"] == 1
+
+
+def test_zero_length_disabled_and_hidden_clips_are_dropped() -> None:
+    compiled = compile_edl([
+        [_clip(0.0, 0.0), _clip(1.0, 0.0005), _clip(2.0, 1.0, enabled=False), _clip(4.0, 1.0)],
+        [_clip(0.0, 10.0)],
+    ], MAIN, hidden_tracks=[1])
+    assert _spans(compiled, MAIN) == [(4.0, 5.0)]
+    assert compiled.stats["dropped"] == 3
+    assert compiled.stats["clips"] == 4
+
+
+def test_empty_timeline() -> None:
+    compiled = compile_edl([[], []], MAIN)
+    assert compiled.sources == []
+    assert compiled.entries == []
+    assert compiled.to_json() == "[]"
+
+
+def _entry(a: float, b: float, source: int = 0, enabled: bool = True) -> dict[str, object]:
+    return {"in": a, "out": b, "enabled": enabled, "source": source}
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 5, 8])
+def test_plan_segments_never_mixes_sources(parts: int) -> None:
+    entries = [
+        _entry(0.0, 5.0, 0), _entry(5.0, 6.0, 1), _entry(6.0, 14.0, 0),
+        _entry(14.0, 30.0, 1), _entry(30.0, 31.0, 0),
+    ]
+    segments = plan_segments(entries, parts, snap=lambda t: t)
+    for segment in segments:
+        assert len({e["source"] for e in segment}) == 1
+    flat = [e for segment in segments for e in segment]
+    for src in (0, 1):
+        want = sum(e["out"] - e["in"] for e in entries if e["source"] == src)
+        got = sum(e["out"] - e["in"] for e in flat if e["source"] == src)
+        assert got == pytest.approx(want)
+    starts = [e["in"] for e in flat]
+    assert starts == sorted(starts)                     # 各ソースは前方向にしか読まない
+
+
+def test_plan_segments_cuts_main_source_on_keyframes_only() -> None:
+    keyframes = [0.0, 3.0, 6.0, 9.0, 12.0, 15.0, 18.0]
+
+    def snap(t: float) -> float:
+        return min(keyframes, key=lambda k: abs(k - t))
+
+    segments = plan_segments([_entry(0.0, 20.0, 0), _entry(20.0, 40.0, 1)], 4, snap=snap)
+    main_cuts = [e["out"] for seg in segments for e in seg if e["source"] == 0][:-1]
+    assert main_cuts and all(c in keyframes for c in main_cuts)
+    other = [seg for seg in segments if seg[0]["source"] == 1]
+    assert len(other) > 1                               # 主ソース以外は時間で切る
+    assert sum(segment_duration(seg) for seg in other) == pytest.approx(20.0)
+
+
+def test_plan_segments_skips_disabled_and_empty_entries() -> None:
+    assert plan_segments([], 4) == []
+    assert plan_segments([_entry(1.0, 1.0), _entry(2.0, 5.0, enabled=False)], 4) == []
+    segments = plan_segments([_entry(0.0, 1.0), _entry(1.0, 1.0)], 4)
+    assert segments == [[_entry(0.0, 1.0)]]
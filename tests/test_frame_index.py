@@ -0,0 +1,175 @@
+"""
+test_frame_index.py
+手組みの FRAME_INDEX_DTYPE 配列でサイドカーの保存・読み込み（元ファイルの同一性確認・
+更新時刻の食い違い・切り詰められたファイル）と FrameIndex の時刻検索を確認する。
+"""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+from frame_index import (
+    _HEADER,
+    _MAGIC,
+    FLAG_KEY,
+    FRAME_INDEX_DTYPE,
+    FrameIndex,
+    load_or_build,
+    load_sidecar,
+    save_sidecar,
+    sidecar_path,
+)
+
+TIME_BASE = (1, 1000)     # pts はミリ秒
+
+
+def _entries(pts: list[int], keys: set[int]) -> np.ndarray:
+    entries = np.zeros(len(pts), dtype=FRAME_INDEX_DTYPE)
+    entries["pts"] = pts
+    entries["file_pos"] = np.arange(len(pts)) * 4096
+    entries["flags"] = [FLAG_KEY if i in keys else 0 for i in range(len(pts))]
+    entries["size"] = 4096
+    return entries
+
+
+def _index() -> FrameIndex:
+    # 10 フレーム（100ms 間隔、先頭は 40ms）、キーフレームは 0 / 4 / 8 番
+    return FrameIndex(_entries([40 + 100 * i for i in range(10)], {0, 4, 8}), TIME_BASE)
+
+
+def test_frame_at() -> None:
+    index = _index()
+    assert len(index) == 10
+    assert index.frame_at(0.0) == 0                 # 最初のフレームより前
+    assert index.frame_at(0.04) == 0
+    assert index.frame_at(0.139) == 0
+    assert index.frame_at(0.14) == 1
+    assert index.frame_at(100.0) == 9
+    assert index.frame_time(-3) == pytest.approx(0.04)
+    assert index.frame_time(99) == pytest.approx(0.94)
+    assert index.snap(0.3) == pytest.approx(0.24)
+
+
+def test_keyframe_lookups() -> None:
+    index = _index()
+    np.testing.assert_allclose(index.key_times, [0.04, 0.44, 0.84])
+    assert index.nearest_keyframe(0.0) == pytest.approx(0.04)
+    assert index.nearest_keyframe(0.44) == pytest.approx(0.44)
+    assert index.nearest_keyframe(0.83) == pytest.approx(0.44)
+    assert index.nearest_keyframe(5.0) == pytest.approx(0.84)
+    assert index.next_keyframe(0.0) == pytest.approx(0.04)
+    assert index.next_keyframe(0.44) == pytest.approx(0.44)
+    assert index.next_keyframe(0.45) == pytest.approx(0.84)
+    assert index.next_keyframe(0.85) is None
+
+
+def test_keyframe_lookups_without_keyframes() -> None:
+    index = FrameIndex(_entries([0, 100], set()), TIME_BASE)
+    assert index.nearest_keyframe(0.5) == 0.5
+    assert index.next_keyframe(0.0) is None
+
+
+@pytest.fixture
+def video(tmp_path: object) -> str:
+    path = os.path.join(str(tmp_path), "clip.mp4")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 1000)
+    return path
+
+
+@pytest.fixture
+def index_dir(tmp_path: object) -> str:
+    return os.path.join(str(tmp_path), "index")
+
+
+def test_sidecar_round_trip(video: str, index_dir: str) -> None:
+    index = _index()
+    assert save_sidecar(video, index, index_dir)
+
+    side = sidecar_path(video, index_dir)
+    with open(side, "rb") as f:
+        magic, size, mtime, num, den, count = _HEADER.unpack(f.read(_HEADER.size))
+    st = os.stat(video)
+    assert (magic, size, mtime) == (_MAGIC, st.st_size, st.st_mtime_ns)
+    assert (num, den, count) == (*TIME_BASE, 10)
+
+    loaded = load_sidecar(video, index_dir)
+    assert loaded is not None
+    assert loaded.time_base == TIME_BASE
+    np.testing.assert_array_equal(loaded.entries, index.entries)
+    np.testing.assert_allclose(loaded.key_times, index.key_times)
+
+
+def test_sidecar_is_stale_after_mtime_change(video: str, index_dir: str) -> None:
+    save_sidecar(video, _index(), index_dir)
+    st = os.stat(video)
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert load_sidecar(video, index_dir) is None
+
+
+def test_sidecar_is_stale_after_size_change(video: str, index_dir: str) -> None:
+    save_sidecar(video, _index(), index_dir)
+    st = os.stat(video)
+    with open(video, "ab") as f:
+        f.write(b"\0")
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert load_sidecar(video, index_dir) is None
+
+
+@pytest.mark.parametrize("keep", [0, _HEADER.size - 1, _HEADER.size, _HEADER.size + 30])
+def test_truncated_sidecar_is_rejected(video: str, index_dir: str, keep: int) -> None:
+    save_sidecar(video, _index(), index_dir)
+    with open(sidecar_path(video, index_dir), "r+b") as f:
+        f.truncate(keep)
+    assert load_sidecar(video, index_dir) is None
+
+
+def test_sidecar_with_bad_magic_is_rejected(video: str, index_dir: str) -> None:
+    save_sidecar(video, _index(), index_dir)
+    with open(sidecar_path(video, index_dir), "r+b") as f:
+        f.write(b"NOTANIDX")
+    assert load_sidecar(video, index_dir) is None
+
+
+def test_missing_source_or_empty_index(video: str, index_dir: str) -> None:
+    assert load_sidecar(video, index_dir) is None
+    assert not save_sidecar(video, FrameIndex(_entries([], set()), TIME_BASE), index_dir)
+    assert not save_sidecar(video + ".missing", _index(), index_dir)
+
+
+class _FakeEngine:
+    """load_or_build が使う VideoEngine のメソッドだけを持ち、走査回数を数える"""
+
+    def __init__(self, index: FrameIndex) -> None:
+        self.index = index
+        self.builds = 0
+        self.installed: list[np.ndarray] = []
+
+    def set_frame_index(self, entries: np.ndarray) -> bool:
+        self.installed.append(entries)
+        return True
+
+    def build_keyframe_index(self) -> int:
+        self.builds += 1
+        return len(self.index)
+
+    def frame_index_table(self) -> tuple[np.ndarray, tuple[int, int]]:
+        return self.index.entries, self.index.time_base
+
+
+def test_load_or_build_uses_the_sidecar_until_the_source_changes(video: str, index_dir: str) -> None:
+    engine = _FakeEngine(_index())
+    assert load_or_build(engine, video, index_dir) is not None
+    assert engine.builds == 1                           # サイドカーが無いので走査して保存
+
+    assert load_or_build(engine, video, index_dir) is not None
+    assert engine.builds == 1
+    np.testing.assert_array_equal(engine.installed[-1], engine.index.entries)
+
+    st = os.stat(video)
+    os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert load_or_build(engine, video, index_dir) is not None
+    assert engine.builds == 2
+    assert load_sidecar(video, index_dir) is not None   # 新しい更新時刻で保存し直す
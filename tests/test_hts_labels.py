@@ -0,0 +1,153 @@
+"""
+test_hts_labels.py
+hts_labels.parse_labels / records_to_accent_phrases を旧 IntonationAnalyzer._parse_labels
+（bench_talk.legacy_parse_labels に移植済み）の出力と突き合わせる。
+旧実装は音素を p3 以降の文字列ごと取り込み、アクセントも読めていなかったので、
+句の切れ目（E フィールド）と各句の音素列・音素数を比較する。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+import pytest
+
+from modules.talk.hts_labels import (
+    UNDEFINED,
+    parse_labels,
+    phoneme_id,
+    phoneme_name,
+    records_to_accent_phrases,
+)
+from modules.tools.bench_talk import legacy_parse_labels
+
+# pyopenjtalk.make_label 形式:「今日は、いい天気です。」（3 アクセント句、読点で pau）
+_TAIL = "/G:xx_xx%xx_xx_xx/H:xx_xx/I:{i}/J:xx_xx/K:2+3-11"
+_SIL = "/A:xx+xx+xx/B:xx-xx_xx/C:xx_xx+xx/D:xx+xx_xx/E:{e}/F:xx_xx#xx_xx@xx_xx|xx_xx"
+_NONE = "xx-xx@xx+xx&xx-xx|xx+xx"
+
+
+def _label(ctx: str, a: str, e: str, f: str, i: str) -> str:
+    return (f"{ctx}/A:{a}/B:xx-xx_xx/C:xx_xx+xx/D:xx+xx_xx/E:{e}/F:{f}"
+            + _TAIL.format(i=i))
+
+
+LABELS: list[str] = [
+    "xx^xx-sil+ky=o" + _SIL.format(e="xx_xx!xx_xx-xx") + _TAIL.format(i=_NONE),
+    _label("xx^sil-ky+o=o", "0+1+3", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", "1-3@1+2&1-2|1+11"),
+    _label("sil^ky-o+o=w", "0+1+3", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", "1-3@1+2&1-2|1+11"),
+    _label("ky^o-o+w=a", "1+2+2", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", "1-3@1+2&1-2|1+11"),
+    _label("o^o-w+a=pau", "2+3+1", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", "1-3@1+2&1-2|1+11"),
+    _label("o^w-a+pau=i", "2+3+1", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", "1-3@1+2&1-2|1+11"),
+    "w^a-pau+i=i" + _SIL.format(e="3_1!0_xx-xx") + _TAIL.format(i=_NONE),
+    _label("a^pau-i+i=t", "0+1+2", "3_1!0_xx-0", "2_1#0_xx@1_2|1_8", "2-8@2+1&2-1|4+8"),
+    _label("pau^i-i+t=e", "1+2+1", "3_1!0_xx-0", "2_1#0_xx@1_2|1_8", "2-8@2+1&2-1|4+8"),
+    _label("i^i-t+e=N", "0+1+6", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("i^t-e+N=k", "0+1+6", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("t^e-N+k=i", "1+2+5", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("e^N-k+i=d", "2+3+4", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("N^k-i+d=e", "2+3+4", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("k^i-d+e=s", "3+4+3", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("i^d-e+s=U", "3+4+3", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("d^e-s+U=sil", "4+5+2", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    _label("e^s-U+sil=xx", "4+5+2", "2_1!0_xx-1", "6_1#0_xx@2_2|3_8", "2-8@2+1&2-1|4+8"),
+    "s^U-sil+xx=xx" + _SIL.format(e="6_1!0_xx-xx") + _TAIL.format(i=_NONE),
+]
+
+_SILENT = ("sil", "pau", "xx")
+
+# A フィールドだけが壊れた「きょ」のラベル（句は前後と同じ）
+_BAD_A = _label("xx^sil-ky+o=o", "a+b+c", "xx_xx!xx_xx-xx", "3_1#0_xx@1_1|1_3", _NONE)
+
+
+def _legacy_phrases(labels: Sequence[str]) -> list[tuple[str, int]]:
+    """
+    旧パーサの句分割に沿って (音素列, 音素数) を作る。旧実装の音素は
+    "p3+p4=p5/A:..." まで取り込んでいたので "+" の手前だけを使い、無音は除く。
+    """
+    phrases = legacy_parse_labels(labels)
+    counted = [label for label in labels if len(label.split("-")) > 1]
+    out: list[tuple[str, int]] = []
+    pos = 0
+    for phrase in phrases:
+        group = counted[pos:pos + phrase.mora_count]
+        pos += phrase.mora_count
+        names = [label.split("-")[1].split("+")[0] for label in group]
+        names = [p for p in names if p not in _SILENT]
+        if names:
+            out.append(("".join(names), len(names)))
+    assert pos == len(counted)
+    return out
+
+
+def _new_phrases(labels: Sequence[str]) -> list[tuple[str, int]]:
+    return [(p.text, p.mora_count) for p in records_to_accent_phrases(parse_labels(labels))]
+
+
+def test_records_match_label_fields() -> None:
+    records = parse_labels(LABELS)
+    assert len(records) == len(LABELS)
+    assert [phoneme_name(i) for i in records["phoneme_id"]] == [
+        label.split("-")[1].split("+")[0] for label in LABELS
+    ]
+    assert records["accent_dist"][1] == 0 and records["mora_pos_rev"][1] == 3
+    assert records["accent_dist"][0] == UNDEFINED
+    assert records["mora_count"].tolist()[7:9] == [2, 2]
+    # 文頭の sil・各句・pau・文末の sil がそれぞれ別の句になる
+    assert records["phrase_id"].tolist() == [0] + [1] * 5 + [2] + [3] * 2 + [4] * 9 + [5]
+    assert np.isnan(records["start"]).all()
+
+
+def test_accent_phrases_match_legacy() -> None:
+    assert _new_phrases(LABELS) == _legacy_phrases(LABELS)
+    assert _new_phrases(LABELS) == [("kyoowa", 5), ("ii", 2), ("teNkidesU", 9)]
+
+
+def test_accent_position_and_f0_come_from_f2() -> None:
+    phrases = records_to_accent_phrases(parse_labels(LABELS))
+    assert [p.accent_position for p in phrases] == [1, 1, 1]
+    assert all(f == 150.0 + 5.0 for p in phrases for f in p.f0_values)
+
+
+@pytest.mark.parametrize("bad", [
+    "",
+    "garbage",
+    "xx^sil-ky+o=o/A:0+1+3",   # /E: /F: が無い途中切れ
+])
+def test_malformed_labels_match_legacy(bad: str) -> None:
+    for labels in ([bad] + LABELS, LABELS[:4] + [bad] + LABELS[4:], LABELS + [bad]):
+        records = parse_labels(labels)
+        assert len(records) == len(labels)
+        assert _new_phrases(labels) == _legacy_phrases(labels)
+
+
+def test_non_numeric_field_keeps_the_phrase() -> None:
+    labels = LABELS[:4] + [_BAD_A] + LABELS[4:]
+    assert _new_phrases(labels) == _legacy_phrases(labels)
+    assert _new_phrases(labels)[0] == ("kyookywa", 6)
+
+
+def test_unparsable_label_is_kept_as_undefined() -> None:
+    records = parse_labels(["garbage"] + LABELS)
+    assert records["phoneme_id"][0] == phoneme_id("xx")
+    for field in ("accent_dist", "mora_pos", "mora_pos_rev", "mora_count", "accent_type"):
+        assert records[field][0] == UNDEFINED
+
+    records = parse_labels(LABELS[:1] + [_BAD_A] + LABELS[1:])
+    assert phoneme_name(records["phoneme_id"][1]) == "ky"
+    assert records["accent_dist"][1] == UNDEFINED
+    assert records["mora_count"][1] == 3 and records["accent_type"][1] == 1
+
+
+def test_timed_labels() -> None:
+    timed = [f"{k * 500000} {(k + 1) * 500000} {label}" for k, label in enumerate(LABELS)]
+    records = parse_labels(timed)
+    np.testing.assert_allclose(records["start"], np.arange(len(LABELS)) * 0.05)
+    np.testing.assert_allclose(records["end"], (np.arange(len(LABELS)) + 1) * 0.05)
+    assert _new_phrases(timed) == _new_phrases(LABELS)
+
+
+def test_empty_input() -> None:
+    assert len(parse_labels([])) == 0
+    assert records_to_accent_phrases(parse_labels([])) == []
@@ -0,0 +1,116 @@
+"""
+test_media_probe.py
+ProbeCache が変わっていないファイルを SQLite から返し、サイズ・更新時刻が変われば
+プローブし直すことを確認する。PyAV は使わず、生成した WAV を wave で読む。
+"""
+
+from __future__ import annotations
+
+import os
+import wave
+
+import media_probe
+import pytest
+from media_probe import MediaInfo, ProbeCache
+
+
+@pytest.fixture
+def probes(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """probe_file に渡されたパスを記録する（PyAV は無いものとして扱う）"""
+    calls: list[str] = []
+    real = media_probe.probe_file
+
+    def counting(path: str) -> MediaInfo | None:
+        calls.append(os.path.basename(path))
+        return real(path)
+
+    monkeypatch.setattr(media_probe, "_AV_AVAILABLE", False)
+    monkeypatch.setattr(media_probe, "probe_file", counting)
+    return calls
+
+
+def _wav(path: str, frames: int, sample_rate: int = 48000, channels: int = 2) -> str:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\0" * frames * 2 * channels)
+    return path
+
+
+@pytest.fixture
+def wavs(tmp_path: object) -> list[str]:
+    return [
+        _wav(os.path.join(str(tmp_path), "a.wav"), 48000),
+        _wav(os.path.join(str(tmp_path), "b.wav"), 24000, sample_rate=24000, channels=1),
+    ]
+
+
+def test_second_get_many_is_served_from_sqlite(tmp_path: object, wavs: list[str],
+                                               probes: list[str]) -> None:
+    db = os.path.join(str(tmp_path), "probe.sqlite3")
+    cache = ProbeCache(db)
+    first = cache.get_many(wavs)
+    assert sorted(probes) == ["a.wav", "b.wav"]
+    assert first[0] is not None and first[0].duration == pytest.approx(1.0)
+    assert first[1] is not None and (first[1].sample_rate, first[1].channels) == (24000, 1)
+    cache.close()
+
+    probes.clear()
+    reopened = ProbeCache(db)                       # 別インスタンスでもファイルから読める
+    second = reopened.get_many(wavs)
+    assert probes == []
+    assert second == first
+    stats = reopened.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 0, 2)
+    reopened.close()
+
+
+def test_size_change_forces_a_reprobe(wavs: list[str], probes: list[str]) -> None:
+    cache = ProbeCache(":memory:")
+    cache.get_many(wavs)
+    probes.clear()
+
+    st = os.stat(wavs[0])
+    _wav(wavs[0], 96000)
+    os.utime(wavs[0], ns=(st.st_atime_ns, st.st_mtime_ns))   # 更新時刻は同じでもサイズで気づく
+    infos = cache.get_many(wavs)
+    assert probes == ["a.wav"]
+    assert infos[0] is not None and infos[0].duration == pytest.approx(2.0)
+
+
+def test_mtime_change_forces_a_reprobe(wavs: list[str], probes: list[str]) -> None:
+    cache = ProbeCache(":memory:")
+    cache.get_many(wavs)
+    probes.clear()
+
+    st = os.stat(wavs[1])
+    os.utime(wavs[1], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    infos = cache.get_many(wavs)
+    assert probes == ["b.wav"]
+    assert infos[1] is not None and infos[1].mtime_ns == st.st_mtime_ns + 1_000_000_000
+    assert cache.get(wavs[1]) == infos[1]
+    assert probes == ["b.wav"]
+
+
+def test_probe_version_change_forces_a_reprobe(wavs: list[str], probes: list[str],
+                                               monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ProbeCache(":memory:")
+    cache.get_many(wavs)
+    probes.clear()
+    monkeypatch.setattr(media_probe, "PROBE_VERSION", media_probe.PROBE_VERSION + 1)
+    cache.get_many(wavs)
+    assert sorted(probes) == ["a.wav", "b.wav"]
+
+
+def test_missing_and_unprobeable_files(tmp_path: object, probes: list[str]) -> None:
+    other = os.path.join(str(tmp_path), "clip.mp4")
+    with open(other, "wb") as f:
+        f.write(b"\0" * 16)
+    cache = ProbeCache(":memory:")
+    assert cache.get_many([os.path.join(str(tmp_path), "missing.wav"), other]) == [None, None]
+    assert probes == ["clip.mp4"]                   # 存在しないファイルはプローブしない
+    assert cache.get(other) is None
+    assert probes == ["clip.mp4", "clip.mp4"]       # 失敗は保存しない
+    stats = cache.stats()
+    assert (stats["failures"], stats["entries"]) == (2, 0)
@@ -0,0 +1,171 @@
+"""
+test_oto.py
+oto.ini のパース・文字コード判定・エイリアス検索・エンジン向けの cutoff 変換・
+.npz キャッシュのキーを、文字列で組んだ oto.ini で確認する。
+"""
+
+from __future__ import annotations
+
+import codecs
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from modules.talk import oto
+from modules.talk.oto import (
+    OTO_FIELDS,
+    OtoTable,
+    decode_oto_bytes,
+    load_oto,
+    parse_oto,
+)
+
+OTO_TEXT = "\n".join([
+    "_あ.wav=- あ,50,120,-300,80,20",         # 負の cutoff（offset からの長さ）
+    "_い.wav=- い,40,100,0,60,15",            # cutoff 0（末尾まで）
+    "_う.wav=- う,30,90,250,70,10",           # 正の cutoff（右ブランク）
+    "_え.wav=,10,20,30,40,50",                # エイリアス空欄 → ファイル名
+    "_お.wav=- お,5,6",                       # 数値の欠けは 0
+    "_か.wav=- か,abc,1,2,3,4",               # 数値にならない行は捨てる
+    "コメント行",                              # '=' の無い行は捨てる
+    "_あ2.wav=- あ,999,999,999,999,999",      # 重複エイリアス（先の行が勝つ）
+    "",
+])
+
+
+def test_parse_oto_columns() -> None:
+    table = parse_oto(OTO_TEXT, directory="sub", root="/voice")
+    assert table.alias.tolist() == ["- あ", "- い", "- う", "_え", "- お", "- あ"]
+    assert table.filename.tolist()[:2] == ["_あ.wav", "_い.wav"]
+    assert set(table.directory.tolist()) == {"sub"}
+    np.testing.assert_array_equal(table.values()[0], [50, 120, -300, 80, 20])
+    np.testing.assert_array_equal(table.values()[3], [10, 20, 30, 40, 50])
+    np.testing.assert_array_equal(table.values()[4], [5, 6, 0, 0, 0])
+    assert table.wav_paths()[0] == os.path.join("/voice", "sub", "_あ.wav")
+
+
+def test_parse_oto_empty_text() -> None:
+    table = parse_oto("")
+    assert len(table) == 0
+    assert table.values().shape == (0, len(OTO_FIELDS))
+    assert table.lookup(["- あ"]).tolist() == [-1]
+
+
+def test_lookup_first_duplicate_wins() -> None:
+    table = parse_oto(OTO_TEXT)
+    rows = table.lookup(["- あ", "- う", "missing", "_え", ""])
+    assert rows.tolist() == [0, 2, -1, 3, -1]
+    assert "- い" in table
+    assert "- ん" not in table
+    timings = table.timings(["- あ", "missing"])
+    assert timings["offset"].tolist() == [50.0, 0.0]
+    assert timings["preutterance"].tolist() == [80.0, 0.0]
+
+
+def test_to_entries_converts_cutoff_for_the_engine() -> None:
+    table = parse_oto(OTO_TEXT, root="/voice")
+    entries = table.to_entries()
+    by_alias = {bytes(e["alias"]).decode("utf-8"): e for e in entries}
+    assert len(entries) == 5                                   # 一意なエイリアスごとに 1 件
+
+    neg, zero, pos = by_alias["- あ"], by_alias["- い"], by_alias["- う"]
+    assert neg["cutoff"] == 50 + 300                           # offset - cutoff
+    assert neg["blank"] == -300
+    assert neg["offset"] == 50                                 # 重複行（999）ではない
+    assert zero["cutoff"] == 0.0 and np.signbit(zero["cutoff"])
+    assert zero["blank"] == 0.0
+    assert pos["cutoff"] == -250
+    assert pos["blank"] == 250
+    assert bytes(neg["wav_path"]).decode("utf-8") == os.path.join("/voice", "_あ.wav")
+    assert neg["filename"] == 0
+
+
+def test_decode_oto_bytes_utf8_and_bom() -> None:
+    text = "_あ.wav=- あ,1,2,3,4,5\n"
+    assert decode_oto_bytes(text.encode("utf-8")) == text
+    assert decode_oto_bytes(codecs.BOM_UTF8 + text.encode("utf-8")) == text
+
+
+def test_decode_oto_bytes_cp932() -> None:
+    pytest.importorskip("chardet")
+    raw = OTO_TEXT.encode("cp932")
+    assert decode_oto_bytes(raw) == OTO_TEXT
+
+
+def test_low_confidence_guess_falls_back_to_cp932(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 短い cp932 は別のコードページと低い確信度で判定されやすい
+    detector = types.SimpleNamespace(detect=lambda raw: {"encoding": "cp1252", "confidence": 0.4})
+    monkeypatch.setitem(sys.modules, "chardet", detector)
+    raw = "_あ.wav=- あ,1,2,3,4,5".encode("cp932")
+    assert decode_oto_bytes(raw) == "_あ.wav=- あ,1,2,3,4,5"
+
+
+def _voice(root: str, files: dict[str, bytes]) -> None:
+    for rel, raw in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(raw)
+
+
+def test_load_oto_reads_subfolders_in_path_order(tmp_path: object) -> None:
+    root = os.path.join(str(tmp_path), "voice")
+    _voice(root, {
+        "oto.ini": "_あ.wav=- あ,1,2,3,4,5\n".encode(),
+        "B4/oto.ini": "_あ.wav=- あ,9,9,9,9,9\n_い.wav=- い,1,1,1,1,1\n".encode(),
+    })
+    table = load_oto(root, cache_dir=None)
+    assert table is not None
+    assert len(table) == 3
+    assert table.offset[table.lookup(["- あ"])[0]] == 9.0          # "B4/oto.ini" < "oto.ini"
+    assert table.directory[table.lookup(["- い"])[0]] == "B4"
+
+
+def test_load_oto_cp932_file(tmp_path: object) -> None:
+    pytest.importorskip("chardet")
+    root = os.path.join(str(tmp_path), "voice")
+    _voice(root, {"oto.ini": OTO_TEXT.encode("cp932")})
+    table = load_oto(root, cache_dir=None)
+    assert table is not None
+    assert "- あ" in table
+
+
+def test_cache_is_keyed_by_content(tmp_path: object, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = os.path.join(str(tmp_path), "voice")
+    cache_dir = os.path.join(str(tmp_path), "cache")
+    _voice(root, {"oto.ini": "_あ.wav=- あ,1,2,3,4,5\n".encode()})
+
+    first = load_oto(root, cache_dir=cache_dir)
+    assert first is not None
+    assert len(os.listdir(cache_dir)) == 1
+
+    def no_parse(*args: object, **kwargs: object) -> OtoTable:
+        raise AssertionError("cache hit must not parse")
+
+    monkeypatch.setattr(oto, "parse_oto", no_parse)
+    cached = load_oto(root, cache_dir=cache_dir)
+    assert cached is not None
+    np.testing.assert_array_equal(cached.values(), first.values())
+    assert cached.root == os.path.abspath(root)
+
+    # 内容が変われば別キーになり、パースし直す
+    monkeypatch.undo()
+    _voice(root, {"oto.ini": "_あ.wav=- あ,7,2,3,4,5\n".encode()})
+    changed = load_oto(root, cache_dir=cache_dir)
+    assert changed is not None
+    assert changed.offset.tolist() == [7.0]
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_cache_key_depends_on_relative_paths_and_bytes() -> None:
+    key = oto._cache_key
+    base = key("/a", ["/a/oto.ini"], [b"x=y"])
+    assert base == key("/b", ["/b/oto.ini"], [b"x=y"])           # root の場所は無関係
+    assert base != key("/a", ["/a/B4/oto.ini"], [b"x=y"])
+    assert base != key("/a", ["/a/oto.ini"], [b"x=z"])
+    # ファイル境界をずらした同じ連結バイト列は別キー
+    two = ["/a/oto.ini", "/a/B4/oto.ini"]
+    assert key("/a", two, [b"ab", b"c"]) != key("/a", two, [b"a", b"bc"])
@@ -0,0 +1,193 @@
+"""
+test_pack_voice.py
+pack_voice.pack_all_voices で一時ディレクトリに .vbank を作り、
+voice_bank.VoiceBank で読み戻して内容・配置が保たれることと、
+再パック時に変更された WAV だけが符号化し直されることを確認する。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from modules.talk.voice_bank import (
+    BANK_ALIGN,
+    BANK_ENTRY_DTYPE,
+    BANK_HEADER_DTYPE,
+    BANK_MAGIC,
+    BANK_VERSION,
+    CODEC_NAMES,
+    DEFAULT_BANK_NAME,
+    VoiceBank,
+    read_bank_blob,
+)
+from modules.tools import pack_voice
+
+
+def _write_wav(path: str, data: np.ndarray, sample_rate: int = 44100, channels: int = 1) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(np.ascontiguousarray(data, dtype="<i2").tobytes())
+
+
+def _voices(root: str) -> dict[str, np.ndarray]:
+    """3 つの合成音源を置き、エントリ名 → 期待するモノラル int16 を返す"""
+    rng = np.random.default_rng(0)
+    voices = os.path.join(root, "assets", "official_voices")
+    t = np.arange(4410) / 44100.0
+    a = (np.sin(2 * np.pi * 220 * t) * 12000).astype(np.int16)
+    i = rng.integers(-32768, 32767, 1001, dtype=np.int16)      # 奇数長・フルスケール
+    stereo = rng.integers(-8000, 8000, (2000, 2), dtype=np.int16)
+    _write_wav(os.path.join(voices, "a.wav"), a)
+    _write_wav(os.path.join(voices, "i.wav"), i, sample_rate=22050)
+    _write_wav(os.path.join(voices, "extra", "u.wav"), stereo, channels=2)
+    return {
+        "a": a,
+        "i": i,
+        "extra_u": np.round(stereo.mean(axis=1)).astype(np.int16),
+    }
+
+
+def _pack(root: str, codec: str, **kwargs: object) -> str:
+    pack_voice.pack_all_voices(codec=codec, analyze=False, base_dir=root, jobs=1, **kwargs)
+    return os.path.join(root, "bin", DEFAULT_BANK_NAME)
+
+
+@pytest.mark.parametrize("codec", sorted(CODEC_NAMES))
+def test_pack_then_load_round_trip(tmp_path: object, codec: str) -> None:
+    root = str(tmp_path)
+    expected = _voices(root)
+    bank_path = _pack(root, codec)
+
+    raw = np.fromfile(bank_path, dtype=np.uint8)
+    header = raw[:BANK_HEADER_DTYPE.itemsize].view(BANK_HEADER_DTYPE)[0]
+    assert bytes(header["magic"]) == BANK_MAGIC
+    assert int(header["version"]) == BANK_VERSION
+    assert int(header["entry_count"]) == len(expected)
+    assert int(header["index_offset"]) == BANK_HEADER_DTYPE.itemsize
+    assert int(header["data_offset"]) % BANK_ALIGN == 0
+    assert int(header["file_size"]) == len(raw)
+
+    bank = VoiceBank(bank_path)
+    assert sorted(bank.names()) == sorted(expected)
+    index = bank.index
+    assert index.dtype == BANK_ENTRY_DTYPE
+    offsets = index["offset"].astype(np.int64)
+    assert (offsets % BANK_ALIGN == 0).all()
+    assert (offsets >= int(header["data_offset"])).all()
+    ends = offsets + index["nbytes"].astype(np.int64)
+    order = np.argsort(offsets)
+    assert (offsets[order][1:] >= ends[order][:-1]).all()      # ブロブが重ならない
+    assert int(ends.max()) <= len(raw)
+    assert (index["codec"] == CODEC_NAMES[codec]).all()
+
+    for name, data in expected.items():
+        np.testing.assert_array_equal(bank.samples(name), data)
+        assert int(bank.info(name)["samples"]) == len(data)
+        assert bank.verify(name)
+    assert int(bank.info("i")["sample_rate"]) == 22050
+    assert int(bank.info("extra_u")["channels"]) == 2
+
+    manifest_offsets = {
+        name: entry["offset"]
+        for name, entry in _manifest(root)["entries"].items()
+    }
+    assert manifest_offsets == {name: int(bank.info(name)["offset"]) for name in expected}
+
+
+def test_raw_entries_are_zero_copy_views(tmp_path: object) -> None:
+    root = str(tmp_path)
+    expected = _voices(root)
+    bank = VoiceBank(_pack(root, "raw"))
+    view = bank.samples("a")
+    assert not view.flags.writeable
+    assert not view.flags.owndata
+    np.testing.assert_array_equal(view, expected["a"])
+
+
+def _manifest(root: str) -> dict:
+    with open(os.path.join(root, "bin", pack_voice.MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _blobs(root: str) -> dict[str, bytes]:
+    bank_path = os.path.join(root, "bin", DEFAULT_BANK_NAME)
+    return {
+        name: read_bank_blob(bank_path, e["offset"], e["nbytes"])
+        for name, e in _manifest(root)["entries"].items()
+    }
+
+
+@pytest.fixture
+def encoded(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """_encode_wav に渡されたエントリ名を記録する（プロセスプールはスレッドで代用）"""
+    calls: list[str] = []
+    real = pack_voice._encode_wav
+
+    def counting(wav_path: str, codec_id: int) -> object:
+        calls.append(pack_voice._entry_name(wav_path))
+        return real(wav_path, codec_id)
+
+    monkeypatch.setattr(pack_voice, "_encode_wav", counting)
+    monkeypatch.setattr(pack_voice, "ProcessPoolExecutor", ThreadPoolExecutor)
+    return calls
+
+
+def test_repack_reencodes_only_the_changed_wav(tmp_path: object, encoded: list[str]) -> None:
+    root = str(tmp_path)
+    expected = _voices(root)
+    voices = os.path.join(root, "assets", "official_voices")
+    _pack(root, "flac")
+    assert sorted(encoded) == sorted(expected)
+    before = _blobs(root)
+
+    encoded.clear()
+    changed = expected["a"][::-1].copy()                      # 長さは同じで中身だけ違う
+    _write_wav(os.path.join(voices, "a.wav"), changed)
+    os.utime(os.path.join(voices, "i.wav"))                   # touch だけなら再符号化しない
+    _pack(root, "flac")
+
+    assert encoded == ["a"]
+    after = _blobs(root)
+    assert after["a"] != before["a"]
+    for name in ("i", "extra_u"):
+        assert after[name] == before[name]
+    bank = VoiceBank(os.path.join(root, "bin", DEFAULT_BANK_NAME))
+    np.testing.assert_array_equal(bank.samples("a"), changed)
+    np.testing.assert_array_equal(bank.samples("i"), expected["i"])
+
+
+def test_repack_sends_only_dirty_wavs_to_the_pool(tmp_path: object, encoded: list[str]) -> None:
+    root = str(tmp_path)
+    expected = _voices(root)
+    voices = os.path.join(root, "assets", "official_voices")
+    _pack(root, "delta")
+    before = _blobs(root)
+
+    encoded.clear()
+    _write_wav(os.path.join(voices, "a.wav"), expected["a"] // 2)
+    _write_wav(os.path.join(voices, "i.wav"), expected["i"] // 2, sample_rate=22050)
+    pack_voice.pack_all_voices(codec="delta", analyze=False, base_dir=root, jobs=2)
+
+    assert sorted(encoded) == ["a", "i"]
+    assert _blobs(root)["extra_u"] == before["extra_u"]
+
+
+def test_repack_without_changes_leaves_the_bank_alone(tmp_path: object, encoded: list[str]) -> None:
+    root = str(tmp_path)
+    _voices(root)
+    bank_path = _pack(root, "raw")
+    st = os.stat(bank_path)
+
+    encoded.clear()
+    _pack(root, "raw")
+    assert encoded == []
+    assert os.stat(bank_path).st_mtime_ns == st.st_mtime_ns
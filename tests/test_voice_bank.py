@@ -0,0 +1,144 @@
+"""
+test_voice_bank.py
+voice_bank のコーデック往復、LRU 常駐の追い出し順、stats() の計数を確認する。
+エンジンはロード/アンロードを記録するだけの偽物で代用する。
+"""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+from modules.talk.voice_bank import (
+    CODEC_NAMES,
+    BankSource,
+    VoiceBank,
+    decode_samples,
+    encode_samples,
+    write_voice_bank,
+)
+
+_CASES = {
+    "empty":    np.zeros(0, dtype=np.int16),
+    "single":   np.array([-32768], dtype=np.int16),
+    "extremes": np.array([32767, -32768, 32767, 0, -32768, -1, 1], dtype=np.int16),
+    "noise":    np.random.default_rng(1).integers(-32768, 32767, 4097, dtype=np.int16),
+}
+
+
+@pytest.mark.parametrize("case", sorted(_CASES))
+@pytest.mark.parametrize("codec", sorted(CODEC_NAMES))
+def test_codec_round_trip(codec: str, case: str) -> None:
+    data = _CASES[case]
+    codec_id = CODEC_NAMES[codec]
+    blob = encode_samples(data, codec_id)
+    decoded = decode_samples(blob, codec_id, len(data))
+    assert decoded.dtype == np.int16
+    np.testing.assert_array_equal(decoded, data)
+
+
+def test_unknown_codec_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        encode_samples(_CASES["single"], 99)
+    with pytest.raises(ValueError):
+        decode_samples(b"\0\0", 99, 1)
+
+
+@pytest.mark.parametrize("codec", sorted(CODEC_NAMES))
+def test_zero_sample_entry_survives_the_bank(tmp_path: object, codec: str) -> None:
+    path = os.path.join(str(tmp_path), "empty.vbank")
+    sources = [
+        BankSource("empty", 0, 44100, 1, read=lambda: _CASES["empty"]),
+        BankSource("noise", len(_CASES["noise"]), 44100, 1, read=lambda: _CASES["noise"]),
+    ]
+    write_voice_bank(path, sources, CODEC_NAMES[codec])
+    bank = VoiceBank(path)
+    assert bank.samples("empty").shape == (0,)
+    assert bank.verify("empty")
+    np.testing.assert_array_equal(bank.samples("noise"), _CASES["noise"])
+
+
+class _FakeLib:
+    """load_embedded_resource / unload_embedded_resource の呼び出し順を記録する"""
+
+    def __init__(self, handle: int = 1) -> None:
+        self._handle = handle
+        self.loaded: list[str] = []
+        self.unloaded: list[str] = []
+
+    def load_embedded_resource(self, name: bytes, data: object, length: int) -> None:
+        self.loaded.append(name.decode("utf-8"))
+
+    def unload_embedded_resource(self, name: bytes) -> None:
+        self.unloaded.append(name.decode("utf-8"))
+
+
+_ENTRY_SAMPLES = 100       # 常駐コストは 8 バイト / サンプル → 800 バイト / エントリ
+
+
+def _bank(tmp_path: object, budget_bytes: int) -> VoiceBank:
+    path = os.path.join(str(tmp_path), "lru.vbank")
+    data = np.arange(_ENTRY_SAMPLES, dtype=np.int16)
+    write_voice_bank(path, [
+        BankSource(name, _ENTRY_SAMPLES, 44100, 1, read=lambda: data)
+        for name in ("a", "b", "c", "d")
+    ])
+    return VoiceBank(path, budget_bytes=budget_bytes)
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path: object) -> None:
+    bank = _bank(tmp_path, budget_bytes=2 * _ENTRY_SAMPLES * 8)
+    lib = _FakeLib()
+
+    bank.register(lib, ["a"])
+    bank.register(lib, ["b"])
+    bank.register(lib, ["a"])        # a を最新にする → 次に追い出されるのは b
+    bank.register(lib, ["c"])
+    assert lib.unloaded == ["b"]
+    bank.register(lib, ["d"])
+    assert lib.unloaded == ["b", "a"]
+    bank.register(lib, ["b"])
+    assert lib.unloaded == ["b", "a", "c"]
+    assert lib.loaded == ["a", "b", "c", "d", "b"]
+    assert bank.stats()["resident_bytes"] <= bank.budget_bytes
+
+
+def test_pinned_entries_are_not_evicted(tmp_path: object) -> None:
+    bank = _bank(tmp_path, budget_bytes=_ENTRY_SAMPLES * 8)
+    lib = _FakeLib()
+
+    with bank.use(lib, ["a"]):
+        bank.register(lib, ["b"])
+        bank.register(lib, ["c"])
+        assert "a" not in lib.unloaded
+    assert lib.unloaded == ["b", "a"]        # 解放後に予算まで戻す
+    assert bank.stats()["resident"] == 1
+
+
+def test_residency_is_tracked_per_library(tmp_path: object) -> None:
+    bank = _bank(tmp_path, budget_bytes=4 * _ENTRY_SAMPLES * 8)
+    first, second = _FakeLib(1), _FakeLib(2)
+    bank.register(first, ["a", "b"])
+    bank.register(second, ["a"])
+    assert sorted(first.loaded) == ["a", "b"]
+    assert second.loaded == ["a"]
+    assert bank.stats()["resident"] == 3
+
+
+def test_stats_counts_hits_and_misses(tmp_path: object) -> None:
+    bank = _bank(tmp_path, budget_bytes=2 * _ENTRY_SAMPLES * 8)
+    lib = _FakeLib()
+
+    assert bank.register(lib, ["a", "b"]) == 2
+    assert bank.register(lib, ["a", "b"]) == 0
+    bank.register(lib, ["c"])
+    bank.register(lib, ["missing"])           # バンクに無い名前は数えない
+    stats = bank.stats()
+    assert stats["misses"] == 3
+    assert stats["hits"] == 2
+    assert stats["evictions"] == 1
+    assert stats["resident"] == 2
+    assert stats["resident_bytes"] == 2 * _ENTRY_SAMPLES * 8
+    assert stats["budget_bytes"] == 2 * _ENTRY_SAMPLES * 8